@@ -372,6 +372,8 @@ class AutomationRenameHosts(Automation):
         if self._rename_host_file(cmk.utils.paths.var_dir + "/inventory", oldname, newname):
             self._rename_host_file(cmk.utils.paths.var_dir + "/inventory", oldname + ".gz",
                                    newname + ".gz")
+            self._rename_host_file(cmk.utils.paths.var_dir + "/inventory", oldname + ".bin",
+                                   newname + ".bin")
             actions.append("inv")
 
         if self._rename_host_dir(cmk.utils.paths.var_dir + "/inventory_archive", oldname, newname):
@@ -752,6 +754,7 @@ class AutomationDeleteHosts(Automation):
                 "%s/persisted/%s" % (cmk.utils.paths.var_dir, hostname),
                 "%s/inventory/%s" % (cmk.utils.paths.var_dir, hostname),
                 "%s/inventory/%s.gz" % (cmk.utils.paths.var_dir, hostname),
+                "%s/inventory/%s.bin" % (cmk.utils.paths.var_dir, hostname),
                 "%s/agent_deployment/%s" % (cmk.utils.paths.var_dir, hostname),
         ]:
             self._delete_if_exists(path)
@@ -1295,6 +1298,7 @@ class AutomationDiagHost(Automation):
             character_encoding=snmp_config.character_encoding,
             is_usewalk_host=snmp_config.is_usewalk_host,
             is_inline_snmp_host=snmp_config.is_inline_snmp_host,
+            is_native_snmp_host=snmp_config.is_native_snmp_host,
             record_stats=config.record_inline_snmp_stats,
         )
 
@@ -2497,6 +2497,8 @@ class HostConfig:
             character_encoding=self._snmp_character_encoding(),
             is_usewalk_host=self.is_usewalk_host,
             is_inline_snmp_host=self._is_inline_snmp_host(),
+            is_native_snmp_host=self._config_cache.in_binary_hostlist(self.hostname,
+                                                                      native_snmp_hosts),
             record_stats=record_inline_snmp_stats,
         )
 
@@ -2976,6 +2978,8 @@ class HostConfig:
             character_encoding=self._snmp_character_encoding(),
             is_usewalk_host=self.is_usewalk_host,
             is_inline_snmp_host=self._is_inline_snmp_host(),
+            is_native_snmp_host=self._config_cache.in_binary_hostlist(self.hostname,
+                                                                      native_snmp_hosts),
             record_stats=record_inline_snmp_stats,
         )
 
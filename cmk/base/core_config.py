@@ -5,11 +5,25 @@
 # conditions defined in the file COPYING, which is part of this source code package.
 
 import abc
+import multiprocessing
 import numbers
 import os
 import sys
 import shutil
-from typing import AnyStr, Callable, Dict, List, Optional, Tuple, Union, Iterator, Final
+from typing import (
+    Any,
+    AnyStr,
+    Callable,
+    Dict,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+    Union,
+    Iterator,
+    Final,
+)
 from contextlib import contextmanager, suppress
 from pathlib import Path
 
@@ -51,6 +65,8 @@ ObjectMacros = Dict[str, AnyStr]
 CoreCommandName = str
 CoreCommand = str
 
+_T = TypeVar("_T")
+
 
 class HelperConfig:
     """Managing the helper core config generations below var/check_mk/core/helper-config/[serial]
@@ -404,6 +420,66 @@ def _create_core_config(core: MonitoringCore) -> ConfigurationWarnings:
     return get_configuration_warnings()
 
 
+def num_config_processes() -> int:
+    """The number of processes creating the host specific parts of the configuration"""
+    if config.core_config_processes < 1:
+        return os.cpu_count() or 1
+    return config.core_config_processes
+
+
+# The function executed by the worker processes of map_hosts(). The workers are
+# forked, so they inherit it (and everything else) from the parent process.
+_host_function: Optional[Callable[[HostName], Any]] = None
+_WorkerResult = Tuple[Any, ConfigurationWarnings, List[HostName], ip_lookup.DNSLookups]
+
+
+def map_hosts(function: Callable[[HostName], _T],
+              hostnames: Sequence[HostName]) -> Iterator[Tuple[HostName, _T]]:
+    """Yields the result of function for every host in the order of hostnames
+
+    With more than one configured process (see num_config_processes()) the
+    hosts are processed by forked worker processes. They only read the
+    loaded configuration and the ConfigCache, which they share with this
+    process copy-on-write. Their results are merged in the order of the
+    hosts, so the result does not depend on the number of processes. The
+    configuration warnings, failed IP lookups and the looked up addresses of
+    the workers are collected in this process. Changed addresses are also
+    written to the persisted IP lookup cache by the workers themselves.
+    """
+    processes = min(num_config_processes(), len(hostnames))
+    if processes <= 1:
+        for hostname in hostnames:
+            yield hostname, function(hostname)
+        return
+
+    global _host_function
+    _host_function = function
+    try:
+        with multiprocessing.get_context("fork").Pool(processes) as pool:
+            # Small chunks keep the workers busy until the end, larger ones
+            # reduce the overhead of the communication
+            chunksize = max(1, min(100, len(hostnames) // (processes * 4)))
+            worker_results = pool.imap(_call_host_function, hostnames, chunksize)
+            for hostname, worker_result in zip(hostnames, worker_results):
+                result, warnings, failed_ip_lookups, dns_lookups = worker_result
+                g_configuration_warnings.extend(warnings)
+                _failed_ip_lookups.extend(failed_ip_lookups)
+                ip_lookup.add_dns_lookups(dns_lookups)
+                yield hostname, result
+    finally:
+        _host_function = None
+
+
+def _call_host_function(hostname: HostName) -> _WorkerResult:
+    assert _host_function is not None
+    initialize_warnings()
+    del _failed_ip_lookups[:]
+    num_dns_lookups = ip_lookup.count_dns_lookups()
+    result = _host_function(hostname)
+    return (result, g_configuration_warnings, _failed_ip_lookups,
+            ip_lookup.get_dns_lookups_since(num_dns_lookups))
+
+
 def _verify_non_deprecated_checkgroups() -> None:
     """Verify that the user has no deprecated check groups configured.
     """
@@ -6,6 +6,7 @@
 """Code for support of Nagios (and compatible) cores"""
 
 import base64
+import functools
 import os
 import py_compile
 import sys
@@ -114,6 +115,29 @@ class NagiosConfig:
         # TODO: Something seems to be mixed up in our call sites...
         self._outfile.write(ensure_str(x))
 
+    def merge_host_config(self, host_cfg: "NagiosConfig") -> None:
+        """Append the configuration of a host that has been created separately
+
+        The commands of host checks via service states are numbered through,
+        so the commands of the host have to be renumbered.
+        """
+        assert isinstance(host_cfg._outfile, StringIO)
+        text = host_cfg._outfile.getvalue()
+        for command, command_line in host_cfg.hostcheck_commands_to_define:
+            new_command = _hostcheck_command_name(len(self.hostcheck_commands_to_define) + 1)
+            text = text.replace(
+                _format_nagios_attribute("check_command", command) + "\n",
+                _format_nagios_attribute("check_command", new_command) + "\n")
+            self.hostcheck_commands_to_define.append((new_command, command_line))
+        self.write(text)
+
+        self.hostgroups_to_define.update(host_cfg.hostgroups_to_define)
+        self.servicegroups_to_define.update(host_cfg.servicegroups_to_define)
+        self.contactgroups_to_define.update(host_cfg.contactgroups_to_define)
+        self.checknames_to_define.update(host_cfg.checknames_to_define)
+        self.active_checks_to_define.update(host_cfg.active_checks_to_define)
+        self.custom_commands_to_define.update(host_cfg.custom_commands_to_define)
+
 
 def create_config(outfile: IO[str], hostnames: Optional[List[HostName]]) -> None:
     if config.host_notification_periods != []:
@@ -144,8 +168,9 @@ def create_config(outfile: IO[str], hostnames: Optional[List[HostName]]) -> None
 
     _output_conf_header(cfg)
 
-    for hostname in sorted(hostnames):
-        _create_nagios_config_host(cfg, config_cache, hostname)
+    for _hostname, host_cfg in core_config.map_hosts(
+            functools.partial(_create_nagios_host_config, config_cache), sorted(hostnames)):
+        cfg.merge_host_config(host_cfg)
 
     _create_nagios_config_contacts(cfg, hostnames)
     _create_nagios_config_hostgroups(cfg)
@@ -167,6 +192,13 @@ def _output_conf_header(cfg: NagiosConfig) -> None:
 """)
 
 
+def _create_nagios_host_config(config_cache: ConfigCache, hostname: HostName) -> NagiosConfig:
+    """Creates the objects of a single host, see NagiosConfig.merge_host_config()"""
+    host_cfg = NagiosConfig(StringIO(), hostnames=None)
+    _create_nagios_config_host(host_cfg, config_cache, hostname)
+    return host_cfg
+
+
 def _create_nagios_config_host(cfg: NagiosConfig, config_cache: ConfigCache,
                                hostname: HostName) -> None:
     cfg.write("\n# ----------------------------------------------------\n")
@@ -208,7 +240,7 @@ def _create_nagios_host_spec(cfg: NagiosConfig, config_cache: ConfigCache, hostn
             host_spec[key] = value
 
     def host_check_via_service_status(service: ServiceName) -> CoreCommand:
-        command = "check-mk-host-custom-%d" % (len(cfg.hostcheck_commands_to_define) + 1)
+        command = _hostcheck_command_name(len(cfg.hostcheck_commands_to_define) + 1)
         cfg.hostcheck_commands_to_define.append(
             (command, 'echo "$SERVICEOUTPUT:%s:%s$" && exit $SERVICESTATEID:%s:%s$' %
              (host_config.hostname, service.replace('$HOSTNAME$', host_config.hostname),
@@ -598,6 +630,10 @@ def _add_ping_service(cfg: NagiosConfig, config_cache: ConfigCache, host_config:
     cfg.write(_format_nagios_object("service", service_spec))
 
 
+def _hostcheck_command_name(number: int) -> CoreCommandName:
+    return "check-mk-host-custom-%d" % number
+
+
 def _format_nagios_object(object_type: str, object_spec: ObjectSpec) -> str:
     cfg = ["define %s {" % object_type]
     for key, val in sorted(object_spec.items(), key=lambda x: x[0]):
@@ -609,12 +645,16 @@ def _format_nagios_object(object_type: str, object_spec: ObjectSpec) -> str:
                 if key.startswith(prefix):
                     key = prefix + _b16encode(key[len(prefix):])
                     val = _b16encode(val)
-        cfg.append("  %-29s %s" % (key, val))
+        cfg.append(_format_nagios_attribute(key, val))
     cfg.append("}")
 
     return "\n".join(cfg) + "\n\n"
 
 
+def _format_nagios_attribute(key: str, value: Any) -> str:
+    return "  %-29s %s" % (key, value)
+
+
 def _b16encode(b: str) -> str:
     return ensure_str(base64.b16encode(ensure_binary(b)))
 
@@ -965,28 +1005,32 @@ def _precompile_hostchecks(serial: ConfigSerial) -> None:
 
     console.verbose("Precompiling host checks...\n")
 
-    host_check_store = HostCheckStore()
-    for hostname in config_cache.all_active_hosts():
-        try:
-            console.verbose("%s%s%-16s%s:",
-                            tty.bold,
-                            tty.blue,
-                            hostname,
-                            tty.normal,
-                            stream=sys.stderr)
-            host_check = _dump_precompiled_hostcheck(config_cache, serial, hostname)
-            if host_check is None:
-                console.verbose("(no Checkmk checks)\n")
-                continue
-
-            host_check_store.write(serial, hostname, host_check)
-        except Exception as e:
-            if cmk.utils.debug.enabled():
-                raise
-            console.error("Error precompiling checks for host %s: %s\n" % (hostname, e))
+    for hostname, error in core_config.map_hosts(
+            functools.partial(_precompile_hostcheck, config_cache, serial),
+            sorted(config_cache.all_active_hosts())):
+        if error is not None:
+            console.error("Error precompiling checks for host %s: %s\n" % (hostname, error))
             sys.exit(5)
 
 
+def _precompile_hostcheck(config_cache: ConfigCache, serial: ConfigSerial,
+                          hostname: HostName) -> Optional[str]:
+    """Creates the precompiled host check of the host, returns the error in case it failed"""
+    try:
+        console.verbose("%s%s%-16s%s:", tty.bold, tty.blue, hostname, tty.normal, stream=sys.stderr)
+        host_check = _dump_precompiled_hostcheck(config_cache, serial, hostname)
+        if host_check is None:
+            console.verbose("(no Checkmk checks)\n")
+            return None
+
+        HostCheckStore().write(serial, hostname, host_check)
+    except Exception as e:
+        if cmk.utils.debug.enabled():
+            raise
+        return str(e)
+    return None
+
+
 def _dump_precompiled_hostcheck(config_cache: ConfigCache,
                                 serial: ConfigSerial,
                                 hostname: HostName,
@@ -49,6 +49,8 @@ check_mk_perfdata_with_times = True
 debug_log = False  # deprecated
 monitoring_host = None  # deprecated
 max_num_processes = 50
+# Number of processes creating the core configuration (0: one per CPU)
+core_config_processes = 1
 fallback_agent_output_encoding = 'latin-1'
 stored_passwords: _Dict = {}
 # Collection of predefined rule conditions. For the moment this setting is only stored
@@ -62,6 +64,8 @@ http_proxies: _Dict = {}
 use_inline_snmp = True
 # Ruleset to disable Inline-SNMP per host when use_inline_snmp is enabled.
 non_inline_snmp_hosts: _List = []
+# Ruleset to use the native SNMP backend (no net-snmp processes) per host
+native_snmp_hosts: _List = []
 
 # Ruleset to recduce fetched OIDs of a check, only inline SNMP
 snmp_limit_oid_range: _List = []
@@ -14,13 +14,14 @@ from contextlib import suppress
 
 import cmk.utils.cleanup
 import cmk.utils.debug
+import cmk.utils.inventory_archive as inventory_archive
 import cmk.utils.misc
 import cmk.utils.paths
 import cmk.utils.store as store
 import cmk.utils.tty as tty
 from cmk.utils.exceptions import MKGeneralException
 from cmk.utils.log import console
-from cmk.utils.structured_data import StructuredDataTree
+from cmk.utils.structured_data import StructuredDataTree, binary_tree_filepath
 from cmk.utils.type_defs import (
     HostAddress,
     HostName,
@@ -256,6 +257,8 @@ def _cleanup_status_data(hostname: HostName) -> None:
         os.remove(filepath)
     with suppress(OSError):
         os.remove(filepath + ".gz")
+    with suppress(OSError):
+        os.remove(binary_tree_filepath(filepath))
 
 
 def _do_inv_for(
@@ -507,6 +510,8 @@ def _save_inventory_tree(hostname: HostName,
             os.remove(filepath)
         if os.path.exists(filepath + ".gz"):
             os.remove(filepath + ".gz")
+        if os.path.exists(binary_tree_filepath(filepath)):
+            os.remove(binary_tree_filepath(filepath))
         return None
 
     old_tree = StructuredDataTree().load_from(filepath)
@@ -519,11 +524,19 @@ def _save_inventory_tree(hostname: HostName,
         console.verbose("New inventory tree\n")
     else:
         console.verbose("Inventory tree has changed\n")
-        old_time = os.stat(filepath).st_mtime
-        arcdir = "%s/%s" % (cmk.utils.paths.inventory_archive_dir, hostname)
-        store.makedirs(arcdir)
-        os.rename(filepath, arcdir + ("/%d" % old_time))
+        old_time = int(os.stat(filepath).st_mtime)
+        if not inventory_archive.has_delta(hostname, old_time):
+            # Saved by a former version: The delta of the old tree can only be
+            # computed as long as the old tree itself is archived
+            arcdir = "%s/%s" % (cmk.utils.paths.inventory_archive_dir, hostname)
+            store.makedirs(arcdir)
+            os.rename(filepath, arcdir + ("/%d" % old_time))
+            if os.path.exists(binary_tree_filepath(filepath)):
+                os.rename(binary_tree_filepath(filepath),
+                          binary_tree_filepath(arcdir + ("/%d" % old_time)))
     inventory_tree.save_to(cmk.utils.paths.inventory_output_dir, hostname)
+    inventory_archive.save_delta(hostname, int(os.stat(filepath).st_mtime), inventory_tree,
+                                 old_tree)
     return old_tree
 
 
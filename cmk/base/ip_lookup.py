@@ -5,6 +5,7 @@
 # conditions defined in the file COPYING, which is part of this source code package.
 
 import errno
+import itertools
 import os
 import socket
 from typing import AnyStr, cast, Dict, List, Optional, Tuple, Union
@@ -26,6 +27,7 @@ IPLookupCacheId = Tuple[HostName, int]
 NewIPLookupCache = Dict[IPLookupCacheId, str]
 LegacyIPLookupCache = Dict[str, str]
 UpdateDNSCacheResult = Tuple[int, List[HostName]]
+DNSLookups = List[Tuple[IPLookupCacheId, Optional[str]]]
 
 _fake_dns: Optional[HostAddress] = None
 _enforce_localhost = False
@@ -162,6 +164,23 @@ def cached_dns_lookup(hostname: HostName, family: int, is_no_ip_host: bool) -> O
                                      (family, hostname, e))
 
 
+def count_dns_lookups() -> int:
+    """The number of addresses looked up by cached_dns_lookup() in this process"""
+    return len(_config_cache.get_dict("cached_dns_lookup"))
+
+
+def get_dns_lookups_since(count: int) -> DNSLookups:
+    """The addresses looked up after the first count ones, see count_dns_lookups()"""
+    cache = _config_cache.get_dict("cached_dns_lookup")
+    # The lookups are only added to the cache, so the latest ones are the last items
+    return list(itertools.islice(reversed(cache.items()), len(cache) - count))[::-1]
+
+
+def add_dns_lookups(lookups: DNSLookups) -> None:
+    """Adds the addresses looked up by another process, e.g. a worker of core_config.map_hosts()"""
+    _config_cache.get_dict("cached_dns_lookup").update(lookups)
+
+
 class IPLookupCache(cmk.base.caching.DictCache):
     def __init__(self) -> None:
         super(IPLookupCache, self).__init__()
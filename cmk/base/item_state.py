@@ -19,9 +19,9 @@ Do not store long-time things here. Also do not store complex
 structures like log files or stuff.
 """
 
-import os
 import traceback
-from typing import Any, AnyStr, Dict, List, Optional, Tuple, Union
+from pathlib import Path
+from typing import Any, AnyStr, Dict, List, MutableMapping, Optional, Tuple, Union
 
 import cmk.utils.cleanup
 import cmk.utils.paths
@@ -30,6 +30,8 @@ from cmk.utils.exceptions import MKException, MKGeneralException
 from cmk.utils.type_defs import HostName
 from cmk.utils.log import logger
 
+import cmk.base.item_state_store as item_state_store
+
 # Constants for counters
 SKIP = None
 RAISE = False
@@ -41,7 +43,7 @@ g_suppress_on_wrap = True  # Suppress check on wrap (raise an exception)
 
 ItemStateKeyElement = Optional[AnyStr]
 ItemStateKey = Tuple[ItemStateKeyElement, ...]
-ItemStates = Dict[ItemStateKey, Any]
+ItemStates = MutableMapping[ItemStateKey, Any]
 OnWrap = Union[None, bool, float]
 
 
@@ -53,15 +55,15 @@ class CachedItemStates:
     def __init__(self) -> None:
         self._logger = logger
         super(CachedItemStates, self).__init__()
+        self._item_states = item_state_store.LazyItemStates({})
         self.reset()
 
     def reset(self) -> None:
-        self._item_states: ItemStates = {}
+        self._item_states.close()
+        self._item_states = item_state_store.LazyItemStates({})
         self._item_state_prefix: ItemStateKey = ()
-        # timestamp of last modification
-        self._last_mtime: Optional[float] = None
         self._removed_item_state_keys: List[ItemStateKey] = []
-        self._updated_item_states: ItemStates = {}
+        self._updated_item_states: Dict[ItemStateKey, Any] = {}
 
     def clear_all_item_states(self) -> None:
         removed_item_state_keys = list(self._item_states.keys())
@@ -69,54 +71,35 @@ class CachedItemStates:
         self._removed_item_state_keys = removed_item_state_keys
 
     def load(self, hostname: HostName) -> None:
+        """Open the item states of the host, the values are decoded on first access"""
         self._logger.debug("Loading item states")
-        filename = cmk.utils.paths.counters_dir + "/" + hostname
+        filename = Path(cmk.utils.paths.counters_dir, hostname)
         try:
-            # TODO: refactoring. put these two values into a named tuple
-            self._item_states = store.load_object_from_file(
-                filename,
-                default={},
-                lock=True,
-            )
-            self._last_mtime = os.stat(filename).st_mtime
+            store.aquire_lock(filename)
+            self._item_states.close()
+            self._item_states = item_state_store.LazyItemStates(item_state_store.load(filename))
         finally:
             store.release_lock(filename)
 
-    # TODO: self._last_mtime needs be updated accordingly after the save_object_to_file operation
-    #       right now, the current mechanism is sufficient enough, since the save() function is only
-    #       called as the final operation, just before the lifecycle of the CachedItemState ends
     def save(self, hostname: HostName) -> None:
         """ The job of the save function is to update the item state on disk.
-        It simply returns, if it detects that the data wasn't changed at all since the last loading
-        If the data on disk has been changed in the meantime, the cached data is updated from disk.
-        Afterwards only the actual modifications (update/remove) are applied to the updated cached
-        data before it is written back to disk.
+        It simply returns, if the data wasn't changed at all since the loading.
+        Otherwise only the actual modifications (update/remove) are appended
+        to the file, so that the modifications of concurrent processes are
+        merged key by key.
         """
         self._logger.debug("Saving item states")
-        filename = cmk.utils.paths.counters_dir + "/" + hostname
+        filename = Path(cmk.utils.paths.counters_dir, hostname)
         if not self._removed_item_state_keys and not self._updated_item_states:
             return
 
         try:
-            if not os.path.exists(cmk.utils.paths.counters_dir):
-                os.makedirs(cmk.utils.paths.counters_dir)
-
             store.aquire_lock(filename)
-            last_mtime = os.stat(filename).st_mtime
-            if last_mtime != self._last_mtime:
-                self._item_states = store.load_object_from_file(filename, default={})
-
-                # Remove obsolete keys
-                for key in self._removed_item_state_keys:
-                    try:
-                        del self._item_states[key]
-                    except KeyError:
-                        pass
-
-                # Add updated keys
-                self._item_states.update(self._updated_item_states)
-
-            store.save_object_to_file(filename, self._item_states, pretty=False)
+            item_state_store.save_changes(
+                filename,
+                self._updated_item_states,
+                self._removed_item_state_keys,
+            )
         except Exception:
             raise MKGeneralException("Cannot write to %s: %s" % (filename, traceback.format_exc()))
         finally:
@@ -133,6 +116,7 @@ class CachedItemStates:
     def remove_full_key(self, full_key: ItemStateKey) -> None:
         try:
             self._removed_item_state_keys.append(full_key)
+            self._updated_item_states.pop(full_key, None)
             del self._item_states[full_key]
         except KeyError:
             pass
@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright (C) 2019 tribe29 GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""Binary storage of the item states of a host
+
+A state file consists of a base segment and a log of deltas:
+
+    header:  magic, end of the base segment, number of entries
+    index:   (hash, key offset, key length, value offset, value length) per
+             entry, sorted by the hash of the encoded key
+    data:    the encoded keys and the marshalled values
+    deltas:  length prefixed records of removed keys and updated entries
+
+The base segment is accessed via mmap: Only the values that are actually
+looked up are decoded. Saving appends the changes of a check cycle as a new
+delta, so concurrent writers merge on the level of single keys. Once the
+deltas are larger than the base segment, the file is compacted into a new
+base segment.
+
+Files in the former format (a repr()'d dict) are read as well and replaced
+by the binary format on the next save.
+"""
+
+import ast
+import marshal
+import mmap
+import os
+import struct
+import zlib
+from pathlib import Path
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    MutableMapping,
+    Optional,
+    Set,
+    Tuple,
+)
+
+import cmk.utils.store as store
+
+__all__ = [
+    "ItemStateFile",
+    "LazyItemStates",
+    "load",
+    "save_changes",
+]
+
+# The key type of the item states, see cmk.base.item_state.ItemStateKey
+_Key = Tuple[Any, ...]
+
+MAGIC = b"CMKIS\x00\x00\x01"
+_HEADER = struct.Struct(">8sQI")
+_ENTRY = struct.Struct(">IIIII")
+_RECORD = struct.Struct(">I")
+# Deltas smaller than this never trigger a compaction
+_MIN_COMPACTION_SIZE = 64 * 1024
+
+_NONE, _STR, _BYTES, _LITERAL = b"\x00", b"\x01", b"\x02", b"\x03"
+
+
+def encode_key(key: _Key) -> bytes:
+    """Encode the key deterministically (which marshal does not)"""
+    parts = []
+    for element in key:
+        if element is None:
+            parts.append(_NONE)
+            continue
+        if isinstance(element, str):
+            tag, raw = _STR, element.encode("utf-8", "surrogatepass")
+        elif isinstance(element, bytes):
+            tag, raw = _BYTES, element
+        else:
+            tag, raw = _LITERAL, repr(element).encode("utf-8")
+        parts.append(tag + _RECORD.pack(len(raw)) + raw)
+    return b"".join(parts)
+
+
+def decode_key(raw: bytes) -> _Key:
+    elements: List[Any] = []
+    offset = 0
+    while offset < len(raw):
+        tag = raw[offset:offset + 1]
+        offset += 1
+        if tag == _NONE:
+            elements.append(None)
+            continue
+        length = _RECORD.unpack_from(raw, offset)[0]
+        offset += _RECORD.size
+        data = raw[offset:offset + length]
+        offset += length
+        if tag == _STR:
+            elements.append(data.decode("utf-8", "surrogatepass"))
+        elif tag == _BYTES:
+            elements.append(data)
+        else:
+            elements.append(ast.literal_eval(data.decode("utf-8")))
+    return tuple(elements)
+
+
+def _hash(raw_key: bytes) -> int:
+    return zlib.crc32(raw_key)
+
+
+class ItemStateFile(Mapping[_Key, Any]):
+    """Read only view of a binary state file
+
+    The caller has to hold the lock of the file while it is opened.
+    """
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._map: Optional[mmap.mmap] = None
+        self._count = 0
+        self._base_end = 0
+        # encoded key -> encoded value (None: removed) of all deltas
+        self._delta: Dict[bytes, Optional[bytes]] = {}
+        self.delta_size = 0
+
+        with path.open("rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size < _HEADER.size:
+                return
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, self._base_end, self._count = _HEADER.unpack_from(self._map)
+        if magic != MAGIC:
+            raise ValueError("%s is not a state file" % path)
+        self._read_deltas()
+
+    def close(self) -> None:
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+    def _read_deltas(self) -> None:
+        assert self._map is not None
+        offset = self._base_end
+        while offset + _RECORD.size <= len(self._map):
+            length = _RECORD.unpack_from(self._map, offset)[0]
+            start = offset + _RECORD.size
+            if start + length > len(self._map):
+                break  # incomplete record of an interrupted writer
+            try:
+                removed, updated = marshal.loads(self._map[start:start + length])
+            except (EOFError, ValueError, TypeError):
+                break  # garbage of an interrupted writer
+            for raw_key in removed:
+                self._delta[raw_key] = None
+            self._delta.update(updated)
+            offset = start + length
+        self.delta_size = offset - self._base_end
+
+    @property
+    def base_size(self) -> int:
+        return self._base_end
+
+    def _entry(self, index: int) -> Tuple[int, int, int, int, int]:
+        assert self._map is not None
+        return _ENTRY.unpack_from(self._map, _HEADER.size + index * _ENTRY.size)
+
+    def _lookup(self, raw_key: bytes) -> Optional[bytes]:
+        if raw_key in self._delta:
+            return self._delta[raw_key]
+        if self._map is None:
+            return None
+        key_hash = _hash(raw_key)
+        # Binary search of the first entry with the hash of the key
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._entry(mid)[0] < key_hash:
+                lo = mid + 1
+            else:
+                hi = mid
+        while lo < self._count:
+            entry_hash, key_offset, key_length, value_offset, value_length = self._entry(lo)
+            if entry_hash != key_hash:
+                break
+            if self._map[key_offset:key_offset + key_length] == raw_key:
+                return self._map[value_offset:value_offset + value_length]
+            lo += 1
+        return None
+
+    def raw_items(self) -> Iterator[Tuple[bytes, bytes]]:
+        """The encoded keys and values of all entries"""
+        for index in range(self._count):
+            _hash_, key_offset, key_length, value_offset, value_length = self._entry(index)
+            assert self._map is not None
+            raw_key = self._map[key_offset:key_offset + key_length]
+            if raw_key not in self._delta:
+                yield raw_key, self._map[value_offset:value_offset + value_length]
+        for raw_key, raw_value in self._delta.items():
+            if raw_value is not None:
+                yield raw_key, raw_value
+
+    def __getitem__(self, key: _Key) -> Any:
+        raw_value = self._lookup(encode_key(key))
+        if raw_value is None:
+            raise KeyError(key)
+        return marshal.loads(raw_value)
+
+    def __contains__(self, key: object) -> bool:
+        return isinstance(key, tuple) and self._lookup(encode_key(key)) is not None
+
+    def __iter__(self) -> Iterator[_Key]:
+        return (decode_key(raw_key) for raw_key, _raw_value in self.raw_items())
+
+    def __len__(self) -> int:
+        return sum(1 for _item in self.raw_items())
+
+
+def load(path: Path) -> Mapping[_Key, Any]:
+    """Open the state file, the caller has to hold the lock"""
+    try:
+        with path.open("rb") as f:
+            magic = f.read(len(MAGIC))
+    except FileNotFoundError:
+        return {}
+    if not magic:
+        return {}
+    if magic == MAGIC:
+        return ItemStateFile(path)
+    # The state file of a former version
+    return store.load_object_from_file(path, default={})
+
+
+def save_changes(path: Path, updated: Mapping[_Key, Any], removed: Iterable[_Key]) -> None:
+    """Append the changes to the state file, the caller has to hold the lock
+
+    Removals are applied before the updates.
+    """
+    raw_removed = [encode_key(key) for key in removed]
+    raw_updated = {encode_key(key): marshal.dumps(value) for key, value in updated.items()}
+
+    current = load(path)
+    if not isinstance(current, ItemStateFile):
+        # Create the file, or migrate the file of a former version
+        entries = {encode_key(key): marshal.dumps(value) for key, value in current.items()}
+        for raw_key in raw_removed:
+            entries.pop(raw_key, None)
+        entries.update(raw_updated)
+        _write_base(path, entries.items())
+        return
+
+    try:
+        record = marshal.dumps((raw_removed, raw_updated))
+        with path.open("r+b") as f:
+            # Overwrite what an interrupted writer may have left behind the
+            # last complete delta
+            f.seek(current.base_size + current.delta_size)
+            f.write(_RECORD.pack(len(record)) + record)
+            f.truncate()
+
+        delta_size = current.delta_size + _RECORD.size + len(record)
+        if delta_size > max(current.base_size, _MIN_COMPACTION_SIZE):
+            compacted = dict(current.raw_items())
+            for raw_key in raw_removed:
+                compacted.pop(raw_key, None)
+            compacted.update(raw_updated)
+            _write_base(path, compacted.items())
+    finally:
+        current.close()
+
+
+def _write_base(path: Path, entries: Iterable[Tuple[bytes, bytes]]) -> None:
+    items = sorted((_hash(raw_key), raw_key, raw_value) for raw_key, raw_value in entries)
+    offset = _HEADER.size + len(items) * _ENTRY.size
+    index = []
+    for key_hash, raw_key, raw_value in items:
+        index.append(
+            _ENTRY.pack(key_hash, offset, len(raw_key), offset + len(raw_key), len(raw_value)))
+        offset += len(raw_key) + len(raw_value)
+
+    store.save_bytes_to_file(
+        path,
+        b"".join([_HEADER.pack(MAGIC, offset, len(items))] + index +
+                 [raw for _hash_, raw_key, raw_value in items for raw in (raw_key, raw_value)]),
+    )
+
+
+class LazyItemStates(MutableMapping[_Key, Any]):
+    """The item states of a host: the loaded ones plus the changes of this cycle
+
+    Values of the loaded states are decoded on first access.
+    """
+    def __init__(self, loaded: Mapping[_Key, Any]) -> None:
+        self._loaded = loaded
+        self._values: Dict[_Key, Any] = {}
+        self._deleted: Set[_Key] = set()
+
+    def close(self) -> None:
+        if isinstance(self._loaded, ItemStateFile):
+            self._loaded.close()
+
+    def __getitem__(self, key: _Key) -> Any:
+        if key in self._deleted:
+            raise KeyError(key)
+        try:
+            return self._values[key]
+        except KeyError:
+            pass
+        value = self._values[key] = self._loaded[key]
+        return value
+
+    def __setitem__(self, key: _Key, value: Any) -> None:
+        self._values[key] = value
+        self._deleted.discard(key)
+
+    def __delitem__(self, key: _Key) -> None:
+        if key not in self:
+            raise KeyError(key)
+        self._values.pop(key, None)
+        self._deleted.add(key)
+
+    def __contains__(self, key: object) -> bool:
+        return key not in self._deleted and (key in self._values or key in self._loaded)
+
+    def __iter__(self) -> Iterator[_Key]:
+        yield from (key for key in self._values if key not in self._deleted)
+        yield from (
+            key for key in self._loaded if key not in self._values and key not in self._deleted)
+
+    def __len__(self) -> int:
+        return sum(1 for _key in self)
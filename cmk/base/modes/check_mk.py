@@ -40,6 +40,7 @@ from cmk.utils.type_defs import (
 import cmk.snmplib.snmp_modes as snmp_modes
 
 import cmk.fetchers.factory as snmp_factory
+from cmk.fetchers import SNMPFetcher
 
 import cmk.base.api.agent_based.register as agent_based_register
 import cmk.base.backup
@@ -57,6 +58,7 @@ import cmk.base.localize
 import cmk.base.obsolete_output as out
 import cmk.base.packaging
 import cmk.base.parent_scan
+import cmk.base.prediction as prediction
 import cmk.base.profiling as profiling
 from cmk.base.api.agent_based.checking_classes import CheckPlugin
 from cmk.base.core_factory import create_core
@@ -756,6 +758,67 @@ modes.register(
         short_help="Cleanup outdated piggyback files",
     ))
 
+#.
+#   .--precompute-predictions----------------------------------------------.
+#   |                             _ _      _   _                           |
+#   |          _ __  _ __ ___  __| (_) ___| |_(_) ___  _ __  ___           |
+#   |         | '_ \| '__/ _ \/ _` | |/ __| __| |/ _ \| '_ \/ __|          |
+#   |         | |_) | | |  __/ (_| | | (__| |_| | (_) | | | \__ \          |
+#   |         | .__/|_|  \___|\__,_|_|\___|\__|_|\___/|_| |_|___/          |
+#   |         |_|                                                          |
+#   |                                                                      |
+#   '----------------------------------------------------------------------'
+
+
+def mode_precompute_predictions(options: Dict) -> None:
+    with prediction.precompute_lock() as locked:
+        if not locked:
+            console.verbose("The predictions are refreshed by another process\n")
+            return
+
+        config.load()
+        num_refreshed = prediction.precompute_predictions(
+            config.get_config_cache().all_active_hosts(),
+            lead_time=options.get("lead-time", 600),
+            processes=options.get("procs", 4),
+        )
+    console.verbose("Refreshed %d predictions\n", num_refreshed)
+
+
+modes.register(
+    Mode(
+        long_option="precompute-predictions",
+        handler_function=mode_precompute_predictions,
+        needs_config=False,
+        needs_checks=False,
+        short_help="Refresh the predictions of predictive levels",
+        long_help=[
+            "Computes the predictions of predictive levels which are outdated "
+            "or will be outdated before the given lead time has passed, so that "
+            "the checks do not need to compute them. Only the predictions "
+            "which a check has needed within their validity period are refreshed. "
+            "Nothing is done while another process is still refreshing the "
+            "predictions.",
+        ],
+        sub_options=[
+            Option(
+                long_option="lead-time",
+                argument=True,
+                argument_descr="SECONDS",
+                argument_conv=int,
+                short_help="Refresh the predictions needed within the next SECONDS seconds. "
+                "Defaults to 600.",
+            ),
+            Option(
+                long_option="procs",
+                argument=True,
+                argument_descr="N",
+                argument_conv=int,
+                short_help="Compute the predictions in N threads in parallel. Defaults to 4.",
+            ),
+        ],
+    ))
+
 #.
 #   .--scan-parents--------------------------------------------------------.
 #   |                                                         _            |
@@ -950,6 +1013,61 @@ modes.register(
         ],
     ))
 
+#.
+#   .--snmp-plan-----------------------------------------------------------.
+#   |                                               _                      |
+#   |         ___ _ __  _ __ ___  _ __        _ __ | | __ _ _ __           |
+#   |        / __| '_ \| '_ ` _ \| '_ \ _____| '_ \| |/ _` | '_ \          |
+#   |        \__ \ | | | | | | | | |_) |_____| |_) | | (_| | | | |         |
+#   |        |___/_| |_|_| |_| |_| .__/      | .__/|_|\__,_|_| |_|         |
+#   |                            |_|         |_|                           |
+#   '----------------------------------------------------------------------'
+
+
+def mode_snmp_plan(hostnames: List[HostName]) -> None:
+    config_cache = config.get_config_cache()
+
+    if not hostnames:
+        hostnames = sorted(host for host in config_cache.all_active_realhosts()
+                           if config_cache.get_host_config(host).is_snmp_host)
+
+    for hostname in hostnames:
+        host_config = config_cache.get_host_config(hostname)
+        ipaddress = ip_lookup.lookup_ip_address(host_config)
+        for source in checkers.make_sources(host_config, ipaddress, mode=checkers.Mode.CHECKING):
+            if not isinstance(source, checkers.snmp.SNMPSource):
+                continue
+
+            fetcher = SNMPFetcher.from_json(source.fetcher_configuration)
+            plan = fetcher.make_walk_plan(fetcher.configured_snmp_sections)
+            out.output("%s%s%s [%s]: %d columns requested, %d walks, %d saved\n" %
+                       (tty.bold, hostname, tty.normal, source.id, plan.requested, len(
+                           plan.walks), plan.saved))
+            for walk in plan.walks:
+                out.output(
+                    "  %-40s %s\n" %
+                    (walk.fetchoid, ", ".join(str(section_name) for section_name in walk.sections)))
+                for fetchoid in walk.covers[1:]:
+                    console.verbose("    %s\n" % fetchoid)
+
+
+modes.register(
+    Mode(
+        long_option="snmp-plan",
+        handler_function=mode_snmp_plan,
+        argument=True,
+        argument_descr="[HOST1 HOST2...]",
+        argument_optional=True,
+        short_help="Show the SNMP walks of the configured sections",
+        long_help=[
+            "Shows the subtrees that are walked to fetch the configured SNMP sections "
+            "of the given hosts (or all SNMP hosts) and how many walks are saved by "
+            "fetching subtrees requested by several sections only once. "
+            "Use -v to see the requested OIDs that are answered by each walk. "
+            "The hosts are not contacted.",
+        ],
+    ))
+
 #.
 #   .--flush---------------------------------------------------------------.
 #   |                         __ _           _                             |
@@ -1096,8 +1214,12 @@ modes.register(
 #   '----------------------------------------------------------------------'
 
 
-def mode_update() -> None:
+def mode_update(options: Dict) -> None:
     from cmk.base.core_config import do_create_config  # pylint: disable=import-outside-toplevel
+
+    if "procs" in options:
+        config.core_config_processes = options["procs"]
+
     try:
         with cmk.base.core.activation_lock(mode=config.restart_locking):
             do_create_config(create_core(config.monitoring_core))
@@ -1122,6 +1244,16 @@ modes.register(
             "and the configuration for the Core helper processes is being created.",
             "The agent bakery is updating the agents.",
         ],
+        sub_options=[
+            Option(
+                long_option="procs",
+                argument=True,
+                argument_descr="N",
+                argument_conv=int,
+                short_help="Create the host specific configuration in N processes in parallel. "
+                "Use 0 for one process per CPU. Defaults to the setting core_config_processes.",
+            ),
+        ],
     ))
 
 #.
@@ -1581,6 +1713,8 @@ def mode_check(options: CheckingOptions, args: List[str]) -> None:
     if keepalive and "keepalive" in options:
         # handle CMC check helper
         keepalive.enable()
+        # The helper loads the same files for every check it executes
+        store.enable_file_cache()
         if "keepalive-fd" in options:
             keepalive.fd.set_(options["keepalive-fd"])
 
@@ -10,11 +10,28 @@ import logging
 import math
 import os
 import time
-from typing import Optional, List, Any, cast, Dict, Union, Callable, Tuple, TypedDict
+from contextlib import contextmanager
+from multiprocessing.pool import ThreadPool
+from pathlib import Path
+from typing import (
+    Any,
+    Callable,
+    cast,
+    Dict,
+    Iterator,
+    List,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple,
+    TypedDict,
+    Union,
+)
 
 import cmk.utils.debug
 import cmk.utils
 import cmk.utils.defines as defines
+import cmk.utils.paths
 import cmk.utils.store as store
 from cmk.utils.log import VERBOSE
 import cmk.utils.prediction
@@ -30,6 +47,9 @@ from cmk.utils.prediction import (
     PredictionInfo,
     ConsolidationFunctionName,
     EstimatedLevels,
+    PREDICTION_COLUMNS,
+    TimeSeries,
+    TimeSeriesArray,
 )
 
 logger = logging.getLogger("cmk.prediction")
@@ -152,10 +172,8 @@ def time_slices(timestamp: Timestamp, horizon: Seconds, period_info: PeriodInfo,
     return slices
 
 
-def retrieve_grouped_data_from_rrd(
-        rrd_column: RRDColumnFunction,
-        time_windows: TimeSlices) -> Tuple[TimeWindow, List[TimeSeriesValues]]:
-    "Collect all time slices and up-sample them to same resolution"
+def _fetch_slices(rrd_column: RRDColumnFunction,
+                  time_windows: TimeSlices) -> Tuple[TimeWindow, List[Tuple[TimeSeries, Seconds]]]:
     from_time = time_windows[0][0]
 
     slices = [(rrd_column(start, end), from_time - start) for start, end in time_windows]
@@ -167,38 +185,76 @@ def retrieve_grouped_data_from_rrd(
     if twindow[2] == 0:
         raise MKGeneralException("Got no historic metrics")
 
+    return twindow, slices
+
+
+def retrieve_grouped_data_from_rrd(
+        rrd_column: RRDColumnFunction,
+        time_windows: TimeSlices) -> Tuple[TimeWindow, List[TimeSeriesValues]]:
+    "Collect all time slices and up-sample them to same resolution"
+    twindow, slices = _fetch_slices(rrd_column, time_windows)
     return twindow, [ts.bfill_upsample(twindow, shift) for ts, shift in slices]
 
 
-def data_stats(slices: List[TimeSeriesValues]) -> DataStats:
-    "Statistically summarize all the upsampled RRD data"
+def retrieve_grouped_array_from_rrd(rrd_column: RRDColumnFunction,
+                                    time_windows: TimeSlices) -> Tuple[TimeWindow, TimeSeriesArray]:
+    "Same as retrieve_grouped_data_from_rrd, but returns the slices as rows of an array"
+    twindow, slices = _fetch_slices(rrd_column, time_windows)
+    return twindow, _stack([ts.bfill_upsample_array(twindow, shift) for ts, shift in slices])
+
+
+def _stack(slices: List[TimeSeriesArray]) -> TimeSeriesArray:
+    """Like the former zip(*slices), the slices are cut to the shortest one"""
+    import numpy as np  # type: ignore[import] # pylint: disable=import-outside-toplevel
+    num_points = min(len(values) for values in slices)
+    return np.stack([values[:num_points] for values in slices])
 
-    descriptors: DataStats = []
 
-    for time_column in zip(*slices):
-        point_line = [x for x in time_column if x is not None]
-        if point_line:
-            average = sum(point_line) / float(len(point_line))
-            descriptors.append([
-                average,
-                min(point_line),
-                max(point_line),
-                stdev(point_line, average),
-            ])
-        else:
-            descriptors.append([None, None, None, None])
+def data_stats_array(slices: TimeSeriesArray) -> TimeSeriesArray:
+    """Statistically summarize the upsampled RRD data, one slice per row
 
-    return descriptors
+    Returns a row (average, min, max, stdev) per time column, NaN where the
+    column has no data. In the case of a single data-point an unbiased standard
+    deviation is undefined. In this case we take the magnitude of the measured
+    value itself as a measure of the dispersion."""
+    import numpy as np  # type: ignore[import] # pylint: disable=import-outside-toplevel
+    valid = ~np.isnan(slices)
+    samples = valid.sum(axis=0)
+    values = np.where(valid, slices, 0.0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        average = values.sum(axis=0) / samples
+        variance = np.abs((values**2).sum(axis=0) - average**2 * samples) / (samples - 1)
+    stats = np.column_stack([
+        average,
+        np.where(valid, slices, np.inf).min(axis=0),
+        np.where(valid, slices, -np.inf).max(axis=0),
+        np.where(samples == 1, np.abs(average), np.sqrt(variance)),
+    ])
+    stats[samples == 0] = np.nan
+    return stats
+
+
+def _stats_to_points(stats: TimeSeriesArray) -> DataStats:
+    return [[None if math.isnan(value) else value for value in point] for point in stats.tolist()]
+
+
+def data_stats(slices: List[TimeSeriesValues]) -> DataStats:
+    "Statistically summarize all the upsampled RRD data"
+    import numpy as np  # type: ignore[import] # pylint: disable=import-outside-toplevel
+    if not slices:
+        return []
+    return _stats_to_points(
+        data_stats_array(_stack([np.array(values, dtype=float) for values in slices])))
 
 
 def calculate_data_for_prediction(time_windows: TimeSlices,
                                   rrd_datacolumn: RRDColumnFunction) -> PredictionData:
-    twindow, slices = retrieve_grouped_data_from_rrd(rrd_datacolumn, time_windows)
+    twindow, slices = retrieve_grouped_array_from_rrd(rrd_datacolumn, time_windows)
 
-    descriptors = data_stats(slices)
+    descriptors = _stats_to_points(data_stats_array(slices))
 
     return {
-        u"columns": [u"average", u"min", u"max", u"stdev"],
+        u"columns": PREDICTION_COLUMNS,
         u"points": descriptors,
         u"num_points": len(descriptors),
         u"data_twindow": list(twindow[:2]),
@@ -207,29 +263,68 @@ def calculate_data_for_prediction(time_windows: TimeSlices,
 
 
 def save_predictions(pred_file: str, info: PredictionInfo, data_for_pred: PredictionData) -> None:
-    with open(pred_file + '.info', "w") as fname:
-        json.dump(info, fname)
-    with open(pred_file, "w") as fname:
-        json.dump(data_for_pred, fname)
-
-
-def stdev(point_line: List[float], average: float) -> float:
-    samples = len(point_line)
-    # In the case of a single data-point an unbiased standard deviation is
-    # undefined. In this case we take the magnitude of the measured value
-    # itself as a measure of the dispersion.
-    if samples == 1:
-        return abs(average)
-    return math.sqrt(abs(sum(p**2 for p in point_line) - average**2 * samples) / float(samples - 1))
+    store.save_text_to_file(pred_file + '.info', json.dumps(info))
+    cmk.utils.prediction.save_prediction_data(pred_file, cast(Dict, data_for_pred))
+
+
+def _fetch_rrd_columns(
+    hostname: HostName, service_description: ServiceName,
+    metrics: List[Tuple[MetricName, ConsolidationFunctionName,
+                        TimeSlices]]) -> List[RRDColumnFunction]:
+    """Fetches the RRD data of all time slices of the metrics of a service with one query"""
+    requests = [(dsname, cf, start, end)
+                for dsname, cf, time_windows in metrics
+                for start, end in time_windows]
+    series = iter(cmk.utils.prediction.get_rrd_data_batch(hostname, service_description, requests))
+    return [
+        _prefetched_rrd_column({time_window: next(series)
+                                for time_window in time_windows})
+        for _dsname, _cf, time_windows in metrics
+    ]
+
+
+def _prefetched_rrd_column(
+        series: Dict[Tuple[Timestamp, Timestamp], TimeSeries]) -> RRDColumnFunction:
+    def time_boundaries(fromtime: Timestamp, untiltime: Timestamp) -> TimeSeries:
+        return series[(fromtime, untiltime)]
+
+    return time_boundaries
+
+
+def _compute_prediction(pred_file: str, timestamp: Timestamp, time_windows: TimeSlices,
+                        rrd_datacolumn: RRDColumnFunction, hostname: HostName,
+                        service_description: ServiceName, dsname: MetricName,
+                        cf: ConsolidationFunctionName,
+                        params: PredictionParameters) -> PredictionData:
+    """Computes and saves the prediction of the time slices of timestamp
+
+    The host name and the service description are saved in the info file, so
+    that precompute_predictions() can refresh the prediction later."""
+    data_for_pred = calculate_data_for_prediction(time_windows, rrd_datacolumn)
+
+    info: PredictionInfo = {
+        u"time": timestamp,
+        u"range": time_windows[0],
+        u"cf": cf,
+        u"dsname": dsname,
+        u"slice": prediction_periods[params["period"]]["slice"],
+        u"params": params,
+        u"hostname": hostname,
+        u"service_description": service_description,
+    }
+    save_predictions(pred_file, info, data_for_pred)
+    return data_for_pred
 
 
-def is_prediction_up2date(pred_file: str, timegroup: Timegroup,
-                          params: PredictionParameters) -> bool:
+def is_prediction_up2date(pred_file: str,
+                          timegroup: Timegroup,
+                          params: PredictionParameters,
+                          now: Optional[float] = None) -> bool:
     """Check, if we need to (re-)compute the prediction file.
 
     This is the case if:
     - no prediction has been done yet for this time group
-    - the prediction from the last time is outdated
+    - the prediction from the last time is outdated (at now, default: the current time)
     - the prediction from the last time was done with other parameters
     """
     last_info = cmk.utils.prediction.retrieve_data_for_prediction(pred_file + ".info", timegroup)
@@ -237,7 +332,8 @@ def is_prediction_up2date(pred_file: str, timegroup: Timegroup,
         return False
 
     period_info = prediction_periods[params["period"]]
-    now = time.time()
+    if now is None:
+        now = time.time()
     if last_info["time"] + cast(int, period_info["valid"]) * cast(int, period_info["slice"]) < now:
         logger.log(VERBOSE, "Prediction of %s outdated", timegroup)
         return False
@@ -272,36 +368,172 @@ def get_levels(
 
     pred_file = os.path.join(pred_dir, timegroup)
     cmk.utils.prediction.clean_prediction_files(pred_file)
+    _mark_used(pred_dir, now)
 
-    data_for_pred: Optional[PredictionData] = None
+    reference: Optional[Dict[str, Optional[float]]] = None
     if is_prediction_up2date(pred_file, timegroup, params):
-        # Suppression: I am not sure how to check what this function returns
-        #              For now I hope this is compatible.
-        data_for_pred = cmk.utils.prediction.retrieve_data_for_prediction(  # type: ignore[assignment]
-            pred_file, timegroup)
+        reference = cmk.utils.prediction.retrieve_prediction_reference(
+            pred_file, rel_time, timegroup)
 
-    if data_for_pred is None:
+    if reference is None:
         logger.log(VERBOSE, "Calculating prediction data for time group %s", timegroup)
         cmk.utils.prediction.clean_prediction_files(pred_file, force=True)
 
         time_windows = time_slices(now, int(params["horizon"] * 86400), period_info, timegroup)
 
-        rrd_datacolumn = cmk.utils.prediction.rrd_datacolum(hostname, service_description, dsname,
-                                                            cf)
+        rrd_datacolumn, = _fetch_rrd_columns(hostname, service_description,
+                                             [(dsname, cf, time_windows)])
 
-        data_for_pred = calculate_data_for_prediction(time_windows, rrd_datacolumn)
+        data_for_pred = _compute_prediction(pred_file, now, time_windows, rrd_datacolumn, hostname,
+                                            service_description, dsname, cf, params)
 
-        info: PredictionInfo = {
-            u"time": now,
-            u"range": time_windows[0],
-            u"cf": cf,
-            u"dsname": dsname,
-            u"slice": period_info["slice"],
-            u"params": params,
-        }
-        save_predictions(pred_file, info, data_for_pred)
+        # Find reference value in data_for_pred
+        index = int(rel_time / cast(int, data_for_pred["step"]))  # fixed: true-division
+        reference = dict(zip(data_for_pred["columns"], data_for_pred["points"][index]))
 
-    # Find reference value in data_for_pred
-    index = int(rel_time / cast(int, data_for_pred["step"]))  # fixed: true-division
-    reference = dict(zip(data_for_pred["columns"], data_for_pred["points"][index]))
     return cmk.utils.prediction.estimate_levels(reference, params, levels_factor)
+
+
+# Touched by the check path, see precompute_predictions()
+_LAST_USED_FILE = "last_used"
+
+
+def _mark_used(pred_dir: str, now: Timestamp) -> None:
+    path = os.path.join(pred_dir, _LAST_USED_FILE)
+    try:
+        os.utime(path, (now, now))
+    except FileNotFoundError:
+        with open(path, "w"):
+            pass
+        os.utime(path, (now, now))
+
+
+def _recently_used(pred_dir: str, params: PredictionParameters, now: Timestamp) -> bool:
+    """Whether the check path has needed the predictions of a metric within their period"""
+    period_info = prediction_periods[params["period"]]
+    try:
+        last_used = os.stat(os.path.join(pred_dir, _LAST_USED_FILE)).st_mtime
+    except FileNotFoundError:
+        return False
+    return last_used + cast(int, period_info["valid"]) * cast(int, period_info["slice"]) >= now
+
+
+ServiceKey = Tuple[HostName, ServiceName]
+
+
+class _PredictionTask(NamedTuple):
+    pred_file: str
+    timestamp: Timestamp
+    time_windows: TimeSlices
+    dsname: MetricName
+    cf: ConsolidationFunctionName
+    params: PredictionParameters
+
+
+@contextmanager
+def precompute_lock() -> Iterator[bool]:
+    """Whether or not this process may precompute the predictions
+
+    The job runs every 5 minutes from cron. A run which takes longer must not
+    be overlapped by the next one, which does not even need to load the
+    configuration then."""
+    with store.try_locked(Path(cmk.utils.paths.tmp_dir, "precompute_predictions.lock")) as locked:
+        yield locked
+
+
+def precompute_predictions(hostnames: Set[HostName], lead_time: Seconds, processes: int) -> int:
+    """Refreshes the predictions which are outdated now or will be in lead_time seconds
+
+    Without this, the first check of a service that needs a prediction which is
+    outdated computes it. At the start of the time groups (e.g. at midnight)
+    this happens for all services with predictive levels at the same moment.
+
+    The latest info file of each metric of the hosts tells the service, the
+    consolidation function and the parameters get_levels() has been called
+    with. Metrics the check path has not needed within the validity period of
+    their predictions are skipped: their service has been removed or does not
+    use predictive levels anymore. One task per service fetches the RRD data
+    of all its outdated predictions with one livestatus query, the tasks are
+    processed by a pool of threads. Returns the number of refreshed
+    predictions."""
+    now = int(time.time())
+    tasks: Dict[ServiceKey, Dict[str, _PredictionTask]] = {}
+    for hostname in sorted(hostnames):
+        host_dir = os.path.join(cmk.utils.paths.var_dir, "prediction", hostname)
+        for pred_dir, info in _latest_prediction_infos(host_dir):
+            if not _recently_used(pred_dir, info["params"], now):
+                continue
+            for timestamp in [now, now + lead_time]:
+                task = _outdated_prediction(pred_dir, info, timestamp, now)
+                if task is not None:
+                    tasks.setdefault((info["hostname"], info["service_description"]),
+                                     {})[task.pred_file] = task
+
+    if not tasks:
+        return 0
+
+    with ThreadPool(processes) as pool:
+        return sum(pool.imap_unordered(_refresh_predictions, tasks.items()))
+
+
+def _latest_prediction_infos(host_dir: str) -> List[Tuple[str, PredictionInfo]]:
+    """The directory and the info of the latest prediction of each metric of a host
+
+    Predictions computed by former versions, which do not know their service,
+    are refreshed on the next check of their service."""
+    infos = []
+    for dirpath, _dirnames, filenames in os.walk(host_dir):
+        metric_infos = []
+        for filename in filenames:
+            if not filename.endswith(".info"):
+                continue
+            info = cmk.utils.prediction.retrieve_data_for_prediction(
+                os.path.join(dirpath, filename), filename[:-5])
+            if info is not None and "service_description" in info:
+                metric_infos.append(info)
+        if metric_infos:
+            infos.append((dirpath, max(metric_infos, key=lambda info: info["time"])))
+    return infos
+
+
+def _outdated_prediction(pred_dir: str, info: PredictionInfo, timestamp: Timestamp,
+                         now: Timestamp) -> Optional[_PredictionTask]:
+    """The task to compute the prediction needed at timestamp, None if it is up to date
+
+    The prediction has to be valid until the end of the time slice of timestamp.
+    If the time slice has not begun yet, the prediction is computed for its start."""
+    params = info["params"]
+    period_info = prediction_periods[params["period"]]
+    timegroup, from_time, until_time, _rel_time = get_prediction_timegroup(timestamp, period_info)
+    pred_file = os.path.join(pred_dir, timegroup)
+    if is_prediction_up2date(pred_file, timegroup, params, now=until_time - 1):
+        return None
+
+    timestamp = max(now, from_time)
+    return _PredictionTask(
+        pred_file,
+        timestamp,
+        time_slices(timestamp, int(params["horizon"] * 86400), period_info, timegroup),
+        info["dsname"],
+        info["cf"],
+        params,
+    )
+
+
+def _refresh_predictions(service_tasks: Tuple[ServiceKey, Dict[str, _PredictionTask]]) -> int:
+    (hostname, service_description), tasks = service_tasks
+    try:
+        rrd_datacolumns = _fetch_rrd_columns(
+            hostname, service_description,
+            [(task.dsname, task.cf, task.time_windows) for task in tasks.values()])
+        for task, rrd_datacolumn in zip(tasks.values(), rrd_datacolumns):
+            logger.log(VERBOSE, "Precomputing prediction %s", task.pred_file)
+            _compute_prediction(task.pred_file, task.timestamp, task.time_windows, rrd_datacolumn,
+                                hostname, service_description, task.dsname, task.cf, task.params)
+    except MKGeneralException as e:
+        if cmk.utils.debug.enabled():
+            raise
+        logger.warning("Cannot precompute the predictions of %s/%s: %s", hostname,
+                       service_description, e)
+        return 0
+    return len(tasks)
@@ -7,6 +7,7 @@
 import sys
 from pathlib import Path
 
+import cmk.utils.store as store
 import cmk.base.obsolete_output as out
 from cmk.utils.log import console
 
@@ -48,3 +49,9 @@ stats.sort_stats('time').print_stats()""" % _profile_path)
     show_profile.chmod(0o755)
     out.output("Profile '%s' written. Please run %s.\n" % (_profile_path, show_profile),
                stream=sys.stderr)
+
+    file_cache_stats = store.file_cache_stats()
+    if file_cache_stats is not None:
+        out.output("File cache: %(hits)d hits, %(misses)d misses, %(evictions)d evictions, "
+                   "%(entries)d entries (%(size)d bytes)\n" % file_cache_stats,
+                   stream=sys.stderr)
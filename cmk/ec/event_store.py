@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright (C) 2019 tribe29 GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""The store of the current events of the event console
+
+The events are kept in the order they have been added, keyed by their id.
+Additionally they are indexed by host, core host and rule id, so the event
+limits, the cancelling of events and the queries of the status table only
+look at the events of one host or rule. Adding and removing an event takes
+constant time.
+
+The indexed fields of an event are remembered when it is added. When an event
+is changed afterwards, changed() has to be called: Its host or rule may have
+changed (e.g. when it is counted up by an event of another host), it then
+counts as the newest event of its new host and rule.
+
+The store also keeps track of the events added, changed and removed since the
+last call of take_changes(), which is what the journal of the event status
+file is made of.
+"""
+
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+Event = Dict[str, Any]
+_Keys = Tuple[str, str, Optional[str]]
+
+
+def _keys(event: Event) -> _Keys:
+    return event["host"], event["core_host"], event["rule_id"]
+
+
+def _remove_from(index: Dict[Any, Dict[int, Event]], key: Any, event_id: int) -> None:
+    bucket = index[key]
+    del bucket[event_id]
+    if not bucket:
+        del index[key]
+
+
+class EventStore:
+    def __init__(self, events: Iterable[Event] = ()) -> None:
+        super(EventStore, self).__init__()
+        self._events: Dict[int, Event] = {}
+        self._keys: Dict[int, _Keys] = {}
+        self._by_host: Dict[str, Dict[int, Event]] = {}
+        self._by_core_host: Dict[str, Dict[int, Event]] = {}
+        self._by_rule: Dict[Optional[str], Dict[int, Event]] = {}
+        # Number of events per host and core host, the unit of the host event limit
+        self._host_counts: Dict[Tuple[str, str], int] = {}
+        # The ids of the events added, changed or removed since the last take_changes()
+        self._changes: Dict[int, None] = {}
+        for event in events:
+            self.add(event)
+        self._changes.clear()
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    def __iter__(self) -> Iterator[Event]:
+        return iter(self._events.values())
+
+    def get(self, event_id: int) -> Optional[Event]:
+        return self._events.get(event_id)
+
+    def add(self, event: Event) -> None:
+        """Adds the event as the newest one, an event with the same id is replaced"""
+        event_id = event["id"]
+        if event_id in self._events:
+            self.remove(event_id)
+        self._events[event_id] = event
+        self._index(event_id, event)
+        self._changes[event_id] = None
+
+    def remove(self, event_id: int) -> Event:
+        """Removes the event with the given id, raises KeyError if there is none"""
+        event = self._events.pop(event_id)
+        self._unindex(event_id)
+        self._changes[event_id] = None
+        return event
+
+    def changed(self, event: Event) -> None:
+        """Records the change of the event, reindexes it if its host or rule have been changed
+
+        Events which are not (or no longer) in the store are ignored."""
+        event_id = event.get("id")
+        if event_id not in self._events:
+            return
+        if self._keys[event_id] != _keys(event):
+            self._unindex(event_id)
+            self._index(event_id, event)
+        self._changes[event_id] = None
+
+    def take_changes(self) -> Tuple[List[Event], List[int]]:
+        """Returns the current added or changed events and the ids of the removed events"""
+        updated = [self._events[event_id] for event_id in self._changes if event_id in self._events]
+        removed = [event_id for event_id in self._changes if event_id not in self._events]
+        self._changes = {}
+        return updated, removed
+
+    def _index(self, event_id: int, event: Event) -> None:
+        # This is what loading the status of many events mostly consists of: keep it lean
+        host, core_host, rule_id = self._keys[event_id] = _keys(event)
+        self._by_host.setdefault(host, {})[event_id] = event
+        self._by_core_host.setdefault(core_host, {})[event_id] = event
+        self._by_rule.setdefault(rule_id, {})[event_id] = event
+        host_key = host, core_host
+        self._host_counts[host_key] = self._host_counts.get(host_key, 0) + 1
+
+    def _unindex(self, event_id: int) -> None:
+        host, core_host, rule_id = self._keys.pop(event_id)
+        _remove_from(self._by_host, host, event_id)
+        _remove_from(self._by_core_host, core_host, event_id)
+        _remove_from(self._by_rule, rule_id, event_id)
+        if self._host_counts[(host, core_host)] == 1:
+            del self._host_counts[(host, core_host)]
+        else:
+            self._host_counts[(host, core_host)] -= 1
+
+    # The following methods return the events oldest first. The iterables
+    # must not be used while the store is changed.
+
+    def of_host(self, host: str) -> Iterable[Event]:
+        return self._by_host.get(host, {}).values()
+
+    def of_hosts(self, hosts: Iterable[str]) -> List[Event]:
+        """Returns the events of all the (distinct) hosts, ordered by their ids"""
+        buckets = [self._by_host[host] for host in hosts if host in self._by_host]
+        if len(buckets) == 1:
+            return list(buckets[0].values())
+        return sorted((event for bucket in buckets for event in bucket.values()),
+                      key=lambda event: event["id"])
+
+    def of_core_host(self, core_host: str) -> Iterable[Event]:
+        return self._by_core_host.get(core_host, {}).values()
+
+    def of_rule(self, rule_id: Optional[str]) -> Iterable[Event]:
+        return self._by_rule.get(rule_id, {}).values()
+
+    def of_host_and_rule(self, host: str, rule_id: Optional[str]) -> List[Event]:
+        """Returns the events of the host and rule, looking only at the smaller of both"""
+        of_host = self._by_host.get(host, {})
+        of_rule = self._by_rule.get(rule_id, {})
+        if len(of_host) <= len(of_rule):
+            return [event for event_id, event in of_host.items() if event_id in of_rule]
+        return [event for event_id, event in of_rule.items() if event_id in of_host]
+
+    def oldest(self) -> Optional[Event]:
+        return next(iter(self._events.values()), None)
+
+    def oldest_of_host(self, host: str) -> Optional[Event]:
+        return next(iter(self.of_host(host)), None)
+
+    def oldest_of_rule(self, rule_id: Optional[str]) -> Optional[Event]:
+        return next(iter(self.of_rule(rule_id)), None)
+
+    def num_of_host(self, host: str, core_host: str) -> int:
+        return self._host_counts.get((host, core_host), 0)
+
+    def num_of_rule(self, rule_id: Optional[str]) -> int:
+        return len(self._by_rule.get(rule_id, ()))
+
+    def host_counts(self) -> Dict[Tuple[str, str], int]:
+        return dict(self._host_counts)
+
+    def rule_counts(self) -> Dict[Optional[str], int]:
+        return {rule_id: len(events) for rule_id, events in self._by_rule.items()}
@@ -6,7 +6,6 @@
 
 import os
 import struct
-import subprocess
 import threading
 import time
 from logging import Logger
@@ -16,7 +15,7 @@ from typing import Any, AnyStr, Dict, Iterable, List, Optional, Tuple, Union
 from cmk.utils.log import VERBOSE
 from cmk.utils.render import date_and_time
 
-from .actions import quote_shell_string
+from .history_index import HistoryIndexes, time_range
 from .query import QueryGET
 from .settings import Settings
 
@@ -36,6 +35,7 @@ class History:
         self._lock = threading.Lock()
         self._mongodb = MongoDB()
         self._active_history_period = ActiveHistoryPeriod()
+        self._indexes = HistoryIndexes()
         self.reload_configuration(config)
 
     def reload_configuration(self, config: Dict[str, Any]) -> None:
@@ -295,11 +295,14 @@ def _reload_configuration_files(history: History) -> None:
 
 
 def _flush_files(history: History) -> None:
-    _expire_logfiles(history._settings, history._config, history._logger, history._lock, True)
+    _expire_logfiles(history._settings, history._config, history._logger, history._lock,
+                     history._indexes, True)
 
 
 def _housekeeping_files(history: History) -> None:
-    _expire_logfiles(history._settings, history._config, history._logger, history._lock, False)
+    _expire_logfiles(history._settings, history._config, history._logger, history._lock,
+                     history._indexes, False)
+    history._indexes.save()
 
 
 # Make a new entry in the event history. Each entry is tab-separated line
@@ -398,7 +401,7 @@ def _current_history_period(config: Dict[str, Any]) -> int:
 
 # Delete old log files
 def _expire_logfiles(settings: Settings, config: Dict[str, Any], logger: Logger,
-                     lock_history: threading.Lock, flush: bool) -> None:
+                     lock_history: threading.Lock, indexes: HistoryIndexes, flush: bool) -> None:
     with lock_history:
         try:
             days = config["history_lifetime"]
@@ -410,6 +413,7 @@ def _expire_logfiles(settings: Settings, config: Dict[str, Any], logger: Logger,
                     logger.info("Deleting log file %s (age %s)" %
                                 (path, date_and_time(path.stat().st_mtime)))
                     path.unlink()
+                    indexes.forget(path)
         except Exception as e:
             if settings.options.debug:
                 raise
@@ -425,119 +429,51 @@ def _get_files(history: History, logger: Logger, query: QueryGET) -> Iterable[An
     logger.debug("Filters: %r", filters)
     logger.debug("Limit: %r", limit)
 
-    # Be aware: The order here is important. It must match the order of the fields
-    # in the history file entries (See get_event_history_from_file). The fields in
-    # the file are currectly in the same order as StatusTableHistory.columns.
-    #
-    # Please note: Keep this in sync with livestatus/src/TableEventConsole.cc.
-    grepping_filters = [
-        'event_id',
-        'event_text',
-        'event_comment',
-        'event_host',
-        'event_host_regex',
-        'event_contact',
-        'event_application',
-        'event_rule_id',
-        'event_owner',
-        'event_ipaddress',
-        'event_core_host',
-    ]
-
-    # Optimization: use grep in order to reduce amount of read lines based on
-    # some frequently used filters.
-    #
-    # It's ok if the filters don't match 100% accurately on the right lines. If in
-    # doubt, you can output more lines than necessary. This is only a kind of
-    # prefiltering.
-    grep_pairs: List[Tuple[int, str]] = []
-    for column_name, operator_name, _predicate, argument in filters:
-        # Make sure that the greptexts are in the same order as in the
-        # actual logfiles. They will be joined with ".*"!
-        try:
-            nr = grepping_filters.index(column_name)
-            if operator_name in ['=', '~~']:
-                grep_pairs.append((nr, str(argument)))
-        except Exception:
-            pass
-
-    grep_pairs.sort()
-    greptexts = [x[1] for x in grep_pairs]
-    logger.debug("Texts for grep: %r", greptexts)
-
-    time_filters = [f for f in filters if f[0].split("_")[-1] == "time"]
-    logger.debug("Time filters: %r", time_filters)
-
-    # We do not want to open all files. So our strategy is:
-    # look for "time" filters and first apply the filter to
-    # the first entry and modification time of the file. Only
-    # if at least one of both timestamps is accepted then we
-    # take that file into account.
-    # Use the later logfiles first, to get the newer log entries
-    # first. When a limit is reached, the newer entries should
-    # be processed in most cases. We assume that now.
-    # To keep a consistent order of log entries, we should care
-    # about sorting the log lines in reverse, but that seems to
-    # already be done by the GUI, so we don't do that twice. Skipping
-    # this # will lead into some lines of a single file to be limited in
-    # wrong order. But this should be better than before.
-    for ts, path in sorted(((int(str(path.name)[:-4]), path)
-                            for path in history._settings.paths.history_dir.value.glob('*.log')),
-                           reverse=True):
-        if limit is not None and limit <= 0:
+    # The filters on the host, application, rule id and event id as well as the
+    # time filters are answered by the indexes of the history files (see
+    # history_index). All filters are applied to the lines found that way.
+    low, high = time_range(filters)
+    paths = sorted(((int(str(path.name)[:-4]), path)
+                    for path in history._settings.paths.history_dir.value.glob('*.log')),
+                   reverse=True)
+    # Use the later logfiles first and the newer lines of a file first: When
+    # the limit is reached, we have the newest entries.
+    for nr, (ts, path) in enumerate(paths):
+        if limit is not None and len(history_entries) >= limit:
             break
-        first_entry, last_entry = _get_logfile_timespan(path)
-        for _column_name, _operator_name, predicate, _argument in time_filters:
-            if predicate(first_entry):
-                break
-            if predicate(last_entry):
-                break
-        else:
-            # If no filter matches but we *have* filters
-            # then we skip this file. It cannot contain
-            # any useful entry for us.
-            if len(time_filters):
-                if history._settings.options.debug:
-                    history._logger.info("Skipping logfile %s.log because of time filter" % ts)
-                continue  # skip this file
-
-        new_entries = _parse_history_file(history, path, query, greptexts, limit, history._logger)
-        history_entries += new_entries
-        if limit is not None:
-            limit -= len(new_entries)
+        if not history._indexes.may_contain(path, low, high):
+            if history._settings.options.debug:
+                history._logger.info("Skipping logfile %s.log because of time filter" % ts)
+            continue
+
+        history_entries += _read_history_file(
+            history, path, query, None if limit is None else limit - len(history_entries), nr == 0,
+            logger)
 
     return history_entries
 
 
-def _parse_history_file(history: History, path: Path, query: Any, greptexts: List[str],
-                        limit: Optional[int], logger: Logger) -> List[Any]:
+def _read_history_file(history: History, path: Path, query: QueryGET, limit: Optional[int],
+                       active: bool, logger: Logger) -> List[Any]:
     entries: List[Any] = []
-    line_no = 0
-    # If we have greptexts we pre-filter the file using the extremely
-    # fast GNU Grep
-    # Revert lines from the log file to have the newer lines processed first
-    cmd = 'tac %s' % quote_shell_string(str(path))
-    if greptexts:
-        cmd += " | egrep -i -e %s" % quote_shell_string(".*".join(greptexts))
-    grep = subprocess.Popen(cmd, shell=True, close_fds=True, stdout=subprocess.PIPE)  # nosec
-    if grep.stdout is None:
-        raise Exception("Huh? stdout vanished...")
-
-    for line in grep.stdout:
-        line_no += 1
-        if limit is not None and len(entries) > limit:
-            grep.kill()
-            grep.wait()
-            break
+    index, line_numbers = history._indexes.lines(path, query.filters, active)
+    with path.open("rb") as f:
+        for number in line_numbers:
+            if limit is not None and len(entries) >= limit:
+                break
 
-        try:
-            parts: List[Any] = line.decode('utf-8').rstrip('\n').split('\t')
-            _convert_history_line(history, parts)
-            values = [line_no] + parts
-            if query.filter_row(values):
-                entries.append(values)
-        except Exception as e:
-            logger.exception("Invalid line '%r' in history file %s: %s" % (line, path, e))
+            start, end = index.offsets(number)
+            f.seek(start)
+            line = f.read(end - start)
+            try:
+                parts: List[Any] = line.decode('utf-8').rstrip('\n').split('\t')
+                _convert_history_line(history, parts)
+                # Line numbers count from the end of the file, the newest line is 1
+                values = [len(index) - number] + parts
+                if query.filter_row(values):
+                    entries.append(values)
+            except Exception as e:
+                logger.exception("Invalid line '%r' in history file %s: %s" % (line, path, e))
 
     return entries
 
@@ -594,19 +530,6 @@ def _unsplit(s: Any) -> Any:
     return s
 
 
-def _get_logfile_timespan(path: Path) -> Tuple[float, float]:
-    try:
-        with path.open(encoding="utf-8") as f:
-            first_entry = float(f.readline().split('\t', 1)[0])
-    except Exception:
-        first_entry = 0.0
-    try:
-        last_entry = path.stat().st_mtime
-    except Exception:
-        last_entry = 0.0
-    return first_entry, last_entry
-
-
 # Rip out/replace any characters which have a special meaning in the UTF-8
 # encoded history files, see e.g. quote_tab. In theory this shouldn't be
 # necessary, because there are a bunch of bytes which are not contained in any
@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright (C) 2019 tribe29 GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""Indexes of the history files of the event console
+
+Every history file (a segment of the history, one per history period) gets
+an index file next to it, "<timestamp>.idx" for "<timestamp>.log":
+
+    header:  magic, indexed size of the history file, number of lines,
+             minimum and maximum time of the entries
+    data:    the marshalled index: the offset and time of every line, the
+             lines of every host, application and rule id (postings) and the
+             event id of every line together with the lines sorted by event id
+
+The history files themselves are not changed, entries are still appended as
+tab separated lines. An index covers the history file up to its indexed size
+and is brought up to date by indexing the lines appended since then. So the
+index can always be rebuilt from the history file: It is simply ignored when
+it does not fit.
+"""
+
+import marshal
+import threading
+from array import array
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
+import struct
+
+import cmk.utils.store as store
+
+MAGIC = b"CMKECH\x00\x01"
+_HEADER = struct.Struct("=8sQQdd")
+# Saving the index of the newest history file is deferred until this many lines are new
+_MIN_SAVE_LINES = 10000
+
+# The field positions in the lines of the history files (see history._add_files) of the
+# indexed event columns
+_FIELDS = {
+    "event_host": 11,
+    "event_application": 13,
+    "event_rule_id": 17,
+}
+_FIELD_ID = 4
+_FIELD_MAX = max(_FIELDS.values()) + 1
+
+Filter = Tuple[str, str, Callable[[Any], bool], Any]
+
+
+def index_path(log_path: Path) -> Path:
+    return log_path.with_suffix(".idx")
+
+
+def _read_header(path: Path) -> Optional[Tuple[int, int, float, float]]:
+    try:
+        with path.open("rb") as f:
+            magic, size, lines, min_time, max_time = _HEADER.unpack(f.read(_HEADER.size))
+    except (OSError, struct.error):
+        return None
+    if magic != MAGIC:
+        return None
+    return size, lines, min_time, max_time
+
+
+def time_range(filters: Iterable[Filter]) -> Tuple[float, float]:
+    """Returns the times (inclusive) the history_time filters may accept"""
+    low, high = float("-inf"), float("inf")
+    for column_name, operator_name, _predicate, argument in filters:
+        if column_name != "history_time":
+            continue
+        if operator_name in (">", ">=", "="):
+            low = max(low, argument)
+        if operator_name in ("<", "<=", "="):
+            high = min(high, argument)
+    return low, high
+
+
+def _bisect_left(order: array, keys: array, key: int) -> int:
+    low, high = 0, len(order)
+    while low < high:
+        middle = (low + high) // 2
+        if keys[order[middle]] < key:
+            low = middle + 1
+        else:
+            high = middle
+    return low
+
+
+class SegmentIndex:
+    """The index of one history file
+
+    The event ids are looked up via the lines sorted by event id. Lines that
+    have been indexed after the index was saved are not sorted yet, their
+    event ids are compared one by one."""
+    def __init__(self, log_path: Path) -> None:
+        super(SegmentIndex, self).__init__()
+        self.log_path = log_path
+        self._saved_lines = -1
+        self._reset()
+
+    def _reset(self) -> None:
+        self.size = 0
+        self.min_time = float("inf")
+        self.max_time = float("-inf")
+        self._offsets = array("Q")
+        self._times = array("d")
+        self._ids = array("q")
+        self._id_order = array("I")
+        self._postings: Dict[str, Dict[str,
+                                       Union[array,
+                                             memoryview]]] = {column: {} for column in _FIELDS}
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    @classmethod
+    def load(cls, log_path: Path) -> "SegmentIndex":
+        """Loads the saved index, without updating it"""
+        index = cls(log_path)
+        try:
+            raw = index_path(log_path).read_bytes()
+            magic, size, lines, min_time, max_time = _HEADER.unpack_from(raw)
+            if magic != MAGIC:
+                return index
+            data = marshal.loads(raw[_HEADER.size:])
+        except (OSError, ValueError, EOFError, TypeError, struct.error):
+            return index
+
+        for name in ["_offsets", "_times", "_ids", "_id_order"]:
+            getattr(index, name).frombytes(data[name])
+        # The postings stay bytes until they are needed
+        index._postings.update(data["postings"])
+        if len(index._offsets) != lines:
+            index._reset()
+            return index
+        index.size, index.min_time, index.max_time = size, min_time, max_time
+        index._saved_lines = lines
+        return index
+
+    def unsaved_lines(self) -> int:
+        return len(self) - max(self._saved_lines, 0)
+
+    def save(self) -> None:
+        """Saves the index, the lines indexed since the last save are sorted in"""
+        if self._saved_lines == len(self):
+            return
+        if len(self._id_order) < len(self):
+            self._id_order = array(
+                "I",
+                sorted(self._id_order.tolist() + list(range(len(self._id_order), len(self))),
+                       key=self._ids.__getitem__))
+        data = {
+            "_offsets": self._offsets.tobytes(),
+            "_times": self._times.tobytes(),
+            "_ids": self._ids.tobytes(),
+            "_id_order": self._id_order.tobytes(),
+            "postings": {
+                column: {
+                    key: lines if isinstance(lines, bytes) else lines.tobytes()
+                    for key, lines in postings.items()
+                } for column, postings in self._postings.items()
+            },
+        }
+        store.save_bytes_to_file(
+            index_path(self.log_path),
+            _HEADER.pack(MAGIC, self.size, len(self), self.min_time, self.max_time) +
+            marshal.dumps(data))
+        self._saved_lines = len(self)
+
+    def update(self) -> int:
+        """Indexes the complete lines appended to the history file, returns their number"""
+        try:
+            size = self.log_path.stat().st_size
+        except OSError:
+            size = 0
+        if size < self.size:  # the file has been replaced, start from scratch
+            self._reset()
+        if size == self.size:
+            return 0
+
+        with self.log_path.open("rb") as f:
+            f.seek(self.size)
+            data = f.read(size - self.size)
+        data = data[:data.rfind(b"\n") + 1]
+
+        offset = self.size
+        first = number = len(self)
+        for line in data.split(b"\n")[:-1]:
+            self._add_line(number, offset, line)
+            offset += len(line) + 1
+            number += 1
+        self.size = offset
+        return number - first
+
+    def _add_line(self, number: int, offset: int, line: bytes) -> None:
+        parts = line.split(b"\t", _FIELD_MAX)
+        try:
+            entry_time = float(parts[0])
+            event_id = int(parts[_FIELD_ID])
+        except (ValueError, IndexError):
+            entry_time, event_id = 0.0, 0  # Broken line, reported when it is read
+
+        self._offsets.append(offset)
+        self._times.append(entry_time)
+        self._ids.append(event_id)
+        self.min_time = min(self.min_time, entry_time)
+        self.max_time = max(self.max_time, entry_time)
+
+        if len(parts) < _FIELD_MAX:
+            return
+        for column, position in _FIELDS.items():
+            key = parts[position].decode("utf-8", "replace")
+            postings = self._postings[column]
+            lines = postings.get(key)
+            if not isinstance(lines, array):
+                lines = postings[key] = array("I", lines or b"")
+            lines.append(number)
+
+    def lines(self, filters: List[Filter]) -> Iterator[int]:
+        """Returns the numbers of the lines that may match the filters, newest first
+
+        The filters on the indexed columns are applied to the distinct values of
+        these columns, the time filters to the times of the lines. The lines
+        still have to be checked against all filters. Only the time filters are
+        applied lazily, the lines appended meanwhile are not returned."""
+        candidates: Optional[Set[int]] = None
+        for column_name, operator_name, predicate, argument in filters:
+            if column_name in _FIELDS:
+                lines: Set[int] = set()
+                for key, postings in self._postings[column_name].items():
+                    if predicate(key):
+                        lines.update(
+                            memoryview(postings).cast("I") if isinstance(postings, bytes
+                                                                        ) else postings)
+            elif column_name == "event_id" and operator_name in ("=", "in"):
+                lines = self._lines_of_ids(argument if operator_name == "in" else [argument])
+            else:
+                continue
+            candidates = lines if candidates is None else candidates & lines
+
+        low, high = time_range(filters)
+        times = self._times
+        numbers: Iterable[int] = range(len(self) - 1, -1, -1) if candidates is None else sorted(
+            candidates, reverse=True)
+        if low == float("-inf") and high == float("inf"):
+            return iter(numbers)
+        return (number for number in numbers if low <= times[number] <= high)
+
+    def _lines_of_ids(self, event_ids: Iterable[int]) -> Set[int]:
+        lines: Set[int] = set()
+        order, ids = self._id_order, self._ids
+        for event_id in event_ids:
+            position = _bisect_left(order, ids, event_id)
+            while position < len(order) and ids[order[position]] == event_id:
+                lines.add(order[position])
+                position += 1
+        for number in range(len(order), len(self)):
+            if ids[number] in event_ids:
+                lines.add(number)
+        return lines
+
+    def offsets(self, number: int) -> Tuple[int, int]:
+        """Returns the start and end offset of a line in the history file"""
+        end = self._offsets[number + 1] if number + 1 < len(self) else self.size
+        return self._offsets[number], end
+
+
+class HistoryIndexes:
+    """Provides the up to date indexes of the history files
+
+    The index of the newest history file, the one entries are appended to,
+    is kept in memory. The others are loaded when they are needed."""
+    def __init__(self) -> None:
+        super(HistoryIndexes, self).__init__()
+        self._lock = threading.Lock()
+        self._active: Optional[SegmentIndex] = None
+
+    def may_contain(self, log_path: Path, low: float, high: float) -> bool:
+        """Whether the file may contain entries in the time range (without loading the index)"""
+        with self._lock:
+            if self._active is not None and self._active.log_path == log_path:
+                return True
+        header = _read_header(index_path(log_path))
+        if header is None:
+            return True
+        size, lines, min_time, max_time = header
+        try:
+            if size != log_path.stat().st_size:
+                return True
+        except OSError:
+            return False
+        return lines > 0 and min_time <= high and max_time >= low
+
+    def lines(self, log_path: Path, filters: List[Filter],
+              active: bool) -> Tuple[SegmentIndex, Iterator[int]]:
+        """Returns the updated index of the file and the lines that may match the filters
+
+        The index of an inactive file is saved right away when it has changed."""
+        with self._lock:
+            if self._active is not None and self._active.log_path == log_path:
+                index = self._active
+            else:
+                index = SegmentIndex.load(log_path)
+            index.update()
+            if active:
+                self._active = index
+            else:
+                index.save()
+            return index, index.lines(filters)
+
+    def save(self) -> None:
+        """Updates the index of the newest history file and saves it once enough lines are new"""
+        with self._lock:
+            if self._active is None:
+                return
+            if not self._active.log_path.exists():
+                self._active = None
+                return
+            self._active.update()
+            if self._active.unsaved_lines() >= _MIN_SAVE_LINES:
+                self._active.save()
+
+    def forget(self, log_path: Path) -> None:
+        with self._lock:
+            if self._active is not None and self._active.log_path == log_path:
+                self._active = None
+        index_path(log_path).unlink(missing_ok=True)
@@ -28,7 +28,7 @@ import threading
 import time
 import traceback
 from types import FrameType
-from typing import Any, AnyStr, Dict, Iterable, Iterator, List, Optional, Tuple, Type, Union
+from typing import Any, AnyStr, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Type, Union
 
 from six import ensure_binary
 
@@ -49,11 +49,14 @@ import livestatus
 
 from .actions import do_notify, do_event_action, do_event_actions, event_has_opened
 from .crash_reporting import ECCrashReport, CrashReportStore
+from .event_store import EventStore
 from .history import ActiveHistoryPeriod, History, scrub_string, quote_tab, get_logfile
 from .query import MKClientError, Query, QueryGET
+from .rule_index import RuleIndex
 from .rule_packs import load_config as load_config_using
 from .settings import FileDescriptor, PortNumber, Settings, settings as create_settings
 from .snmp import SNMPTrapEngine
+from .status_journal import StatusJournal, gc_disabled
 
 
 class SyslogPriority:
@@ -510,6 +513,8 @@ class Perfcounters:
         self._average_rates: Dict[str, float] = {}
         self._times: Dict[str, float] = {}
         self._last_statistics: Optional[float] = None
+        # Per rule: tries, hits and the total time spent for matching
+        self._rule_counters: Dict[str, Tuple[int, int, float]] = {}
 
         self._logger = logger.getChild("Perfcounters")
 
@@ -524,6 +529,22 @@ class Perfcounters:
             else:
                 self._times[counter] = ptime
 
+    def count_rule(self, rule_id: str, duration: float, hit: bool) -> None:
+        with self._lock:
+            tries, hits, total_time = self._rule_counters.get(rule_id, (0, 0, 0.0))
+            self._rule_counters[rule_id] = (tries + 1, hits + hit, total_time + duration)
+
+    def get_rule_counters(self) -> Dict[str, Tuple[int, int, float]]:
+        with self._lock:
+            return self._rule_counters.copy()
+
+    def reset_rule_counters(self, rule_id: Optional[str]) -> None:
+        with self._lock:
+            if rule_id:
+                self._rule_counters.pop(rule_id, None)
+            else:
+                self._rule_counters = {}
+
     def do_statistics(self) -> None:
         with self._lock:
             now = time.time()
@@ -1071,6 +1092,7 @@ class EventServer(ECServerThread):
                             event["count"] = max(0, event["count"] - new_tokens)
                             event[
                                 "last_token"] = last_token + new_tokens * secs_per_token  # not now! would be unfair
+                            self._event_status.event_changed(event)
                             if event["count"] == 0:
                                 self._logger.info(
                                     "Rule %s/%s, event %d: again without allowed rate, dropping event"
@@ -1097,6 +1119,7 @@ class EventServer(ECServerThread):
                                       (event["id"], event["rule_id"]))
                     event["phase"] = "open"
                     self._history.add(event, "DELAYOVER")
+                    self._event_status.event_changed(event)
                     if rule:
                         event_has_opened(self._history, self.settings, self._config, self._logger,
                                          self, self._event_columns, rule, event)
@@ -1167,9 +1190,9 @@ class EventServer(ECServerThread):
                 # First look for case 1: rule that already have at least one hit
                 # and this events in the state "counting" exist.
                 events_to_delete = []
-                events = self._event_status.events()
+                events = self._event_status.events_of_rule(rule["id"])
                 for nr, event in enumerate(events):
-                    if event["rule_id"] == rule["id"] and event["phase"] == "counting":
+                    if event["phase"] == "counting":
                         # time has elapsed. Now lets see if we have reached
                         # the neccessary count:
                         if event["count"] < expected_count:  # no -> trigger alarm
@@ -1206,10 +1229,8 @@ class EventServer(ECServerThread):
         merge_event = None
         merge = rule["expect"].get("merge", "open")
         if merge != "never":
-            for event in self._event_status.events():
-                if event["rule_id"] == rule["id"] and \
-                        (event["phase"] == "open" or
-                         (event["phase"] == "ack" and merge == "acked")):
+            for event in self._event_status.events_of_rule(rule["id"]):
+                if event["phase"] == "open" or (event["phase"] == "ack" and merge == "acked"):
                     merge_event = event
                     break
 
@@ -1222,6 +1243,7 @@ class EventServer(ECServerThread):
             # Better rewrite (again). Rule might have changed. Also we have changed
             # the text and the user might have his own text added via set_text.
             self.rewrite_event(rule, merge_event, {}, set_first=False)
+            self._event_status.event_changed(merge_event)
             self._history.add(merge_event, "COUNTFAILED")
         else:
             # Create artifical event from scratch. Make sure that all important
@@ -1256,6 +1278,8 @@ class EventServer(ECServerThread):
                 event["phase"] = "closed"
                 self._history.add(event, "AUTODELETE")
                 self._event_status.remove_event(event)
+            else:
+                self._event_status.event_changed(event)
 
     def reload_configuration(self, config: Dict[str, Any]) -> None:
         self._config = config
@@ -1337,6 +1361,7 @@ class EventServer(ECServerThread):
         self._logger.info("Compiled %d active rules (ignoring %d disabled rules)" %
                           (count_rules, count_disabled))
         if self._config["rule_optimizer"]:
+            self._rule_index = RuleIndex(self._rules, self._rule_hash)
             self._logger.info(
                 "Rule hash: %d rules - %d hashed, %d unspecific" %
                 (len(self._rules), len(self._rules) - count_unspecific, count_unspecific))
@@ -1431,7 +1456,7 @@ class EventServer(ECServerThread):
         # Rule optimizer
         if self._config["rule_optimizer"]:
             self._hash_stats[event["facility"]][event["priority"]] += 1
-            rule_candidates = self._rule_hash.get(event["facility"], {}).get(event["priority"], [])
+            rule_candidates = self._rule_index.candidates(event)
         else:
             rule_candidates = self._rules
 
@@ -1525,6 +1550,9 @@ class EventServer(ECServerThread):
                             self._history.add(existing_event, "AUTODELETE")
                             with self._event_status.lock:
                                 self._event_status.remove_event(existing_event)
+                        else:
+                            with self._event_status.lock:
+                                self._event_status.event_changed(existing_event)
                 elif "expect" in rule:
                     self._event_status.count_expected_event(self, event)
                 else:
@@ -1541,11 +1569,13 @@ class EventServer(ECServerThread):
                         if event["phase"] == "open":
                             event_has_opened(self._history, self.settings, self._config,
                                              self._logger, self, self._event_columns, rule, event)
-                            if rule.get("autodelete"):
-                                event["phase"] = "closed"
-                                self._history.add(event, "AUTODELETE")
-                                with self._event_status.lock:
+                            with self._event_status.lock:
+                                if rule.get("autodelete"):
+                                    event["phase"] = "closed"
+                                    self._history.add(event, "AUTODELETE")
                                     self._event_status.remove_event(event)
+                                else:
+                                    self._event_status.event_changed(event)
                 return
 
         # End of loop over rules.
@@ -1601,6 +1631,12 @@ class EventServer(ECServerThread):
     # match.
     def event_rule_matches(self, rule, event):
         self._perfcounters.count("rule_tries")
+        started = time.perf_counter()
+        result = self._event_rule_matches(rule, event)
+        self._perfcounters.count_rule(rule["id"], time.perf_counter() - started, bool(result))
+        return result
+
+    def _event_rule_matches(self, rule, event):
         with self._lock_configuration:
             result = self._rule_matcher.event_rule_matches_non_inverted(rule, event)
             if rule.get("invert_matching"):
@@ -2597,12 +2633,9 @@ class StatusTableEvents(StatusTable):
         self._event_status = event_status
 
     def _enumerate(self, query: QueryGET) -> Iterable[List[Any]]:
-        for event in self._event_status.get_events():
-            # Optimize filters that are set by the check_mkevents active check. Since users
-            # may have a lot of those checks running, it is a good idea to optimize this.
-            if query.only_host and event["host"] not in query.only_host:
-                continue
-
+        # Optimize filters that are set by the check_mkevents active check. Since users
+        # may have a lot of those checks running, it is a good idea to optimize this.
+        for event in self._event_status.get_events(query.only_host or None):
             row = []
             for column_name in self.column_names:
                 try:
@@ -2637,14 +2670,23 @@ class StatusTableRules(StatusTable):
     columns = [
         ("rule_id", ""),
         ("rule_hits", 0),
+        ("rule_tries", 0),  # since the last start of the event daemon
+        ("rule_matching_hits", 0),  # since the last start of the event daemon
+        ("rule_matching_time", 0.0),  # total seconds spent for matching the rule
     ]
 
-    def __init__(self, logger: Logger, event_status: 'EventStatus') -> None:
+    def __init__(self, logger: Logger, event_status: 'EventStatus',
+                 perfcounters: Perfcounters) -> None:
         super().__init__(logger)
         self._event_status = event_status
+        self._perfcounters = perfcounters
 
     def _enumerate(self, query: QueryGET) -> Iterable[List[Any]]:
-        return self._event_status.get_rule_stats()
+        rule_hits = dict(self._event_status.get_rule_stats())
+        rule_counters = self._perfcounters.get_rule_counters()
+        for rule_id in sorted(set(rule_hits).union(rule_counters)):
+            yield [rule_id, rule_hits.get(rule_id, 0)] + list(
+                rule_counters.get(rule_id, (0, 0, 0.0)))
 
 
 class StatusTableStatus(StatusTable):
@@ -2690,7 +2732,7 @@ class StatusServer(ECServerThread):
 
         self._table_events = StatusTableEvents(logger, event_status)
         self._table_history = StatusTableHistory(logger, history)
-        self._table_rules = StatusTableRules(logger, event_status)
+        self._table_rules = StatusTableRules(logger, event_status, perfcounters)
         self._table_status = StatusTableStatus(logger, event_server)
         self._perfcounters = perfcounters
         self._lock_configuration = lock_configuration
@@ -2955,6 +2997,7 @@ class StatusServer(ECServerThread):
             event["contact"] = contact
         if user:
             event["owner"] = user
+        self._event_status.event_changed(event)
         self._history.add(event, "UPDATE", user)
 
     def handle_command_create(self, arguments: List[str]) -> None:
@@ -2974,6 +3017,7 @@ class StatusServer(ECServerThread):
         event["state"] = int(newstate)
         if user:
             event["owner"] = user
+        self._event_status.event_changed(event)
         self._history.add(event, "CHANGESTATE", user)
 
     def handle_command_reload(self) -> None:
@@ -3006,15 +3050,18 @@ class StatusServer(ECServerThread):
         if arguments:
             self._logger.info("Resetting counters of rule " + arguments[0])
             self._event_status.reset_counters(arguments[0])
+            self._perfcounters.reset_rule_counters(arguments[0])
         else:
             self._logger.info("Resetting all rule counters")
             self._event_status.reset_counters(None)
+            self._perfcounters.reset_rule_counters(None)
 
     def handle_command_action(self, arguments):
         event_id, user, action_id = arguments
         event = self._event_status.event(int(event_id))
         if user:
             event["owner"] = user
+            self._event_status.event_changed(event)
 
         if action_id == "@NOTIFY":
             do_notify(self._event_server, self._logger, event, user, is_cancelling=False)
@@ -3155,19 +3202,19 @@ class EventStatus:
         self.lock = threading.Lock()
         self._history = history
         self._logger = logger
+        self._journal = StatusJournal(settings.paths.status_file.value)
         self.flush()
 
     def reload_configuration(self, config: Dict[str, Any]) -> None:
         self._config = config
 
     def flush(self) -> None:
-        # TODO: Improve types!
-        self._events: List[Any] = []
+        self._events = EventStore()
+        self._journal.invalidate()
         self._next_event_id = 1
         self._rule_stats: Dict[str, int] = {}
         # needed for expecting rules
         self._interval_starts: Dict[str, int] = {}
-        self._initialize_event_limit_status()
 
         # TODO: might introduce some performance counters, like:
         # - number of received messages
@@ -3175,13 +3222,16 @@ class EventStatus:
         # - number of rule misses
 
     def events(self) -> List[Any]:
+        """Returns a copy of the list of events, which may be changed while iterating it"""
         # TODO: Improve type!
-        return self._events
+        return list(self._events)
+
+    def events_of_rule(self, rule_id: Optional[str]) -> List[Any]:
+        """Returns a copy of the list of events of the rule, oldest first"""
+        return list(self._events.of_rule(rule_id))
 
     def event(self, eid):
-        for event in self._events:
-            if event["id"] == eid:
-                return event
+        return self._events.get(eid)
 
     # Return beginning of current expectation interval. For new rules
     # we start with the next interval in future.
@@ -3224,30 +3274,45 @@ class EventStatus:
     def pack_status(self):
         return {
             "next_event_id": self._next_event_id,
-            "events": self._events,
+            "events": list(self._events),
             "rule_stats": self._rule_stats,
             "interval_starts": self._interval_starts,
         }
 
     def unpack_status(self, status):
         self._next_event_id = status["next_event_id"]
-        self._events = status["events"]
+        self._events = EventStore(status["events"])
         self._rule_stats = status["rule_stats"]
         self._interval_starts = status["interval_starts"]
+        self._journal.invalidate()
 
+    # Only the changes since the last save are appended to the status file,
+    # from time to time it is compacted to a snapshot of the complete status.
     def save_status(self):
         now = time.time()
-        status = self.pack_status()
         path = self.settings.paths.status_file.value
-        path_new = path.parent / (path.name + '.new')
-        # Believe it or not: cPickle is more than two times slower than repr()
-        with path_new.open(mode='wb') as f:
-            f.write((repr(status) + "\n").encode("utf-8"))
-            f.flush()
-            os.fsync(f.fileno())
-        path_new.rename(path)
+        updated, removed = self._events.take_changes()
+        try:
+            if self._journal.needs_snapshot():
+                what, size = "snapshot", self._journal.write_snapshot(self.pack_status())
+            else:
+                try:
+                    what, size = "changes", self._journal.append(
+                        updated, removed, {
+                            "next_event_id": self._next_event_id,
+                            "rule_stats": self._rule_stats,
+                            "interval_starts": self._interval_starts,
+                        })
+                except OSError as e:
+                    self._logger.warning("Cannot append to %s (%s), saving a snapshot" % (path, e))
+                    what, size = "snapshot", self._journal.write_snapshot(self.pack_status())
+        except Exception:
+            # The changes taken are not in the status file, only a snapshot saves them now
+            self._journal.invalidate()
+            raise
         elapsed = time.time() - now
-        self._logger.log(VERBOSE, "Saved event state to %s in %.3fms.", path, elapsed * 1000)
+        self._logger.log(VERBOSE, "Saved event state to %s in %.3fms (%s, %d bytes).", path,
+                         elapsed * 1000, what, size)
 
     def reset_counters(self, rule_id):
         if rule_id:
@@ -3259,66 +3324,51 @@ class EventStatus:
 
     def load_status(self, event_server):
         path = self.settings.paths.status_file.value
-        if path.exists():
-            try:
-                status = ast.literal_eval(path.read_text(encoding="utf-8"))
-                self._next_event_id = status["next_event_id"]
-                self._events = status["events"]
-                self._rule_stats = status["rule_stats"]
-                self._interval_starts = status.get("interval_starts", {})
-                self._logger.info("Loaded event state from %s." % path)
-            except Exception as e:
-                self._logger.exception("Error loading event state from %s: %s" % (path, e))
-                raise
+        try:
+            status = self._journal.load()
+            if status is None:
+                return
+            self._next_event_id = status["next_event_id"]
+            events = status["events"]
+            self._rule_stats = status["rule_stats"]
+            self._interval_starts = status.get("interval_starts", {})
+            self._logger.info("Loaded event state from %s." % path)
+        except Exception as e:
+            self._logger.exception("Error loading event state from %s: %s" % (path, e))
+            raise
 
         # Add new columns
-        for event in self._events:
+        for event in events:
+            if "ipaddress" not in event or "core_host" not in event:
+                self._journal.invalidate()  # the changes are saved with the next snapshot
             event.setdefault("ipaddress", "")
 
             if "core_host" not in event:
                 event_server.add_core_host_to_event(event)
                 event["host_in_downtime"] = False
 
-        # core_host is needed to initialize the status
-        self._initialize_event_limit_status()
-
-    # Called on Event Console initialization from status file to initialize
-    # the current event limit state -> Sets internal counters which are
-    # updated during runtime.
-    def _initialize_event_limit_status(self):
-        self.num_existing_events = len(self._events)
-
-        self.num_existing_events_by_host = {}
-        self.num_existing_events_by_rule = {}
-        for event in self._events:
-            self._count_event_add(event)
-
-    def _count_event_add(self, event):
-        host_key = (event["host"], event["core_host"])
-        if host_key not in self.num_existing_events_by_host:
-            self.num_existing_events_by_host[host_key] = 1
-        else:
-            self.num_existing_events_by_host[host_key] += 1
+        # core_host is needed to index the events
+        with gc_disabled():
+            self._events = EventStore(events)
 
-        if event["rule_id"] not in self.num_existing_events_by_rule:
-            self.num_existing_events_by_rule[event["rule_id"]] = 1
-        else:
-            self.num_existing_events_by_rule[event["rule_id"]] += 1
+    # The current event limit state, derived from the indexes of the events
+    @property
+    def num_existing_events(self) -> int:
+        return len(self._events)
 
-    def _count_event_remove(self, event):
-        host_key = (event["host"], event["core_host"])
+    @property
+    def num_existing_events_by_host(self) -> Dict[Tuple[str, str], int]:
+        return self._events.host_counts()
 
-        self.num_existing_events -= 1
-        self.num_existing_events_by_host[host_key] -= 1
-        self.num_existing_events_by_rule[event["rule_id"]] -= 1
+    @property
+    def num_existing_events_by_rule(self) -> Dict[Optional[str], int]:
+        return self._events.rule_counts()
 
     def new_event(self, event):
         self._perfcounters.count("events")
         event["id"] = self._next_event_id
         self._next_event_id += 1
-        self._events.append(event)
-        self.num_existing_events += 1
-        self._count_event_add(event)
+        self._events.add(event)
         self._history.add(event, "NEW")
 
     def archive_event(self, event):
@@ -3328,23 +3378,24 @@ class EventStatus:
         event["phase"] = "closed"
         self._history.add(event, "ARCHIVED")
 
+    # protected by self.lock
+    def event_changed(self, event):
+        """Needs to be called after an existing event has been changed"""
+        self._events.changed(event)
+
     def remove_event(self, event):
         try:
-            self._events.remove(event)
-            self._count_event_remove(event)
-        except ValueError:
+            self._events.remove(event["id"])
+        except KeyError:
             self._logger.exception("Cannot remove event %d: not present" % event["id"])
 
-    # protected by self.lock
-    def _remove_event_by_nr(self, index):
-        event = self._events.pop(index)
-        self._count_event_remove(event)
-
     # protected by self.lock
     def remove_oldest_event(self, ty, event):
         if ty == "overall":
             self._logger.log(VERBOSE, "  Removing oldest event")
-            self._remove_event_by_nr(0)
+            oldest = self._events.oldest()
+            if oldest is not None:
+                self.remove_event(oldest)
         elif ty == "by_rule":
             self._logger.log(VERBOSE, "  Removing oldest event of rule \"%s\"", event["rule_id"])
             self._remove_oldest_event_of_rule(event["rule_id"])
@@ -3354,26 +3405,24 @@ class EventStatus:
 
     # protected by self.lock
     def _remove_oldest_event_of_rule(self, rule_id):
-        for event in self._events:
-            if event["rule_id"] == rule_id:
-                self.remove_event(event)
-                return
+        event = self._events.oldest_of_rule(rule_id)
+        if event is not None:
+            self.remove_event(event)
 
     # protected by self.lock
     def _remove_oldest_event_of_host(self, hostname):
-        for event in self._events:
-            if event["host"] == hostname:
-                self.remove_event(event)
-                return
+        event = self._events.oldest_of_host(hostname)
+        if event is not None:
+            self.remove_event(event)
 
     # protected by self.lock
     def get_num_existing_events_by(self, ty, event):
         if ty == "overall":
             return self.num_existing_events
         if ty == "by_rule":
-            return self.num_existing_events_by_rule.get(event["rule_id"], 0)
+            return self._events.num_of_rule(event["rule_id"])
         if ty == "by_host":
-            return self.num_existing_events_by_host.get((event["host"], event["core_host"]), 0)
+            return self._events.num_of_host(event["host"], event["core_host"])
         raise NotImplementedError()
 
     # Cancel all events the belong to a certain rule id and are
@@ -3381,55 +3430,54 @@ class EventStatus:
     def cancel_events(self, event_server, event_columns, new_event, match_groups, rule):
         with self.lock:
             to_delete = []
-            for nr, event in enumerate(self._events):
-                if event["rule_id"] == rule["id"]:
-                    if self.cancelling_match(match_groups, new_event, event, rule):
-                        # Fill a few fields of the cancelled event with data from
-                        # the cancelling event so that action scripts have useful
-                        # values and the logfile entry if more relevant.
-                        previous_phase = event["phase"]
-                        event["phase"] = "closed"
-                        # TODO: Why do we use OK below and not new_event["state"]???
-                        event["state"] = 0  # OK
-                        event["text"] = new_event["text"]
-                        # TODO: This is a hack and partial copy-n-paste from rewrite_events...
-                        if "set_text" in rule:
-                            event["text"] = replace_groups(rule["set_text"], event["text"],
-                                                           match_groups)
-                        event["time"] = new_event["time"]
-                        event["last"] = new_event["time"]
-                        event["priority"] = new_event["priority"]
-                        self._history.add(event, "CANCELLED")
-                        actions = rule.get("cancel_actions", [])
-                        if actions:
-                            if previous_phase != "open" \
-                               and rule.get("cancel_action_phases", "always") == "open":
-                                self._logger.info(
-                                    "Do not execute cancelling actions, event %s's phase "
-                                    "is not 'open' but '%s'" % (event["id"], previous_phase))
-                            else:
-                                do_event_actions(self._history,
-                                                 self.settings,
-                                                 self._config,
-                                                 self._logger,
-                                                 event_server,
-                                                 event_columns,
-                                                 actions,
-                                                 event,
-                                                 is_cancelling=True)
-
-                        to_delete.append(nr)
-
-            for nr in to_delete[::-1]:
-                self._remove_event_by_nr(nr)
-
-    def cancelling_match(self, match_groups, new_event, event, rule):
-        debug = self._config["debug_rules"]
+            # Only events of the host of the cancelling event can be cancelled
+            host = self._cancelling_host(match_groups, new_event, rule)
+            for event in self._events.of_host_and_rule(host, rule["id"]):
+                if self.cancelling_match(match_groups, new_event, event, rule):
+                    # Fill a few fields of the cancelled event with data from
+                    # the cancelling event so that action scripts have useful
+                    # values and the logfile entry if more relevant.
+                    previous_phase = event["phase"]
+                    event["phase"] = "closed"
+                    # TODO: Why do we use OK below and not new_event["state"]???
+                    event["state"] = 0  # OK
+                    event["text"] = new_event["text"]
+                    # TODO: This is a hack and partial copy-n-paste from rewrite_events...
+                    if "set_text" in rule:
+                        event["text"] = replace_groups(rule["set_text"], event["text"],
+                                                       match_groups)
+                    event["time"] = new_event["time"]
+                    event["last"] = new_event["time"]
+                    event["priority"] = new_event["priority"]
+                    self._history.add(event, "CANCELLED")
+                    actions = rule.get("cancel_actions", [])
+                    if actions:
+                        if previous_phase != "open" \
+                           and rule.get("cancel_action_phases", "always") == "open":
+                            self._logger.info("Do not execute cancelling actions, event %s's phase "
+                                              "is not 'open' but '%s'" %
+                                              (event["id"], previous_phase))
+                        else:
+                            do_event_actions(self._history,
+                                             self.settings,
+                                             self._config,
+                                             self._logger,
+                                             event_server,
+                                             event_columns,
+                                             actions,
+                                             event,
+                                             is_cancelling=True)
+
+                    to_delete.append(event)
+
+            for event in to_delete:
+                self.remove_event(event)
 
+    def _cancelling_host(self, match_groups, new_event, rule):
         # The match_groups of the canceling match only contain the *_ok match groups
         # Since the rewrite definitions are based on the positive match, we need to
         # create some missing keys. O.o
-        for key in match_groups.keys():
+        for key in list(match_groups.keys()):
             if key.endswith("_ok"):
                 match_groups[key[:-3]] = match_groups[key]
 
@@ -3439,7 +3487,12 @@ class EventStatus:
         host = new_event["host"]
         if "set_host" in rule:
             host = replace_groups(rule["set_host"], host, match_groups)
+        return host
 
+    def cancelling_match(self, match_groups, new_event, event, rule):
+        debug = self._config["debug_rules"]
+
+        host = self._cancelling_host(match_groups, new_event, rule)
         if event["host"] != host:
             if debug:
                 self._logger.info("Do not cancel event %d: host is not the same (%s != %s)" %
@@ -3516,10 +3569,14 @@ class EventStatus:
                 preserve["contact"] = found["contact"]
         found.update(event)
         found.update(preserve)
+        with self.lock:
+            self.event_changed(found)
 
     def count_expected_event(self, event_server, event):
-        for ev in self._events:
-            if ev["rule_id"] == event["rule_id"] and ev["phase"] == "counting":
+        with self.lock:
+            events = list(self._events.of_rule(event["rule_id"]))
+        for ev in events:
+            if ev["phase"] == "counting":
                 self.count_event_up(ev, event)
                 return
 
@@ -3534,31 +3591,33 @@ class EventStatus:
         # we do never modify events that are already in the state "open"
         # since the event has been created because the count was too
         # low in the specified period of time.
-        for ev in self._events:
-            if ev["rule_id"] == event["rule_id"]:
-                if ev["phase"] == "ack" and not count["count_ack"]:
-                    continue  # skip acknowledged events
-
-                if count["separate_host"] and ev["host"] != event["host"]:
-                    continue  # treat events with separated hosts separately
+        with self.lock:
+            if count["separate_host"]:
+                # treat events with separated hosts separately
+                events = self._events.of_host_and_rule(event["host"], event["rule_id"])
+            else:
+                events = list(self._events.of_rule(event["rule_id"]))
+        for ev in events:
+            if ev["phase"] == "ack" and not count["count_ack"]:
+                continue  # skip acknowledged events
 
-                if count["separate_application"] and ev["application"] != event["application"]:
-                    continue  # same for application
+            if count["separate_application"] and ev["application"] != event["application"]:
+                continue  # same for application
 
-                if count["separate_match_groups"] and ev["match_groups"] != event["match_groups"]:
-                    continue
+            if count["separate_match_groups"] and ev["match_groups"] != event["match_groups"]:
+                continue
 
-                if count.get("count_duration"
-                            ) is not None and ev["first"] + count["count_duration"] < event["time"]:
-                    # Counting has been discontinued on this event after a certain time
-                    continue
+            if count.get("count_duration"
+                        ) is not None and ev["first"] + count["count_duration"] < event["time"]:
+                # Counting has been discontinued on this event after a certain time
+                continue
 
-                if ev["host_in_downtime"] != event["host_in_downtime"]:
-                    continue  # treat events with different downtime states separately
+            if ev["host_in_downtime"] != event["host_in_downtime"]:
+                continue  # treat events with different downtime states separately
 
-                found = ev
-                self.count_event_up(found, event)
-                break
+            found = ev
+            self.count_event_up(found, event)
+            break
         else:
             event["count"] = 1
             event["phase"] = "counting"
@@ -3573,18 +3632,21 @@ class EventStatus:
 
     # locked with self.lock
     def delete_event(self, event_id, user):
-        for nr, event in enumerate(self._events):
-            if event["id"] == event_id:
-                event["phase"] = "closed"
-                if user:
-                    event["owner"] = user
-                self._history.add(event, "DELETE", user)
-                self._remove_event_by_nr(nr)
-                return
-        raise MKClientError("No event with id %s" % event_id)
+        event = self._events.get(event_id)
+        if event is None:
+            raise MKClientError("No event with id %s" % event_id)
+        event["phase"] = "closed"
+        if user:
+            event["owner"] = user
+        self._history.add(event, "DELETE", user)
+        self._events.remove(event_id)
 
-    def get_events(self):
-        return self._events
+    # locked with self.lock
+    def get_events(self, hosts: Optional[Set[str]] = None) -> Iterable[Any]:
+        """Returns the events, only the ones of the given hosts if hosts are given"""
+        if hosts is None:
+            return self._events
+        return self._events.of_hosts(hosts)
 
     def get_rule_stats(self):
         return sorted(self._rule_stats.items(), key=lambda x: x[0])
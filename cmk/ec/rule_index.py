@@ -0,0 +1,338 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright (C) 2019 tribe29 GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""Prefiltering of the rules an event has to be matched against
+
+The rule optimizer of the event server only narrows the rules down by the
+syslog facility and priority of an event. With thousands of rules most of the
+remaining ones are still tried one by one. The RuleIndex additionally looks at
+the host, application and message conditions of the compiled rules: Every
+rule is registered with the literal host name of an exact host match or with a
+literal that every match of one of its patterns must contain. For an event
+only the rules whose literal is found in the event (and the rules without such
+a condition) remain candidates, all others can not match.
+"""
+
+import re
+from typing import (Any, Callable, Dict, Iterable, List, Optional, Pattern, Sequence, Set, Tuple,
+                    Union)
+
+Rule = Dict[str, Any]
+MatchingValue = Union[str, Pattern[str]]
+
+# re.IGNORECASE matches "i" also with these two, str.casefold() does not fold them to "i"
+_FOLD_TABLE = {0x130: "i", 0x131: "i"}
+
+
+def fold(text: str) -> str:
+    """Case folds a text the way a literal has to be searched for in it
+
+    An ASCII literal found by an re.IGNORECASE pattern or by the lower cased
+    infix matching of the EC is also contained in the folded text."""
+    return text.translate(_FOLD_TABLE).casefold()
+
+
+def _is_literal_char(char: str) -> bool:
+    return char.isascii() and char.isprintable()
+
+
+def _skip_class(pattern: str, pos: int) -> int:
+    """Returns the position after the character class starting at pattern[pos]"""
+    pos += 1
+    if pattern[pos:pos + 1] == "^":
+        pos += 1
+    if pattern[pos:pos + 1] == "]":
+        pos += 1
+    while pos < len(pattern):
+        if pattern[pos] == "\\":
+            pos += 2
+            continue
+        if pattern[pos] == "]":
+            return pos + 1
+        pos += 1
+    raise ValueError("unterminated character class")
+
+
+def _skip_group(pattern: str, pos: int) -> int:
+    """Returns the position after the group starting at pattern[pos]"""
+    depth = 0
+    while pos < len(pattern):
+        char = pattern[pos]
+        if char == "\\":
+            pos += 2
+            continue
+        if char == "[":
+            pos = _skip_class(pattern, pos)
+            continue
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+            if depth == 0:
+                return pos + 1
+        pos += 1
+    raise ValueError("unterminated group")
+
+
+def _literal_runs(pattern: str) -> List[str]:
+    """Returns runs of literal characters every match of the regex contains
+
+    This is deliberately conservative: Groups, character classes, escape
+    sequences and repeated characters end a run and alternatives on the top
+    level make the pattern yield no run at all."""
+    runs: List[str] = []
+    run = ""
+    pos = 0
+    while pos < len(pattern):
+        char = pattern[pos]
+        if char == "|":
+            return []
+
+        if char in "*?{":
+            # The preceding character is optional
+            runs.append(run[:-1])
+            run = ""
+            if char == "{":
+                end = pattern.find("}", pos)
+                if end == -1:
+                    return runs
+                pos = end
+        elif char == "+":
+            runs.append(run)
+            run = ""
+        elif char == "\\":
+            escaped = pattern[pos + 1:pos + 2]
+            if escaped and not escaped.isalnum() and _is_literal_char(escaped):
+                run += escaped
+            else:
+                runs.append(run)
+                run = ""
+                # Skip the arguments of \x41, \N{...}, \12 and friends
+                while pos + 2 < len(pattern) and pattern[pos + 2].isalnum():
+                    pos += 1
+            pos += 1
+        elif char == "(":
+            runs.append(run)
+            run = ""
+            pos = _skip_group(pattern, pos)
+            continue
+        elif char == "[":
+            runs.append(run)
+            run = ""
+            pos = _skip_class(pattern, pos)
+            continue
+        elif char in ".^$" or not _is_literal_char(char):
+            runs.append(run)
+            run = ""
+        else:
+            run += char
+        pos += 1
+
+    runs.append(run)
+    return runs
+
+
+def required_literals(value: MatchingValue) -> List[str]:
+    """Returns folded literals every text matching the value contains
+
+    The value is a compiled matching value of a rule: A lower cased string for
+    infix matching or a regex. The list is empty when no literal is known."""
+    if isinstance(value, str):
+        return [value] if value.isascii() else []
+
+    if value.flags & re.VERBOSE:
+        return []
+    try:
+        runs = _literal_runs(value.pattern)
+    except ValueError:
+        return []
+    return sorted(dict.fromkeys(fold(run) for run in runs if run), key=len, reverse=True)
+
+
+class _LiteralIndex:
+    """Finds the registered literals contained in a (folded) text
+
+    Literals are looked up by one of their trigrams, the one shared with the
+    fewest other literals. The text is then split into its trigrams once and
+    only the literals of the trigrams found in the text are verified."""
+    def __init__(self, literals: Dict[str, List[int]]) -> None:
+        super(_LiteralIndex, self).__init__()
+        self._positions = literals
+        self._short: List[str] = []
+        self._by_trigram: Dict[str, List[str]] = {}
+
+        trigram_counts: Dict[str, int] = {}
+        for literal in literals:
+            for trigram in set(self._trigrams(literal)):
+                trigram_counts[trigram] = trigram_counts.get(trigram, 0) + 1
+
+        for literal in literals:
+            if len(literal) < 3:
+                self._short.append(literal)
+                continue
+            trigram = min(self._trigrams(literal), key=trigram_counts.__getitem__)
+            self._by_trigram.setdefault(trigram, []).append(literal)
+        self._trigram_set = frozenset(self._by_trigram)
+
+    @staticmethod
+    def _trigrams(text: str) -> Iterable[str]:
+        return (text[i:i + 3] for i in range(len(text) - 2))
+
+    def positions(self, text: str) -> Iterable[int]:
+        for literal in self._short:
+            if literal in text:
+                yield from self._positions[literal]
+
+        for trigram in self._trigram_set.intersection(self._trigrams(text)):
+            for literal in self._by_trigram[trigram]:
+                if literal in text:
+                    yield from self._positions[literal]
+
+
+# A condition of a rule: The event field (see _event_fields()), whether the
+# field has to be equal to one of the alternatives or has to contain one of them
+Condition = Tuple[str, bool, Tuple[str, ...]]
+
+_PATTERN_KEYS = ["match", "match_ok", "match_host", "match_application", "cancel_application"]
+
+
+def _alternatives(rule: Rule, keys: Sequence[str],
+                  choose: Callable[[List[str]], str]) -> Optional[Tuple[str, ...]]:
+    """Returns the literals of which one is contained in a text matched by the keys
+
+    The text is matched if any of the present keys matches, so every one of
+    them needs a literal."""
+    literals = []
+    for key in keys:
+        if key in rule:
+            candidates = required_literals(rule[key])
+            if not candidates:
+                return None
+            literals.append(choose(candidates))
+    return tuple(literals) or None
+
+
+def _longest(literals: List[str]) -> str:
+    return max(literals, key=len)
+
+
+def rule_conditions(rule: Rule, choose: Callable[[List[str]], str] = _longest) -> List[Condition]:
+    """Returns the conditions of a compiled rule, the most selective one first
+
+    Of the literals required by a pattern, the one picked by choose is used."""
+    if rule.get("invert_matching"):
+        return []
+
+    conditions: List[Condition] = []
+    host = rule.get("match_host")
+    if isinstance(host, str):
+        conditions.append(("host_name", True, (host,)))
+
+    # A rule without "match" matches all messages
+    if "match" in rule:
+        message = _alternatives(rule, ["match", "match_ok"], choose)
+        if message:
+            conditions.append(("text", False, message))
+
+    if host is not None and not isinstance(host, str):
+        host_literals = required_literals(host)
+        if host_literals:
+            conditions.append(("host", False, (choose(host_literals),)))
+
+    application = _alternatives(rule, ["match_application", "cancel_application"], choose)
+    if application:
+        conditions.append(("application", False, application))
+    return conditions
+
+
+def _event_fields(event: Dict[str, Any]) -> Dict[str, str]:
+    return {
+        "host_name": event["host"].lower(),
+        "host": fold(event["host"]),
+        "text": fold(event["text"]),
+        "application": fold(event["application"]),
+    }
+
+
+class RuleIndex:
+    """Determines the candidate rules of an event, in the order of the rules
+
+    Besides the conditions of the rules, the syslog facility and priority
+    buckets of the rule optimizer (EventServer._rule_hash) are respected."""
+    def __init__(self, rules: Sequence[Rule], rule_hash: Dict[int, Dict[int, List[Rule]]]) -> None:
+        super(RuleIndex, self).__init__()
+        self._rules = list(rules)
+        self._conditions: List[List[Condition]] = []
+        self._unconditional: List[int] = []
+        self._host_names: Dict[str, List[int]] = {}
+        literals: Dict[str, Dict[str, List[int]]] = {"text": {}, "host": {}, "application": {}}
+
+        # Literals shared by many rules make bad index keys: Prefer the rare ones
+        usage: Dict[str, int] = {}
+        for rule in self._rules:
+            for literal in {
+                    literal for key in _PATTERN_KEYS if key in rule
+                    for literal in required_literals(rule[key])
+            }:
+                usage[literal] = usage.get(literal, 0) + 1
+
+        def choose(candidates: List[str]) -> str:
+            return min(candidates, key=lambda literal: (len(literal) < 3, usage[literal]))
+
+        for position, rule in enumerate(self._rules):
+            conditions = rule_conditions(rule, choose)
+            self._conditions.append(conditions)
+            if not conditions:
+                self._unconditional.append(position)
+                continue
+
+            field, _exact, alternatives = conditions[0]
+            for alternative in alternatives:
+                if field == "host_name":
+                    self._host_names.setdefault(alternative, []).append(position)
+                else:
+                    literals[field].setdefault(alternative, []).append(position)
+
+        self._literal_indexes = {
+            field: _LiteralIndex(field_literals)
+            for field, field_literals in literals.items()
+            if field_literals
+        }
+
+        # Bit facility * 8 + priority is set when the rule is in that bucket
+        self._buckets = [0] * len(self._rules)
+        positions = {id(rule): position for position, rule in enumerate(self._rules)}
+        for facility, prio_hash in rule_hash.items():
+            for prio, bucket in prio_hash.items():
+                for rule in bucket:
+                    self._buckets[positions[id(rule)]] |= 1 << (facility * 8 + prio)
+
+    def candidates(self, event: Dict[str, Any]) -> List[Rule]:
+        try:
+            bit = 1 << (event["facility"] * 8 + event["priority"])
+        except ValueError:  # negative facility or priority
+            return []
+
+        fields = _event_fields(event)
+        positions: Set[int] = set(self._unconditional)
+        positions.update(self._host_names.get(fields["host_name"], ()))
+        for field, index in self._literal_indexes.items():
+            positions.update(index.positions(fields[field]))
+
+        return [
+            self._rules[position]
+            for position in sorted(positions)
+            if self._buckets[position] & bit and self._conditions_hold(position, fields)
+        ]
+
+    def _conditions_hold(self, position: int, fields: Dict[str, str]) -> bool:
+        for field, exact, alternatives in self._conditions[position]:
+            value = fields[field]
+            if exact:
+                if value not in alternatives:
+                    return False
+            elif not any(alternative in value for alternative in alternatives):
+                return False
+        return True
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright (C) 2019 tribe29 GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""Persistence of the event status of the event console
+
+The status file consists of a snapshot of the complete status and a journal
+of the changes made since then:
+
+    header:   magic, end of the snapshot
+    snapshot: the marshalled status (see EventStatus.pack_status())
+    journal:  records of (length, crc32, marshalled changes), one per save
+
+A record of changes contains the new and changed events (complete), the ids
+of the removed events and the small parts of the status (next event id, rule
+stats and interval starts). Saving appends a record, so its cost depends on
+the number of changes, not on the number of events. Once the journal is
+larger than the snapshot, a new snapshot is written instead.
+
+The snapshot is written to a new file which is then renamed, records are
+appended and synced. A record that is incomplete or broken because of a
+crash while it was written ends the journal: The status is recovered up to
+the previous save and the broken record is overwritten by the next one.
+
+Status files of former versions (a repr()'d status) are read as well and are
+replaced by a snapshot on the next save.
+"""
+
+import ast
+import gc
+import marshal
+import os
+import struct
+import zlib
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+MAGIC = b"CMKECS\x00\x01"
+_HEADER = struct.Struct(">8sQ")
+_RECORD = struct.Struct(">II")
+# Journals smaller than this never trigger a new snapshot
+_MIN_SNAPSHOT_SIZE = 1024 * 1024
+
+Status = Dict[str, Any]
+Event = Dict[str, Any]
+
+
+@contextmanager
+def gc_disabled() -> Iterator[None]:
+    """Creating the objects of many events triggers the garbage collector over and
+    over again, although none of them can be garbage"""
+    was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if was_enabled:
+            gc.enable()
+
+
+def _apply(events: Dict[int, Event], status: Status, changes: Dict[str, Any]) -> None:
+    for event_id in changes["removed"]:
+        events.pop(event_id, None)
+    for event in changes["updated"]:
+        events[event["id"]] = event
+    for key in ["next_event_id", "rule_stats", "interval_starts"]:
+        status[key] = changes[key]
+
+
+class StatusJournal:
+    """Reads and writes the status file, remembering where to append to it"""
+    def __init__(self, path: Path) -> None:
+        super(StatusJournal, self).__init__()
+        self.path = path
+        self._snapshot_size = 0
+        # The end of the last valid record, 0: a new snapshot has to be written
+        self._end = 0
+
+    def invalidate(self) -> None:
+        """The next save writes a new snapshot"""
+        self._end = 0
+
+    def needs_snapshot(self) -> bool:
+        return self._end == 0 or self._end - self._snapshot_size > max(
+            self._snapshot_size, _MIN_SNAPSHOT_SIZE)
+
+    def load(self) -> Optional[Status]:
+        """Returns the status recovered from snapshot and journal, None without status file"""
+        self.invalidate()
+        try:
+            raw = self.path.read_bytes()
+        except FileNotFoundError:
+            return None
+        if not raw.startswith(MAGIC):
+            # The status file of a former version
+            return ast.literal_eval(raw.decode("utf-8"))
+
+        _magic, snapshot_end = _HEADER.unpack_from(raw)
+        with gc_disabled():
+            status = marshal.loads(memoryview(raw)[_HEADER.size:snapshot_end])
+            events = {event["id"]: event for event in status["events"]}
+
+            offset = snapshot_end
+            while offset + _RECORD.size <= len(raw):
+                length, checksum = _RECORD.unpack_from(raw, offset)
+                start = offset + _RECORD.size
+                record = memoryview(raw)[start:start + length]
+                if len(record) < length or zlib.crc32(record) != checksum:
+                    break  # interrupted while writing the record
+                _apply(events, status, marshal.loads(record))
+                offset = start + length
+
+            status["events"] = list(events.values())
+        self._snapshot_size, self._end = snapshot_end, offset
+        return status
+
+    def write_snapshot(self, status: Status) -> int:
+        """Replaces the status file by a snapshot of the status, returns its size"""
+        snapshot = marshal.dumps(status)
+        path_new = self.path.parent / (self.path.name + '.new')
+        with path_new.open(mode="wb") as f:
+            f.write(_HEADER.pack(MAGIC, _HEADER.size + len(snapshot)))
+            f.write(snapshot)
+            f.flush()
+            os.fsync(f.fileno())
+        path_new.rename(self.path)
+        self._snapshot_size = self._end = _HEADER.size + len(snapshot)
+        return self._end
+
+    def append(self, updated: List[Event], removed: List[int], status: Status) -> int:
+        """Appends a record of the changes to the journal, returns its size
+
+        The record also contains the next event id, the rule stats and the
+        interval starts of the status."""
+        record = marshal.dumps({
+            "updated": updated,
+            "removed": removed,
+            "next_event_id": status["next_event_id"],
+            "rule_stats": status["rule_stats"],
+            "interval_starts": status["interval_starts"],
+        })
+        with self.path.open(mode="r+b") as f:
+            if os.fstat(f.fileno()).st_size < self._end:
+                raise OSError("The status file %s has been truncated" % self.path)
+            f.seek(self._end)
+            f.write(_RECORD.pack(len(record), zlib.crc32(record)) + record)
+            f.truncate()
+            f.flush()
+            os.fsync(f.fileno())
+        self._end += _RECORD.size + len(record)
+        return _RECORD.size + len(record)
+
+    def sizes(self) -> Tuple[int, int]:
+        """The size of the snapshot and of the journal"""
+        return self._snapshot_size, self._end - self._snapshot_size
@@ -7,6 +7,7 @@
 #
 # Protocol fetcher -> core: <header><payload>
 
+import atexit
 import enum
 import json
 import logging
@@ -27,8 +28,13 @@ from cmk.utils.exceptions import MKTimeout
 from cmk.snmplib.type_defs import AbstractRawData
 
 from . import FetcherType
+from .snmp_backend import close_sessions
 from .type_defs import Mode
 
+# The native SNMP backend keeps its sessions open from one host to the next.
+# Close them when the helper (or any other process fetching data) finishes.
+atexit.register(close_sessions)
+
 
 class CmcLogLevel(str, enum.Enum):
     CRITICAL = "critical"
@@ -9,7 +9,7 @@ import logging
 
 from cmk.snmplib.type_defs import ABCSNMPBackend, SNMPHostConfig
 
-from .snmp_backend import ClassicSNMPBackend, StoredWalkSNMPBackend
+from .snmp_backend import ClassicSNMPBackend, NativeSNMPBackend, StoredWalkSNMPBackend
 
 try:
     from .cee.snmp_backend import inline  # type: ignore[import]
@@ -40,6 +40,9 @@ def backend(snmp_config: SNMPHostConfig,
     if use_cache or snmp_config.is_usewalk_host:
         return StoredWalkSNMPBackend(snmp_config, logger)
 
+    if snmp_config.is_native_snmp_host:
+        return NativeSNMPBackend(snmp_config, logger)
+
     if snmp_config.is_inline_snmp_host:
         return inline.InlineSNMPBackend(snmp_config, logger)
 
@@ -8,7 +8,20 @@ import ast
 import logging
 from functools import partial
 from types import TracebackType
-from typing import Any, cast, Collection, Dict, Final, List, Mapping, Optional, Sequence, Tuple, Type
+from typing import (
+    Any,
+    cast,
+    Collection,
+    Dict,
+    Final,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+)
 
 from cmk.utils.type_defs import SectionName
 
@@ -22,6 +35,7 @@ from cmk.snmplib.type_defs import (
     SNMPTable,
     SNMPTree,
 )
+from cmk.snmplib.walk_cache import WalkCache
 
 from . import factory
 from ._base import ABCFetcher, ABCFileCache, verify_ipaddress
@@ -142,11 +156,25 @@ class SNMPFetcher(ABCFetcher[SNMPRawData]):
         """
         return mode not in (Mode.DISCOVERY, Mode.CHECKING)
 
+    def make_walk_plan(self, section_names: Iterable[SectionName]) -> snmp_table.SNMPWalkPlan:
+        return snmp_table.plan_snmp_walks(
+            ((section_name, self.snmp_section_trees[section_name])
+             for section_name in section_names),
+            self.use_snmpwalk_cache,
+            snmp_config=self.snmp_config,
+        )
+
     def _fetch_from_io(self, mode: Mode) -> SNMPRawData:
         selected_sections = (self._detect()
                              if mode is Mode.DISCOVERY else self.configured_snmp_sections)
 
         fetched_data: SNMPRawData = {}
+        # Sections sharing subtrees (e.g. the interface tables) walk them only once
+        walk_cache = WalkCache(self.snmp_config.hostname)
+        plan = self.make_walk_plan(selected_sections)
+        self._logger.debug("Walking %d subtrees for %d requested columns", len(plan.walks),
+                           plan.requested)
+        snmp_table.walk_planned(plan, backend=self._backend, walk_cache=walk_cache)
         for section_name in selected_sections:
             self._logger.debug("%s: Fetching data", section_name)
 
@@ -155,10 +183,12 @@ class SNMPFetcher(ABCFetcher[SNMPRawData]):
             # and fetches a separate snmp table.
             get_snmp = partial(snmp_table.get_snmp_table_cached
                                if self.use_snmpwalk_cache else snmp_table.get_snmp_table,
-                               backend=self._backend)
+                               backend=self._backend,
+                               walk_cache=walk_cache)
             # branch: List[SNMPTree]
             fetched_section_data: List[SNMPTable] = []
             for entry in oid_info:
                 fetched_section_data.append(get_snmp(section_name, entry))
             fetched_data[section_name] = fetched_section_data
+        walk_cache.save()
         return fetched_data
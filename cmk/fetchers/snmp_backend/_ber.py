@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright (C) 2019 tribe29 GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""Minimal BER codec for the SNMP messages of the native backend.
+
+Only the small subset of ASN.1 needed to encode GET, GETNEXT and GETBULK
+requests and to decode the corresponding responses and reports is implemented.
+"""
+
+from typing import Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from cmk.snmplib.type_defs import OID, SNMPRawValue
+
+__all__ = [
+    "BERError",
+    "PDU",
+    "VarBind",
+    "decode_pdu",
+    "decode_pdu_element",
+    "decode_sequence",
+    "decode_tlv",
+    "encode_integer",
+    "encode_octet_string",
+    "encode_oid",
+    "encode_pdu",
+    "encode_sequence",
+    "encode_tlv",
+    "oid_to_tuple",
+]
+
+# Universal
+TAG_INTEGER = 0x02
+TAG_OCTET_STRING = 0x04
+TAG_NULL = 0x05
+TAG_OID = 0x06
+TAG_SEQUENCE = 0x30
+# Application (RFC 2578)
+TAG_IP_ADDRESS = 0x40
+TAG_COUNTER32 = 0x41
+TAG_GAUGE32 = 0x42
+TAG_TIMETICKS = 0x43
+TAG_OPAQUE = 0x44
+TAG_NSAP_ADDRESS = 0x45
+TAG_COUNTER64 = 0x46
+TAG_UINTEGER32 = 0x47
+# Context specific exceptions (RFC 3416)
+TAG_NO_SUCH_OBJECT = 0x80
+TAG_NO_SUCH_INSTANCE = 0x81
+TAG_END_OF_MIB_VIEW = 0x82
+# PDUs
+PDU_GET = 0xa0
+PDU_GETNEXT = 0xa1
+PDU_RESPONSE = 0xa2
+PDU_GETBULK = 0xa5
+PDU_REPORT = 0xa8
+
+EXCEPTION_TAGS = frozenset((TAG_NO_SUCH_OBJECT, TAG_NO_SUCH_INSTANCE, TAG_END_OF_MIB_VIEW))
+
+# error-status of SNMPv1 agents at the end of the MIB
+ERROR_NO_SUCH_NAME = 2
+
+_UNSIGNED_TAGS = frozenset((
+    TAG_COUNTER32,
+    TAG_GAUGE32,
+    TAG_TIMETICKS,
+    TAG_COUNTER64,
+    TAG_UINTEGER32,
+))
+
+
+class BERError(ValueError):
+    pass
+
+
+class VarBind(NamedTuple):
+    oid: OID
+    tag: int
+    value: Optional[SNMPRawValue]
+
+    @property
+    def is_exception(self) -> bool:
+        return self.tag in EXCEPTION_TAGS
+
+
+class PDU(NamedTuple):
+    pdu_type: int
+    request_id: int
+    error_status: int
+    error_index: int
+    varbinds: List[VarBind]
+
+
+def _encode_length(length: int) -> bytes:
+    if length < 0x80:
+        return bytes((length,))
+    raw = length.to_bytes((length.bit_length() + 7) // 8, "big")
+    return bytes((0x80 | len(raw),)) + raw
+
+
+def encode_tlv(tag: int, payload: bytes) -> bytes:
+    return bytes((tag,)) + _encode_length(len(payload)) + payload
+
+
+def encode_integer(value: int) -> bytes:
+    length = (value.bit_length() + 8) // 8
+    return encode_tlv(TAG_INTEGER, value.to_bytes(length, "big", signed=True))
+
+
+def encode_octet_string(value: bytes) -> bytes:
+    return encode_tlv(TAG_OCTET_STRING, value)
+
+
+def encode_null() -> bytes:
+    return b"\x05\x00"
+
+
+def oid_to_tuple(oid: OID) -> Tuple[int, ...]:
+    try:
+        return tuple(int(p) for p in oid.strip(".").split("."))
+    except ValueError:
+        raise BERError("Invalid OID %r" % oid)
+
+
+def encode_oid(oid: OID) -> bytes:
+    parts = oid_to_tuple(oid)
+    if len(parts) < 2:
+        raise BERError("OID %r is too short" % oid)
+    encoded = bytearray()
+    for sub_id in (parts[0] * 40 + parts[1],) + parts[2:]:
+        chunk = [sub_id & 0x7f]
+        sub_id >>= 7
+        while sub_id:
+            chunk.append(0x80 | (sub_id & 0x7f))
+            sub_id >>= 7
+        encoded.extend(reversed(chunk))
+    return encode_tlv(TAG_OID, bytes(encoded))
+
+
+def encode_sequence(*items: bytes, tag: int = TAG_SEQUENCE) -> bytes:
+    return encode_tlv(tag, b"".join(items))
+
+
+def encode_pdu(
+    pdu_type: int,
+    request_id: int,
+    oids: Iterable[OID],
+    *,
+    error_status: int = 0,
+    error_index: int = 0,
+) -> bytes:
+    """Encode a request PDU, all values are NULL
+
+    For GETBULK requests error_status and error_index are the
+    non-repeaters and max-repetitions.
+    """
+    return encode_sequence(
+        encode_integer(request_id),
+        encode_integer(error_status),
+        encode_integer(error_index),
+        encode_sequence(*(encode_sequence(encode_oid(o), encode_null()) for o in oids)),
+        tag=pdu_type,
+    )
+
+
+def decode_tlv(data: bytes, offset: int = 0) -> Tuple[int, int, int]:
+    """Return tag, start and end of the value at the given offset"""
+    try:
+        tag = data[offset]
+        length = data[offset + 1]
+        start = offset + 2
+        if length & 0x80:
+            num_octets = length & 0x7f
+            length = int.from_bytes(data[start:start + num_octets], "big")
+            start += num_octets
+    except IndexError:
+        raise BERError("Truncated BER data")
+    end = start + length
+    if end > len(data):
+        raise BERError("Truncated BER data")
+    return tag, start, end
+
+
+def decode_sequence(data: bytes, start: int, end: int) -> List[Tuple[int, int, int]]:
+    """Return (tag, start, end) of all elements between start and end"""
+    elements = []
+    while start < end:
+        element = decode_tlv(data, start)
+        elements.append(element)
+        start = element[2]
+    return elements
+
+
+def decode_integer(data: bytes, start: int, end: int) -> int:
+    return int.from_bytes(data[start:end], "big", signed=True)
+
+
+def _decode_oid(data: bytes, start: int, end: int) -> OID:
+    if start == end:
+        return ""
+    sub_ids: List[int] = []
+    value = 0
+    for byte in data[start:end]:
+        value = (value << 7) | (byte & 0x7f)
+        if not byte & 0x80:
+            sub_ids.append(value)
+            value = 0
+    first = sub_ids[0]
+    if first < 40:
+        head: Sequence[int] = (0, first)
+    elif first < 80:
+        head = (1, first - 40)
+    else:
+        head = (2, first - 80)
+    return "." + ".".join(map(str, list(head) + sub_ids[1:]))
+
+
+def _decode_value(tag: int, data: bytes, start: int, end: int) -> Optional[SNMPRawValue]:
+    """Convert the value to the same representation the other backends use"""
+    if tag == TAG_OCTET_STRING or tag == TAG_OPAQUE:
+        return data[start:end]
+    if tag == TAG_INTEGER:
+        return str(decode_integer(data, start, end)).encode("ascii")
+    if tag in _UNSIGNED_TAGS:
+        return str(int.from_bytes(data[start:end], "big")).encode("ascii")
+    if tag == TAG_OID:
+        return _decode_oid(data, start, end).encode("ascii")
+    if tag == TAG_IP_ADDRESS:
+        return ".".join(str(b) for b in data[start:end]).encode("ascii")
+    if tag == TAG_NULL:
+        return b""
+    if tag in EXCEPTION_TAGS:
+        return None
+    # Unknown types (e.g. NsapAddress): hand over the raw bytes
+    return data[start:end]
+
+
+def decode_pdu(data: bytes, offset: int = 0) -> PDU:
+    return decode_pdu_element(data, *decode_tlv(data, offset))
+
+
+def decode_pdu_element(data: bytes, pdu_type: int, start: int, end: int) -> PDU:
+    """Decode a PDU already located by decode_tlv or decode_sequence"""
+    try:
+        (_t, rs, re), (_t, es, ee), (_t, is_, ie), (_t, vs, ve) = decode_sequence(data, start, end)
+    except ValueError:
+        raise BERError("Malformed PDU")
+
+    varbinds = []
+    for _t, bs, be in decode_sequence(data, vs, ve):
+        try:
+            (oid_tag, os_, oe), (value_tag, value_start, value_end) = decode_sequence(data, bs, be)
+        except ValueError:
+            raise BERError("Malformed variable binding")
+        if oid_tag != TAG_OID:
+            raise BERError("Malformed variable binding")
+        varbinds.append(
+            VarBind(
+                _decode_oid(data, os_, oe),
+                value_tag,
+                _decode_value(value_tag, data, value_start, value_end),
+            ))
+
+    return PDU(
+        pdu_type,
+        decode_integer(data, rs, re),
+        decode_integer(data, es, ee),
+        decode_integer(data, is_, ie),
+        varbinds,
+    )
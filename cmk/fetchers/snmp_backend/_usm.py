@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright (C) 2019 tribe29 GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""User-based security model (RFC 3414, RFC 3826, RFC 7860) for the native backend"""
+
+import hashlib
+import hmac
+import os
+import struct
+from typing import Callable, Dict, Optional, Tuple
+
+from Cryptodome.Cipher import AES, DES  # type: ignore[import]
+
+from cmk.utils.exceptions import MKGeneralException
+
+from cmk.snmplib.type_defs import SNMPCredentials
+
+__all__ = ["USMUser"]
+
+# hash function and length of the truncated HMAC, by the auth protocol names
+# used in the SNMP credentials.
+_AUTH_PROTOCOLS: Dict[str, Tuple[Callable, int]] = {
+    "md5": (hashlib.md5, 12),
+    "sha": (hashlib.sha1, 12),
+    "SHA-224": (hashlib.sha224, 16),
+    "SHA-256": (hashlib.sha256, 24),
+    "SHA-384": (hashlib.sha384, 32),
+    "SHA-512": (hashlib.sha512, 48),
+}
+
+_PRIV_PROTOCOLS = ("DES", "AES")
+
+_SECURITY_LEVELS = {
+    "noAuthNoPriv": (False, False),
+    "authNoPriv": (True, False),
+    "authPriv": (True, True),
+}
+
+
+def password_to_key(hash_function: Callable, password: bytes) -> bytes:
+    """Key derivation as specified in RFC 3414, A.2: Hash 1MB of the repeated password"""
+    if not password:
+        raise MKGeneralException("Empty SNMPv3 passwords are not allowed")
+    repeated = password * (64 // len(password) + 2)
+    digest = hash_function()
+    for index in range(0, 1048576, 64):
+        offset = index % len(password)
+        digest.update(repeated[offset:offset + 64])
+    return digest.digest()
+
+
+def localize_key(hash_function: Callable, key: bytes, engine_id: bytes) -> bytes:
+    return hash_function(key + engine_id + key).digest()
+
+
+class USMUser:
+    """The SNMPv3 security parameters of a host, derived from the SNMP credentials
+
+    The localized keys depend on the authoritative engine ID of the agent,
+    so they are computed (once) after the engine has been discovered.
+    """
+    def __init__(self, credentials: SNMPCredentials) -> None:
+        if not (isinstance(credentials, tuple) and len(credentials) in (2, 4, 6)):
+            raise MKGeneralException("Invalid SNMPv3 credentials %r" % (credentials,))
+
+        self.auth_protocol: Optional[str] = None
+        self._auth_password = b""
+        self.priv_protocol: Optional[str] = None
+        self._priv_password = b""
+        if len(credentials) == 2:
+            sec_level, user_name = credentials
+        elif len(credentials) == 4:
+            sec_level, self.auth_protocol, user_name, auth_password = credentials
+            self._auth_password = auth_password.encode("utf-8")
+        else:
+            (sec_level, self.auth_protocol, user_name, auth_password, self.priv_protocol,
+             priv_password) = credentials
+            self._auth_password = auth_password.encode("utf-8")
+            self._priv_password = priv_password.encode("utf-8")
+
+        try:
+            self.auth, self.priv = _SECURITY_LEVELS[sec_level]
+        except KeyError:
+            raise MKGeneralException("Invalid SNMPv3 security level: %s" % sec_level)
+        if self.auth and self.auth_protocol not in _AUTH_PROTOCOLS:
+            raise MKGeneralException("Invalid SNMP auth protocol: %s" % self.auth_protocol)
+        if self.priv and self.priv_protocol not in _PRIV_PROTOCOLS:
+            raise MKGeneralException("Invalid SNMP priv protocol: %s" % self.priv_protocol)
+
+        self.user_name = user_name.encode("utf-8")
+        self._localized_for: Optional[bytes] = None
+        self._auth_key = b""
+        self._priv_key = b""
+        self._salt = struct.unpack("!Q", os.urandom(8))[0]
+
+    @property
+    def flags(self) -> int:
+        # reportable | priv | auth
+        return 0x04 | (0x02 if self.priv else 0x00) | (0x01 if self.auth else 0x00)
+
+    @property
+    def auth_params_length(self) -> int:
+        if not self.auth:
+            return 0
+        return _AUTH_PROTOCOLS[str(self.auth_protocol)][1]
+
+    def localize(self, engine_id: bytes) -> None:
+        if not self.auth or self._localized_for == engine_id:
+            return
+        hash_function = _AUTH_PROTOCOLS[str(self.auth_protocol)][0]
+        self._auth_key = localize_key(hash_function,
+                                      password_to_key(hash_function, self._auth_password),
+                                      engine_id)
+        if self.priv:
+            self._priv_key = localize_key(hash_function,
+                                          password_to_key(hash_function, self._priv_password),
+                                          engine_id)
+        self._localized_for = engine_id
+
+    def sign(self, whole_message: bytes) -> bytes:
+        hash_function, length = _AUTH_PROTOCOLS[str(self.auth_protocol)]
+        return hmac.new(self._auth_key, whole_message, hash_function).digest()[:length]
+
+    def verify(self, whole_message: bytes, auth_params: bytes) -> bool:
+        return hmac.compare_digest(self.sign(whole_message), auth_params)
+
+    def _next_salt(self) -> int:
+        self._salt = (self._salt + 1) & 0xffffffffffffffff
+        return self._salt
+
+    def encrypt(self, data: bytes, engine_boots: int, engine_time: int) -> Tuple[bytes, bytes]:
+        """Return the encrypted scoped PDU and the privacy parameters"""
+        if self.priv_protocol == "DES":
+            salt = struct.pack("!II", engine_boots & 0xffffffff, self._next_salt() & 0xffffffff)
+            iv = bytes(a ^ b for a, b in zip(self._priv_key[8:16], salt))
+            padded = data + b"\x00" * ((8 - len(data) % 8) % 8)
+            return DES.new(self._priv_key[:8], DES.MODE_CBC, iv).encrypt(padded), salt
+
+        salt = struct.pack("!Q", self._next_salt())
+        iv = struct.pack("!II", engine_boots, engine_time) + salt
+        return AES.new(self._priv_key[:16], AES.MODE_CFB, iv, segment_size=128).encrypt(data), salt
+
+    def decrypt(self, data: bytes, priv_params: bytes, engine_boots: int,
+                engine_time: int) -> bytes:
+        if self.priv_protocol == "DES":
+            if len(data) % 8:
+                raise MKGeneralException("Invalid length of DES encrypted data")
+            iv = bytes(a ^ b for a, b in zip(self._priv_key[8:16], priv_params))
+            return DES.new(self._priv_key[:8], DES.MODE_CBC, iv).decrypt(data)
+
+        iv = struct.pack("!II", engine_boots, engine_time) + priv_params
+        return AES.new(self._priv_key[:16], AES.MODE_CFB, iv, segment_size=128).decrypt(data)
@@ -0,0 +1,558 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright (C) 2019 tribe29 GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""SNMP backend talking SNMP v1, v2c and v3 over UDP without external processes
+
+Unlike the ClassicSNMPBackend, which spawns one net-snmp command per request,
+this backend encodes the requests itself and keeps one connected UDP socket
+per host open for the lifetime of the process. Table walks use GETBULK where
+the host allows it, and several walks can be pipelined by `walk_many`.
+"""
+
+import collections
+import itertools
+import os
+import select
+import socket
+import time
+from typing import Dict, Iterable, List, NamedTuple, Optional, OrderedDict, Sequence, Set, Tuple
+
+from cmk.utils.exceptions import MKGeneralException, MKSNMPError
+from cmk.utils.log import console
+
+from cmk.snmplib.type_defs import (
+    ABCSNMPBackend,
+    OID,
+    SNMPContextName,
+    SNMPHostConfig,
+    SNMPRawValue,
+    SNMPRowInfo,
+)
+
+from . import _ber as ber
+from ._usm import USMUser
+
+__all__ = ["NativeSNMPBackend", "close_sessions"]
+
+# net-snmp defaults, used when the host has no "snmp_timing" rule
+_DEFAULT_TIMEOUT = 1.0
+_DEFAULT_RETRIES = 5
+
+_MAX_MESSAGE_SIZE = 65507
+_MAX_SESSIONS = 512
+
+# usmStats* report OIDs (RFC 3414)
+_USM_UNSUPPORTED_SEC_LEVELS = ".1.3.6.1.6.3.15.1.1.1.0"
+_USM_NOT_IN_TIME_WINDOWS = ".1.3.6.1.6.3.15.1.1.2.0"
+_USM_UNKNOWN_USER_NAMES = ".1.3.6.1.6.3.15.1.1.3.0"
+_USM_UNKNOWN_ENGINE_IDS = ".1.3.6.1.6.3.15.1.1.4.0"
+_USM_WRONG_DIGESTS = ".1.3.6.1.6.3.15.1.1.5.0"
+_USM_DECRYPTION_ERRORS = ".1.3.6.1.6.3.15.1.1.6.0"
+
+_USM_REPORT_ERRORS = {
+    _USM_UNSUPPORTED_SEC_LEVELS: "Unsupported security level",
+    _USM_UNKNOWN_USER_NAMES: "Unknown user name",
+    _USM_WRONG_DIGESTS: "Authentication failure (incorrect password, community or key)",
+    _USM_DECRYPTION_ERRORS: "Decryption error",
+}
+
+_request_ids = itertools.count(int.from_bytes(os.urandom(3), "big"))
+
+
+def _next_request_id() -> int:
+    return next(_request_ids) & 0x7fffffff
+
+
+class Request(NamedTuple):
+    pdu_type: int
+    oids: Sequence[OID]
+    non_repeaters: int = 0
+    max_repetitions: int = 0
+
+
+class SNMPSession:
+    """One connected UDP socket and the protocol state of one SNMP agent
+
+    Requests are pipelined: All requests handed over to `request` at once are
+    sent before waiting for the first answer. Answers are matched by their
+    request ID, so late answers to retransmitted requests are ignored.
+    """
+    def __init__(self, snmp_config: SNMPHostConfig) -> None:
+        self._address = snmp_config.ipaddress
+        self._port = snmp_config.port
+        self._timeout = float(snmp_config.timing.get("timeout", _DEFAULT_TIMEOUT))
+        self._retries = int(snmp_config.timing.get("retries", _DEFAULT_RETRIES))
+
+        self.version = _snmp_version(snmp_config)
+        self._community = b""
+        self._user: Optional[USMUser] = None
+        if self.version == 3:
+            self._user = USMUser(snmp_config.credentials)
+        else:
+            if not isinstance(snmp_config.credentials, str):
+                raise TypeError()
+            self._community = snmp_config.credentials.encode("utf-8")
+
+        # Authoritative engine of the agent (SNMPv3 only)
+        self._engine_id: Optional[bytes] = None
+        self._engine_boots = 0
+        self._engine_time = 0
+        self._engine_time_at = 0.0
+
+        self._socket = socket.socket(
+            socket.AF_INET6 if snmp_config.is_ipv6_primary else socket.AF_INET,
+            socket.SOCK_DGRAM,
+        )
+        self._socket.setblocking(False)
+        try:
+            self._socket.connect((self._address, self._port))
+        except socket.gaierror:
+            self._socket.close()
+            raise MKSNMPError("Unknown host (%s)" % self._address)
+        except OSError as exc:
+            self._socket.close()
+            raise MKSNMPError("SNMP Error on %s: %s" % (self._address, exc))
+
+    def close(self) -> None:
+        self._socket.close()
+
+    def fileno(self) -> int:
+        return self._socket.fileno()
+
+    def request(self,
+                requests: Sequence[Request],
+                context_name: Optional[SNMPContextName] = None) -> List[ber.PDU]:
+        if self._user is not None and self._engine_id is None:
+            self._discover_engine()
+
+        context = (context_name or "").encode("utf-8")
+        results: List[Optional[ber.PDU]] = [None] * len(requests)
+        pending: Dict[int, int] = {}
+        messages: Dict[int, bytes] = {}
+        for index, req in enumerate(requests):
+            request_id = _next_request_id()
+            pending[request_id] = index
+            messages[request_id] = self._encode(request_id, req, context)
+
+        for _attempt in range(self._retries + 1):
+            for request_id in pending:
+                self._send(messages[request_id])
+
+            deadline = time.monotonic() + self._timeout
+            while pending:
+                message_id, pdu = self._receive(deadline)
+                if message_id is None or pdu is None:
+                    break  # timed out, retransmit what is left
+                index_of_request = pending.pop(message_id, None)
+                if index_of_request is None:
+                    continue  # answer to an earlier transmission
+
+                if pdu.pdu_type == ber.PDU_REPORT:
+                    self._handle_report(pdu)
+                    # Re-encode with the updated engine parameters and send again
+                    request_id = _next_request_id()
+                    pending[request_id] = index_of_request
+                    messages[request_id] = self._encode(request_id, requests[index_of_request],
+                                                        context)
+                    self._send(messages[request_id])
+                    continue
+
+                results[index_of_request] = pdu
+
+            if not pending:
+                break
+
+        if pending:
+            raise MKSNMPError("Timeout: No Response from %s" % self._address)
+        return [r for r in results if r is not None]
+
+    def _send(self, message: bytes) -> None:
+        try:
+            self._socket.send(message)
+        except OSError as exc:
+            raise MKSNMPError("SNMP Error on %s: %s" % (self._address, exc))
+
+    def _receive(self, deadline: float) -> Tuple[Optional[int], Optional[ber.PDU]]:
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None, None
+            readable, _writable, _exceptional = select.select([self._socket], [], [], remaining)
+            if not readable:
+                return None, None
+            try:
+                data = self._socket.recv(_MAX_MESSAGE_SIZE)
+            except BlockingIOError:
+                continue
+            except OSError as exc:
+                # e.g. ICMP port unreachable on the connected socket
+                raise MKSNMPError("SNMP Error on %s: %s" % (self._address, exc))
+            try:
+                return self._decode(data)
+            except (ber.BERError, MKSNMPError) as exc:
+                console.vverbose("Dropping invalid SNMP message from %s: %s\n" %
+                                 (self._address, exc))
+
+    #
+    # Message encoding and decoding
+    #
+
+    def _encode(self, request_id: int, req: Request, context: bytes) -> bytes:
+        pdu = ber.encode_pdu(
+            req.pdu_type,
+            request_id,
+            req.oids,
+            error_status=req.non_repeaters,
+            error_index=req.max_repetitions,
+        )
+        if self._user is not None:
+            return self._encode_v3(request_id, pdu, context)
+        return ber.encode_sequence(
+            ber.encode_integer(self.version),
+            ber.encode_octet_string(self._community),
+            pdu,
+        )
+
+    def _decode(self, data: bytes) -> Tuple[int, ber.PDU]:
+        _tag, start, end = ber.decode_tlv(data)
+        elements = ber.decode_sequence(data, start, end)
+        if not elements or elements[0][0] != ber.TAG_INTEGER:
+            raise ber.BERError("Malformed SNMP message")
+        version = ber.decode_integer(data, elements[0][1], elements[0][2])
+        if version != self.version:
+            raise ber.BERError("Unexpected SNMP version %d" % version)
+        if self._user is not None:
+            return self._decode_v3(data, elements)
+        if len(elements) != 3:
+            raise ber.BERError("Malformed SNMP message")
+        pdu = ber.decode_pdu_element(data, *elements[2])
+        return pdu.request_id, pdu
+
+    #
+    # SNMP v3 (user-based security model)
+    #
+
+    def _current_engine_time(self) -> int:
+        return self._engine_time + int(time.monotonic() - self._engine_time_at)
+
+    def _discover_engine(self) -> None:
+        console.vverbose("Discovering SNMPv3 engine of %s\n" % self._address)
+        assert self._user is not None
+        request_id = _next_request_id()
+        message = self._encode_v3_message(
+            request_id,
+            ber.encode_sequence(
+                ber.encode_octet_string(b""),
+                ber.encode_octet_string(b""),
+                ber.encode_pdu(ber.PDU_GET, request_id, []),
+            ),
+            flags=0x04,
+            engine_id=b"",
+            user_name=b"",
+        )
+        for _attempt in range(self._retries + 1):
+            self._send(message)
+            deadline = time.monotonic() + self._timeout
+            while True:
+                message_id, _pdu = self._receive(deadline)
+                if message_id is None:
+                    break
+                if message_id == request_id and self._engine_id:
+                    self._user.localize(self._engine_id)
+                    return
+        raise MKSNMPError("Timeout: No Response from %s" % self._address)
+
+    def _encode_v3_message(
+        self,
+        message_id: int,
+        scoped_pdu: bytes,
+        *,
+        flags: int,
+        engine_id: bytes,
+        user_name: bytes,
+        auth_length: int = 0,
+        priv_params: bytes = b"",
+    ) -> bytes:
+        head = ber.encode_integer(3) + ber.encode_sequence(
+            ber.encode_integer(message_id),
+            ber.encode_integer(_MAX_MESSAGE_SIZE),
+            ber.encode_octet_string(bytes((flags,))),
+            ber.encode_integer(3),  # USM
+        )
+        security_head = (ber.encode_octet_string(engine_id) +
+                         ber.encode_integer(self._engine_boots) +
+                         ber.encode_integer(self._current_engine_time() if engine_id else 0) +
+                         ber.encode_octet_string(user_name))
+        security_tail = (ber.encode_octet_string(b"\x00" * auth_length) +
+                         ber.encode_octet_string(priv_params))
+        security = ber.encode_sequence(security_head, security_tail)
+        security_params = ber.encode_octet_string(security)
+        message = ber.encode_sequence(head, security_params, scoped_pdu)
+        if not auth_length or self._user is None:
+            return message
+
+        # The HMAC is computed over the whole message with zeroed auth params
+        # and then written in place of the zeros.
+        # The auth params are the first element of security_tail, which is
+        # directly followed by the scoped PDU.
+        offset = len(message) - len(scoped_pdu) - len(security_tail) + 2
+        return message[:offset] + self._user.sign(message) + message[offset + auth_length:]
+
+    def _encode_v3(self, message_id: int, pdu: bytes, context: bytes) -> bytes:
+        assert self._user is not None and self._engine_id is not None
+        scoped_pdu = ber.encode_sequence(
+            ber.encode_octet_string(self._engine_id),
+            ber.encode_octet_string(context),
+            pdu,
+        )
+        priv_params = b""
+        if self._user.priv:
+            encrypted, priv_params = self._user.encrypt(scoped_pdu, self._engine_boots,
+                                                        self._current_engine_time())
+            scoped_pdu = ber.encode_octet_string(encrypted)
+
+        return self._encode_v3_message(
+            message_id,
+            scoped_pdu,
+            flags=self._user.flags,
+            engine_id=self._engine_id,
+            user_name=self._user.user_name,
+            auth_length=self._user.auth_params_length,
+            priv_params=priv_params,
+        )
+
+    def _decode_v3(self, data: bytes, elements: List[Tuple[int, int, int]]) -> Tuple[int, ber.PDU]:
+        assert self._user is not None
+        if len(elements) != 4:
+            raise ber.BERError("Malformed SNMPv3 message")
+        (_t, gs, ge), (_t, ss, se), (data_tag, ds, de) = elements[1:]
+
+        message_id_elem, _max_size, flags_elem, _model = ber.decode_sequence(data, gs, ge)
+        message_id = ber.decode_integer(data, message_id_elem[1], message_id_elem[2])
+        flags = data[flags_elem[1]] if flags_elem[2] > flags_elem[1] else 0
+
+        _tag, us, ue = ber.decode_tlv(data, ss)
+        (engine_id_elem, boots_elem, time_elem, _user_elem, auth_elem,
+         priv_elem) = ber.decode_sequence(data, us, ue)
+        engine_id = data[engine_id_elem[1]:engine_id_elem[2]]
+        engine_boots = ber.decode_integer(data, boots_elem[1], boots_elem[2])
+        engine_time = ber.decode_integer(data, time_elem[1], time_elem[2])
+
+        if flags & 0x01:
+            auth_params = data[auth_elem[1]:auth_elem[2]]
+            zeroed = (data[:auth_elem[1]] + b"\x00" * len(auth_params) + data[auth_elem[2]:])
+            if not self._user.verify(zeroed, auth_params):
+                raise MKSNMPError("Authentication failure of SNMPv3 message")
+
+        if flags & 0x02:
+            if data_tag != ber.TAG_OCTET_STRING:
+                raise ber.BERError("Malformed encrypted PDU")
+            try:
+                scoped = self._user.decrypt(data[ds:de], data[priv_elem[1]:priv_elem[2]],
+                                            engine_boots, engine_time)
+            except (MKGeneralException, ValueError) as exc:
+                # e.g. invalid length of the data or of the privacy parameters
+                raise ber.BERError("Undecryptable PDU: %s" % exc)
+            _tag, ps, pe = ber.decode_tlv(scoped)
+        else:
+            scoped = data
+            ps, pe = ds, de
+
+        _ctx_engine, _ctx_name, pdu_elem = ber.decode_sequence(scoped, ps, pe)
+        pdu = ber.decode_pdu_element(scoped, *pdu_elem)
+
+        # Only authenticated messages may change the engine parameters, except
+        # during discovery and for the (unauthenticated) unknown engine ID report.
+        if engine_id and (flags & 0x01 or self._engine_id is None or
+                          (pdu.pdu_type == ber.PDU_REPORT and pdu.varbinds and
+                           pdu.varbinds[0].oid == _USM_UNKNOWN_ENGINE_IDS)):
+            self._engine_id = engine_id
+            self._engine_boots = engine_boots
+            self._engine_time = engine_time
+            self._engine_time_at = time.monotonic()
+
+        return message_id, pdu
+
+    def _handle_report(self, pdu: ber.PDU) -> None:
+        oid = pdu.varbinds[0].oid if pdu.varbinds else ""
+        if oid == _USM_NOT_IN_TIME_WINDOWS:
+            console.vverbose("SNMPv3 engine time of %s is out of sync, resending\n" % self._address)
+            return
+        if oid == _USM_UNKNOWN_ENGINE_IDS:
+            assert self._user is not None and self._engine_id is not None
+            self._user.localize(self._engine_id)
+            return
+        raise MKSNMPError("SNMP Error on %s: %s" %
+                          (self._address, _USM_REPORT_ERRORS.get(oid, "Report %s" % oid)))
+
+
+def _snmp_version(snmp_config: SNMPHostConfig) -> int:
+    """Return the value of the version field of the message (0: v1, 1: v2c, 3: v3)"""
+    if snmp_config.is_snmpv3_host:
+        return 3
+    if snmp_config.is_bulkwalk_host or snmp_config.is_snmpv2or3_without_bulkwalk_host:
+        return 1
+    return 0
+
+
+_sessions: OrderedDict[Tuple, SNMPSession] = collections.OrderedDict()
+
+
+def _session_key(snmp_config: SNMPHostConfig) -> Tuple:
+    return (
+        snmp_config.ipaddress,
+        snmp_config.port,
+        snmp_config.is_ipv6_primary,
+        snmp_config.credentials,
+        snmp_config.is_bulkwalk_host,
+        snmp_config.is_snmpv2or3_without_bulkwalk_host,
+        tuple(sorted(snmp_config.timing.items())),
+    )
+
+
+def _get_session(snmp_config: SNMPHostConfig) -> SNMPSession:
+    key = _session_key(snmp_config)
+    try:
+        _sessions.move_to_end(key)
+        return _sessions[key]
+    except KeyError:
+        pass
+
+    session = _sessions[key] = SNMPSession(snmp_config)
+    while len(_sessions) > _MAX_SESSIONS:
+        _key, oldest = _sessions.popitem(last=False)
+        oldest.close()
+    return session
+
+
+def close_sessions() -> None:
+    """Close the sockets of all hosts contacted by this process"""
+    while _sessions:
+        _key, session = _sessions.popitem()
+        session.close()
+
+
+class _Walk:
+    def __init__(self, oid: OID) -> None:
+        self.oid = "." + oid.strip(".")
+        self.prefix = self.oid + "."
+        self.next_oid = self.oid
+        self.rows: SNMPRowInfo = []
+        self.done = False
+        self._seen: Set[OID] = set()
+
+    def feed(self, pdu: ber.PDU, version: int, address: str) -> None:
+        if pdu.error_status:
+            if version == 0 and pdu.error_status == ber.ERROR_NO_SUCH_NAME:
+                self.done = True  # SNMPv1: end of MIB
+                return
+            raise MKSNMPError("SNMP Error on %s: error-status %d while walking %s" %
+                              (address, pdu.error_status, self.oid))
+
+        for varbind in pdu.varbinds:
+            if (varbind.is_exception or not varbind.oid.startswith(self.prefix) or
+                    varbind.oid in self._seen):
+                self.done = True
+                return
+            self._seen.add(varbind.oid)
+            self.rows.append((varbind.oid, varbind.value or b""))
+            self.next_oid = varbind.oid
+
+        if not pdu.varbinds:
+            self.done = True
+
+
+class NativeSNMPBackend(ABCSNMPBackend):
+    @property
+    def _session(self) -> SNMPSession:
+        return _get_session(self.config)
+
+    def get(self,
+            oid: OID,
+            context_name: Optional[SNMPContextName] = None) -> Optional[SNMPRawValue]:
+        if oid.endswith(".*"):
+            oid_prefix = oid[:-2]
+            pdu_type = ber.PDU_GETNEXT
+        else:
+            oid_prefix = oid
+            pdu_type = ber.PDU_GET
+
+        console.vverbose("Native SNMP %s of %s on %s\n" % (
+            "GETNEXT" if pdu_type == ber.PDU_GETNEXT else "GET",
+            oid_prefix,
+            self.config.ipaddress,
+        ))
+        try:
+            response = self._session.request([Request(pdu_type, [oid_prefix])], context_name)[0]
+        except MKSNMPError as exc:
+            console.verbose("SNMP error: %s\n" % exc)
+            return None
+
+        if response.error_status or not response.varbinds:
+            return None
+        varbind = response.varbinds[0]
+        console.vverbose("SNMP answer: ==> [%r]\n" % (varbind.value,))
+        if varbind.is_exception or varbind.value is None:
+            return None
+        # In case of .*, check if prefix is the one we are looking for
+        prefix = "." + oid_prefix.strip(".") + "."
+        if pdu_type == ber.PDU_GETNEXT and not varbind.oid.startswith(prefix):
+            return None
+        return varbind.value
+
+    def walk(self,
+             oid: OID,
+             check_plugin_name: Optional[str] = None,
+             table_base_oid: Optional[OID] = None,
+             context_name: Optional[SNMPContextName] = None) -> SNMPRowInfo:
+        return self.walk_many([oid], context_name=context_name)[0]
+
+    def walk_many(
+        self,
+        oids: Iterable[OID],
+        *,
+        context_name: Optional[SNMPContextName] = None,
+    ) -> List[SNMPRowInfo]:
+        """Walk several subtrees at once
+
+        Every round sends the next request of all unfinished walks in one
+        batch, so the round trip times of the walks overlap.
+        """
+        session = self._session
+        walks = [_Walk(oid) for oid in oids]
+        use_bulk = self.config.is_bulkwalk_host and session.version != 0
+        console.vverbose("Native SNMP %s of %s on %s\n" % (
+            "GETBULK walk" if use_bulk else "GETNEXT walk",
+            ", ".join(w.oid for w in walks),
+            self.config.ipaddress,
+        ))
+
+        active = walks
+        while active:
+            if use_bulk:
+                requests = [
+                    Request(ber.PDU_GETBULK, [w.next_oid],
+                            max_repetitions=self.config.bulk_walk_size_of) for w in active
+                ]
+            else:
+                requests = [Request(ber.PDU_GETNEXT, [w.next_oid]) for w in active]
+
+            for walk, response in zip(active, session.request(requests, context_name)):
+                walk.feed(response, session.version, self.config.ipaddress)
+            active = [w for w in active if not w.done]
+
+        # Like snmpwalk: Try a GET of the OID itself, if there was nothing below it.
+        empty = [w for w in walks if not w.rows]
+        if empty:
+            responses = session.request([Request(ber.PDU_GET, [w.oid]) for w in empty],
+                                        context_name)
+            for walk, response in zip(empty, responses):
+                if response.error_status:
+                    continue
+                walk.rows.extend((vb.oid, vb.value)
+                                 for vb in response.varbinds
+                                 if not vb.is_exception and vb.value is not None)
+
+        return [w.rows for w in walks]
@@ -9,8 +9,9 @@ import errno
 import os
 import copy
 import json
+import marshal
 from types import ModuleType
-from typing import Set, Any, AnyStr, Callable, Dict, List, Optional, Tuple, Union
+from typing import Set, Any, AnyStr, Callable, Dict, List, NamedTuple, Optional, Tuple, Union
 from pathlib import Path
 import time
 
@@ -161,44 +162,128 @@ def _load_config_file(path: str) -> None:
 
 
 # Load multisite.mk and all files in multisite.d/. This will happen
-# for *each* HTTP request.
-# FIXME: Optimize this to cache the config etc. until either the config files or plugins
-# have changed. We could make this being cached for multiple requests just like the
-# plugins of other modules. This may save significant time in case of small requests like
-# the graph ajax page or similar.
+# for *each* HTTP request. The loaded configuration is kept in a snapshot, which
+# is reused by the following requests as long as neither the configuration files
+# nor the config plugins have changed.
 def load_config() -> None:
+    global _config_snapshot
+
+    fingerprint = _config_fingerprint()
+    if (fingerprint is not None and _config_snapshot is not None and
+            _config_snapshot.fingerprint == fingerprint):
+        _restore_config_snapshot(_config_snapshot)
+    else:
+        # A configuration failing to load must not be reused by the next request
+        _config_snapshot = None
+        varnames = _load_config_files()
+        if fingerprint is not None:
+            _config_snapshot = _take_config_snapshot(fingerprint, varnames)
+
+    execute_post_config_load_hooks()
+
+
+def _load_config_files() -> Set[str]:
+    """Loads the configuration and returns the names of the variables it consists of"""
     global sites
 
     # Set default values for all user-changable configuration settings
     _initialize_with_default_config()
+    vars_before_config_files = all_nonfunction_vars(globals())
 
     # Initialze sites with default site configuration. Need to do it here to
     # override possibly deleted sites
     sites = default_single_site_configuration()
 
+    for path in _config_file_paths():
+        _load_config_file(path)
+
+    if sites:
+        sites = migrate_old_site_config(sites)
+    else:
+        sites = default_single_site_configuration()
+
+    _prepare_tag_config()
+
+    return set(default_config).union(["sites", "tags"],
+                                     all_nonfunction_vars(globals()) - vars_before_config_files)
+
+
+def _config_file_paths() -> List[str]:
     # First load main file
-    _load_config_file(cmk.utils.paths.default_config_dir + "/multisite.mk")
+    filelist = [cmk.utils.paths.default_config_dir + "/multisite.mk"]
 
     # Load also recursively all files below multisite.d
     conf_dir = cmk.utils.paths.default_config_dir + "/multisite.d"
-    filelist = []
+    conf_dir_filelist = []
     if os.path.isdir(conf_dir):
         for root, _directories, files in os.walk(conf_dir):
             for filename in files:
                 if filename.endswith(".mk"):
-                    filelist.append(root + "/" + filename)
+                    conf_dir_filelist.append(root + "/" + filename)
 
-    filelist.sort()
-    for p in filelist:
-        _load_config_file(p)
+    return filelist + sorted(conf_dir_filelist)
 
-    if sites:
-        sites = migrate_old_site_config(sites)
-    else:
-        sites = default_single_site_configuration()
 
-    _prepare_tag_config()
-    execute_post_config_load_hooks()
+# The paths, modification times (in ns), sizes and inodes of all configuration
+# files and legacy config plugins and the names of the config plugin modules
+_ConfigFingerprint = Tuple[Tuple[Tuple[str, int, int, int], ...], Tuple[str, ...]]
+
+
+class _ConfigSnapshot(NamedTuple):
+    fingerprint: _ConfigFingerprint
+    # Every request gets its own copy of the values, which it is free to modify: The
+    # plain data structures are kept marshalled, the other values are deep copied.
+    marshalled: Dict[str, bytes]
+    copied: Dict[str, Any]
+    # The tag config derived from the configuration is only replaced, never modified
+    tags: cmk.utils.tags.TagConfig
+
+
+_config_snapshot: Optional[_ConfigSnapshot] = None
+
+
+def _config_fingerprint() -> Optional[_ConfigFingerprint]:
+    """The fingerprint of the configuration, None if a file has changed too recently
+
+    See store.reliable_file_signature() for the files changed too recently."""
+    paths = _config_file_paths()
+    for plugins_path in [
+            Path(cmk.utils.paths.web_dir, "plugins", "config"),
+            cmk.utils.paths.local_web_dir / "plugins" / "config",
+    ]:
+        if plugins_path.exists():
+            paths += sorted(str(p) for p in plugins_path.iterdir())
+
+    signatures = []
+    for path in paths:
+        reliable, signature = store.reliable_file_signature(path)
+        if not reliable:
+            return None
+        if signature is not None:
+            signatures.append((path,) + signature)
+
+    return tuple(signatures), tuple(sorted(module.__name__ for module in _config_plugin_modules()))
+
+
+def _take_config_snapshot(fingerprint: _ConfigFingerprint, varnames: Set[str]) -> _ConfigSnapshot:
+    snapshot = _ConfigSnapshot(fingerprint, {}, {}, tags)
+    for varname in varnames - {"tags"}:
+        value = globals()[varname]
+        try:
+            snapshot.marshalled[varname] = marshal.dumps(value)
+        except ValueError:
+            snapshot.copied[varname] = copy.deepcopy(value)
+    return snapshot
+
+
+def _restore_config_snapshot(snapshot: _ConfigSnapshot) -> None:
+    global tags
+    config_vars = globals()
+    for varname, marshalled in snapshot.marshalled.items():
+        config_vars[varname] = marshal.loads(marshalled)
+    for varname, value in snapshot.copied.items():
+        config_vars[varname] = copy.deepcopy(value)
+    tags = snapshot.tags
 
 
 def _prepare_tag_config() -> None:
@@ -10,7 +10,7 @@
 from functools import partial
 import logging
 
-from typing import Any, TYPE_CHECKING
+from typing import Any, Iterator, TYPE_CHECKING, TypeVar
 
 from werkzeug.local import LocalProxy, LocalStack
 
@@ -23,6 +23,8 @@ if TYPE_CHECKING:
 
 _sentinel = object()
 
+T = TypeVar('T')
+
 
 class _AppCtxGlobals:
     def get(self, name, default=None):
@@ -135,6 +137,30 @@ class RequestContext:
         _request_ctx_stack.pop()
 
 
+def stream_with_context(iterator: Iterator[T]) -> Iterator[T]:
+    """Keeps the application and request context while iterating over a response body
+
+    A streamed response body is produced when the WSGI server sends the response,
+    which is after the request has been processed and the contexts have been left.
+    Like flask.stream_with_context, the contexts of the current request are
+    pushed again while the body is produced."""
+    app_context = _app_ctx_stack.top
+    request_context = _request_ctx_stack.top
+    if app_context is None or request_context is None:
+        raise RuntimeError("Working outside of request context.")
+
+    def generator() -> Iterator[T]:
+        _app_ctx_stack.push(app_context)
+        _request_ctx_stack.push(request_context)
+        try:
+            yield from iterator
+        finally:
+            _request_ctx_stack.pop()
+            _app_ctx_stack.pop()
+
+    return generator()
+
+
 # NOTE: Flask offers the proxies below, and we should go into that direction,
 # too. But currently our html class is a swiss army knife with tons of
 # responsibilities which we should really, really split up...
@@ -1282,6 +1282,9 @@ class html(ABCHTMLGenerator):
     def write_binary(self, data: bytes) -> None:
         self.output_funnel.write_binary(data)
 
+    def stream(self, producer: Iterator[None]) -> None:
+        self.output_funnel.stream(producer)
+
     @contextmanager
     def plugged(self) -> Iterator[None]:
         with self.output_funnel.plugged():
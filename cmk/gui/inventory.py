@@ -17,6 +17,7 @@ import dicttoxml  # type: ignore[import]
 
 import livestatus
 
+import cmk.utils.inventory_archive as inventory_archive
 import cmk.utils.paths
 from cmk.utils.structured_data import StructuredDataTree, Container, Numeration, Attributes
 from cmk.utils.exceptions import (
@@ -108,10 +109,13 @@ def load_filtered_inventory_tree(hostname: Optional[HostName]) -> Optional[Struc
     return _filter_tree(_load_inventory_tree(hostname))
 
 
-def load_filtered_and_merged_tree(row):
+def load_filtered_and_merged_tree(row, inventory_paths: Optional[List[str]] = None):
     """Load inventory tree from file, status data tree from row,
-    merge these trees and returns the filtered tree"""
-    inventory_tree = _load_inventory_tree(row.get("host_name"))
+    merge these trees and returns the filtered tree
+
+    With inventory_paths (like ".hardware.cpu.model" or ".software.packages:") only
+    the parts of the inventory tree needed for these paths are loaded."""
+    inventory_tree = _load_inventory_tree(row.get("host_name"), inventory_paths)
     status_data_tree = _create_tree_from_raw_tree(row.get("host_structured_status"))
 
     merged_tree = _merge_inventory_and_status_data_tree(inventory_tree, status_data_tree)
@@ -155,12 +159,18 @@ def get_history_deltas(hostname, search_timestamp=None):
 
     latest_timestamp = str(int(os.stat(inventory_path).st_mtime))
     inventory_archive_dir = "%s/inventory_archive/%s" % (cmk.utils.paths.var_dir, hostname)
+    if not os.path.isdir(inventory_archive_dir):
+        return [], []
     try:
-        archived_timestamps = sorted(os.listdir(inventory_archive_dir))
+        archived_timestamps, delta_timestamps = inventory_archive.get_archived_timestamps(hostname)
     except OSError:
         return [], []
 
-    all_timestamps = archived_timestamps + [latest_timestamp]
+    all_timestamps = [
+        str(timestamp) for timestamp in sorted(
+            set(archived_timestamps + delta_timestamps + [int(latest_timestamp)]))
+    ]
+    saved_deltas = {str(timestamp) for timestamp in delta_timestamps}
     previous_timestamp = None
 
     if not search_timestamp:
@@ -188,6 +198,8 @@ def get_history_deltas(hostname, search_timestamp=None):
                 return
             tree_lookup[timestamp] = inventory_tree
         else:
+            # Trees having a delta have not been archived, they are compared as empty
+            # trees in case a tree saved by a former version follows them
             inventory_archive_path = "%s/%s" % (inventory_archive_dir, timestamp)
             tree_lookup[timestamp] = _filter_tree(
                 StructuredDataTree().load_from(inventory_archive_path))
@@ -196,6 +208,23 @@ def get_history_deltas(hostname, search_timestamp=None):
     corrupted_history_files = []
     delta_history = []
     for _idx, timestamp in enumerate(required_timestamps):
+        if timestamp in saved_deltas:
+            # Saved along with the tree, see cmk.utils.inventory_archive
+            try:
+                delta = inventory_archive.load_delta(hostname, int(timestamp))
+            except (MKGeneralException, SyntaxError, ValueError):
+                corrupted_history_files.append(
+                    str(
+                        inventory_archive.delta_filepath(hostname, int(timestamp)).relative_to(
+                            cmk.utils.paths.omd_root)))
+                delta = None
+            if delta is not None:
+                new, changed, removed, delta_tree = _filter_delta(*delta)
+                if new or changed or removed:
+                    delta_history.append((timestamp, (new, changed, removed, delta_tree)))
+            previous_timestamp = timestamp
+            continue
+
         cached_delta_path = os.path.join(cmk.utils.paths.var_dir, "inventory_delta_cache", hostname,
                                          "%s_%s" % (previous_timestamp, timestamp))
 
@@ -270,26 +299,37 @@ class LoadStructuredDataError(MKException):
     pass
 
 
-def _load_inventory_tree(hostname: Optional[HostName]) -> Optional[StructuredDataTree]:
-    """Load data of a host, cache it in the current HTTP request"""
+def _load_inventory_tree(
+        hostname: Optional[HostName],
+        inventory_paths: Optional[List[str]] = None) -> Optional[StructuredDataTree]:
+    """Load data of a host, cache it in the current HTTP request
+
+    With inventory_paths only the subtrees needed for these paths are loaded."""
     if not hostname:
         return None
 
     inventory_tree_cache = g.setdefault("inventory", {})
-    if hostname in inventory_tree_cache:
+    cache_key = hostname if inventory_paths is None else (hostname, tuple(inventory_paths))
+    if cache_key in inventory_tree_cache:
+        inventory_tree = inventory_tree_cache[cache_key]
+    elif inventory_paths is not None and hostname in inventory_tree_cache:
+        # The complete tree has already been loaded
         inventory_tree = inventory_tree_cache[hostname]
     else:
         if '/' in hostname:
             # just for security reasons
             return None
         cache_path = "%s/inventory/%s" % (cmk.utils.paths.var_dir, hostname)
+        tree_paths = None if inventory_paths is None else [
+            parse_tree_path(inventory_path)[0] for inventory_path in inventory_paths
+        ]
         try:
-            inventory_tree = StructuredDataTree().load_from(cache_path)
+            inventory_tree = StructuredDataTree().load_from(cache_path, tree_paths)
         except Exception as e:
             if config.debug:
                 html.show_warning("%s" % e)
             raise LoadStructuredDataError()
-        inventory_tree_cache[hostname] = inventory_tree
+        inventory_tree_cache[cache_key] = inventory_tree
     return inventory_tree
 
 
@@ -318,6 +358,17 @@ def _filter_tree(struct_tree: Optional[StructuredDataTree]) -> Optional[Structur
     return struct_tree.get_filtered_tree(_get_permitted_inventory_paths())
 
 
+def _filter_delta(
+        delta: inventory_archive.Delta,
+        compared_numerations: inventory_archive.ComparedNumerations) -> inventory_archive.Delta:
+    permitted_paths = _get_permitted_inventory_paths()
+    if permitted_paths is None:
+        return delta
+    delta_tree = delta[3].get_filtered_tree(permitted_paths)
+    new, changed, removed = inventory_archive.count_delta_entries(delta_tree, compared_numerations)
+    return new, changed, removed, delta_tree
+
+
 def _get_permitted_inventory_paths():
     """
     Returns either a list of permitted paths or
@@ -14,7 +14,7 @@ import datetime as dt
 import operator
 import re
 import time
-from typing import Any, Callable, Dict, Generator, List, Literal, Optional, Tuple, Union
+from typing import Any, Callable, Dict, Generator, Iterator, List, Literal, Optional, Tuple, Union
 
 # TODO: Make livestatus.py a well tested package on pypi
 # TODO: Move this code to the livestatus package
@@ -396,6 +396,9 @@ program_start num_hosts num_services'
     def query(self, query, headers='') -> Response:
         return self._lookup_next_query(query, headers)
 
+    def query_iter(self, query, headers='') -> Iterator[List[Any]]:
+        return iter(self._lookup_next_query(query, headers))
+
     def query_parallel(self, query, headers) -> Response:
         return self._lookup_next_query(query, headers)
 
@@ -12,7 +12,7 @@ from cmk.gui.plugins.views import (
     DataSourceLivestatus,
     RowTable,
     RowTableLivestatus,
-    query_livestatus,
+    iter_livestatus,
 )
 
 
@@ -483,10 +483,10 @@ class ServiceDiscoveryRowTable(RowTable):
 
         columns = [c for c in columns if c not in view.datasource.add_columns]
         query = self.prepare_lql(columns, headers)
-        data = query_livestatus(query, only_sites, limit, "read")
-
         columns = ["site"] + columns
-        service_rows = [dict(zip(columns, row)) for row in data]
+        service_rows = [
+            dict(zip(columns, row)) for row in iter_livestatus(query, only_sites, limit, "read")
+        ]
 
         rows = []
         for row in service_rows:
@@ -54,6 +54,11 @@ from cmk.gui.permissions import (
 
 
 class RowTableEC(RowTableLivestatus):
+    @property
+    def supports_paging(self) -> bool:
+        # Events of not permitted hosts are dropped after the query
+        return False
+
     def query(self, view, columns, headers, only_sites, limit, all_active_filters):
         for c in ["event_contact_groups", "host_contact_groups", "event_host"]:
             if c not in columns:
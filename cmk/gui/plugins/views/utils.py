@@ -8,12 +8,14 @@
 # TODO: More feature related splitting up would be better
 
 import abc
+import itertools
+import logging
 import time
 import re
 import hashlib
 from pathlib import Path
 import traceback
-from typing import Callable, NamedTuple, Hashable, TYPE_CHECKING, Any, Set, Tuple, List, Optional, Union, Dict, Type, cast
+from typing import Callable, NamedTuple, Hashable, TYPE_CHECKING, Any, Set, Tuple, List, Optional, Union, Dict, Type, cast, Iterable, Iterator
 
 from six import ensure_str
 
@@ -403,10 +405,14 @@ class ViewLayoutRegistry(cmk.utils.plugin_registry.Registry[Type[Layout]]):
 
 layout_registry = ViewLayoutRegistry()
 
-Exporter = NamedTuple("Exporter", [
-    ("name", str),
-    ("handler", Callable[["View", Rows], None]),
-])
+
+class Exporter(NamedTuple):
+    name: str
+    handler: Callable[["View", Rows], None]
+    # The handler writes the rows one after another with html.stream() and accepts
+    # any iterable of rows. The rows of views may then be exported while they are
+    # received from livestatus.
+    streams_rows: bool = False
 
 
 class ViewExporterRegistry(cmk.utils.plugin_registry.Registry[Exporter]):
@@ -674,6 +680,23 @@ class RowTable(metaclass=abc.ABCMeta):
               limit: Optional[int], all_active_filters: 'List[Filter]') -> Rows:
         raise NotImplementedError()
 
+    @property
+    def supports_paging(self) -> bool:
+        """Whether query() returns one row per livestatus row, in the order of livestatus
+
+        Only then OrderBy: and Offset: headers may be added to the headers of
+        query(), which is needed for sorting and paging the view by livestatus."""
+        return False
+
+    def query_chunks(self, view: 'View', columns: List[ColumnName], headers: str,
+                     only_sites: OnlySites, limit: Optional[int],
+                     all_active_filters: 'List[Filter]') -> Iterator[Rows]:
+        """Like query(), but the rows are yielded in chunks
+
+        Only tables supporting paging yield the rows while they are received from
+        livestatus, the others yield all rows in one chunk."""
+        yield self.query(view, columns, headers, only_sites, limit, all_active_filters)
+
 
 class RowTableLivestatus(RowTable):
     def __init__(self, table_name: str) -> None:
@@ -684,6 +707,10 @@ class RowTableLivestatus(RowTable):
     def table_name(self) -> str:
         return self._table_name
 
+    @property
+    def supports_paging(self) -> bool:
+        return True
+
     @staticmethod
     def _prepare_columns(columns: List[ColumnName],
                          view: 'View') -> Tuple[List[ColumnName], Dict[int, List[ColumnName]]]:
@@ -741,8 +768,7 @@ class RowTableLivestatus(RowTable):
         datasource = view.datasource
 
         columns, dynamic_columns = self._prepare_columns(columns, view)
-        query = self.prepare_lql(columns, headers + datasource.add_headers)
-        data = query_livestatus(query, only_sites, limit, datasource.auth_domain)
+        data: Iterable[LivestatusRow] = self._iter_data(view, columns, headers, only_sites, limit)
 
         if datasource.merge_by:
             data = _merge_data(data, columns)
@@ -758,10 +784,56 @@ class RowTableLivestatus(RowTable):
 
         return rows
 
+    def query_chunks(self,
+                     view: 'View',
+                     columns: List[ColumnName],
+                     headers: str,
+                     only_sites: OnlySites,
+                     limit: Optional[int],
+                     all_active_filters: 'List[Filter]',
+                     chunk_size: int = 1000) -> Iterator[Rows]:
+        """Like query(), but the rows are yielded in chunks while they are received
+
+        The post processing of the datasource and the painters is done for every
+        chunk. Rows of different sites can not be merged."""
+        datasource = view.datasource
+        if datasource.merge_by:
+            yield self.query(view, columns, headers, only_sites, limit, all_active_filters)
+            return
+
+        columns, dynamic_columns = self._prepare_columns(columns, view)
+        data = self._iter_data(view, columns, headers, only_sites, limit)
+
+        columns = ["site"] + columns + datasource.add_columns
+        while True:
+            chunk = list(itertools.islice(data, chunk_size))
+            if not chunk:
+                return
+
+            rows: Rows = datasource.post_process([dict(zip(columns, row)) for row in chunk])
+            for index, cell in enumerate(view.row_cells):
+                painter = cell.painter()
+                painter.derive(rows, cell, dynamic_columns.get(index))
+            yield rows
+
+    def _iter_data(self, view: 'View', columns: List[ColumnName], headers: str,
+                   only_sites: OnlySites, limit: Optional[int]) -> Iterator[LivestatusRow]:
+        datasource = view.datasource
+        query = self.prepare_lql(columns, headers + datasource.add_headers)
+        return iter_livestatus(query, only_sites, limit, datasource.auth_domain)
+
 
 def query_livestatus(query: LivestatusQuery, only_sites: OnlySites, limit: Optional[int],
                      auth_domain: str) -> List[LivestatusRow]:
+    return list(iter_livestatus(query, only_sites, limit, auth_domain))
+
 
+def iter_livestatus(query: LivestatusQuery, only_sites: OnlySites, limit: Optional[int],
+                    auth_domain: str) -> Iterator[LivestatusRow]:
+    """Like query_livestatus(), but the rows are yielded while they are received
+
+    Until the iteration has ended, the connections to the sites are busy: Other
+    livestatus queries raise a RuntimeError."""
     if all((
             config.debug_livestatus_queries,
             html.output_format == "html",
@@ -772,12 +844,20 @@ def query_livestatus(query: LivestatusQuery, only_sites: OnlySites, limit: Optio
         html.close_div()
 
     sites.live().set_auth_domain(auth_domain)
-    with sites.only_sites(only_sites), sites.prepend_site(), sites.set_limit(limit):
-        data = sites.live().query(query)
+    try:
+        with sites.only_sites(only_sites), sites.prepend_site(), sites.set_limit(limit):
+            yield from sites.live().query_iter(query)
+    finally:
+        sites.live().set_auth_domain("read")
+        _log_query_stats()
 
-    sites.live().set_auth_domain("read")
 
-    return data
+def _log_query_stats() -> None:
+    if not logger.isEnabledFor(logging.DEBUG):
+        return
+    for site_id, stats in sorted(sites.live().query_stats().items()):
+        logger.debug("Livestatus response of site %s: latency %s, duration %s, %d bytes, %d rows",
+                     site_id, stats.latency, stats.duration, stats.bytes_received, stats.rows)
 
 
 # TODO: Return value of render() could be cleaned up e.g. to a named tuple with an
@@ -894,6 +974,11 @@ class Painter(metaclass=abc.ABCMeta):
         """Whether or not to load the HW/SW inventory for this column"""
         return False
 
+    @property
+    def inventory_paths(self) -> Optional[List[str]]:
+        """The paths of the HW/SW inventory needed by this column, None: The whole tree"""
+        return None
+
 
 class PainterRegistry(cmk.utils.plugin_registry.Registry[Type[Painter]]):
     def plugin_name(self, instance: Type[Painter]) -> str:
@@ -921,6 +1006,7 @@ def register_painter(ident: str, spec: Dict[str, Any]) -> None:
             "printable": property(lambda s: s._spec.get("printable", True)),
             "sorter": property(lambda s: s._spec.get("sorter", None)),
             "load_inv": property(lambda s: s._spec.get("load_inv", False)),
+            "inventory_paths": property(lambda s: s._spec.get("inventory_paths")),
         })
     painter_registry.register(cls)
 
@@ -963,12 +1049,26 @@ class Sorter(metaclass=abc.ABCMeta):
         """Optional list of arguments for the cmp function"""
         return None
 
+    @property
+    def livestatus_order_by(self) -> Optional[List[Tuple[ColumnName, bool]]]:
+        """The livestatus columns and directions (descending?) sorting like cmp()
+
+        Views with sorters that can be expressed with OrderBy: headers are sorted
+        and paged by livestatus. Strings are ordered case-insensitively there,
+        numbers by their value. None: cmp() can not be expressed this way."""
+        return None
+
     # TODO: Cleanup this hack
     @property
     def load_inv(self) -> bool:
         """Whether or not to load the HW/SW inventory for this column"""
         return False
 
+    @property
+    def inventory_paths(self) -> Optional[List[str]]:
+        """The paths of the HW/SW inventory needed by this column, None: The whole tree"""
+        return None
+
 
 class DerivedColumnsSorter(Sorter):
     @abc.abstractmethod
@@ -995,6 +1095,8 @@ def register_sorter(ident: str, spec: Dict[str, Any]) -> None:
             "title": property(lambda s: s._spec["title"]),
             "columns": property(lambda s: s._spec["columns"]),
             "load_inv": property(lambda s: s._spec.get("load_inv", False)),
+            "inventory_paths": property(lambda s: s._spec.get("inventory_paths")),
+            "livestatus_order_by": property(lambda s: s._spec.get("livestatus_order_by")),
             "cmp": spec["cmp"],
         })
     sorter_registry.register(cls)
@@ -1183,18 +1285,25 @@ def paint_nagiosflag(row: Row, field: ColumnName, bold_if_nonzero: bool) -> Cell
             _("yes") if nonzero else _("no"))
 
 
-def declare_simple_sorter(name: str, title: str, column: ColumnName, func: SorterFunction) -> None:
-    register_sorter(name, {
-        "title": title,
-        "columns": [column],
-        "cmp": lambda self, r1, r2: func(column, r1, r2)
-    })
+def declare_simple_sorter(name: str,
+                          title: str,
+                          column: ColumnName,
+                          func: SorterFunction,
+                          livestatus_sortable: bool = False) -> None:
+    register_sorter(
+        name, {
+            "title": title,
+            "columns": [column],
+            "cmp": lambda self, r1, r2: func(column, r1, r2),
+            "livestatus_order_by": _livestatus_order_by(livestatus_sortable, column, False),
+        })
 
 
 def declare_1to1_sorter(painter_name: PainterName,
                         func: SorterFunction,
                         col_num: int = 0,
-                        reverse: bool = False) -> PainterName:
+                        reverse: bool = False,
+                        livestatus_sortable: bool = False) -> PainterName:
     painter = painter_registry[painter_name]()
 
     if not reverse:
@@ -1202,14 +1311,27 @@ def declare_1to1_sorter(painter_name: PainterName,
     else:
         cmp_func = lambda self, r1, r2: func(painter.columns[col_num], r2, r1)
 
-    register_sorter(painter_name, {
-        "title": painter.title,
-        "columns": painter.columns,
-        "cmp": cmp_func,
-    })
+    register_sorter(
+        painter_name, {
+            "title": painter.title,
+            "columns": painter.columns,
+            "cmp": cmp_func,
+            "livestatus_order_by": _livestatus_order_by(livestatus_sortable,
+                                                        painter.columns[col_num], reverse),
+        })
     return painter_name
 
 
+def _livestatus_order_by(livestatus_sortable: bool, column: ColumnName,
+                         descending: bool) -> Optional[List[Tuple[ColumnName, bool]]]:
+    # Only set for sorters comparing an int, float, time or string column of a
+    # livestatus table with cmp_simple_number() or cmp_simple_string(). Livestatus
+    # can not sort by other columns, e.g. lists like the custom variable names.
+    if livestatus_sortable:
+        return [(column, descending)]
+    return None
+
+
 def cmp_simple_number(column: ColumnName, r1: Row, r2: Row) -> int:
     v1 = r1[column]
     v2 = r2[column]
@@ -1293,7 +1415,7 @@ def get_perfdata_nth_value(row: Row, n: int, remove_unit: bool = False) -> str:
         return str(e)
 
 
-def _merge_data(data: List[LivestatusRow], columns: List[ColumnName]) -> List[LivestatusRow]:
+def _merge_data(data: Iterable[LivestatusRow], columns: List[ColumnName]) -> List[LivestatusRow]:
     """Merge all data rows with different sites but the same value in merge_column
 
     We require that all column names are prefixed with the tablename. The column with the merge key
@@ -1759,7 +1881,7 @@ class Cell:
                 params.append(('display_options', display_options.title_options))
 
             classes += ["sort"]
-            onclick = "location.href=\'%s\'" % html.makeuri(params, 'sort')
+            onclick = "location.href=\'%s\'" % html.makeuri(params, 'sort', delvars=["page"])
             title = _('Sort by %s') % self.title()
 
         if is_last_column_header:
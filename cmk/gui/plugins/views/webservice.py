@@ -6,14 +6,14 @@
 
 import json
 import time
-from typing import TYPE_CHECKING
+from typing import Iterable, Iterator, TYPE_CHECKING
 
 from six import ensure_str
 
 import cmk.gui.escaping as escaping
 from cmk.gui.globals import html
 from cmk.gui.htmllib import HTML
-from cmk.gui.type_defs import Rows
+from cmk.gui.type_defs import Row
 from cmk.gui.plugins.views import (
     exporter_registry,
     Exporter,
@@ -25,17 +25,34 @@ if TYPE_CHECKING:
     from cmk.gui.views import View
 
 
-def _export_python_raw(view: "View", rows: Rows) -> None:
-    html.write(repr(rows))
+def _export_python_raw(view: "View", rows: Iterable[Row]) -> None:
+    html.stream(_python_raw_rows(rows))
 
 
-exporter_registry.register(Exporter(
-    name="python-raw",
-    handler=_export_python_raw,
-))
+def _python_raw_rows(rows: Iterable[Row]) -> Iterator[None]:
+    # Same as repr() of the list of rows
+    html.write_text("[")
+    for index, row in enumerate(rows):
+        if index:
+            html.write(", ")
+        html.write(repr(row))
+        yield
+    html.write_text("]")
+
+
+exporter_registry.register(
+    Exporter(
+        name="python-raw",
+        handler=_export_python_raw,
+        streams_rows=True,
+    ))
+
 
+def _export_python(view: "View", rows: Iterable[Row]) -> None:
+    html.stream(_python_rows(view, rows))
 
-def _export_python(view: "View", rows: Rows) -> None:
+
+def _python_rows(view: "View", rows: Iterable[Row]) -> Iterator[None]:
     html.write_text("[\n")
     html.write(repr([cell.export_title() for cell in view.row_cells]))
     html.write_text(",\n")
@@ -54,22 +71,23 @@ def _export_python(view: "View", rows: Rows) -> None:
             html.write(repr(content))
             html.write_text(",")
         html.write_text("],")
+        yield
     html.write_text("\n]\n")
 
 
 exporter_registry.register(Exporter(
     name="python",
     handler=_export_python,
+    streams_rows=True,
 ))
 
 
-def _show_json(view: "View", rows: Rows) -> None:
-    painted_rows = []
-
+def _json_rows(view: "View", rows: Iterable[Row]) -> Iterator[None]:
     header_row = []
     for cell in view.row_cells:
         header_row.append(escaping.strip_tags(cell.export_title()))
-    painted_rows.append(header_row)
+    html.write_text("[\n")
+    _write_json_row(header_row)
 
     for row in rows:
         painted_row = []
@@ -86,50 +104,68 @@ def _show_json(view: "View", rows: Rows) -> None:
 
             painted_row.append(content)
 
-        painted_rows.append(painted_row)
+        html.write_text(",\n")
+        _write_json_row(painted_row)
+        yield
+
+    html.write_text("\n]")
 
-    html.write(json.dumps(painted_rows, indent=True))
 
+def _write_json_row(painted_row: list) -> None:
+    # Same as the rows in json.dumps() of the list of all rows with indent=True
+    html.write(" " + json.dumps(painted_row, indent=True).replace("\n", "\n "))
 
-def _export_json(view: "View", rows: Rows) -> None:
-    _show_json(view, rows)
+
+def _export_json(view: "View", rows: Iterable[Row]) -> None:
+    html.stream(_json_rows(view, rows))
 
 
 exporter_registry.register(Exporter(
     name="json",
     handler=_export_json,
+    streams_rows=True,
 ))
 
 
-def _export_json_export(view: "View", rows: Rows) -> None:
+def _export_json_export(view: "View", rows: Iterable[Row]) -> None:
     filename = '%s-%s.json' % (view.name,
                                time.strftime('%Y-%m-%d_%H-%M-%S', time.localtime(time.time())))
     html.response.headers["Content-Disposition"] = "Attachment; filename=\"%s\"" % ensure_str(
         filename)
 
-    _show_json(view, rows)
+    html.stream(_json_rows(view, rows))
 
 
-exporter_registry.register(Exporter(
-    name="json_export",
-    handler=_export_json_export,
-))
+exporter_registry.register(
+    Exporter(
+        name="json_export",
+        handler=_export_json_export,
+        streams_rows=True,
+    ))
 
 
-def _export_jsonp(view: "View", rows: Rows) -> None:
+def _export_jsonp(view: "View", rows: Iterable[Row]) -> None:
     html.write("%s(\n" % html.request.var('jsonp', 'myfunction'))
-    _show_json(view, rows)
+    html.stream(_jsonp_rows(view, rows))
+
+
+def _jsonp_rows(view: "View", rows: Iterable[Row]) -> Iterator[None]:
+    yield from _json_rows(view, rows)
     html.write_text(");\n")
 
 
 exporter_registry.register(Exporter(
     name="jsonp",
     handler=_export_jsonp,
+    streams_rows=True,
 ))
 
 
 class CSVRenderer:
-    def show(self, view: "View", rows: Rows) -> None:
+    def show(self, view: "View", rows: Iterable[Row]) -> None:
+        html.stream(self._rows(view, rows))
+
+    def _rows(self, view: "View", rows: Iterable[Row]) -> Iterator[None]:
         csv_separator = html.request.get_str_input_mandatory("csv_separator", ";")
         first = True
         for cell in view.group_cells + view.row_cells:
@@ -151,6 +187,7 @@ class CSVRenderer:
                 joined_row = join_row(row, cell)
                 content = cell.render_for_export(joined_row)
                 html.write('"%s"' % self._format_for_csv(content))
+            yield
 
     def _format_for_csv(self, raw_data):
         # raw_data can also be int, float, dict (labels)
@@ -160,22 +197,25 @@ class CSVRenderer:
         return escaping.strip_tags(str(raw_data)).replace('\n', '').replace('"', '""')
 
 
-def _export_csv_export(view: "View", rows: Rows) -> None:
+def _export_csv_export(view: "View", rows: Iterable[Row]) -> None:
     output_csv_headers(view.spec)
     CSVRenderer().show(view, rows)
 
 
-exporter_registry.register(Exporter(
-    name="csv_export",
-    handler=_export_csv_export,
-))
+exporter_registry.register(
+    Exporter(
+        name="csv_export",
+        handler=_export_csv_export,
+        streams_rows=True,
+    ))
 
 
-def _export_csv(view: "View", rows: Rows) -> None:
+def _export_csv(view: "View", rows: Iterable[Row]) -> None:
     CSVRenderer().show(view, rows)
 
 
 exporter_registry.register(Exporter(
     name="csv",
     handler=_export_csv,
+    streams_rows=True,
 ))
@@ -1746,6 +1746,9 @@ class FilterAggrServiceUsed(FilterTristate):
     def filter(self, infoname):
         return ""
 
+    def need_filter_table(self) -> bool:
+        return self.tristate_value() != -1
+
     def filter_table(self, rows):
         current = self.tristate_value()
         if current == -1:
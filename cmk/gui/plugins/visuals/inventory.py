@@ -361,6 +361,12 @@ class FilterInvText(Filter):
     def need_inventory(self) -> bool:
         return bool(self.filtertext)
 
+    def need_filter_table(self) -> bool:
+        return self.need_inventory()
+
+    def inventory_paths(self) -> Optional[List[str]]:
+        return [self._invpath]
+
     def display(self) -> None:
         htmlvar = self.htmlvars[0]
         value = html.request.var(htmlvar)
@@ -433,6 +439,12 @@ class FilterInvFloat(Filter):
     def need_inventory(self) -> bool:
         return any(self.filter_configs())
 
+    def need_filter_table(self) -> bool:
+        return self.need_inventory()
+
+    def inventory_paths(self) -> Optional[List[str]]:
+        return [self._invpath]
+
     def filter_table(self, rows: Rows) -> Rows:
         lower, upper = self.filter_configs()
         if not any((lower, upper)):
@@ -457,6 +469,12 @@ class FilterInvBool(FilterTristate):
     def need_inventory(self) -> bool:
         return self.tristate_value() != -1
 
+    def need_filter_table(self) -> bool:
+        return self.need_inventory()
+
+    def inventory_paths(self) -> Optional[List[str]]:
+        return [self._invpath]
+
     def filter(self, infoname):
         return ""  # No Livestatus filtering right now
 
@@ -486,6 +504,9 @@ class FilterHasInv(FilterTristate):
     def need_inventory(self) -> bool:
         return self.tristate_value() != -1
 
+    def need_filter_table(self) -> bool:
+        return self.need_inventory()
+
     def filter(self, infoname):
         return ""  # No Livestatus filtering right now
 
@@ -522,6 +543,12 @@ class FilterInvHasSoftwarePackage(Filter):
     def need_inventory(self) -> bool:
         return bool(self.filtername)
 
+    def need_filter_table(self) -> bool:
+        return self.need_inventory()
+
+    def inventory_paths(self) -> Optional[List[str]]:
+        return [".software.packages:"]
+
     def display(self) -> None:
         html.text_input(self._varprefix + "name")
         html.br()
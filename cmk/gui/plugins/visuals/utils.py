@@ -263,6 +263,10 @@ class Filter(metaclass=abc.ABCMeta):
         """Whether this filter needs to load host inventory data"""
         return False
 
+    def inventory_paths(self) -> Optional[List[str]]:
+        """The paths of the host inventory data needed by this filter, None: The whole tree"""
+        return None
+
     def validate_value(self, value: Dict) -> None:
         return
 
@@ -270,6 +274,13 @@ class Filter(metaclass=abc.ABCMeta):
         """post-Livestatus filtering (e.g. for BI aggregations)"""
         return rows
 
+    def need_filter_table(self) -> bool:
+        """Whether filter_table() may drop rows with the current filter settings
+
+        Views can only be sorted and paged by livestatus when no rows are
+        dropped after the query."""
+        return type(self).filter_table is not Filter.filter_table
+
     def variable_settings(self, row: dict) -> HTTPVariables:
         """return pairs of htmlvar and name according to dataset in row"""
         return []
@@ -2382,6 +2382,29 @@ class ConfigVariableDelayPrecompile(ConfigVariable):
         )
 
 
+@config_variable_registry.register
+class ConfigVariableCoreConfigProcesses(ConfigVariable):
+    def group(self):
+        return ConfigVariableGroupCheckExecution
+
+    def domain(self):
+        return ConfigDomainCore
+
+    def ident(self):
+        return "core_config_processes"
+
+    def valuespec(self):
+        return Integer(
+            title=_("Processes creating the core configuration"),
+            label=_("processes"),
+            help=_("The number of processes creating the host and service definitions and "
+                   "precompiling the host checks when activating the configuration. Use 0 for "
+                   "one process per CPU. Running several processes reduces the time needed for "
+                   "the activation of large configurations, but needs more memory."),
+            minvalue=0,
+        )
+
+
 @config_variable_registry.register
 class ConfigVariableClusterMaxCachefileAge(ConfigVariable):
     def group(self):
@@ -4433,6 +4456,24 @@ rulespec_registry.register(
     ))
 
 
+def _help_native_snmp_hosts():
+    return _("By default Checkmk uses Inline SNMP or, if that is not available, the SNMP "
+             "command line tools of Net-SNMP, which start one process per request. Hosts "
+             "configured with this ruleset are queried by the native SNMP implementation "
+             "of Checkmk instead. It sends the requests itself, reuses one UDP socket per "
+             "host and walks tables with GETBULK requests if bulk walk is enabled for the "
+             "host. This rule takes precedence over the Inline SNMP setting.")
+
+
+rulespec_registry.register(
+    BinaryHostRulespec(
+        group=RulespecGroupAgentSNMP,
+        help_func=_help_native_snmp_hosts,
+        name="native_snmp_hosts",
+        title=lambda: _("Hosts using the native SNMP implementation"),
+    ))
+
+
 def _help_usewalk_hosts():
     return _("This ruleset helps in test and development. You can create stored SNMP walks on "
              "the command line with cmk --snmpwalk HOSTNAME. A host that is configured with "
@@ -24,6 +24,10 @@ import cmk.gui.config as config
 from cmk.gui.globals import g, request
 from cmk.gui.config import LoggedInUser
 
+# A site which has not completed its response to a query within this many
+# connect timeouts is marked as dead, like a site not accepting the connection.
+_QUERY_TIMEOUT_FACTOR = 10
+
 #   .--API-----------------------------------------------------------------.
 #   |                             _    ____ ___                            |
 #   |                            / \  |  _ \_ _|                           |
@@ -184,9 +188,14 @@ def _site_config_for_livestatus(site_id: SiteId, site: SiteConfiguration) -> Sit
     special things to do:
     a) Tell livestatus not to strip away the cache header
     b) Connect in plain text to the sites local proxy unix socket
+
+    The deadline of the queries is derived from the connect timeout of the site.
     """
     copied_site: SiteConfiguration = site.copy()
 
+    if site.get("timeout"):
+        copied_site["query_timeout"] = _QUERY_TIMEOUT_FACTOR * site["timeout"]
+
     if copied_site["proxy"] is not None:
         copied_site["cache"] = site["proxy"].get("cache", True)
 
@@ -6,7 +6,7 @@
 
 # TODO: Rework connection management and multiplexing
 
-from typing import cast, Union, Any, Callable, Dict, List, Optional, Tuple, Literal
+from typing import cast, Union, Any, Callable, Dict, List, NamedTuple, Optional, Tuple, Literal
 import time
 import os
 import traceback
@@ -250,9 +250,8 @@ def _load_user(user_id: UserId) -> UserSpec:
     """
     user = load_cached_profile(user_id)
     if user is None:
-        # No cached profile present. Load all users to get the users data
-        user = load_users(lock=False).get(user_id, {})
-        assert user is not None  # help mypy
+        # No cached profile present. Look the user up in the user database
+        user = load_user(user_id) or {}
     return user
 
 
@@ -568,135 +567,54 @@ def load_users(lock: bool = False) -> Users:
     if 'users' in g:
         return g.users
 
-    # First load monitoring contacts from Checkmk's world. If this is
-    # the first time, then the file will be empty, which is no problem.
-    # Execfile will the simply leave contacts = {} unchanged.
-    contacts = store.load_from_mk_file(filename, "contacts", {})
-
-    # Now load information about users from the GUI config world
-    filename = _multisite_dir() + "users.mk"
-    users = store.load_from_mk_file(_multisite_dir() + "users.mk", "multisite_users", {})
-
-    # Merge them together. Monitoring users not known to Multisite
-    # will be added later as normal users.
-    result = {}
-    for uid, user in users.items():
-        # Transform user IDs which were stored with a wrong type
-        uid = ensure_str(uid)
+    database = _load_user_database()
+    result: Users = store.MARSHAL_CODEC.loads(database.users)
+    for uid in database.htpasswd_only_users:
+        result[uid]["roles"] = config.roles_of_user(uid)
 
-        profile = contacts.get(uid, {})
-        profile.update(user)
-        result[uid] = profile
-
-        # Convert non unicode mail addresses
-        if "email" in profile:
-            profile["email"] = ensure_str(profile["email"])
-
-    # This loop is only neccessary if someone has edited
-    # contacts.mk manually. But we want to support that as
-    # far as possible.
-    for uid, contact in contacts.items():
-        # Transform user IDs which were stored with a wrong type
-        uid = ensure_str(uid)
+    # Now read the user specific files
+    directory = cmk.utils.paths.var_dir + "/web/"
+    user_dirs = [ensure_str(d) for d in os.listdir(directory) if d[0] != '.']
+    for uid in user_dirs:
+        _add_user_dir_attributes(result, uid, _load_user_dir_attributes(uid))
 
-        if uid not in result:
-            result[uid] = contact
-            result[uid]["roles"] = ["user"]
-            result[uid]["locked"] = True
-            result[uid]["password"] = ""
+    # Forget about the directories of removed users
+    for uid in set(_user_dir_attributes_cache).difference(user_dirs):
+        del _user_dir_attributes_cache[uid]
 
-    # Passwords are read directly from the apache htpasswd-file.
-    # That way heroes of the command line will still be able to
-    # change passwords with htpasswd. Users *only* appearing
-    # in htpasswd will also be loaded and assigned to the role
-    # they are getting according to the multisite old-style
-    # configuration variables.
+    # populate the users cache
+    g.users = result
 
-    def readlines(f):
-        try:
-            return Path(f).open(encoding="utf-8")
-        except IOError:
-            return []
+    return result
 
-    # FIXME TODO: Consolidate with htpasswd user connector
-    filename = cmk.utils.paths.htpasswd_file
-    for line in readlines(filename):
-        line = line.strip()
-        if ':' in line:
-            uid, password = line.strip().split(":")[:2]
-            uid = ensure_str(uid)
-            if password.startswith("!"):
-                locked = True
-                password = password[1:]
-            else:
-                locked = False
-            if uid in result:
-                result[uid]["password"] = password
-                result[uid]["locked"] = locked
-            else:
-                # Create entry if this is an admin user
-                new_user = {
-                    "roles": config.roles_of_user(uid),
-                    "password": password,
-                    "locked": False,
-                }
-                result[uid] = new_user
-            # Make sure that the user has an alias
-            result[uid].setdefault("alias", uid)
-        # Other unknown entries will silently be dropped. Sorry...
 
-    # Now read the serials, only process for existing users
-    serials_file = '%s/auth.serials' % os.path.dirname(cmk.utils.paths.htpasswd_file)
-    for line in readlines(serials_file):
-        line = line.strip()
-        if ':' in line:
-            user_id, serial = line.split(':')[:2]
-            user_id = ensure_str(user_id)
-            if user_id in result:
-                result[user_id]['serial'] = utils.saveint(serial)
+def load_user(user_id: UserId) -> Optional[UserSpec]:
+    """Returns the profile of a single user as found in load_users() or None if there is none"""
+    if 'users' in g:
+        return g.users.get(user_id)
 
-    # Now read the user specific files
-    directory = cmk.utils.paths.var_dir + "/web/"
-    for d in os.listdir(directory):
-        if d[0] != '.':
-            uid = ensure_str(d)
+    database = _load_user_database()
+    profile = database.profiles.get(user_id)
+    users: Users = {} if profile is None else {user_id: store.MARSHAL_CODEC.loads(profile)}
+    if user_id in database.htpasswd_only_users:
+        users[user_id]["roles"] = config.roles_of_user(user_id)
+    _add_user_dir_attributes(users, user_id, _load_user_dir_attributes(user_id))
+    return users.get(user_id)
 
-            # read special values from own files
-            if uid in result:
-                for attr, conv_func in [
-                    ('num_failed_logins', utils.saveint),
-                    ('last_pw_change', utils.saveint),
-                    ('last_seen', utils.savefloat),
-                    ('enforce_pw_change', lambda x: bool(utils.saveint(x))),
-                    ('idle_timeout', _convert_idle_timeout),
-                    ('session_id', _convert_session_info),
-                ]:
-                    val = load_custom_attr(uid, attr, conv_func)
-                    if val is not None:
-                        result[uid][attr] = val
-
-            # read automation secrets and add them to existing
-            # users or create new users automatically
-            try:
-                user_secret_path = Path(directory) / d / "automation.secret"
-                with user_secret_path.open(encoding="utf-8") as f:
-                    secret: Optional[str] = ensure_str(f.read().strip())
-            except IOError:
-                secret = None
-
-            if secret:
-                if uid in result:
-                    result[uid]["automation_secret"] = secret
-                else:
-                    result[uid] = {
-                        "roles": ["guest"],
-                        "automation_secret": secret,
-                    }
 
-    # populate the users cache
-    g.users = result
+def load_users_of_contactgroup(group: ContactgroupName) -> Users:
+    """Returns the profiles of the members of the contact group as found in load_users()"""
+    if 'users' in g:
+        return {
+            uid: user for uid, user in g.users.items() if group in user.get("contactgroups", [])
+        }
 
-    return result
+    users = {}
+    for uid in _load_user_database().contactgroup_members.get(group, []):
+        user = load_user(uid)
+        if user is not None:
+            users[uid] = user
+    return users
 
 
 def custom_attr_path(userid: UserId, key: str) -> str:
@@ -996,6 +914,249 @@ def _convert_idle_timeout(value: str) -> Union[int, bool, None]:
         return None  # Invalid value -> use global setting
 
 
+#.
+#   .-User database--------------------------------------------------------.
+#   |   _   _                     _       _        _                       |
+#   |  | | | |___  ___ _ __    __| | __ _| |_ __ _| |__   __ _ ___  ___    |
+#   |  | | | / __|/ _ \ '__|  / _` |/ _` | __/ _` | '_ \ / _` / __|/ _ \   |
+#   |  | |_| \__ \  __/ |    | (_| | (_| | || (_| | |_) | (_| \__ \  __/   |
+#   |   \___/|___/\___|_|     \__,_|\__,_|\__\__,_|_.__/ \__,_|___/\___|   |
+#   |                                                                      |
+#   +----------------------------------------------------------------------+
+#   | The users merged from contacts.mk, users.mk, htpasswd and            |
+#   | auth.serials are kept indexed in memory and in a cache file as long  |
+#   | as these files are unchanged. The files in the directory of a user   |
+#   | are kept as long as the directory is unchanged.                      |
+#   '----------------------------------------------------------------------'
+
+# The signature of a file, None if it is missing
+_SourceSignature = Optional[store.FileSignature]
+
+
+class _UserDatabase(NamedTuple):
+    fingerprint: Tuple[Tuple[str, _SourceSignature], ...]
+    # The marshalled users and (for the lookup of single users) the marshalled profiles
+    users: bytes
+    profiles: Dict[UserId, bytes]
+    # The users only known from htpasswd get the roles of the configuration
+    htpasswd_only_users: List[UserId]
+    contactgroup_members: Dict[ContactgroupName, List[UserId]]
+
+
+_user_database: Optional[_UserDatabase] = None
+
+# The attributes read from the files in the directory of a user and its automation
+# secret, by user ID along with the signature of the directory
+_UserDirAttributes = Tuple[Dict[str, Any], Optional[str]]
+_user_dir_attributes_cache: Dict[UserId, Tuple[_SourceSignature, _UserDirAttributes]] = {}
+
+
+def _user_database_cache_path() -> Path:
+    return Path(cmk.utils.paths.tmp_dir, "users.cache")
+
+
+def _load_user_database() -> _UserDatabase:
+    global _user_database
+
+    paths = [
+        _root_dir() + "contacts.mk",
+        _multisite_dir() + "users.mk",
+        cmk.utils.paths.htpasswd_file,
+        '%s/auth.serials' % os.path.dirname(cmk.utils.paths.htpasswd_file),
+    ]
+    signatures = [store.reliable_file_signature(path) for path in paths]
+    fingerprint = tuple(
+        (path, signature) for path, (_reliable, signature) in zip(paths, signatures))
+    reliable = all(reliable for reliable, _signature in signatures)
+
+    if reliable and _user_database is not None and _user_database.fingerprint == fingerprint:
+        return _user_database
+
+    cache_path = _user_database_cache_path()
+    try:
+        cached = store.load_object_from_file(cache_path, default=None) if reliable else None
+    except (ValueError, EOFError):
+        cached = None  # Treat a corrupted cache file like a missing one
+
+    if cached is not None and cached[0] == fingerprint:
+        users, htpasswd_only_users = cached[1], cached[2]
+    else:
+        users, htpasswd_only_users = _merge_user_sources()
+        if reliable:
+            store.makedirs(cache_path.parent)
+            store.save_object_to_file(cache_path, (fingerprint, users, htpasswd_only_users),
+                                      codec=store.MARSHAL_CODEC)
+
+    contactgroup_members: Dict[ContactgroupName, List[UserId]] = {}
+    for uid, user in users.items():
+        for group in user.get("contactgroups", []):
+            contactgroup_members.setdefault(group, []).append(uid)
+
+    database = _UserDatabase(
+        fingerprint,
+        store.MARSHAL_CODEC.dumps(users),
+        {uid: store.MARSHAL_CODEC.dumps(user) for uid, user in users.items()},
+        htpasswd_only_users,
+        contactgroup_members,
+    )
+    _user_database = database if reliable else None
+    return database
+
+
+def _merge_user_sources() -> Tuple[Users, List[UserId]]:
+    """Merges the users of contacts.mk, users.mk, htpasswd and auth.serials
+
+    Also returns the users only known from htpasswd, which need to get the roles
+    of the configuration."""
+    # First load monitoring contacts from Checkmk's world. If this is
+    # the first time, then the file will be empty, which is no problem.
+    # Execfile will the simply leave contacts = {} unchanged.
+    contacts = store.load_from_mk_file(_root_dir() + "contacts.mk", "contacts", {})
+
+    # Now load information about users from the GUI config world
+    users = store.load_from_mk_file(_multisite_dir() + "users.mk", "multisite_users", {})
+
+    # Merge them together. Monitoring users not known to Multisite
+    # will be added later as normal users.
+    result = {}
+    for uid, user in users.items():
+        # Transform user IDs which were stored with a wrong type
+        uid = ensure_str(uid)
+
+        profile = contacts.get(uid, {})
+        profile.update(user)
+        result[uid] = profile
+
+        # Convert non unicode mail addresses
+        if "email" in profile:
+            profile["email"] = ensure_str(profile["email"])
+
+    # This loop is only neccessary if someone has edited
+    # contacts.mk manually. But we want to support that as
+    # far as possible.
+    for uid, contact in contacts.items():
+        # Transform user IDs which were stored with a wrong type
+        uid = ensure_str(uid)
+
+        if uid not in result:
+            result[uid] = contact
+            result[uid]["roles"] = ["user"]
+            result[uid]["locked"] = True
+            result[uid]["password"] = ""
+
+    # Passwords are read directly from the apache htpasswd-file.
+    # That way heroes of the command line will still be able to
+    # change passwords with htpasswd. Users *only* appearing
+    # in htpasswd will also be loaded and assigned to the role
+    # they are getting according to the multisite old-style
+    # configuration variables.
+    htpasswd_only_users = []
+
+    # FIXME TODO: Consolidate with htpasswd user connector
+    filename = cmk.utils.paths.htpasswd_file
+    for line in _readlines(filename):
+        line = line.strip()
+        if ':' in line:
+            uid, password = line.strip().split(":")[:2]
+            uid = ensure_str(uid)
+            if password.startswith("!"):
+                locked = True
+                password = password[1:]
+            else:
+                locked = False
+            if uid in result:
+                result[uid]["password"] = password
+                result[uid]["locked"] = locked
+            else:
+                # Create entry if this is an admin user
+                new_user = {
+                    "password": password,
+                    "locked": False,
+                }
+                result[uid] = new_user
+                htpasswd_only_users.append(uid)
+            # Make sure that the user has an alias
+            result[uid].setdefault("alias", uid)
+        # Other unknown entries will silently be dropped. Sorry...
+
+    # Now read the serials, only process for existing users
+    serials_file = '%s/auth.serials' % os.path.dirname(cmk.utils.paths.htpasswd_file)
+    for line in _readlines(serials_file):
+        line = line.strip()
+        if ':' in line:
+            user_id, serial = line.split(':')[:2]
+            user_id = ensure_str(user_id)
+            if user_id in result:
+                result[user_id]['serial'] = utils.saveint(serial)
+
+    return result, htpasswd_only_users
+
+
+def _readlines(f):
+    try:
+        return Path(f).open(encoding="utf-8")
+    except IOError:
+        return []
+
+
+def _load_user_dir_attributes(uid: UserId) -> _UserDirAttributes:
+    """Reads the special values and the automation secret from the directory of the user
+
+    The files in the directory are always replaced, which changes the
+    modification time of the directory."""
+    user_dir = cmk.utils.paths.var_dir + "/web/" + uid
+    reliable, signature = store.reliable_file_signature(user_dir)
+    cached = _user_dir_attributes_cache.get(uid)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+
+    attributes = {}
+    for attr, conv_func in [
+        ('num_failed_logins', utils.saveint),
+        ('last_pw_change', utils.saveint),
+        ('last_seen', utils.savefloat),
+        ('enforce_pw_change', lambda x: bool(utils.saveint(x))),
+        ('idle_timeout', _convert_idle_timeout),
+        ('session_id', _convert_session_info),
+    ]:
+        val = load_custom_attr(uid, attr, conv_func)
+        if val is not None:
+            attributes[attr] = val
+
+    try:
+        user_secret_path = Path(user_dir) / "automation.secret"
+        with user_secret_path.open(encoding="utf-8") as f:
+            secret: Optional[str] = ensure_str(f.read().strip())
+    except IOError:
+        secret = None
+
+    if reliable:
+        _user_dir_attributes_cache[uid] = (signature, (attributes, secret))
+    else:
+        _user_dir_attributes_cache.pop(uid, None)
+    return attributes, secret
+
+
+def _add_user_dir_attributes(users: Users, uid: UserId,
+                             user_dir_attributes: _UserDirAttributes) -> None:
+    attributes, secret = user_dir_attributes
+
+    # read special values from own files
+    if uid in users:
+        users[uid].update(attributes)
+
+    # read automation secrets and add them to existing
+    # users or create new users automatically
+    if secret:
+        if uid in users:
+            users[uid]["automation_secret"] = secret
+        else:
+            users[uid] = {
+                "roles": ["guest"],
+                "automation_secret": secret,
+            }
+
+
 #.
 #   .-Custom-Attrs.--------------------------------------------------------.
 #   |   ____          _                          _   _   _                 |
@@ -4,6 +4,7 @@
 # This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
 # conditions defined in the file COPYING, which is part of this source code package.
 
+import itertools
 from contextlib import contextmanager
 from typing import Iterator, Union, List
 from six import ensure_binary
@@ -11,6 +12,8 @@ from six import ensure_binary
 from cmk.gui.http import Response
 from cmk.gui.i18n import _
 from cmk.gui.exceptions import MKGeneralException
+from cmk.gui.globals import stream_with_context
+from cmk.gui.log import logger
 from cmk.gui.utils.html import HTML
 
 # TODO: Almost HTMLContent, only None is missing, but that would be OK, too...
@@ -58,6 +61,47 @@ class OutputFunnel:
     def _lowlevel_write(self, text: bytes) -> None:
         self._response.stream.write(text)
 
+    def stream(self, producer: Iterator[None], chunk_size: int = 64 * 1024) -> None:
+        """Sends the output of the producer while it is produced
+
+        The producer is a generator which writes with write() and yields whenever
+        the output written so far may be sent, e.g. after every row. It is run while
+        the WSGI server sends the response and only about chunk_size bytes of its
+        output are held in memory. This has to be the last output of the page.
+
+        The response has already been started when the producer fails. The error is
+        logged and an error message is appended to the output sent so far."""
+        if self._is_plugged():
+            # The output is collected by the plug anyway
+            for _step in producer:
+                pass
+            return
+
+        self._response.response = itertools.chain(
+            self._response.response, stream_with_context(self._chunks(producer, chunk_size)))
+
+    def _chunks(self, producer: Iterator[None], chunk_size: int) -> Iterator[bytes]:
+        self.plug_text.append([])
+        try:
+            try:
+                size = 0
+                counted = 0
+                for _step in producer:
+                    texts = self.plug_text[-1]
+                    size += sum(len(text) for text in texts[counted:])
+                    counted = len(texts)
+                    if size >= chunk_size:
+                        yield ensure_binary(self.drain())
+                        size = counted = 0
+            except Exception as e:
+                logger.exception("error while streaming the output")
+                self.write("\n\n%s\n" % (_("ERROR: The output is incomplete: %s") % e))
+            text = self.drain()
+            if text:
+                yield ensure_binary(text)
+        finally:
+            self.plug_text.pop()
+
     @contextmanager
     def plugged(self) -> Iterator[None]:
         self.plug_text.append([])
@@ -11,8 +11,9 @@ import pprint
 import traceback
 import json
 import functools
+import itertools
 from typing import (Any, Callable, Dict, List, Optional, Sequence, Set, Tuple as _Tuple, Union,
-                    Iterator, Type)
+                    Iterator, Type, cast)
 
 import livestatus
 from livestatus import SiteId
@@ -320,6 +321,7 @@ class View:
         self._only_sites: Optional[List[SiteId]] = None
         self._user_sorters: Optional[List[SorterSpec]] = None
         self._want_checkboxes: bool = False
+        self._page: Optional[int] = None
 
     @property
     def datasource(self) -> ABCDataSource:
@@ -416,6 +418,19 @@ class View:
     def only_sites(self, only_sites: Optional[List[SiteId]]) -> None:
         self._only_sites = only_sites
 
+    @property
+    def page(self) -> Optional[int]:
+        """The page of the view that is shown, starting with 1
+
+        Is None unless the rows have been sorted and paged by livestatus. In this
+        case only the rows of the page (and one more, if there is a next page) are
+        fetched."""
+        return self._page
+
+    @page.setter
+    def page(self, page: Optional[int]) -> None:
+        self._page = page
+
     @property
     def layout(self) -> Layout:
         """Return the HTML layout of the view"""
@@ -643,7 +658,13 @@ class GUIViewRenderer(ABCViewRenderer):
             html.open_div(id_="data_container")
 
         if not has_done_actions:
-            if display_options.enabled(display_options.W):
+            if self.view.page is not None:
+                if display_options.enabled(display_options.W):
+                    self._show_page_navigation(
+                        cmk.gui.view_utils.row_limit_exceeded(unfiltered_amount_of_rows,
+                                                              self.view.row_limit))
+                del rows[self.view.row_limit:]
+            elif display_options.enabled(display_options.W):
                 if cmk.gui.view_utils.row_limit_exceeded(unfiltered_amount_of_rows,
                                                          self.view.row_limit):
                     cmk.gui.view_utils.query_limit_exceeded_warn(self.view.row_limit, config.user)
@@ -697,6 +718,21 @@ class GUIViewRenderer(ABCViewRenderer):
         if display_options.enabled(display_options.H):
             html.body_end()
 
+    def _show_page_navigation(self, has_next_page: bool) -> None:
+        assert self.view.page is not None
+        page = self.view.page
+        if page == 1 and not has_next_page:
+            return
+
+        text = HTML(_("Page %d") % page)
+        if page > 1:
+            text += " " + html.render_a(
+                _("Previous page"), target="_self", href=html.makeuri([("page", page - 1)]))
+        if has_next_page:
+            text += " " + html.render_a(
+                _("Next page"), target="_self", href=html.makeuri([("page", page + 1)]))
+        html.show_message(text)
+
     def _page_menu(self, breadcrumb: Breadcrumb, rows: Rows,
                    show_filters: List[Filter]) -> PageMenu:
         if not display_options.enabled(display_options.B):
@@ -1703,6 +1739,9 @@ def process_view(view: View, view_renderer: ABCViewRenderer) -> None:
 
 def _process_regular_view(view: View, view_renderer: ABCViewRenderer) -> None:
     all_active_filters = _get_view_filters(view)
+    if html.output_format != "html" and _stream_view_export(view, all_active_filters):
+        return
+
     unfiltered_amount_of_rows, rows = _get_view_rows(view, all_active_filters, only_count=False)
 
     if html.output_format != "html":
@@ -1759,7 +1798,14 @@ def _get_view_filters(view: View) -> List[Filter]:
 def _get_view_rows(view: View,
                    all_active_filters: List[Filter],
                    only_count: bool = False) -> _Tuple[int, Rows]:
-    rows = _fetch_view_rows(view, all_active_filters, only_count)
+    order_by_headers = None if only_count else _livestatus_order_by_headers(
+        view, all_active_filters)
+    if order_by_headers is not None:
+        page_rows = _get_view_page_rows(view, all_active_filters, order_by_headers)
+        if page_rows is not None:
+            return page_rows
+
+    rows = _fetch_view_rows(view, all_active_filters, only_count, view.row_limit)
 
     # Sorting - use view sorters and URL supplied sorters
     _sort_data(view, rows, view.sorters)
@@ -1773,7 +1819,221 @@ def _get_view_rows(view: View,
     return unfiltered_amount_of_rows, rows
 
 
-def _fetch_view_rows(view: View, all_active_filters: List[Filter], only_count: bool) -> Rows:
+def _livestatus_order_by_headers(view: View, all_active_filters: List[Filter]) -> Optional[str]:
+    """Returns the OrderBy: headers to sort the rows of the view by livestatus
+
+    None is returned, if the rows have to be sorted in Python: Only limited HTML
+    views of livestatus tables can be paged, all sorters need to be known to
+    livestatus and no filter may remove rows after the query."""
+    datasource = view.datasource
+    if (view.row_limit is None or html.output_format != "html" or datasource.merge_by or
+            not datasource.table.supports_paging):
+        return None
+
+    if "Stats:" in datasource.add_headers + view.spec.get("add_headers", ""):
+        return None
+
+    if not _sites_support_paging(view):
+        return None
+
+    if any(filter_.need_filter_table() for filter_ in all_active_filters):
+        return None
+
+    return _livestatus_sort_headers(view)
+
+
+def _livestatus_sort_headers(view: View) -> Optional[str]:
+    """Returns the OrderBy: headers sorting the rows like the sorters of the view
+
+    None is returned, if a sorter is not known to livestatus. The id keys of the
+    datasource are the last sort keys."""
+    order_by: List[_Tuple[str, bool]] = []
+    for entry in view.sorters:
+        if entry.join_key or entry.sorter.livestatus_order_by is None:
+            return None
+        order_by += [(column, descending != entry.negate)
+                     for column, descending in entry.sorter.livestatus_order_by]
+
+    # Rows with equal sort keys need a stable order to be paged
+    order_by += [(column, False) for column in view.datasource.id_keys if column != "site"]
+
+    return "".join("OrderBy: %s %s\n" % (column, "desc" if descending else "asc")
+                   for column, descending in order_by)
+
+
+def _get_view_page_rows(view: View, all_active_filters: List[Filter],
+                        order_by_headers: str) -> Optional[_Tuple[int, Rows]]:
+    """Fetches the rows of the current page of a view sorted by livestatus
+
+    A single site sends exactly the rows of the page. With multiple sites every
+    site sends its first rows up to the end of the page, which are merged here.
+    One additional row is fetched to know whether there is a next page.
+
+    None is returned, if a site rejected the OrderBy: or Offset: headers. The
+    rows have to be fetched and sorted in Python then."""
+    row_limit = view.row_limit
+    assert row_limit is not None
+
+    view.page = max(1, html.request.get_integer_input_mandatory("page", 1))
+    offset = (view.page - 1) * row_limit
+
+    dead_sites = set(sites.live().dead_sites())
+    if len(view.only_sites or config.sites) <= 1:
+        rows = _fetch_view_rows(view, all_active_filters, False, row_limit,
+                                order_by_headers + "Offset: %d\n" % offset)
+    else:
+        rows = _fetch_view_rows(view, all_active_filters, False, offset + row_limit,
+                                order_by_headers)
+        _sort_page_rows(view, rows)
+        rows = rows[offset:offset + row_limit + 1]
+
+    if _page_headers_rejected(dead_sites):
+        view.page = None
+        return None
+
+    return len(rows), rows
+
+
+# The sites which do not know the OrderBy: and Offset: headers, because their
+# livestatus is older than the one of this site
+_sites_without_paging: Set[SiteId] = set()
+
+
+def _sites_support_paging(view: View) -> bool:
+    return _sites_without_paging.isdisjoint(view.only_sites or config.sites)
+
+
+def _page_headers_rejected(dead_sites: Set[SiteId]) -> bool:
+    """Whether a site not in dead_sites failed the last query on the OrderBy: or Offset: headers
+
+    The failed sites are not queried again by the current connection. To repeat
+    the query without these headers, the connections to all sites are reset."""
+    errors = {
+        site_id: str(deadinfo["exception"])
+        for site_id, deadinfo in sites.live().dead_sites().items()
+        if site_id not in dead_sites
+    }
+    rejected = [
+        site_id for site_id, error in errors.items() if "OrderBy:" in error or "Offset:" in error
+    ]
+    if not rejected:
+        return False
+
+    _sites_without_paging.update(
+        site_id for site_id in rejected if "undefined request header" in errors[site_id])
+    sites.disconnect()
+    return True
+
+
+def _sort_page_rows(view: View, rows: Rows) -> None:
+    """Sorts the merged rows of several sites like livestatus sorts the rows of one site"""
+    id_keys = [column for column in view.datasource.id_keys if column != "site"] + ["site"]
+
+    def id_key(row: Row) -> List[Any]:
+        return [(row[column].lower(), row[column]) if isinstance(row[column], str) else row[column]
+                for column in id_keys]
+
+    rows.sort(key=id_key)
+    # Stable, the rows with equal sort keys stay in the order of their ids
+    _sort_data(view, rows, view.sorters)
+
+
+def _stream_view_export(view: View, all_active_filters: List[Filter]) -> bool:
+    """Exports the rows of a view while they are received from livestatus
+
+    This is possible, when the exporter writes the rows one after another and no
+    row is needed to process the others: The rows are not sorted or sorted by the
+    livestatus of a single site, no filter drops rows after the query and no data
+    is joined or added to the rows. Otherwise False is returned and nothing done."""
+    if html.output_format == "csv" and view.layout.has_individual_csv_export:
+        return False
+
+    exporter = exporter_registry.get(html.output_format)
+    if exporter is None or not exporter.streams_rows:
+        return False
+
+    datasource = view.datasource
+    if datasource.merge_by or not datasource.table.supports_paging or view.join_cells:
+        return False
+
+    if type(datasource).post_process is not ABCDataSource.post_process:
+        return False
+
+    if any(type(cell.painter()).derive is not Painter.derive for cell in view.row_cells):
+        return False
+
+    if any(filter_.need_filter_table() for filter_ in all_active_filters):
+        return False
+
+    if _is_inventory_data_needed(view.group_cells, view.row_cells, view.sorters,
+                                 all_active_filters):
+        return False
+
+    if not cmk_version.is_raw_edition() and _sla_painter_parameters(view):
+        return False
+
+    sort_headers: Optional[str] = ""
+    if view.sorters:
+        sort_headers = _livestatus_sort_headers(view)
+        if (sort_headers is None or len(view.only_sites or config.sites) > 1 or
+                not _sites_support_paging(view)):
+            return False
+
+    dead_sites = set(sites.live().dead_sites())
+    rows = _iter_view_rows(view, all_active_filters, sort_headers)
+    if sort_headers and _page_headers_rejected(dead_sites):
+        return False
+
+    # Exporters streaming the rows accept any iterable of rows
+    exporter.handler(view, cast(Rows, _check_dead_sites(rows, dead_sites)))
+    return True
+
+
+def _check_dead_sites(rows: Iterator[Row], dead_sites: Set[SiteId]) -> Iterator[Row]:
+    """Raises an error after the rows, when a site failed while they were received
+
+    The rows of such a site are incomplete or missing."""
+    yield from rows
+    errors = [
+        "%s: %s" % (site_id, deadinfo["exception"])
+        for site_id, deadinfo in sites.live().dead_sites().items()
+        if site_id not in dead_sites
+    ]
+    if errors:
+        raise MKGeneralException(
+            _("The rows of these sites are incomplete: %s") % ", ".join(errors))
+
+
+def _iter_view_rows(view: View, all_active_filters: List[Filter],
+                    sort_headers: str) -> Iterator[Row]:
+    """Returns an iterator over the rows of a view, which are received while iterating
+
+    The query is sent and the first rows are received right away to raise errors
+    of the query while the request is processed."""
+    if not _should_fetch_view_rows(view, only_count=False):
+        return iter([])
+
+    headers = (get_livestatus_filter_headers(view, all_active_filters) +
+               view.spec.get("add_headers", "") + sort_headers)
+    columns = _get_needed_regular_columns(view.group_cells + view.row_cells, view.sorters,
+                                          view.datasource)
+    chunks = view.datasource.table.query_chunks(view, columns, headers, view.only_sites,
+                                                view.row_limit, all_active_filters)
+    first_chunk = next(chunks, [])
+    return itertools.chain(first_chunk, itertools.chain.from_iterable(chunks))
+
+
+def _should_fetch_view_rows(view: View, only_count: bool) -> bool:
+    # Some views show data only after pressing [Search]
+    return (only_count or (not view.spec.get("mustsearch")) or
+            html.request.var("filled_in") in ["filter", 'actions', 'confirm', 'painteroptions'])
+
+
+def _fetch_view_rows(view: View,
+                     all_active_filters: List[Filter],
+                     only_count: bool,
+                     limit: Optional[int],
+                     page_headers: str = "") -> Rows:
     """Fetches the view rows from livestatus
 
     Besides gathering the information from livestatus it also joins the rows with other information.
@@ -1784,16 +2044,15 @@ def _fetch_view_rows(view: View, all_active_filters: List[Filter], only_count: b
     - Add SLA data when needed
     """
     filterheaders = get_livestatus_filter_headers(view, all_active_filters)
-    headers = filterheaders + view.spec.get("add_headers", "")
+    headers = filterheaders + view.spec.get("add_headers", "") + page_headers
 
     # Fetch data. Some views show data only after pressing [Search]
-    if (only_count or (not view.spec.get("mustsearch")) or
-            html.request.var("filled_in") in ["filter", 'actions', 'confirm', 'painteroptions']):
+    if _should_fetch_view_rows(view, only_count):
         columns = _get_needed_regular_columns(view.group_cells + view.row_cells, view.sorters,
                                               view.datasource)
 
-        rows: Rows = view.datasource.table.query(view, columns, headers, view.only_sites,
-                                                 view.row_limit, all_active_filters)
+        rows: Rows = view.datasource.table.query(view, columns, headers, view.only_sites, limit,
+                                                 all_active_filters)
 
         # Now add join information, if there are join columns
         if view.join_cells:
@@ -1803,7 +2062,10 @@ def _fetch_view_rows(view: View, all_active_filters: List[Filter], only_count: b
         # inventory, then we load it and attach it as column "host_inventory"
         if _is_inventory_data_needed(view.group_cells, view.row_cells, view.sorters,
                                      all_active_filters):
-            _add_inventory_data(rows)
+            _add_inventory_data(
+                rows,
+                _get_needed_inventory_paths(view.group_cells, view.row_cells, view.sorters,
+                                            all_active_filters))
 
         if not cmk_version.is_raw_edition():
             _add_sla_data(view, rows)
@@ -1876,7 +2138,10 @@ def _export_view(view: View, rows: Rows) -> None:
         raise MKUserError("output_format",
                           _("Output format '%s' not supported") % html.output_format)
 
-    exporter.handler(view, rows)
+    # The rows have already been fetched. Errors of the exporter still produce an
+    # error page, when its output is collected before the response is sent.
+    with html.plugged():
+        exporter.handler(view, rows)
 
 
 def _is_ec_unrelated_host_view(view_spec: ViewSpec) -> bool:
@@ -1988,14 +2253,44 @@ def _is_inventory_data_needed(group_cells: List[Cell], cells: List[Cell],
     return False
 
 
-def _add_inventory_data(rows: Rows) -> None:
+def _get_needed_inventory_paths(group_cells: List[Cell], cells: List[Cell],
+                                sorters: List[SorterEntry],
+                                all_active_filters: 'List[Filter]') -> Optional[List[str]]:
+    """The paths of the inventory needed by the painters, sorters and filters, None: All"""
+    needed: List[Optional[List[str]]] = []
+    for cell in cells:
+        if cell.has_tooltip() and cell.tooltip_painter_name().startswith("inv_"):
+            needed.append(cell.tooltip_painter().inventory_paths)
+
+    for entry in sorters:
+        if entry.sorter.load_inv:
+            needed.append(entry.sorter.inventory_paths)
+
+    for cell in group_cells + cells:
+        painter = cell.painter()
+        if painter.load_inv:
+            needed.append(painter.inventory_paths)
+
+    for filt in all_active_filters:
+        if filt.need_inventory():
+            needed.append(filt.inventory_paths())
+
+    inventory_paths: List[str] = []
+    for paths in needed:
+        if paths is None:
+            return None
+        inventory_paths.extend(path for path in paths if path not in inventory_paths)
+    return inventory_paths
+
+
+def _add_inventory_data(rows: Rows, inventory_paths: Optional[List[str]] = None) -> None:
     corrupted_inventory_files = []
     for row in rows:
         if "host_name" not in row:
             continue
 
         try:
-            row["host_inventory"] = inventory.load_filtered_and_merged_tree(row)
+            row["host_inventory"] = inventory.load_filtered_and_merged_tree(row, inventory_paths)
         except inventory.LoadStructuredDataError:
             # The inventory row may be joined with other rows (perf-o-meter, ...).
             # Therefore we initialize the corrupt inventory tree with an empty tree
@@ -2011,12 +2306,17 @@ def _add_inventory_data(rows: Rows) -> None:
                     ", ".join(sorted(corrupted_inventory_files)))
 
 
+def _sla_painter_parameters(view: View) -> List:
+    return [
+        cell.painter_parameters()
+        for cell in view.row_cells
+        if cell.painter_name() in ["sla_specific", "sla_fixed"]
+    ]
+
+
 def _add_sla_data(view: View, rows: Rows) -> None:
     import cmk.gui.cee.sla as sla  # pylint: disable=no-name-in-module,import-outside-toplevel
-    sla_params = []
-    for cell in view.row_cells:
-        if cell.painter_name() in ["sla_specific", "sla_fixed"]:
-            sla_params.append(cell.painter_parameters())
+    sla_params = _sla_painter_parameters(view)
     if sla_params:
         sla_configurations_container = sla.SLAConfigurationsContainerFactory.create_from_cells(
             sla_params, rows)
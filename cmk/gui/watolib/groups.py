@@ -255,12 +255,10 @@ def find_usages_of_contact_group(name):
 def _find_usages_of_contact_group_in_users(name):
     """Is the contactgroup assigned to a user?"""
     used_in = []
-    users = userdb.load_users()
+    users = userdb.load_users_of_contactgroup(name)
     for userid, user in sorted(users.items(), key=lambda x: x[1].get("alias", x[0])):
-        cgs = user.get("contactgroups", [])
-        if name in cgs:
-            used_in.append(('%s: %s' % (_('User'), user.get('alias', userid)),
-                            folder_preserving_link([('mode', 'edit_user'), ('edit', userid)])))
+        used_in.append(('%s: %s' % (_('User'), user.get('alias', userid)),
+                        folder_preserving_link([('mode', 'edit_user'), ('edit', userid)])))
     return used_in
 
 
@@ -12,7 +12,8 @@ import time
 import re
 import shutil
 import uuid
-from typing import Any, Dict, List, Optional, Set, Tuple, Type, Union
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Set, Tuple, Type, Union
 
 from livestatus import SiteId
 
@@ -52,6 +53,7 @@ from cmk.gui.plugins.watolib.utils import wato_fileheader
 from cmk.gui.background_job import BackgroundJobAlreadyRunning
 from cmk.gui.breadcrumb import Breadcrumb, BreadcrumbItem
 
+import cmk.utils.paths
 import cmk.utils.version as cmk_version
 
 from cmk.utils import store
@@ -452,6 +454,19 @@ def update_metadata(
     return attributes
 
 
+def _host_attribute_default_values() -> Dict[str, Any]:
+    """Returns the default values of all host attributes
+
+    Computing them creates the valuespecs of the attributes, they are computed only
+    once per request instead of once per folder."""
+    if 'wato_host_attribute_default_values' not in g:
+        g.wato_host_attribute_default_values = {
+            host_attribute.name(): host_attribute.default_value()
+            for host_attribute in host_attribute_registry.attributes()
+        }
+    return g.wato_host_attribute_default_values
+
+
 class CREFolder(WithPermissions, WithAttributes, WithUniqueIdentifier, BaseFolder):
     """This class represents a WATO folder that contains other folders and hosts."""
 
@@ -515,7 +530,7 @@ class CREFolder(WithPermissions, WithAttributes, WithUniqueIdentifier, BaseFolde
     @staticmethod
     def invalidate_caches():
         g.pop('wato_folders', {})
-        for cache_id in ["folder_choices", "folder_choices_full_title"]:
+        for cache_id in ["folder_choices", "folder_choices_full_title", "wato_host_folder_paths"]:
             g.pop(cache_id, None)
         Folder.root_folder().drop_caches()
 
@@ -629,12 +644,20 @@ class CREFolder(WithPermissions, WithAttributes, WithUniqueIdentifier, BaseFolde
         self._locked_hosts = False
 
         self._hosts = {}
-        if not os.path.exists(self.hosts_file_path()):
+        indexed_hosts = _host_index.folder_hosts(self)
+        if indexed_hosts is None:
             return
 
-        variables = self._load_hosts_file()
         # Can either be set to True or a string (which will be used as host lock message)
-        self._locked_hosts = variables["_lock"]
+        self._locked_hosts = indexed_hosts.locked_hosts
+
+        for host_name, (attributes,
+                        cluster_nodes) in store.MARSHAL_CODEC.loads(indexed_hosts.hosts).items():
+            self._hosts[host_name] = Host(self, host_name, attributes, cluster_nodes)
+
+    def _read_hosts_file(self) -> 'Tuple[Union[bool, str], _FolderHosts]':
+        """Returns the host lock and the attributes and cluster nodes of the hosts in hosts.mk"""
+        variables = self._load_hosts_file()
 
         # Add entries in clusters{} to all_hosts, prepare cluster to node mapping
         nodes_of = {}
@@ -646,18 +669,18 @@ class CREFolder(WithPermissions, WithAttributes, WithUniqueIdentifier, BaseFolde
             nodes_of[str(cluster_with_tags.split('|')[0])] = list(map(str, nodes))
 
         # Build list of individual hosts
+        hosts: _FolderHosts = {}
         for host_name_with_tags in variables["all_hosts"]:
             parts = host_name_with_tags.split('|', 1)
             # Werk #10863: In 1.6 some hosts / rulesets were saved as unicode
             # strings.  After reading the config into the GUI ensure we really
             # process the host names as str. TODO: Can be removed with Python 3.
             host_name = str(parts[0])
-            host = self._create_host_from_variables(host_name, nodes_of, variables)
-            self._hosts[host_name] = host
-
-    def _create_host_from_variables(self, host_name, nodes_of, variables):
-        cluster_nodes = nodes_of.get(host_name)
+            hosts[host_name] = (self._host_attributes_from_variables(host_name, variables),
+                                nodes_of.get(host_name))
+        return variables["_lock"], hosts
 
+    def _host_attributes_from_variables(self, host_name, variables):
         # If we have a valid entry in host_attributes then the hosts.mk file contained
         # valid WATO information from a last save and we use that
         if host_name in variables["host_attributes"]:
@@ -681,7 +704,7 @@ class CREFolder(WithPermissions, WithAttributes, WithUniqueIdentifier, BaseFolde
                 if host_name in variables[config_dict]:
                     attributes[attribute_key] = variables[config_dict][host_name]
 
-        return Host(self, host_name, attributes, cluster_nodes)
+        return attributes
 
     def _upgrade_keys(self, data):
         data['attributes'] = self._transform_old_attributes(data.get('attributes', {}))
@@ -822,6 +845,7 @@ class CREFolder(WithPermissions, WithAttributes, WithUniqueIdentifier, BaseFolde
                 host.drop_caches()
 
             self._save_hosts_file()
+            _update_host_folder_paths(self)
 
         call_hook_hosts_changed(self)
 
@@ -830,6 +854,7 @@ class CREFolder(WithPermissions, WithAttributes, WithUniqueIdentifier, BaseFolde
         if not self.has_hosts():
             if os.path.exists(self.hosts_file_path()):
                 os.remove(self.hosts_file_path())
+            _host_index.forget_folder_hosts(self)
             return
 
         out = io.StringIO()
@@ -986,6 +1011,15 @@ class CREFolder(WithPermissions, WithAttributes, WithUniqueIdentifier, BaseFolde
         out.write("host_attributes.update(\n%s)\n" % format_config_value(cleaned_hosts))
         store.save_file(self.hosts_file_path(), out.getvalue())
 
+        # Hand the hosts over to the host index as _read_hosts_file() would read them
+        indexed_hosts: _FolderHosts = {}
+        for hostname in all_hosts + list(clusters):
+            attributes = store.MARSHAL_CODEC.loads(
+                store.MARSHAL_CODEC.dumps(cleaned_hosts[hostname]))
+            indexed_hosts[hostname] = (self._transform_old_attributes(attributes),
+                                       clusters.get(hostname))
+        _host_index.update_folder_hosts(self, indexed_hosts)
+
     def _get_alias_from_extra_conf(self, host_name, variables):
         aliases = self._host_extra_conf(host_name, variables["extra_host_conf"]["alias"])
         if len(aliases) > 0:
@@ -1116,6 +1150,13 @@ class CREFolder(WithPermissions, WithAttributes, WithUniqueIdentifier, BaseFolde
         self._load_hosts_on_demand()
         return self._hosts
 
+    def host_names(self):
+        # The names are known from the host index, the hosts need not be loaded for them
+        if self._hosts is not None:
+            return self._hosts.keys()
+        indexed_hosts = _host_index.folder_hosts(self)
+        return [] if indexed_hosts is None else list(indexed_hosts.host_names)
+
     def num_hosts(self):
         # Do *not* load hosts here! This method must kept cheap
         return self._num_hosts
@@ -1313,10 +1354,8 @@ class CREFolder(WithPermissions, WithAttributes, WithUniqueIdentifier, BaseFolde
         effective.update(self.attributes())
 
         # now add default values of attributes for all missing values
-        for host_attribute in host_attribute_registry.attributes():
-            attrname = host_attribute.name()
-            if attrname not in effective:
-                effective.setdefault(attrname, host_attribute.default_value())
+        for attrname, default_value in _host_attribute_default_values().items():
+            effective.setdefault(attrname, default_value)
 
         self._cache_effective_attributes(effective)
         return effective
@@ -2087,6 +2126,12 @@ class SearchFolder(WithPermissions, WithAttributes, BaseFolder):
         if not in_folder.may("read"):
             return {}
 
+        # Folders without matching host names are skipped without loading their hosts
+        if self._criteria[".name"] and not any(
+                host_attribute_matches(self._criteria[".name"], host_name)
+                for host_name in in_folder.host_names()):
+            return {}
+
         found = {}
         for host_name, host in in_folder.hosts().items():
             if self._criteria[".name"] and not host_attribute_matches(self._criteria[".name"],
@@ -2122,7 +2167,10 @@ class CREHost(WithPermissions, WithAttributes):
 
     @staticmethod
     def host(host_name):
-        return Folder.root_folder().find_host_recursively(host_name)
+        folder_path = _host_folder_paths().get(host_name)
+        if folder_path is None:
+            return None
+        return Folder.folder(folder_path).host(host_name)
 
     @staticmethod
     def all():
@@ -2470,11 +2518,11 @@ def must_be_in_contactgroups(cgspec):
 
     cgconf = convert_cgroups_from_tuple(cgspec)
     cgs = cgconf["groups"]
-    users = userdb.load_users()
-    if config.user.id not in users:
+    user = None if config.user.id is None else userdb.load_user(config.user.id)
+    if user is None:
         user_cgs = []
     else:
-        user_cgs = users[config.user.id]["contactgroups"]
+        user_cgs = user["contactgroups"]
     for c in cgs:
         if c not in user_cgs:
             raise MKAuthException(
@@ -2483,6 +2531,166 @@ def must_be_in_contactgroups(cgspec):
                 (c, ", ".join(user_cgs)))
 
 
+#.
+#   .--Host index----------------------------------------------------------.
+#   |            _   _           _     _           _                       |
+#   |           | | | | ___  ___| |_  (_)_ __   __| | _____  __            |
+#   |           | |_| |/ _ \/ __| __| | | '_ \ / _` |/ _ \ \/ /            |
+#   |           |  _  | (_) \__ \ |_  | | | | | (_| |  __/>  <             |
+#   |           |_| |_|\___/|___/\__| |_|_| |_|\__,_|\___/_/\_\            |
+#   |                                                                      |
+#   +----------------------------------------------------------------------+
+#   | The hosts read from the hosts.mk of the folders are kept in memory   |
+#   | and in a cache file as long as the hosts.mk are unchanged. Loading   |
+#   | the hosts of all folders then does not execute all hosts.mk files.   |
+#   '----------------------------------------------------------------------'
+
+# The explicit attributes and the cluster nodes (None for regular hosts) by host name
+_FolderHosts = Dict[str, Tuple[Dict[str, Any], Optional[List[str]]]]
+
+
+class _IndexedHosts(NamedTuple):
+    signature: store.FileSignature
+    locked_hosts: Union[bool, str]
+    host_names: List[str]
+    # The marshalled _FolderHosts, every load of the hosts gets its own copy
+    hosts: bytes
+
+
+class _HostIndex:
+    """The hosts of the folders by the path of their hosts.mk
+
+    An entry is used as long as the signature of the hosts.mk is unchanged. The
+    index is shared by the requests of a process and saved to a cache file for
+    new processes."""
+    def __init__(self) -> None:
+        super(_HostIndex, self).__init__()
+        self._entries: Optional[Dict[str, _IndexedHosts]] = None
+        self._changed = False
+
+    def folder_hosts(self, folder: 'CREFolder') -> Optional[_IndexedHosts]:
+        """Returns the hosts of the folder or None if it has no hosts.mk"""
+        entries = self._load()
+        path = folder.hosts_file_path()
+        reliable, signature = store.reliable_file_signature(path)
+        if signature is None:
+            self._forget(path)
+            return None
+
+        entry = entries.get(path)
+        if entry is not None and entry.signature == signature:
+            return entry
+
+        locked_hosts, hosts = folder._read_hosts_file()
+        entry = _IndexedHosts(signature, locked_hosts, list(hosts),
+                              store.MARSHAL_CODEC.dumps(hosts))
+        if reliable:
+            entries[path] = entry
+            self._changed = True
+        else:
+            self._forget(path)
+        return entry
+
+    def update_folder_hosts(self, folder: 'CREFolder', hosts: _FolderHosts) -> None:
+        """Takes over the hosts just written to the hosts.mk of the folder
+
+        The file has been replaced by the save (it has a new inode), so its signature
+        can be relied on although it is that recent. WATO never writes a host lock."""
+        entries = self._load()
+        path = folder.hosts_file_path()
+        signature = store.file_signature(path)
+        if signature is None:
+            self._forget(path)
+            return
+        entries[path] = _IndexedHosts(signature, False, list(hosts),
+                                      store.MARSHAL_CODEC.dumps(hosts))
+        self._changed = True
+
+    def forget_folder_hosts(self, folder: 'CREFolder') -> None:
+        self._load()
+        self._forget(folder.hosts_file_path())
+
+    def retain(self, root_dir: str, paths: Set[str]) -> None:
+        """Forgets the hosts.mk below the root directory which are not given"""
+        for path in [p for p in self._load() if p.startswith(root_dir) and p not in paths]:
+            self._forget(path)
+
+    def save(self) -> None:
+        """Saves the index to the cache file in case it has changed"""
+        if self._entries is None or not self._changed:
+            return
+        path = _host_index_cache_path()
+        store.makedirs(path.parent)
+        store.save_object_to_file(
+            path,
+            (cmk_version.__version__, {p: tuple(entry) for p, entry in self._entries.items()}),
+            codec=store.MARSHAL_CODEC)
+        self._changed = False
+
+    def _forget(self, path: str) -> None:
+        assert self._entries is not None
+        if self._entries.pop(path, None) is not None:
+            self._changed = True
+
+    def _load(self) -> Dict[str, _IndexedHosts]:
+        if self._entries is not None:
+            return self._entries
+
+        try:
+            cached = store.load_object_from_file(_host_index_cache_path(), default=None)
+        except (ValueError, EOFError):
+            cached = None  # Treat a corrupted cache file like a missing one
+
+        # The attributes of the hosts are transformed while reading the hosts.mk,
+        # the index of another version may have been transformed differently
+        self._entries = {}
+        if cached is not None and cached[0] == cmk_version.__version__:
+            self._entries = {p: _IndexedHosts(*entry) for p, entry in cached[1].items()}
+        return self._entries
+
+
+_host_index = _HostIndex()
+
+
+def _host_index_cache_path() -> Path:
+    return Path(cmk.utils.paths.tmp_dir, "wato", "hosts.cache")
+
+
+def _host_folder_paths() -> Dict[str, str]:
+    """Returns the path of the folder of every host by host name
+
+    The host names are taken from the host index, the hosts are not loaded. The
+    mapping is kept for the current request and updated by save_hosts()."""
+    if 'wato_host_folder_paths' not in g:
+        host_folder_paths = {}
+        hosts_file_paths = set()
+        for folder_path, folder in Folder.all_folders().items():
+            hosts_file_paths.add(folder.hosts_file_path())
+            for host_name in folder.host_names():
+                # Like find_host_recursively(), the first folder wins
+                host_folder_paths.setdefault(host_name, folder_path)
+        g.wato_host_folder_paths = host_folder_paths
+
+        _host_index.retain(Folder.root_folder().get_root_dir(), hosts_file_paths)
+        _host_index.save()
+    return g.wato_host_folder_paths
+
+
+def _update_host_folder_paths(folder: 'CREFolder') -> None:
+    if 'wato_host_folder_paths' not in g:
+        return
+    if Folder.all_folders().get(folder.path()) is not folder:
+        # Not a folder of the current folder tree, the mapping is built again
+        del g.wato_host_folder_paths
+        return
+
+    host_folder_paths = g.wato_host_folder_paths
+    for host_name in [name for name, path in host_folder_paths.items() if path == folder.path()]:
+        del host_folder_paths[host_name]
+    for host_name in folder.host_names():
+        host_folder_paths[host_name] = folder.path()
+
+
 #.
 #   .--CME-----------------------------------------------------------------.
 #   |                          ____ __  __ _____                           |
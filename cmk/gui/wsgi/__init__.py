@@ -10,9 +10,12 @@ from cmk.gui.wsgi.middleware import apache_env
 from cmk.gui.wsgi.routing import make_router
 from cmk.gui.wsgi.profiling import ProfileSwitcher
 import cmk.utils.paths
+import cmk.utils.store
 
 
 def make_app(debug=False):
+    # The apache workers load the same configuration files with every request
+    cmk.utils.store.enable_file_cache()
     return ProfileSwitcher(
         apache_env(make_router(debug=debug)),
         profile_file=pathlib.Path(cmk.utils.paths.var_dir) / "multisite.profile",
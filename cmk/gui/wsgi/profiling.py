@@ -10,6 +10,7 @@ from werkzeug.wrappers import Request
 from cmk.gui import config
 import cmk.utils.paths
 import cmk.utils.log
+import cmk.utils.store
 
 from repoze.profile import ProfileMiddleware  # type: ignore[import]
 
@@ -47,13 +48,21 @@ class ProfileSwitcher:
             cmk.utils.log.logger.info("Created profile dump script: %s", script_path)
 
     def __call__(self, environ, start_response):
-        if _profiling_enabled(environ):
-            self._create_dump_script()
-            app = self.profiled_app
-        else:
-            app = self.app
+        if not _profiling_enabled(environ):
+            return self.app(environ, start_response)
 
-        return app(environ, start_response)
+        self._create_dump_script()
+        response = self.profiled_app(environ, start_response)
+        _log_file_cache_stats()
+        return response
+
+
+def _log_file_cache_stats():
+    stats = cmk.utils.store.file_cache_stats()
+    if stats is not None:
+        cmk.utils.log.logger.info(
+            "File cache: %d hits, %d misses, %d evictions, %d entries (%d bytes)", stats["hits"],
+            stats["misses"], stats["evictions"], stats["entries"], stats["size"])
 
 
 def _profiling_enabled(environ):
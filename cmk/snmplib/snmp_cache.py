@@ -44,7 +44,7 @@ def write_single_oid_cache(snmp_config: SNMPHostConfig) -> None:
     if not os.path.exists(cache_dir):
         os.makedirs(cache_dir)
     cache_path = "%s/%s.%s" % (cache_dir, snmp_config.hostname, snmp_config.ipaddress)
-    store.save_object_to_file(cache_path, _g_single_oid_cache, pretty=False)
+    store.save_object_to_file(cache_path, _g_single_oid_cache, codec=store.MARSHAL_CODEC)
 
 
 def set_single_oid_cache(oid: OID, value: Optional[SNMPDecodedString]) -> None:
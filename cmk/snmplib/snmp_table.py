@@ -4,16 +4,27 @@
 # This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
 # conditions defined in the file COPYING, which is part of this source code package.
 
-import os
-from typing import Any, Callable, cast, List, Optional, Set, Tuple, Union
+from typing import (
+    Any,
+    Callable,
+    cast,
+    Dict,
+    Hashable,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Union,
+)
 
 from six import ensure_binary
 
-import cmk.utils.debug
-import cmk.utils.store as store
 from cmk.utils.exceptions import MKGeneralException
 from cmk.utils.log import console
-from cmk.utils.type_defs import HostName, SectionName
+from cmk.utils.type_defs import SectionName
 
 from .type_defs import (
     ABCSNMPBackend,
@@ -31,6 +42,7 @@ from .type_defs import (
     OIDWithSubOIDsAndColumns,
     SNMPColumn,
     SNMPColumns,
+    SNMPContext,
     SNMPDecodedValues,
     SNMPHostConfig,
     SNMPRawValue,
@@ -39,20 +51,27 @@ from .type_defs import (
     SNMPTree,
     SNMPValueEncoding,
 )
+from .walk_cache import encode_oid, WalkCache
 
 ResultColumnsUnsanitized = List[Tuple[OID, SNMPRowInfo, SNMPValueEncoding]]
 ResultColumnsSanitized = List[Tuple[List[SNMPRawValue], SNMPValueEncoding]]
 ResultColumnsDecoded = List[List[SNMPDecodedValues]]
 
 
-def get_snmp_table(section_name: Optional[SectionName], oid_info: Union[OIDInfo, SNMPTree], *,
-                   backend: ABCSNMPBackend) -> SNMPTable:
-    return _get_snmp_table(section_name, oid_info, False, backend=backend)
+def get_snmp_table(section_name: Optional[SectionName],
+                   oid_info: Union[OIDInfo, SNMPTree],
+                   *,
+                   backend: ABCSNMPBackend,
+                   walk_cache: Optional[WalkCache] = None) -> SNMPTable:
+    return _get_snmp_table(section_name, oid_info, False, backend=backend, walk_cache=walk_cache)
 
 
-def get_snmp_table_cached(section_name: Optional[SectionName], oid_info: Union[OIDInfo, SNMPTree],
-                          *, backend: ABCSNMPBackend) -> SNMPTable:
-    return _get_snmp_table(section_name, oid_info, True, backend=backend)
+def get_snmp_table_cached(section_name: Optional[SectionName],
+                          oid_info: Union[OIDInfo, SNMPTree],
+                          *,
+                          backend: ABCSNMPBackend,
+                          walk_cache: Optional[WalkCache] = None) -> SNMPTable:
+    return _get_snmp_table(section_name, oid_info, True, backend=backend, walk_cache=walk_cache)
 
 
 SPECIAL_COLUMNS = [
@@ -66,7 +85,21 @@ SPECIAL_COLUMNS = [
 
 # TODO: OID_END_OCTET_STRING is not used at all. Drop it.
 def _get_snmp_table(section_name: Optional[SectionName], oid_info: Union[OIDInfo, SNMPTree],
-                    use_snmpwalk_cache: bool, *, backend: ABCSNMPBackend) -> SNMPTable:
+                    use_snmpwalk_cache: bool, *, backend: ABCSNMPBackend,
+                    walk_cache: Optional[WalkCache]) -> SNMPTable:
+    # Callers fetching several tables of a host pass their own walk cache and
+    # save it once they are done. Otherwise the walks are only shared within
+    # this table.
+    if walk_cache is None:
+        walk_cache = WalkCache(backend.hostname)
+        info = _get_snmp_table(section_name,
+                               oid_info,
+                               use_snmpwalk_cache,
+                               backend=backend,
+                               walk_cache=walk_cache)
+        walk_cache.save()
+        return info
+
     oid, suboids, targetcolumns = _make_target_columns(oid_info)
 
     index_column = -1
@@ -99,7 +132,8 @@ def _get_snmp_table(section_name: Optional[SectionName], oid_info: Union[OIDInfo
                                     fetchoid,
                                     column,
                                     use_snmpwalk_cache,
-                                    backend=backend)
+                                    backend=backend,
+                                    walk_cache=walk_cache)
 
             if column in SPECIAL_COLUMNS:
                 index_column = len(columns)
@@ -221,10 +255,6 @@ def _oid_to_intlist(oid: OID) -> List[int]:
     return []
 
 
-def _cmp_oids(o1: OID, o2: OID) -> int:
-    return (_oid_to_intlist(o1) > _oid_to_intlist(o2)) - (_oid_to_intlist(o1) < _oid_to_intlist(o2))
-
-
 def _key_oids(o1: OID) -> List[int]:
     return _oid_to_intlist(o1)
 
@@ -234,21 +264,178 @@ def _key_oid_pairs(pair1: Tuple[OID, SNMPRawValue]) -> List[int]:
 
 
 def _get_snmpwalk(section_name: Optional[SectionName], oid: OID, fetchoid: OID, column: SNMPColumn,
-                  use_snmpwalk_cache: bool, *, backend: ABCSNMPBackend) -> SNMPRowInfo:
+                  use_snmpwalk_cache: bool, *, backend: ABCSNMPBackend,
+                  walk_cache: WalkCache) -> SNMPRowInfo:
     if column in SPECIAL_COLUMNS:
         return []
 
     save_to_cache = isinstance(column, OIDCached)
-    get_from_cache = save_to_cache and use_snmpwalk_cache
-    cached = _get_cached_snmpwalk(backend.hostname, fetchoid) if get_from_cache else None
+    scope = _walk_scope(section_name, backend.config)
+    cached = walk_cache.get(fetchoid,
+                            scope=scope,
+                            use_persisted=save_to_cache and use_snmpwalk_cache)
     if cached is not None:
+        console.vverbose("  Using walk of %s from walk cache\n" % fetchoid)
         return cached
     rowinfo = _perform_snmpwalk(section_name, oid, fetchoid, backend=backend)
-    if save_to_cache:
-        _save_snmpwalk_cache(backend.hostname, fetchoid, rowinfo)
+    walk_cache.add(fetchoid, rowinfo, scope=scope, persist=save_to_cache)
     return rowinfo
 
 
+def _walk_scope(section_name: Optional[SectionName], snmp_config: SNMPHostConfig) -> Hashable:
+    """Walks of the same subtree can be shared between sections of the same scope
+
+    The result of a walk depends on the SNMPv3 contexts of the section and,
+    if configured, on the OID range limits of the section.
+    """
+    contexts = tuple(snmp_config.snmpv3_contexts_of(section_name))
+    if snmp_config.oid_range_limits:
+        return contexts, section_name
+    return contexts
+
+
+class PlannedWalk(NamedTuple):
+    fetchoid: OID
+    base_oid: OID
+    # The first section requesting the subtree, its contexts are used for the walk
+    section_name: Optional[SectionName]
+    scope: Hashable
+    persist: bool
+    use_persisted: bool
+    # All requested fetch OIDs answered by this walk, and their sections
+    covers: List[OID]
+    sections: List[Optional[SectionName]]
+
+
+class SNMPWalkPlan(NamedTuple):
+    walks: List[PlannedWalk]
+    requested: int
+
+    @property
+    def saved(self) -> int:
+        return self.requested - len(self.walks)
+
+
+def plan_snmp_walks(
+    section_trees: Iterable[Tuple[Optional[SectionName], Sequence[Union[OIDInfo, SNMPTree]]]],
+    use_snmpwalk_cache: bool,
+    *,
+    snmp_config: SNMPHostConfig,
+) -> SNMPWalkPlan:
+    """Compute the minimal set of subtrees to walk for the given sections
+
+    Every column of every tree requests a walk of its fetch OID. Requests of
+    the same fetch OID, and requests of a subtree of another requested fetch
+    OID, are answered by one walk, as long as they are in the same scope (see
+    _walk_scope). The walks are ordered by the first request they answer, so
+    the order of the sections is kept.
+    """
+    requested = 0
+    walks: Dict[Tuple[Hashable, OID], Dict[str, Any]] = {}
+    order: Dict[Tuple[Hashable, OID], int] = {}
+    for section_name, trees in section_trees:
+        scope = _walk_scope(section_name, snmp_config)
+        for tree in trees:
+            oid, suboids, targetcolumns = _make_target_columns(tree)
+            for suboid in suboids:
+                for column in targetcolumns:
+                    if column in SPECIAL_COLUMNS:
+                        continue
+                    requested += 1
+                    fetchoid = _compute_fetch_oid(oid, suboid, column)
+                    order.setdefault((scope, fetchoid), requested)
+                    cached = isinstance(column, OIDCached)
+                    walk = walks.setdefault(
+                        (scope, fetchoid), {
+                            "fetchoid": fetchoid,
+                            "base_oid": oid,
+                            "section_name": section_name,
+                            "scope": scope,
+                            "persist": False,
+                            "use_persisted": use_snmpwalk_cache,
+                            "covers": [fetchoid],
+                            "sections": [],
+                        })
+                    walk["persist"] |= cached
+                    walk["use_persisted"] &= cached
+                    if section_name not in walk["sections"]:
+                        walk["sections"].append(section_name)
+
+    # Sorted by scope and OID, the walks inside of a subtree directly follow
+    # the walk of the subtree.
+    root: Optional[Tuple[Hashable, bytes, Dict[str, Any]]] = None
+    for scope, key, walk in sorted(
+        ((scope, _plan_key(fetchoid), walk) for (scope, fetchoid), walk in walks.items()),
+            key=lambda item: (repr(item[0]), item[1]),
+    ):
+        if root is None or not (root[0] == scope and root[1] and key.startswith(root[1])):
+            root = scope, key, walk
+            continue
+        ancestor = root[2]
+        ancestor_id = (scope, ancestor["fetchoid"])
+        order[ancestor_id] = min(order[ancestor_id], order[(scope, walk["fetchoid"])])
+        ancestor["persist"] |= walk["persist"]
+        ancestor["use_persisted"] &= walk["use_persisted"]
+        ancestor["covers"].append(walk["fetchoid"])
+        for section_name in walk["sections"]:
+            if section_name not in ancestor["sections"]:
+                ancestor["sections"].append(section_name)
+        del walks[(scope, walk["fetchoid"])]
+
+    return SNMPWalkPlan(
+        [PlannedWalk(**walks[walk_id]) for walk_id in sorted(walks, key=order.__getitem__)],
+        requested,
+    )
+
+
+def _plan_key(fetchoid: OID) -> bytes:
+    try:
+        return encode_oid(fetchoid)
+    except ValueError:
+        # Not walkable as part of another subtree, and does not contain one.
+        return b""
+
+
+def walk_planned(plan: SNMPWalkPlan, *, backend: ABCSNMPBackend, walk_cache: WalkCache) -> None:
+    """Walk the planned subtrees into the walk cache
+
+    The subtrees walked in the same SNMPv3 contexts are handed to the backend
+    at once (see ABCSNMPBackend.walk_many), so backends able to do so overlap
+    the round trips of the walks. The tables of the sections are then computed
+    from the walk cache.
+    """
+    pending = [
+        walk for walk in plan.walks
+        if walk_cache.get(walk.fetchoid, scope=walk.scope, use_persisted=walk.use_persisted) is None
+    ]
+    if backend.config.oid_range_limits:
+        # The backends limit the walks per section, walk them one by one
+        for walk in pending:
+            rowinfo = _perform_snmpwalk(walk.section_name,
+                                        walk.base_oid,
+                                        walk.fetchoid,
+                                        backend=backend)
+            walk_cache.add(walk.fetchoid, rowinfo, scope=walk.scope, persist=walk.persist)
+        return
+
+    walks_by_contexts: Dict[Tuple[SNMPContext, ...], List[PlannedWalk]] = {}
+    for walk in pending:
+        contexts = tuple(backend.config.snmpv3_contexts_of(walk.section_name))
+        walks_by_contexts.setdefault(contexts, []).append(walk)
+
+    for contexts, walks in walks_by_contexts.items():
+        rowinfos: List[SNMPRowInfo] = [[] for _walk in walks]
+        added_oids: List[Set[OID]] = [set() for _walk in walks]
+        for context_name in contexts:
+            for nr, rows in enumerate(
+                    backend.walk_many([walk.fetchoid for walk in walks],
+                                      context_name=context_name)):
+                _add_walked_rows(rowinfos[nr], added_oids[nr], rows)
+
+        for walk, rowinfo in zip(walks, rowinfos):
+            walk_cache.add(walk.fetchoid, rowinfo, scope=walk.scope, persist=walk.persist)
+
+
 def _perform_snmpwalk(section_name: Optional[SectionName], base_oid: OID, fetchoid: OID, *,
                       backend: ABCSNMPBackend) -> SNMPRowInfo:
     added_oids: Set[OID] = set([])
@@ -263,26 +450,29 @@ def _perform_snmpwalk(section_name: Optional[SectionName], base_oid: OID, fetcho
             table_base_oid=base_oid,
             context_name=context_name,
         )
-
-        # I've seen a broken device (Mikrotik Router), that broke after an
-        # update to RouterOS v6.22. It would return 9 time the same OID when
-        # .1.3.6.1.2.1.1.1.0 was being walked. We try to detect these situations
-        # by removing any duplicate OID information
-        if len(rows) > 1 and rows[0][0] == rows[1][0]:
-            console.vverbose("Detected broken SNMP agent. Ignoring duplicate OID %s.\n" %
-                             rows[0][0])
-            rows = rows[:1]
-
-        for row_oid, val in rows:
-            if row_oid in added_oids:
-                console.vverbose("Duplicate OID found: %s (%r)\n" % (row_oid, val))
-            else:
-                rowinfo.append((row_oid, val))
-                added_oids.add(row_oid)
+        _add_walked_rows(rowinfo, added_oids, rows)
 
     return rowinfo
 
 
+def _add_walked_rows(rowinfo: SNMPRowInfo, added_oids: Set[OID], rows: SNMPRowInfo) -> None:
+    """Add the rows of a walk in one context to the rows of the other contexts"""
+    # I've seen a broken device (Mikrotik Router), that broke after an
+    # update to RouterOS v6.22. It would return 9 time the same OID when
+    # .1.3.6.1.2.1.1.1.0 was being walked. We try to detect these situations
+    # by removing any duplicate OID information
+    if len(rows) > 1 and rows[0][0] == rows[1][0]:
+        console.vverbose("Detected broken SNMP agent. Ignoring duplicate OID %s.\n" % rows[0][0])
+        rows = rows[:1]
+
+    for row_oid, val in rows:
+        if row_oid in added_oids:
+            console.vverbose("Duplicate OID found: %s (%r)\n" % (row_oid, val))
+        else:
+            rowinfo.append((row_oid, val))
+            added_oids.add(row_oid)
+
+
 def _compute_fetch_oid(oid: Union[OID, OIDSpec], suboid: Optional[OID], column: SNMPColumn) -> OID:
     if suboid:
         fetchoid = "%s.%s" % (oid, suboid)
@@ -316,10 +506,12 @@ def _sanitize_snmp_table_columns(columns: ResultColumnsUnsanitized) -> ResultCol
     # First compute the complete list of end-oids appearing in the output
     # by looping all results and putting the endoids to a flat list
     endoids: List[OID] = []
+    seen: Set[OID] = set()
     for fetchoid, row_info, value_encoding in columns:
         for o, value in row_info:
             endoid = _extract_end_oid(fetchoid, o)
-            if endoid not in endoids:
+            if endoid not in seen:
+                seen.add(endoid)
                 endoids.append(endoid)
 
     # The list needs to be sorted to prevent problems when the first
@@ -363,10 +555,8 @@ def _sanitize_snmp_table_columns(columns: ResultColumnsUnsanitized) -> ResultCol
 
 
 def _are_ascending_oids(oid_list: List[OID]) -> bool:
-    for a in range(len(oid_list) - 1):
-        if _cmp_oids(oid_list[a], oid_list[a + 1]) > 0:  # == 0 should never happen
-            return False
-    return True
+    keys = [_oid_to_intlist(oid) for oid in oid_list]
+    return all(a <= b for a, b in zip(keys, keys[1:]))  # == should never happen
 
 
 def _construct_snmp_table_of_rows(columns: ResultColumnsDecoded) -> SNMPTable:
@@ -379,29 +569,3 @@ def _construct_snmp_table_of_rows(columns: ResultColumnsDecoded) -> SNMPTable:
         row = [c[index] for c in columns]
         new_info.append(row)
     return new_info
-
-
-def _get_cached_snmpwalk(hostname: HostName, fetchoid: OID) -> Optional[SNMPRowInfo]:
-    path = _snmpwalk_cache_path(hostname, fetchoid)
-    try:
-        console.vverbose("  Loading %s from walk cache %s\n" % (fetchoid, path))
-        return store.load_object_from_file(path)
-    except Exception:
-        if cmk.utils.debug.enabled():
-            raise
-        console.verbose("  Failed loading walk cache from %s. Continue without it.\n" % path)
-        return None
-
-
-def _save_snmpwalk_cache(hostname: HostName, fetchoid: OID, rowinfo: SNMPRowInfo) -> None:
-    path = _snmpwalk_cache_path(hostname, fetchoid)
-
-    if not os.path.exists(os.path.dirname(path)):
-        os.makedirs(os.path.dirname(path))
-
-    console.vverbose("  Saving walk of %s to walk cache %s\n" % (fetchoid, path))
-    store.save_object_to_file(path, rowinfo, pretty=False)
-
-
-def _snmpwalk_cache_path(hostname: HostName, fetchoid: OID) -> str:
-    return os.path.join(cmk.utils.paths.var_dir, "snmp_cache", hostname, fetchoid)
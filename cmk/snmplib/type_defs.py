@@ -164,6 +164,7 @@ class SNMPHostConfig(
             ("character_encoding", Optional[str]),
             ("is_usewalk_host", bool),
             ("is_inline_snmp_host", bool),
+            ("is_native_snmp_host", bool),
             ("record_stats", bool),
         ])):
     @property
@@ -226,6 +227,19 @@ class ABCSNMPBackend(metaclass=abc.ABCMeta):
              context_name: Optional[SNMPContextName] = None) -> SNMPRowInfo:
         return []
 
+    def walk_many(
+        self,
+        oids: Iterable[OID],
+        *,
+        context_name: Optional[SNMPContextName] = None,
+    ) -> List[SNMPRowInfo]:
+        """Walk several subtrees of the host in the given SNMP context
+
+        Backends able to overlap the walks override this, by default the
+        subtrees are walked one after the other.
+        """
+        return [self.walk(oid, context_name=context_name) for oid in oids]
+
 
 OID_END = 0  # Suffix-part of OID that was not specified
 OID_STRING = -1  # Complete OID as string ".1.3.6.1.4.1.343...."
@@ -0,0 +1,300 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright (C) 2019 tribe29 GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""Columnar per host store of SNMP walks
+
+All rows of all walked subtrees of a host are kept once, sorted by their
+OID. The OIDs are encoded as fixed width big endian sub-identifiers, so that
+the byte order of the encoded OIDs is the numeric order of the OIDs and all
+rows of a subtree are one contiguous range, found by two bisections.
+
+Walks of subtrees that are already covered by a walk of the current fetch
+(or, when requested, by a persisted walk) are answered from the store
+without talking to the device.
+
+The persisted walks of a host are saved to one file, which is rewritten as a
+whole. The walks persisted per OID by former versions are converted and
+removed on the first save.
+"""
+
+import bisect
+import os
+import shutil
+import struct
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple
+
+import cmk.utils.debug
+import cmk.utils.paths
+import cmk.utils.store as store
+from cmk.utils.log import console
+from cmk.utils.type_defs import HostName
+
+from .type_defs import OID, SNMPRowInfo, SNMPRawValue
+
+__all__ = ["WalkCache"]
+
+_MAGIC = b"CMKWALK1"
+_HEADER = struct.Struct(">8sII")
+
+# The scope a subtree was walked in (None for persisted walks of former
+# fetches) and whether the walk is persisted.
+_Coverage = Tuple[Optional[Hashable], bool]
+
+
+def encode_oid(oid: OID) -> bytes:
+    """Encode an OID such that the byte order is the numeric order
+
+    Raises ValueError for OIDs that are not numeric or whose sub-identifiers
+    exceed 32 bits (which SNMP does not allow).
+    """
+    sub_ids = [int(p) for p in oid.strip(".").split(".")]
+    try:
+        return struct.pack(">%dI" % len(sub_ids), *sub_ids)
+    except struct.error as e:
+        raise ValueError(str(e))
+
+
+def decode_oid(key: bytes) -> OID:
+    return "." + ".".join(map(str, struct.unpack(">%dI" % (len(key) // 4), key)))
+
+
+def _upper_bound(prefix: bytes) -> Optional[bytes]:
+    """The smallest key that sorts after all keys starting with prefix"""
+    stripped = prefix.rstrip(b"\xff")
+    if not stripped:
+        return None
+    return stripped[:-1] + bytes((stripped[-1] + 1,))
+
+
+class WalkCache:
+    """The walked subtrees of one host
+
+    The persisted walks are loaded lazily on the first lookup that asks for
+    them (or before saving, so that the file keeps the other subtrees).
+    """
+    def __init__(self, hostname: HostName) -> None:
+        self.hostname = hostname
+        self.path = os.path.join(cmk.utils.paths.var_dir, "snmp_cache", "%s.walk" % hostname)
+        # The walks persisted per OID by former versions
+        self.legacy_dir = os.path.join(cmk.utils.paths.var_dir, "snmp_cache", hostname)
+        self._keys: List[bytes] = []
+        self._oids: List[OID] = []
+        self._values: List[SNMPRawValue] = []
+        self._covered: Dict[bytes, _Coverage] = {}
+        self._loaded = False
+        self._dirty = False
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def get(
+        self,
+        fetchoid: OID,
+        *,
+        scope: Hashable,
+        use_persisted: bool,
+    ) -> Optional[SNMPRowInfo]:
+        """Return the rows of the subtree, if it has been walked already
+
+        Walks of this fetch are only used if they had been done in the same
+        scope (e.g. with the same SNMP contexts), persisted walks of former
+        fetches only if asked for.
+        """
+        try:
+            key = encode_oid(fetchoid)
+        except ValueError:
+            return None
+        if use_persisted:
+            self._load()
+
+        for length in range(len(key), 0, -4):
+            coverage = self._covered.get(key[:length])
+            if coverage is None:
+                continue
+            walked_scope, persisted = coverage
+            if walked_scope == scope or (use_persisted and persisted):
+                return self._range(key)
+        return None
+
+    def add(
+        self,
+        fetchoid: OID,
+        rows: SNMPRowInfo,
+        *,
+        scope: Hashable,
+        persist: bool,
+    ) -> None:
+        """Replace the subtree by the result of a fresh walk"""
+        try:
+            key = encode_oid(fetchoid)
+            new_rows = sorted((encode_oid(o), o, v) for o, v in rows)
+        except ValueError:
+            console.vverbose("  Not caching walk of %s: Invalid OID\n" % fetchoid)
+            return
+        if not all(k.startswith(key) for k, _o, _v in new_rows):
+            console.vverbose("  Not caching walk of %s: OIDs outside of the subtree\n" % fetchoid)
+            return
+        if persist:
+            self._load()
+
+        lo, hi = self._bounds(key)
+        self._keys[lo:hi] = [k for k, _o, _v in new_rows]
+        self._oids[lo:hi] = [o for _k, o, _v in new_rows]
+        self._values[lo:hi] = [v for _k, _o, v in new_rows]
+
+        # The subtree has changed: Drop the coverage of the walks inside of it
+        # and of the walks of this fetch in other scopes containing it.
+        for covered_key, (walked_scope, _persisted) in list(self._covered.items()):
+            if covered_key.startswith(key) or (key.startswith(covered_key) and
+                                               walked_scope not in (None, scope)):
+                del self._covered[covered_key]
+        self._covered[key] = (scope, persist)
+        self._dirty |= persist
+
+    def save(self) -> None:
+        """Persist the rows of all subtrees that have been added with persist=True"""
+        has_legacy_walks = os.path.isdir(self.legacy_dir)
+        if has_legacy_walks:
+            self._load()
+        if self._dirty:
+            self._save()
+        if has_legacy_walks:
+            console.vverbose("  Removing walk cache %s of former version\n" % self.legacy_dir)
+            shutil.rmtree(self.legacy_dir, ignore_errors=True)
+
+    def _save(self) -> None:
+        self._load()
+
+        persisted = sorted(k for k, (_c, p) in self._covered.items() if p)
+        prefixes: List[bytes] = []
+        for key in persisted:
+            if not prefixes or not key.startswith(prefixes[-1]):
+                prefixes.append(key)
+
+        keys: List[bytes] = []
+        values: List[SNMPRawValue] = []
+        for prefix in prefixes:
+            lo, hi = self._bounds(prefix)
+            keys.extend(self._keys[lo:hi])
+            values.extend(self._values[lo:hi])
+
+        console.vverbose("  Saving %d walked OIDs to walk cache %s\n" % (len(keys), self.path))
+        store.makedirs(os.path.dirname(self.path))
+        store.save_bytes_to_file(self.path, _serialize(persisted, keys, values))
+        self._dirty = False
+
+    def _bounds(self, prefix: bytes) -> Tuple[int, int]:
+        lo = bisect.bisect_left(self._keys, prefix)
+        upper = _upper_bound(prefix)
+        hi = len(self._keys) if upper is None else bisect.bisect_left(self._keys, upper, lo)
+        return lo, hi
+
+    def _range(self, prefix: bytes) -> SNMPRowInfo:
+        lo, hi = self._bounds(prefix)
+        return list(zip(self._oids[lo:hi], self._values[lo:hi]))
+
+    def _load(self) -> None:
+        if self._loaded:
+            return
+        self._loaded = True
+        self._load_file()
+        self._load_legacy_walks()
+
+    def _load_file(self) -> None:
+        try:
+            raw = store.load_bytes_from_file(self.path)
+            if not raw:
+                return
+            console.vverbose("  Loading walk cache %s\n" % self.path)
+            covered, keys, values = _deserialize(raw)
+        except Exception:
+            if cmk.utils.debug.enabled():
+                raise
+            console.verbose("  Failed loading walk cache from %s. Continue without it.\n" %
+                            self.path)
+            return
+
+        # Walks of the current fetch take precedence over the persisted ones
+        walked = tuple(self._covered)
+        rows = {k: (o, v) for k, o, v in zip(self._keys, self._oids, self._values)}
+        for key, value in zip(keys, values):
+            if not key.startswith(walked):
+                rows[key] = (decode_oid(key), value)
+        self._keys = sorted(rows)
+        self._oids = [rows[k][0] for k in self._keys]
+        self._values = [rows[k][1] for k in self._keys]
+        for key in covered:
+            if not key.startswith(walked):
+                self._covered[key] = (None, True)
+
+    def _load_legacy_walks(self) -> None:
+        """Convert the walks persisted per OID by former versions
+
+        Subtrees overlapping with the walks of the current file or of this fetch
+        are not converted, these are more recent."""
+        try:
+            fetchoids = os.listdir(self.legacy_dir)
+        except FileNotFoundError:
+            return
+
+        for fetchoid in fetchoids:
+            try:
+                key = encode_oid(fetchoid)
+            except ValueError:
+                continue
+            if any(
+                    key.startswith(covered_key) or covered_key.startswith(key)
+                    for covered_key in self._covered):
+                continue
+
+            path = os.path.join(self.legacy_dir, fetchoid)
+            try:
+                rows = store.load_object_from_file(path, default=None)
+            except Exception:
+                if cmk.utils.debug.enabled():
+                    raise
+                console.verbose("  Failed loading walk cache from %s. Continue without it.\n" %
+                                path)
+                continue
+            if rows is not None:
+                console.vverbose("  Converting walk cache %s of former version\n" % path)
+                self.add(fetchoid, rows, scope=None, persist=True)
+
+
+def _pack_column(items: Sequence[bytes]) -> bytes:
+    """All lengths first, then all items"""
+    return struct.pack(">%dI" % len(items), *map(len, items)) + b"".join(items)
+
+
+def _unpack_column(raw: bytes, offset: int, count: int) -> Tuple[List[bytes], int]:
+    lengths = struct.unpack_from(">%dI" % count, raw, offset)
+    offset += 4 * count
+    items = []
+    for length in lengths:
+        items.append(raw[offset:offset + length])
+        offset += length
+    if offset > len(raw):
+        raise ValueError("Truncated walk cache")
+    return items, offset
+
+
+def _serialize(covered: Sequence[bytes], keys: Sequence[bytes],
+               values: Sequence[SNMPRawValue]) -> bytes:
+    return b"".join((
+        _HEADER.pack(_MAGIC, len(covered), len(keys)),
+        _pack_column(covered),
+        _pack_column(keys),
+        _pack_column(values),
+    ))
+
+
+def _deserialize(raw: bytes) -> Tuple[List[bytes], List[bytes], List[SNMPRawValue]]:
+    magic, num_covered, num_rows = _HEADER.unpack_from(raw)
+    if magic != _MAGIC:
+        raise ValueError("Invalid walk cache")
+    covered, offset = _unpack_column(raw, _HEADER.size, num_covered)
+    keys, offset = _unpack_column(raw, offset, num_rows)
+    values, _offset = _unpack_column(raw, offset, num_rows)
+    return covered, keys, values
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright (C) 2019 tribe29 GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""The history of the HW/SW inventory trees of the hosts
+
+Whenever the inventory tree of a host changes, the delta of the new tree to
+the former one is computed and saved in the archive directory of the host:
+
+    inventory_archive/HOST/TIMESTAMP.delta: (new, changed, removed, raw delta tree,
+                                             compared numerations)
+
+TIMESTAMP is the one of the new tree (the mtime of its inventory file). The
+first delta of a host is the one of its first tree to the empty tree, it
+contains the complete base tree. Each further delta only contains what has
+changed, so the history of a host is just this chain of deltas and the former
+trees themselves are not kept.
+
+Former versions archived the complete former trees (named TIMESTAMP). Their
+deltas have to be computed by comparing consecutive trees. A tree saved by a
+former version, which has no delta, is archived completely for this reason
+when it is replaced.
+"""
+
+import errno
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+import cmk.utils.paths
+import cmk.utils.store as store
+from cmk.utils.structured_data import Container, Numeration, StructuredDataTree
+
+# The numbers of new, changed and removed entries and the delta tree
+Delta = Tuple[int, int, int, StructuredDataTree]
+# The paths of the numerations of a delta tree, which both compared trees have. Their
+# new and removed rows count as one entry, see Numeration.compare_with(). New and
+# removed subtrees count all of their values.
+ComparedNumerations = List[Tuple]
+
+_DELTA_SUFFIX = ".delta"
+
+
+def _archive_dir(hostname: str) -> Path:
+    return Path(cmk.utils.paths.inventory_archive_dir, hostname)
+
+
+def delta_filepath(hostname: str, timestamp: int) -> Path:
+    return _archive_dir(hostname) / ("%d%s" % (timestamp, _DELTA_SUFFIX))
+
+
+def has_delta(hostname: str, timestamp: int) -> bool:
+    return delta_filepath(hostname, timestamp).exists()
+
+
+def save_delta(hostname: str, timestamp: int, tree: StructuredDataTree,
+               old_tree: StructuredDataTree) -> None:
+    """Saves the delta of the tree of the timestamp to the former tree of the host"""
+    new, changed, removed, delta_tree = tree.compare_with(old_tree)
+    compared_numerations = [
+        path for path in _numeration_paths(delta_tree.get_root_container())
+        if tree.get_sub_children(path) is not None and old_tree.get_sub_children(path) is not None
+    ]
+    store.makedirs(_archive_dir(hostname))
+    store.save_object_to_file(
+        delta_filepath(hostname, timestamp),
+        (new, changed, removed, delta_tree.get_raw_tree(), compared_numerations))
+
+
+def _numeration_paths(container: Container) -> Iterator[Tuple]:
+    for _edge, abs_path, child in container.get_children():
+        if isinstance(child, Container):
+            yield from _numeration_paths(child)
+        elif isinstance(child, Numeration):
+            yield abs_path
+
+
+def load_delta(hostname: str, timestamp: int) -> Optional[Tuple[Delta, ComparedNumerations]]:
+    """Returns the delta of the tree of the timestamp to the former tree, None if there is none"""
+    raw_delta = store.load_object_from_file(delta_filepath(hostname, timestamp))
+    if raw_delta is None:
+        return None
+    new, changed, removed, raw_delta_tree, compared_numerations = raw_delta
+    delta_tree = StructuredDataTree().create_tree_from_raw_tree(raw_delta_tree)
+    return (new, changed, removed, delta_tree), compared_numerations
+
+
+def count_delta_entries(delta_tree: StructuredDataTree,
+                        compared_numerations: ComparedNumerations) -> Tuple[int, int, int]:
+    """Counts the new, changed and removed entries of a delta tree like compare_with() does
+
+    This is needed for delta trees filtered by the permitted inventory paths of a user."""
+    return _count_container_entries(delta_tree.get_root_container(), set(compared_numerations))
+
+
+def _count_container_entries(container: Container,
+                             compared_numerations: Set[Tuple]) -> Tuple[int, int, int]:
+    return _add_counts(
+        _count_child_entries(abs_path, child, compared_numerations)
+        for _edge, abs_path, child in container.get_children())
+
+
+def _count_child_entries(abs_path: Tuple, child: Any,
+                         compared_numerations: Set[Tuple]) -> Tuple[int, int, int]:
+    if isinstance(child, Container):
+        return _count_container_entries(child, compared_numerations)
+    if isinstance(child, Numeration) and abs_path in compared_numerations:
+        return _add_counts(_count_row(row) for row in child.get_child_data())
+    if isinstance(child, Numeration):
+        return _add_counts(_count_values(row.values()) for row in child.get_child_data())
+    return _count_values(child.get_child_data().values())
+
+
+def _count_row(row: Dict) -> Tuple[int, int, int]:
+    new, changed, removed = _count_values(row.values())
+    if row and new == len(row):
+        return 1, 0, 0
+    if row and removed == len(row):
+        return 0, 0, 1
+    return new, changed, removed
+
+
+def _count_values(values: Iterable[Tuple[Any, Any]]) -> Tuple[int, int, int]:
+    # The values of a delta tree are (old value, new value)
+    new, changed, removed = 0, 0, 0
+    for old_value, new_value in values:
+        if old_value is None and new_value is not None:
+            new += 1
+        elif new_value is None and old_value is not None:
+            removed += 1
+        elif old_value != new_value:
+            changed += 1
+    return new, changed, removed
+
+
+def _add_counts(counts: Iterable[Tuple[int, int, int]]) -> Tuple[int, int, int]:
+    new, changed, removed = 0, 0, 0
+    for sub_new, sub_changed, sub_removed in counts:
+        new, changed, removed = new + sub_new, changed + sub_changed, removed + sub_removed
+    return new, changed, removed
+
+
+def get_archived_timestamps(hostname: str) -> Tuple[List[int], List[int]]:
+    """Returns the timestamps of the archived trees and of the deltas, oldest first
+
+    The archived trees are the complete trees archived by former versions."""
+    try:
+        names = os.listdir(str(_archive_dir(hostname)))
+    except OSError as e:
+        if e.errno == errno.ENOENT:
+            return [], []
+        raise
+
+    tree_timestamps: List[int] = []
+    delta_timestamps: List[int] = []
+    for name in names:
+        if name.isdigit():
+            tree_timestamps.append(int(name))
+        elif name.endswith(_DELTA_SUFFIX) and name[:-len(_DELTA_SUFFIX)].isdigit():
+            delta_timestamps.append(int(name[:-len(_DELTA_SUFFIX)]))
+    return sorted(tree_timestamps), sorted(delta_timestamps)
@@ -6,10 +6,13 @@
 
 import errno
 import logging
+import marshal
 import os
 from pathlib import Path
+import struct
 import tempfile
-from typing import Optional, Dict, Iterator, List, Tuple, NamedTuple
+import time
+from typing import BinaryIO, Callable, Optional, Dict, Iterator, List, Set, Tuple, NamedTuple
 
 import cmk.utils
 import cmk.utils.paths
@@ -54,9 +57,17 @@ PiggybackTimeSettings = List[Tuple[Optional[str], str, int]]
 # "source_state_file":
 # - tmp/check_mk/piggyback_sources/SOURCE
 #
+# "packed_source_file":
+# - tmp/check_mk/piggyback_packed/SOURCE
+#
 # "source_hostname":
 # - Path(tmp/check_mk/piggyback/HOST/SOURCE).name
 # - Path(tmp/check_mk/piggyback_sources/SOURCE).name
+# - Path(tmp/check_mk/piggyback_packed/SOURCE).name
+#
+# Sources store the piggyback data of all their piggybacked hosts in one
+# packed source file (see below). The piggybacked host folders are written
+# by former versions only, they are still read until they are cleaned up.
 
 
 def get_piggyback_raw_data(piggybacked_hostname: str,
@@ -85,7 +96,7 @@ def get_piggyback_raw_data(piggybacked_hostname: str,
             # Raw data is always stored as bytes. Later the content is
             # converted to unicode in abstact.py:_parse_info which respects
             # 'encoding' in section options.
-            raw_data = store.load_bytes_from_file(file_info.file_path)
+            raw_data = _load_piggyback_raw_data(file_info, piggybacked_hostname)
 
         except IOError as e:
             reason = "Cannot read piggyback raw data from source '%s'" % file_info.source_hostname
@@ -132,14 +143,14 @@ def get_source_and_piggyback_hosts(
     """Generates all piggyback pig/piggybacked host pairs that have up-to-date data"""
 
     # Pylint bug (https://github.com/PyCQA/pylint/issues/1660). Fixed with pylint 2.x
-    for piggybacked_host_folder in _get_piggybacked_host_folders():
+    for piggybacked_hostname in _get_piggybacked_hostnames():
         for file_info in _get_piggyback_processed_file_infos(
-                piggybacked_host_folder.name,
+                piggybacked_hostname,
                 time_settings,
         ):
             if not file_info.successfully_processed:
                 continue
-            yield file_info.source_hostname, piggybacked_host_folder.name
+            yield file_info.source_hostname, piggybacked_hostname
 
 
 def has_piggyback_raw_data(piggybacked_hostname: str, time_settings: PiggybackTimeSettings) -> bool:
@@ -158,7 +169,8 @@ def _get_piggyback_processed_file_infos(
     functions. Therefor all these functions needs to deal with suddenly vanishing or
     updated files/directories.
     """
-    source_hostnames = get_source_hostnames(piggybacked_hostname)
+    packed_sources = _packed_sources_index.sources_of(piggybacked_hostname)
+    source_hostnames = _get_source_hostnames(piggybacked_hostname, packed_sources)
     matching_time_settings = _get_matching_time_settings(source_hostnames, piggybacked_hostname,
                                                          time_settings)
 
@@ -167,10 +179,15 @@ def _get_piggyback_processed_file_infos(
         if source_hostname.startswith("."):
             continue
 
-        piggyback_file_path = _get_piggybacked_file_path(source_hostname, piggybacked_hostname)
-
-        successfully_processed, reason, reason_status = _get_piggyback_processed_file_info(
-            source_hostname, piggybacked_hostname, piggyback_file_path, matching_time_settings)
+        packed = packed_sources.get(source_hostname)
+        if packed is None:
+            piggyback_file_path = _get_piggybacked_file_path(source_hostname, piggybacked_hostname)
+            successfully_processed, reason, reason_status = _get_piggyback_processed_file_info(
+                source_hostname, piggybacked_hostname, piggyback_file_path, matching_time_settings)
+        else:
+            stored, piggyback_file_path = packed
+            successfully_processed, reason, reason_status = _get_packed_piggyback_data_info(
+                source_hostname, piggybacked_hostname, stored, matching_time_settings)
 
         piggyback_file_info = PiggybackFileInfo(source_hostname, piggyback_file_path,
                                                 successfully_processed, reason, reason_status)
@@ -199,16 +216,35 @@ def _get_matching_time_settings(
 def _get_piggyback_processed_file_info(
         source_hostname: str, piggybacked_hostname: str, piggyback_file_path: Path,
         time_settings: Dict[Tuple[Optional[str], str], int]) -> Tuple[bool, str, int]:
-
-    max_cache_age = _get_max_cache_age(source_hostname, piggybacked_hostname, time_settings)
-    validity_period = _get_validity_period(source_hostname, piggybacked_hostname, time_settings)
-    validity_state = _get_validity_state(source_hostname, piggybacked_hostname, time_settings)
-
     try:
         file_age = cmk.utils.cachefile_age(piggyback_file_path)
     except MKGeneralException:
         return False, "Piggyback file might have been deleted", 0
 
+    return _get_piggyback_processed_data_info(
+        source_hostname, piggybacked_hostname, time_settings, file_age,
+        lambda status_file_path: _is_piggyback_file_outdated(status_file_path, piggyback_file_path))
+
+
+def _get_packed_piggyback_data_info(
+        source_hostname: str, piggybacked_hostname: str, stored: int,
+        time_settings: Dict[Tuple[Optional[str], str], int]) -> Tuple[bool, str, int]:
+    return _get_piggyback_processed_data_info(
+        source_hostname, piggybacked_hostname, time_settings,
+        time.time() - stored / 1000000.0,
+        lambda status_file_path: _is_packed_piggyback_data_outdated(status_file_path, stored))
+
+
+def _get_piggyback_processed_data_info(
+        source_hostname: str, piggybacked_hostname: str, time_settings: Dict[Tuple[Optional[str],
+                                                                                   str], int],
+        file_age: float, is_outdated: Callable[[Path], bool]) -> Tuple[bool, str, int]:
+    """Evaluates the age of the data of one source (and whether the source still sends it)"""
+
+    max_cache_age = _get_max_cache_age(source_hostname, piggybacked_hostname, time_settings)
+    validity_period = _get_validity_period(source_hostname, piggybacked_hostname, time_settings)
+    validity_state = _get_validity_state(source_hostname, piggybacked_hostname, time_settings)
+
     if file_age > max_cache_age:
         return False, "Piggyback file too old: %s" % Age(file_age - max_cache_age), 0
 
@@ -217,7 +253,7 @@ def _get_piggyback_processed_file_info(
         reason = "Source '%s' not sending piggyback data" % source_hostname
         return _eval_file_in_validity_period(file_age, validity_period, validity_state, reason)
 
-    if _is_piggyback_file_outdated(status_file_path, piggyback_file_path):
+    if is_outdated(status_file_path):
         reason = "Piggyback file not updated by source '%s'" % source_hostname
         return _eval_file_in_validity_period(file_age, validity_period, validity_state, reason)
 
@@ -269,6 +305,17 @@ def _is_piggyback_file_outdated(status_file_path: Path, piggyback_file_path: Pat
         raise
 
 
+def _is_packed_piggyback_data_outdated(status_file_path: Path, stored: int) -> bool:
+    # The status file has the time the source stored its data last as mtime
+    # (see _store_status_file_of())
+    try:
+        return status_file_path.stat().st_mtime_ns // 1000 > stored
+    except OSError as e:
+        if e.errno == errno.ENOENT:
+            return True
+        raise
+
+
 def _remove_piggyback_file(piggyback_file_path: Path) -> bool:
     try:
         piggyback_file_path.unlink()
@@ -288,44 +335,44 @@ def remove_source_status_file(source_hostname: str) -> bool:
 
 def store_piggyback_raw_data(source_hostname: str, piggybacked_raw_data: Dict[str,
                                                                               List[bytes]]) -> None:
-    piggyback_file_paths = []
-    for piggybacked_hostname, lines in piggybacked_raw_data.items():
-        piggyback_file_path = _get_piggybacked_file_path(source_hostname, piggybacked_hostname)
-        logger.log(
-            VERBOSE,
-            "Storing piggyback data for: %s",
-            piggybacked_hostname,
-        )
-        # Raw data is always stored as bytes. Later the content is
-        # converted to unicode in abstact.py:_parse_info which respects
-        # 'encoding' in section options.
-        store.save_bytes_to_file(piggyback_file_path, b"%s\n" % b"\n".join(lines))
-        piggyback_file_paths.append(piggyback_file_path)
-
     # Store the last contact with this piggyback source to be able to filter outdated data later
     # We use the mtime of this file later for comparison.
     # Only do this for hosts that sent piggyback data this turn, cleanup the status file when no
     # piggyback data was sent this turn.
     if piggybacked_raw_data:
         logger.log(VERBOSE, "Received piggyback data for %d hosts", len(piggybacked_raw_data))
+        for piggybacked_hostname in piggybacked_raw_data:
+            logger.log(
+                VERBOSE,
+                "Storing piggyback data for: %s",
+                piggybacked_hostname,
+            )
+        # Raw data is always stored as bytes. Later the content is
+        # converted to unicode in abstact.py:_parse_info which respects
+        # 'encoding' in section options.
+        stored = _store_packed_piggyback_data(
+            source_hostname, {
+                piggybacked_hostname: b"%s\n" % b"\n".join(lines)
+                for piggybacked_hostname, lines in piggybacked_raw_data.items()
+            })
 
         status_file_path = _get_source_status_file_path(source_hostname)
-        _store_status_file_of(status_file_path, piggyback_file_paths)
+        _store_status_file_of(status_file_path, stored)
     else:
         logger.log(VERBOSE, "Received no piggyback data")
         remove_source_status_file(source_hostname)
 
 
-def _store_status_file_of(status_file_path: Path, piggyback_file_paths: List[Path]) -> None:
+def _store_status_file_of(status_file_path: Path, stored: int) -> None:
     store.makedirs(status_file_path.parent)
 
     # Cannot use store.save_bytes_to_file like:
     # 1. store.save_bytes_to_file(status_file_path, b"")
-    # 2. set utime of piggybacked host files
+    # 2. set utime of the status file
     # Between 1. and 2.:
-    # - the piggybacked host may check its files
-    # - status file is newer (before utime of piggybacked host files is set)
-    # => piggybacked host file is outdated
+    # - the piggybacked host may check its data
+    # - status file is newer than the data just stored
+    # => piggybacked host data is outdated
     with tempfile.NamedTemporaryFile("wb",
                                      dir=str(status_file_path.parent),
                                      prefix=".%s.new" % status_file_path.name,
@@ -334,19 +381,8 @@ def _store_status_file_of(status_file_path: Path, piggyback_file_paths: List[Pat
         os.chmod(tmp_path, 0o660)
         tmp.write(b"")
 
-        tmp_stats = os.stat(tmp_path)
-        status_file_times = (tmp_stats.st_atime, tmp_stats.st_mtime)
-        for piggyback_file_path in piggyback_file_paths:
-            try:
-                # TODO use Path.stat() but be aware of:
-                # On POSIX platforms Python reads atime and mtime at nanosecond resolution
-                # but only writes them at microsecond resolution.
-                # (We're using os.utime() in _store_status_file_of())
-                os.utime(str(piggyback_file_path), status_file_times)
-            except OSError as e:
-                if e.errno == errno.ENOENT:
-                    continue
-                raise
+    # The data stored this turn has exactly this time, everything older is outdated
+    os.utime(tmp_path, ns=(stored * 1000, stored * 1000))
     os.rename(tmp_path, str(status_file_path))
 
 
@@ -366,12 +402,37 @@ def get_source_hostnames(piggybacked_hostname: Optional[str] = None) -> List[str
             source_host.name
             for piggybacked_host_folder in _get_piggybacked_host_folders()
             for source_host in _get_piggybacked_host_sources(piggybacked_host_folder)
-        ]
+        ] + _packed_sources_index.source_hostnames()
+
+    return _get_source_hostnames(piggybacked_hostname,
+                                 _packed_sources_index.sources_of(piggybacked_hostname))
+
+
+def _get_source_hostnames(piggybacked_hostname: str,
+                          packed_sources: Dict[str, Tuple[int, Path]]) -> List[str]:
+    if piggybacked_hostname not in _host_folders_index.piggybacked_hostnames():
+        return list(packed_sources)
 
     piggybacked_host_folder = cmk.utils.paths.piggyback_dir / Path(piggybacked_hostname)
-    return [
+    source_hostnames = [
         source_host.name for source_host in _get_piggybacked_host_sources(piggybacked_host_folder)
     ]
+    return source_hostnames + [
+        source_hostname for source_hostname in packed_sources
+        if source_hostname not in source_hostnames
+    ]
+
+
+def _get_piggybacked_hostnames() -> List[str]:
+    piggybacked_hostnames = [
+        piggybacked_host_folder.name for piggybacked_host_folder in _get_piggybacked_host_folders()
+    ]
+    folder_names = set(piggybacked_hostnames)
+    return piggybacked_hostnames + [
+        piggybacked_hostname
+        for piggybacked_hostname in _packed_sources_index.piggybacked_hostnames()
+        if piggybacked_hostname not in folder_names
+    ]
 
 
 def _get_piggybacked_host_folders() -> List[Path]:
@@ -400,6 +461,32 @@ def _get_piggybacked_host_sources(piggybacked_host_folder: Path) -> List[Path]:
         raise
 
 
+class _HostFoldersIndex:
+    """The names of the piggybacked host folders written by former versions
+
+    The piggyback directory is only listed again when it has been changed.
+    Usually it does not exist at all."""
+    def __init__(self) -> None:
+        super(_HostFoldersIndex, self).__init__()
+        self._directory: Optional[Tuple[Path, Optional[store.FileSignature]]] = None
+        self._piggybacked_hostnames: Set[str] = set()
+
+    def piggybacked_hostnames(self) -> Set[str]:
+        directory = cmk.utils.paths.piggyback_dir
+        reliable, signature = store.reliable_file_signature(directory)
+        directory_key = (directory, signature) if reliable else None
+        if directory_key is None or self._directory != directory_key:
+            self._piggybacked_hostnames = {
+                piggybacked_host_folder.name
+                for piggybacked_host_folder in _get_piggybacked_host_folders()
+            }
+            self._directory = directory_key
+        return self._piggybacked_hostnames
+
+
+_host_folders_index = _HostFoldersIndex()
+
+
 def _get_source_state_files() -> List[Path]:
     try:
         return [
@@ -421,6 +508,230 @@ def _get_piggybacked_file_path(source_hostname: str, piggybacked_hostname: str)
     return cmk.utils.paths.piggyback_dir / piggybacked_hostname / source_hostname
 
 
+def _get_packed_source_files() -> List[Path]:
+    try:
+        return [
+            packed_source_file
+            for packed_source_file in cmk.utils.paths.piggyback_packed_dir.iterdir()
+            if not packed_source_file.name.startswith(".")
+        ]
+    except OSError as e:
+        if e.errno == errno.ENOENT:
+            return []
+        raise
+
+
+def _get_packed_source_file_path(source_hostname: str) -> Path:
+    return cmk.utils.paths.piggyback_packed_dir / source_hostname
+
+
+#.
+#   .--packed files--------------------------------------------------------.
+#   |                         _            _    __ _ _                     |
+#   |        _ __   __ _  ___| | _____  __| |  / _(_) | ___  ___           |
+#   |       | '_ \ / _` |/ __| |/ / _ \/ _` | | |_| | |/ _ \/ __|          |
+#   |       | |_) | (_| | (__|   <  __/ (_| | |  _| | |  __/\__ \          |
+#   |       | .__/ \__,_|\___|_|\_\___|\__,_| |_| |_|_|\___||___/          |
+#   |       |_|                                                            |
+#   '----------------------------------------------------------------------'
+
+# A packed source file holds the piggyback data of all piggybacked hosts of
+# one source:
+#
+#     header: magic, length of the index
+#     index:  marshalled {piggybacked_hostname: (stored, offset, length)}
+#     data:   the raw data of the piggybacked hosts, offsets are relative to its start
+#
+# "stored" is the time (in microseconds since the epoch) the data has been
+# received from the source. It takes the role the mtime of the per host files
+# had: The data of piggybacked hosts the source did not send again is kept
+# with its former time and thereby becomes outdated, see _store_status_file_of().
+#
+# Storing replaces the packed file, so a file which has not been replaced has
+# not been changed: Readers cache the indexes of all packed files, see
+# _PackedSourcesIndex.
+
+_PACKED_MAGIC = b"CMKPB\x00\x00\x01"
+_PACKED_HEADER = struct.Struct(">8sI")
+
+_PackedIndex = Dict[str, Tuple[int, int, int]]
+
+
+def _read_packed_index(f: BinaryIO) -> Tuple[_PackedIndex, int]:
+    """Returns the index of the packed file and the offset of its data"""
+    header = f.read(_PACKED_HEADER.size)
+    if len(header) < _PACKED_HEADER.size:
+        return {}, _PACKED_HEADER.size  # Just created for locking
+
+    magic, index_length = _PACKED_HEADER.unpack(header)
+    if magic != _PACKED_MAGIC:
+        raise MKGeneralException("Invalid packed piggyback file: %s" % f.name)
+    return marshal.loads(f.read(index_length)), _PACKED_HEADER.size + index_length
+
+
+def _load_packed_file(path: Path) -> Dict[str, Tuple[int, bytes]]:
+    """Returns the stored time and the raw data per piggybacked host"""
+    try:
+        with path.open("rb") as f:
+            index, _data_offset = _read_packed_index(f)
+            data = f.read()
+    except OSError as e:
+        if e.errno == errno.ENOENT:
+            return {}
+        raise
+    return {
+        piggybacked_hostname: (stored, data[offset:offset + length])
+        for piggybacked_hostname, (stored, offset, length) in index.items()
+    }
+
+
+def _save_packed_file(path: Path, entries: Dict[str, Tuple[int, bytes]]) -> None:
+    index: _PackedIndex = {}
+    offset = 0
+    for piggybacked_hostname, (stored, raw_data) in entries.items():
+        index[piggybacked_hostname] = (stored, offset, len(raw_data))
+        offset += len(raw_data)
+
+    raw_index = marshal.dumps(index)
+    store.save_bytes_to_file(
+        path, b"".join([_PACKED_HEADER.pack(_PACKED_MAGIC, len(raw_index)), raw_index] +
+                       [raw_data for _stored, raw_data in entries.values()]))
+
+
+def _store_packed_piggyback_data(source_hostname: str, raw_data_by_host: Dict[str, bytes]) -> int:
+    """Stores the data in the packed file of the source, returns the stored time of the data"""
+    path = _get_packed_source_file_path(source_hostname)
+    with store.locked(path):
+        entries = _load_packed_file(path)
+        # Later than the data kept from former turns, even when the clock went backwards
+        stored = max([time.time_ns() // 1000] + [stored + 1 for stored, _raw in entries.values()])
+        for piggybacked_hostname, raw_data in raw_data_by_host.items():
+            entries[piggybacked_hostname] = (stored, raw_data)
+        _save_packed_file(path, entries)
+    return stored
+
+
+def _load_piggyback_raw_data(file_info: PiggybackFileInfo, piggybacked_hostname: str) -> bytes:
+    if file_info.file_path.parent == cmk.utils.paths.piggyback_packed_dir:
+        return _packed_sources_index.load_raw_data(file_info.file_path, piggybacked_hostname)
+    return store.load_bytes_from_file(file_info.file_path)
+
+
+def _file_key(stat: os.stat_result) -> store.FileSignature:
+    return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+
+class _PackedSourcesIndex:
+    """The indexes of the packed files of all sources, kept during the whole process
+
+    The directory of the packed files is only listed again when it has been
+    changed. The index of a packed file is only read again when the file has
+    been replaced: Files are told apart by their inode, even when they have
+    been replaced within a short time."""
+    def __init__(self) -> None:
+        super(_PackedSourcesIndex, self).__init__()
+        self._directory: Optional[Tuple[Path, Optional[store.FileSignature]]] = None
+        # source_hostname -> (key, index, data offset)
+        self._sources: Dict[str, Tuple[store.FileSignature, _PackedIndex, int]] = {}
+        # piggybacked_hostname -> source_hostname -> (stored, packed source file)
+        self._by_host: Dict[str, Dict[str, Tuple[int, Path]]] = {}
+
+    def sources_of(self, piggybacked_hostname: str) -> Dict[str, Tuple[int, Path]]:
+        """Returns the stored time of the data of the piggybacked host and the packed file
+        per source"""
+        self._refresh()
+        return dict(self._by_host.get(piggybacked_hostname, {}))
+
+    def piggybacked_hostnames(self) -> List[str]:
+        self._refresh()
+        return list(self._by_host)
+
+    def source_hostnames(self) -> List[str]:
+        self._refresh()
+        return [source_hostname for source_hostname, entry in self._sources.items() if entry[1]]
+
+    def load_raw_data(self, packed_source_file: Path, piggybacked_hostname: str) -> bytes:
+        source_hostname = packed_source_file.name
+        try:
+            with packed_source_file.open("rb") as f:
+                key = _file_key(os.fstat(f.fileno()))
+                entry = self._sources.get(source_hostname)
+                if entry is None or entry[0] != key:
+                    index, data_offset = _read_packed_index(f)
+                    self._set(packed_source_file, key, index, data_offset)
+                else:
+                    _key, index, data_offset = entry
+
+                if piggybacked_hostname not in index:
+                    return b""
+                _stored, offset, length = index[piggybacked_hostname]
+                f.seek(data_offset + offset)
+                return f.read(length)
+        except OSError as e:
+            if e.errno == errno.ENOENT:
+                return b""
+            raise
+
+    def _refresh(self) -> None:
+        directory = cmk.utils.paths.piggyback_packed_dir
+        reliable, signature = store.reliable_file_signature(directory)
+        directory_key = (directory, signature) if reliable else None
+        if directory_key is not None and self._directory == directory_key:
+            return
+
+        stats: Dict[str, Tuple[Path, os.stat_result]] = {}
+        for packed_source_file in _get_packed_source_files():
+            try:
+                stats[packed_source_file.name] = (packed_source_file, packed_source_file.stat())
+            except OSError as e:
+                if e.errno != errno.ENOENT:
+                    raise
+
+        for source_hostname in list(self._sources):
+            if source_hostname not in stats:
+                self._drop(source_hostname)
+
+        for source_hostname, (packed_source_file, file_stat) in stats.items():
+            entry = self._sources.get(source_hostname)
+            if entry is None or entry[0] != _file_key(file_stat):
+                self._load(packed_source_file)
+
+        self._directory = directory_key
+
+    def _load(self, packed_source_file: Path) -> None:
+        try:
+            with packed_source_file.open("rb") as f:
+                key = _file_key(os.fstat(f.fileno()))
+                index, data_offset = _read_packed_index(f)
+        except OSError as e:
+            if e.errno != errno.ENOENT:
+                raise
+            self._drop(packed_source_file.name)
+            return
+        self._set(packed_source_file, key, index, data_offset)
+
+    def _set(self, packed_source_file: Path, key: store.FileSignature, index: _PackedIndex,
+             data_offset: int) -> None:
+        source_hostname = packed_source_file.name
+        self._drop(source_hostname)
+        self._sources[source_hostname] = key, index, data_offset
+        for piggybacked_hostname, (stored, _offset, _length) in index.items():
+            self._by_host.setdefault(piggybacked_hostname,
+                                     {})[source_hostname] = stored, packed_source_file
+
+    def _drop(self, source_hostname: str) -> None:
+        entry = self._sources.pop(source_hostname, None)
+        if entry is None:
+            return
+        for piggybacked_hostname in entry[1]:
+            sources = self._by_host[piggybacked_hostname]
+            del sources[source_hostname]
+            if not sources:
+                del self._by_host[piggybacked_hostname]
+
+
+_packed_sources_index = _PackedSourcesIndex()
+
 #.
 #   .--clean up------------------------------------------------------------.
 #   |                     _                                                |
@@ -450,43 +761,43 @@ def cleanup_piggyback_files(time_settings: List[Tuple[Optional[str], str, int]])
 
     _cleanup_old_source_status_files(piggybacked_hosts_settings)
     _cleanup_old_piggybacked_files(piggybacked_hosts_settings)
+    _cleanup_old_packed_source_files(piggybacked_hosts_settings)
 
 
 def _get_piggybacked_hosts_settings(
     time_settings: List[Tuple[Optional[str], str, int]]
-) -> List[Tuple[Path, List[Path], Dict[Tuple[Optional[str], str], int]]]:
+) -> List[Tuple[str, List[str], Dict[Tuple[Optional[str], str], int]]]:
     piggybacked_hosts_settings = []
-    for piggybacked_host_folder in _get_piggybacked_host_folders():
-        source_hosts = _get_piggybacked_host_sources(piggybacked_host_folder)
+    for piggybacked_hostname in _get_piggybacked_hostnames():
+        source_hostnames = get_source_hostnames(piggybacked_hostname)
         matching_time_settings = _get_matching_time_settings(
-            [source_host.name for source_host in source_hosts],
-            piggybacked_host_folder.name,
+            source_hostnames,
+            piggybacked_hostname,
             time_settings,
         )
         piggybacked_hosts_settings.append(
-            (piggybacked_host_folder, source_hosts, matching_time_settings))
+            (piggybacked_hostname, source_hostnames, matching_time_settings))
     return piggybacked_hosts_settings
 
 
 def _cleanup_old_source_status_files(
-    piggybacked_hosts_settings: List[Tuple[Path, List[Path], Dict[Tuple[Optional[str], str], int]]]
+    piggybacked_hosts_settings: List[Tuple[str, List[str], Dict[Tuple[Optional[str], str], int]]]
 ) -> None:
     """Remove source status files which exceed configured maximum cache age.
     There may be several 'Piggybacked Host Files' rules where the max age is configured.
     We simply use the greatest one per source."""
 
     max_cache_age_by_sources: Dict[str, int] = {}
-    for piggybacked_host_folder, source_hosts, time_settings in piggybacked_hosts_settings:
-        for source_host in source_hosts:
-            max_cache_age = _get_max_cache_age(source_host.name, piggybacked_host_folder.name,
-                                               time_settings)
+    for piggybacked_hostname, source_hostnames, time_settings in piggybacked_hosts_settings:
+        for source_hostname in source_hostnames:
+            max_cache_age = _get_max_cache_age(source_hostname, piggybacked_hostname, time_settings)
 
-            max_cache_age_of_source = max_cache_age_by_sources.get(source_host.name)
+            max_cache_age_of_source = max_cache_age_by_sources.get(source_hostname)
             if max_cache_age_of_source is None:
-                max_cache_age_by_sources[source_host.name] = max_cache_age
+                max_cache_age_by_sources[source_hostname] = max_cache_age
 
             elif max_cache_age >= max_cache_age_of_source:
-                max_cache_age_by_sources[source_host.name] = max_cache_age
+                max_cache_age_by_sources[source_hostname] = max_cache_age
 
     for source_state_file in _get_source_state_files():
         try:
@@ -515,12 +826,13 @@ def _cleanup_old_source_status_files(
 
 
 def _cleanup_old_piggybacked_files(
-    piggybacked_hosts_settings: List[Tuple[Path, List[Path], Dict[Tuple[Optional[str], str], int]]]
+    piggybacked_hosts_settings: List[Tuple[str, List[str], Dict[Tuple[Optional[str], str], int]]]
 ) -> None:
     """Remove piggybacked data files which exceed configured maximum cache age."""
 
-    for piggybacked_host_folder, source_hosts, time_settings in piggybacked_hosts_settings:
-        for piggybacked_host_source in source_hosts:
+    for piggybacked_hostname, _source_hostnames, time_settings in piggybacked_hosts_settings:
+        piggybacked_host_folder = cmk.utils.paths.piggyback_dir / piggybacked_hostname
+        for piggybacked_host_source in _get_piggybacked_host_sources(piggybacked_host_folder):
             successfully_processed, reason, _reason_status = _get_piggyback_processed_file_info(
                 piggybacked_host_source.name,
                 piggybacked_host_folder.name,
@@ -541,7 +853,7 @@ def _cleanup_old_piggybacked_files(
         try:
             piggybacked_host_folder.rmdir()
         except OSError as e:
-            if e.errno == errno.ENOTEMPTY:
+            if e.errno in (errno.ENOTEMPTY, errno.ENOENT):
                 continue
             raise
         else:
@@ -550,3 +862,50 @@ def _cleanup_old_piggybacked_files(
                 "Piggyback folder '%s' is empty. Removed it.",
                 piggybacked_host_folder,
             )
+
+
+def _cleanup_old_packed_source_files(
+    piggybacked_hosts_settings: List[Tuple[str, List[str], Dict[Tuple[Optional[str], str], int]]]
+) -> None:
+    """Remove piggybacked data which exceeds configured maximum cache age from the packed
+    source files. Each source file is rewritten at most once, empty ones are removed."""
+
+    time_settings_by_host = {
+        piggybacked_hostname: time_settings
+        for piggybacked_hostname, _source_hostnames, time_settings in piggybacked_hosts_settings
+    }
+
+    for packed_source_file in _get_packed_source_files():
+        source_hostname = packed_source_file.name
+        with store.locked(packed_source_file):
+            entries = _load_packed_file(packed_source_file)
+            outdated = []
+            for piggybacked_hostname, (stored, _raw_data) in entries.items():
+                time_settings = time_settings_by_host.get(piggybacked_hostname)
+                if time_settings is None:
+                    continue  # Stored after the settings have been computed
+
+                successfully_processed, reason, _reason_status = _get_packed_piggyback_data_info(
+                    source_hostname, piggybacked_hostname, stored, time_settings)
+                if not successfully_processed:
+                    logger.log(
+                        VERBOSE,
+                        "Piggyback data of '%s' in '%s' is outdated (%s). Remove it.",
+                        piggybacked_hostname,
+                        packed_source_file,
+                        reason,
+                    )
+                    outdated.append(piggybacked_hostname)
+
+            for piggybacked_hostname in outdated:
+                del entries[piggybacked_hostname]
+
+            if entries and outdated:
+                _save_packed_file(packed_source_file, entries)
+            elif not entries:
+                logger.log(
+                    VERBOSE,
+                    "Packed piggyback file '%s' is empty. Removed it.",
+                    packed_source_file,
+                )
+                _remove_piggyback_file(packed_source_file)
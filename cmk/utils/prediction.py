@@ -6,9 +6,11 @@
 
 import json
 import logging
+import math
 import os
+import struct
 import time
-from typing import Dict, Callable, List, Optional, Tuple, Iterator
+from typing import Any, Dict, Callable, List, Optional, Tuple, Iterator
 
 from six import ensure_str
 
@@ -17,6 +19,7 @@ from cmk.utils.exceptions import MKGeneralException
 import cmk.utils.debug
 from cmk.utils.log import VERBOSE
 import cmk.utils.paths
+import cmk.utils.store as store
 from cmk.utils.type_defs import Timestamp, Seconds, MetricName, ServiceName, HostName
 
 logger = logging.getLogger("cmk.prediction")
@@ -30,6 +33,19 @@ Timegroup = str
 EstimatedLevel = Optional[float]
 EstimatedLevels = Tuple[EstimatedLevel, EstimatedLevel, EstimatedLevel, EstimatedLevel]
 PredictionInfo = Dict  # TODO: improve this type
+# The metric, consolidation function and time range of RRD data to fetch
+RRDDataRequest = Tuple[MetricName, ConsolidationFunctionName, Timestamp, Timestamp]
+# A numpy.ndarray of floats, NaN where there is no value. numpy is imported
+# where it is needed only, it takes longer to import than the rest of the checking.
+TimeSeriesArray = Any
+
+PREDICTION_COLUMNS = [u"average", u"min", u"max", u"stdev"]
+# The prediction file: The header (magic, start and end of the data time
+# window, step, number of points), followed by the points, each of which
+# consists of the values of the PREDICTION_COLUMNS (NaN: no data).
+_PREDICTION_MAGIC = b"CMKPRD\x00\x01"
+_PREDICTION_HEADER = struct.Struct("<8sqqqI")
+_PREDICTION_POINT = struct.Struct("<%dd" % len(PREDICTION_COLUMNS))
 
 
 def is_dst(timestamp: float) -> bool:
@@ -112,26 +128,36 @@ class TimeSeries:
     def twindow(self) -> TimeWindow:
         return self.start, self.end, self.step
 
+    def _bfill_indices(self, twindow: TimeWindow, shift: Seconds) -> TimeSeriesArray:
+        """The indices of the values which are valid at the timestamps of twindow"""
+        import numpy as np  # type: ignore[import] # pylint: disable=import-outside-toplevel
+        start, end, step = twindow
+        current_times = np.arange(self.start + self.step, self.end + self.step, self.step)
+        indices = np.searchsorted(current_times + shift, np.arange(start, end, step), side="right")
+        return np.minimum(indices, len(self.values) - 1)
+
     def bfill_upsample(self, twindow: TimeWindow, shift: Seconds) -> TimeSeriesValues:
         """Upsample by backward filling values
 
         twindow : 3-tuple, (start, end, step)
              description of target time interval
         """
-        upsa = []
-        i = 0
         start, end, step = twindow
-        current_times = rrd_timestamps(self.twindow)
         if start != self.start or end != self.end or step != self.step:
-            for t in range(start, end, step):
-                if t >= current_times[i] + shift:
-                    i += 1
-                upsa.append(self.values[i])
-
-            return upsa
+            return [self.values[i] for i in self._bfill_indices(twindow, shift).tolist()]
 
         return self.values
 
+    def bfill_upsample_array(self, twindow: TimeWindow, shift: Seconds) -> TimeSeriesArray:
+        """Same as bfill_upsample, but returns the values as array (NaN: no value)"""
+        import numpy as np  # type: ignore[import] # pylint: disable=import-outside-toplevel
+        values = np.array(self.values, dtype=float)
+        start, end, step = twindow
+        if start != self.start or end != self.end or step != self.step:
+            return values[self._bfill_indices(twindow, shift)]
+
+        return values
+
     def downsample(self,
                    twindow: TimeWindow,
                    cf: ConsolidationFunctionName = 'max') -> TimeSeriesValues:
@@ -235,27 +261,41 @@ def get_rrd_data(hostname: HostName,
 
     """
 
+    return get_rrd_data_batch(hostname, service_description, [(varname, cf, fromtime, untiltime)],
+                              max_entries)[0]
+
+
+def get_rrd_data_batch(hostname: HostName,
+                       service_description: ServiceName,
+                       requests: List[RRDDataRequest],
+                       max_entries: int = 400) -> List[TimeSeries]:
+    """Fetch the RRD historic metrics data of several metrics and time ranges of a service
+
+    All of them are fetched with a single livestatus query. Returns the time
+    series of the requests in their order, see get_rrd_data()."""
     step = 1
-    rpn = "%s.%s" % (varname, cf.lower())  # "MAX" -> "max"
-    point_range = ":".join(
-        livestatus.lqencode(str(x)) for x in (fromtime, untiltime, step, max_entries))
-    column = "rrddata:m1:%s:%s" % (rpn, point_range)
+    columns = []
+    for nr, (varname, cf, fromtime, untiltime) in enumerate(requests):
+        rpn = "%s.%s" % (varname, cf.lower())  # "MAX" -> "max"
+        point_range = ":".join(
+            livestatus.lqencode(str(x)) for x in (fromtime, untiltime, step, max_entries))
+        columns.append("rrddata:m%d:%s:%s" % (nr + 1, rpn, point_range))
 
-    lql = livestatus_lql([hostname], [column], service_description) + "OutputFormat: python\n"
+    lql = livestatus_lql([hostname], columns, service_description) + "OutputFormat: python\n"
 
     try:
         connection = livestatus.SingleSiteConnection("unix:%s" %
                                                      cmk.utils.paths.livestatus_unix_socket)
-        response = connection.query_value(lql)
+        response = connection.query_row(lql)
     except livestatus.MKLivestatusNotFoundError as e:
         if cmk.utils.debug.enabled():
             raise
         raise MKGeneralException("Cannot get historic metrics via Livestatus: %s" % e)
 
-    if response is None:
+    if any(data is None for data in response):
         raise MKGeneralException("Cannot retrieve historic data with Nagios Core")
 
-    return TimeSeries(response)
+    return [TimeSeries(data) for data in response]
 
 
 def rrd_datacolum(hostname: HostName, service_description: ServiceName, varname: MetricName,
@@ -290,16 +330,84 @@ def clean_prediction_files(pred_file: str, force: bool = False) -> None:
 # (mo) And, in fact, this function returns at least 2 different types of dataset.
 def retrieve_data_for_prediction(info_file: str, timegroup: Timegroup) -> Optional[PredictionInfo]:
     try:
-        return json.loads(open(info_file).read())
+        with open(info_file, "rb") as f:
+            raw = f.read()
+        if raw.startswith(_PREDICTION_MAGIC):
+            return _parse_prediction_data(raw)
+        return json.loads(raw)
     except IOError:
         logger.log(VERBOSE, "No previous prediction for group %s available.", timegroup)
-    except ValueError:
+    except (ValueError, struct.error):
         logger.log(VERBOSE, "Invalid prediction file %s, old format", info_file)
         pred_file = info_file[:-5] if info_file.endswith(".info") else info_file
         clean_prediction_files(pred_file, force=True)
     return None
 
 
+def save_prediction_data(pred_file: str, data_for_pred: Dict) -> None:
+    """Saves the data of a prediction in the binary format of the prediction file
+
+    The data is the one returned by retrieve_data_for_prediction(). Its columns
+    have to be the PREDICTION_COLUMNS."""
+    if data_for_pred["columns"] != PREDICTION_COLUMNS:
+        raise ValueError("Invalid prediction columns: %r" % data_for_pred["columns"])
+    points = data_for_pred["points"]
+    from_time, until_time = data_for_pred["data_twindow"]
+    values = [math.nan if value is None else value for point in points for value in point]
+    store.save_bytes_to_file(
+        pred_file,
+        _PREDICTION_HEADER.pack(_PREDICTION_MAGIC, from_time, until_time, data_for_pred["step"],
+                                len(points)) + struct.pack("<%dd" % len(values), *values),
+    )
+
+
+def _parse_prediction_data(raw: bytes) -> PredictionInfo:
+    _magic, from_time, until_time, step, num_points = _PREDICTION_HEADER.unpack_from(raw)
+    points = [[None if math.isnan(value) else value
+               for value in point]
+              for point in _PREDICTION_POINT.iter_unpack(raw[_PREDICTION_HEADER.size:])]
+    if len(points) != num_points:
+        raise ValueError("Truncated prediction file")
+    return {
+        u"columns": PREDICTION_COLUMNS,
+        u"points": points,
+        u"num_points": num_points,
+        u"data_twindow": [from_time, until_time],
+        u"step": step,
+    }
+
+
+def retrieve_prediction_reference(pred_file: str, rel_time: Seconds,
+                                  timegroup: Timegroup) -> Optional[Dict[str, Optional[float]]]:
+    """Returns the values of the point of the prediction at rel_time in its slice
+
+    Only this point is read from the prediction file. None is returned if there
+    is no prediction file or it has the JSON format of former versions."""
+    try:
+        with open(pred_file, "rb") as f:
+            header = f.read(_PREDICTION_HEADER.size)
+            if not header.startswith(_PREDICTION_MAGIC) or len(header) < _PREDICTION_HEADER.size:
+                logger.log(VERBOSE, "Invalid prediction file %s, old format", pred_file)
+                return None
+            _magic, _from_time, _until_time, step, num_points = _PREDICTION_HEADER.unpack(header)
+            index = int(rel_time / step)
+            if not 0 <= index < num_points:
+                return dict.fromkeys(PREDICTION_COLUMNS)
+            f.seek(_PREDICTION_HEADER.size + index * _PREDICTION_POINT.size)
+            point = _PREDICTION_POINT.unpack(f.read(_PREDICTION_POINT.size))
+    except IOError:
+        logger.log(VERBOSE, "No previous prediction for group %s available.", timegroup)
+        return None
+    except struct.error:
+        logger.log(VERBOSE, "Invalid prediction file %s, truncated", pred_file)
+        return None
+
+    return {
+        column: None if math.isnan(value) else value
+        for column, value in zip(PREDICTION_COLUMNS, point)
+    }
+
+
 def estimate_levels(
     reference: Dict[str, Optional[float]],
     params: Dict,
@@ -5,7 +5,18 @@
 # conditions defined in the file COPYING, which is part of this source code package.
 """This module provides generic Check_MK ruleset processing functionality"""
 
-from typing import TYPE_CHECKING, Any, Dict, Generator, List, Optional, Pattern, Set, Tuple
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    Generator,
+    Iterator,
+    List,
+    Optional,
+    Pattern,
+    Set,
+    Tuple,
+)
 
 from cmk.utils.rulesets.tuple_rulesets import (
     ALL_HOSTS,
@@ -24,8 +35,9 @@ if TYPE_CHECKING:
 LabelConditions = Dict  # TODO: Optimize this
 PreprocessedHostRuleset = Dict[HostName, List[RuleValue]]
 PreprocessedPattern = Tuple[bool, Pattern[str]]
-PreprocessedServiceRuleset = List[Tuple[RuleValue, Set[HostName], LabelConditions, Tuple,
-                                        PreprocessedPattern]]
+PreprocessedServiceRule = Tuple[RuleValue, Set[HostName], LabelConditions, Tuple,
+                                PreprocessedPattern]
+PreprocessedServiceRuleset = List[PreprocessedServiceRule]
 
 
 class RulesetMatchObject:
@@ -171,13 +183,12 @@ class RulesetMatcher:
                                                                        with_foreign_hosts,
                                                                        is_binary=is_binary)
 
-        for value, hosts, service_labels_condition, service_labels_condition_cache_id, service_description_condition in optimized_ruleset:
-            if match_object.service_description is None:
-                continue
-
-            if match_object.host_name not in hosts:
-                continue
+        if match_object.service_description is None:
+            return
 
+        candidates = optimized_ruleset.candidates(match_object.host_name,
+                                                  match_object.service_description)
+        for value, _hosts, service_labels_condition, service_labels_condition_cache_id, service_description_condition in candidates:
             service_cache_id = (match_object.service_cache_id, service_description_condition,
                                 service_labels_condition_cache_id)
 
@@ -369,7 +380,7 @@ class RulesetOptimizer:
         return host_values
 
     def get_service_ruleset(self, ruleset: Ruleset, with_foreign_hosts: bool,
-                            is_binary: bool) -> PreprocessedServiceRuleset:
+                            is_binary: bool) -> 'ServiceRulesetIndex':
         cache_id = id(ruleset), with_foreign_hosts
 
         if cache_id in self._service_ruleset_cache:
@@ -382,8 +393,8 @@ class RulesetOptimizer:
         return cached_ruleset
 
     def _convert_service_ruleset(self, ruleset: Ruleset, with_foreign_hosts: bool,
-                                 is_binary: bool) -> PreprocessedServiceRuleset:
-        new_rules: PreprocessedServiceRuleset = []
+                                 is_binary: bool) -> 'ServiceRulesetIndex':
+        index = ServiceRulesetIndex()
         for rule in ruleset:
             if "options" in rule and "disabled" in rule["options"]:
                 continue
@@ -399,10 +410,13 @@ class RulesetOptimizer:
                 for label_id, label_spec in service_labels_condition.items())
 
             # And now preprocess the configured patterns in the servlist
-            new_rules.append(
+            service_description_condition = rule["condition"].get("service_description")
+            index.add(
                 (rule["value"], hosts, service_labels_condition, service_labels_condition_cache_id,
-                 self._convert_pattern_list(rule["condition"].get("service_description"))))
-        return new_rules
+                 self._convert_pattern_list(service_description_condition)),
+                _literal_prefixes(service_description_condition),
+            )
+        return index
 
     def _convert_pattern_list(self, patterns: List[str]) -> PreprocessedPattern:
         """Compiles a list of service match patterns to a to a single regex
@@ -665,6 +679,161 @@ class RulesetOptimizer:
             self._host_grouped_ref[hostname] = group_ref
 
 
+class ServiceRulesetIndex:
+    """A service ruleset compiled for the lookup of the rules of a service
+
+    The host conditions (host names, tags, labels and folder) of the rules
+    have already been resolved to sets of hosts. Rules with the same host
+    conditions share the same set, so the rules of a host are determined once
+    per distinct set and host.
+
+    The service description patterns are matched from the start of the
+    description. The literal prefixes of all patterns are combined in one
+    automaton which finds the rules whose patterns may match a description in
+    a single pass. Only these rules (and the negated ones) are left for the
+    regex and label matching.
+    """
+    def __init__(self) -> None:
+        super(ServiceRulesetIndex, self).__init__()
+        self.rules: PreprocessedServiceRuleset = []
+        self._negated: List[bool] = []
+        # id of the host set -> the host set and the rules using it
+        self._host_conditions: Dict[int, Tuple[Set[HostName], List[int]]] = {}
+        self._rules_of_host: Dict[Optional[HostName], List[int]] = {}
+        self._prefixes = _PrefixAutomaton()
+
+    def add(self, rule: PreprocessedServiceRule, prefixes: List[str]) -> None:
+        """Append a rule, prefixes are the literal prefixes of its patterns"""
+        rule_id = len(self.rules)
+        self.rules.append(rule)
+        self._negated.append(rule[4][0])
+        hosts = rule[1]
+        self._host_conditions.setdefault(id(hosts), (hosts, []))[1].append(rule_id)
+        for prefix in prefixes:
+            self._prefixes.add(prefix, rule_id)
+        self._rules_of_host.clear()
+
+    def rules_of_host(self, hostname: Optional[HostName]) -> List[int]:
+        """The ids of the rules matching the host in the order of the ruleset"""
+        try:
+            return self._rules_of_host[hostname]
+        except KeyError:
+            pass
+
+        rule_ids: List[int] = []
+        for hosts, condition_rule_ids in self._host_conditions.values():
+            if hostname in hosts:
+                rule_ids.extend(condition_rule_ids)
+        rule_ids.sort()
+        self._rules_of_host[hostname] = rule_ids
+        return rule_ids
+
+    def candidates(self, hostname: Optional[HostName],
+                   service_description: ServiceName) -> Iterator[PreprocessedServiceRule]:
+        """The rules that may match the service, in the order of the ruleset"""
+        rule_ids = self.rules_of_host(hostname)
+        if not rule_ids:
+            return
+
+        prefixed = self._prefixes.matches(service_description)
+        for rule_id in rule_ids:
+            if rule_id in prefixed or self._negated[rule_id]:
+                yield self.rules[rule_id]
+
+
+class _PrefixAutomaton:
+    """Finds the values of all added prefixes of a text
+
+    A trie over the characters of the prefixes, the values of a prefix are
+    stored in its node under the key None.
+    """
+    def __init__(self) -> None:
+        super(_PrefixAutomaton, self).__init__()
+        self._root: Dict[Optional[str], Any] = {}
+
+    def add(self, prefix: str, value: int) -> None:
+        node = self._root
+        for char in prefix:
+            node = node.setdefault(char, {})
+        node.setdefault(None, []).append(value)
+
+    def matches(self, text: str) -> Set[int]:
+        node = self._root
+        found = set(node.get(None, ()))
+        for char in text:
+            node = node.get(char)
+            if node is None:
+                break
+            found.update(node.get(None, ()))
+        return found
+
+
+def _literal_prefixes(patterns: Optional[List]) -> List[str]:
+    """The literal prefixes of the service description patterns of a rule
+
+    Every description matched by one of the patterns starts with one of the
+    prefixes. The prefix may be empty when it can not be determined.
+    """
+    if not patterns:
+        return [""]  # Match everything
+
+    _negate, patterns = parse_negated_condition_list(patterns)
+    return [_literal_prefix(p["$regex"] if isinstance(p, dict) else p) for p in patterns]
+
+
+def _literal_prefix(pattern: str) -> str:
+    if _may_not_be_prefixed(pattern):
+        return ""
+
+    prefix: List[str] = []
+    pos = 1 if pattern.startswith("^") else 0
+    while pos < len(pattern):
+        char = pattern[pos]
+        if char == "\\":
+            if pos + 1 >= len(pattern) or pattern[pos + 1].isalnum():
+                break  # a character class like \d or a back reference
+            char = pattern[pos + 1]
+            pos += 2
+        elif char in ".^$*+?{}[]|()":
+            break
+        else:
+            pos += 1
+
+        if pos < len(pattern) and pattern[pos] in "*?{":
+            break  # the character is optional
+        prefix.append(char)
+    return "".join(prefix)
+
+
+def _may_not_be_prefixed(pattern: str) -> bool:
+    """Whether the pattern contains alternatives on the top level or inline flags"""
+    depth = 0
+    pos = 0
+    while pos < len(pattern):
+        char = pattern[pos]
+        if char == "\\":
+            pos += 1
+        elif char == "[":
+            # Skip the character set, a leading "]" is part of the set
+            pos += 1
+            if pattern.startswith("^", pos):
+                pos += 1
+            if pattern.startswith("]", pos):
+                pos += 1
+            while pos < len(pattern) and pattern[pos] != "]":
+                pos += 2 if pattern[pos] == "\\" else 1
+        elif char == "(":
+            if pattern.startswith("(?", pos) and pattern[pos + 2:pos + 3] in tuple("aiLmsux"):
+                return True
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "|" and depth == 0:
+            return True
+        pos += 1
+    return False
+
+
 def _tags_or_labels_cache_id(tag_or_label_spec):
     if isinstance(tag_or_label_spec, dict):
         if "$ne" in tag_or_label_spec:
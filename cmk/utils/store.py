@@ -7,16 +7,23 @@
 functionality is the locked file opening realized with the File() context
 manager."""
 
+import abc
 import ast
+from collections import OrderedDict
 from contextlib import contextmanager
 import errno
 import fcntl
+import gc
 import logging
+import marshal
 import os
 from pathlib import Path
 import pprint
 import tempfile
-from typing import Any, Union, Dict, Iterator, Optional, AnyStr, cast
+import threading
+import time
+from types import CodeType
+from typing import Any, Union, Dict, Iterator, Optional, AnyStr, Tuple, cast
 
 from six import ensure_binary
 
@@ -121,8 +128,11 @@ def load_mk_file(path: Union[Path, str], default: Any = None, lock: bool = False
 
     try:
         try:
-            with path.open(mode="rb") as f:
-                exec(f.read(), globals(), default)
+            if _file_cache is None:
+                with path.open(mode="rb") as f:
+                    exec(f.read(), globals(), default)
+            else:
+                exec(_compile_mk_file_through_file_cache(_file_cache, path), globals(), default)
         except IOError as e:
             if e.errno != errno.ENOENT:  # No such file or directory
                 raise
@@ -180,14 +190,88 @@ def save_to_mk_file(path: Union[Path, str],
 #   '----------------------------------------------------------------------'
 
 
+class ObjectCodec(abc.ABC):
+    """Serializes the python data structures of the object files
+
+    Files written with a codec start with its header byte, by which
+    load_object_from_file() detects the codec to read them with. Files without
+    the header of a registered codec are read as repr() of the data, which is
+    what save_object_to_file() writes by default."""
+    header: bytes
+
+    @abc.abstractmethod
+    def dumps(self, data: Any) -> bytes:
+        raise NotImplementedError()
+
+    @abc.abstractmethod
+    def loads(self, raw: bytes) -> Any:
+        raise NotImplementedError()
+
+
+class MarshalCodec(ObjectCodec):
+    """A fast binary format for plain data
+
+    Supported are None, bool, int, float, str, bytes, tuple, list, set,
+    frozenset and dict (but not their subclasses). The marshal format version is
+    fixed, so the files can be read by all Python versions of Checkmk."""
+    header = b"\x01"
+    _VERSION = 4
+
+    def dumps(self, data: Any) -> bytes:
+        return marshal.dumps(data, self._VERSION)
+
+    def loads(self, raw: bytes) -> Any:
+        # Creating the objects of large files triggers the garbage collector over
+        # and over again, although none of them can be garbage
+        was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            return marshal.loads(raw)
+        finally:
+            if was_enabled:
+                gc.enable()
+
+
+MARSHAL_CODEC = MarshalCodec()
+
+_object_codecs: Dict[bytes, ObjectCodec] = {}
+
+
+def register_object_codec(codec: ObjectCodec) -> None:
+    # The header must not be a character repr() can start with
+    if len(codec.header) != 1 or codec.header >= b" ":
+        raise ValueError("Invalid header of object codec: %r" % codec.header)
+    _object_codecs[codec.header] = codec
+
+
+register_object_codec(MARSHAL_CODEC)
+
+
 # Handle .mk files that are only holding a python data structure and often
 # directly read via file/open and then parsed using eval.
 # TODO: Consolidate with load_mk_file?
 def load_object_from_file(path: Union[Path, str], default: Any = None, lock: bool = False) -> Any:
-    content = cast(str, _load_data_from_file(path, lock=lock, encoding="utf-8"))
+    if _file_cache is not None:
+        return _load_object_through_file_cache(_file_cache, path, default, lock)
+
+    content = cast(bytes, _load_data_from_file(path, lock=lock))
     if not content:
         return default
-    return ast.literal_eval(content)
+
+    codec = _object_codecs.get(content[:1])
+    if codec is not None:
+        return codec.loads(content[1:])
+
+    return ast.literal_eval(_decode_object_file(path, content, lock))
+
+
+def _decode_object_file(path: Union[Path, str], content: bytes, lock: bool) -> str:
+    try:
+        return content.decode("utf-8")
+    except UnicodeDecodeError as e:
+        if lock:
+            release_lock(path)
+        raise MKGeneralException(_("Cannot read file \"%s\": %s") % (path, e))
 
 
 def load_text_from_file(path: Union[Path, str], default: str = u"", lock: bool = False) -> str:
@@ -239,8 +323,16 @@ def _load_data_from_file(path: Union[Path, str],
 
 
 # A simple wrapper for cases where you want to store a python data
-# structure that is then read by load_data_from_file() again
-def save_object_to_file(path: Union[Path, str], data: Any, pretty: bool = False) -> None:
+# structure that is then read by load_data_from_file() again. With a codec, the
+# data is saved in its format instead of as (human readable) repr().
+def save_object_to_file(path: Union[Path, str],
+                        data: Any,
+                        pretty: bool = False,
+                        codec: Optional[ObjectCodec] = None) -> None:
+    if codec is not None:
+        _save_data_to_file(path, codec.header + codec.dumps(data))
+        return
+
     if pretty:
         try:
             formatted_data = pprint.pformat(data)
@@ -341,6 +433,185 @@ def _save_data_to_file(path: Union[Path, str], content: bytes, mode: int = 0o660
         release_lock(path)
 
 
+#.
+#   .--File cache----------------------------------------------------------.
+#   |              _____ _ _                       _                       |
+#   |             |  ___(_) | ___    ___ __ _  ___| |__   ___              |
+#   |             | |_  | | |/ _ \  / __/ _` |/ __| '_ \ / _ \             |
+#   |             |  _| | | |  __/ | (_| (_| | (__| | | |  __/             |
+#   |             |_|   |_|_|\___|  \___\__,_|\___|_| |_|\___|             |
+#   |                                                                      |
+#   +----------------------------------------------------------------------+
+#   | Long-lived processes load the same unchanged files over and over     |
+#   | again. They can enable a cache for load_object_from_file() and       |
+#   | load_mk_file(), which keeps what has been parsed from the files.     |
+#   '----------------------------------------------------------------------'
+
+# The modification time (in ns), size and inode of a file
+FileSignature = Tuple[int, int, int]
+# A file changed less than this number of seconds before its signature has been
+# taken may change again without changing its signature, see reliable_file_signature().
+# File systems with timestamps finer than seconds take them from the kernel clock,
+# which ticks at least every 10 ms.
+_RACY_SECONDS = 2.0
+_RACY_SECONDS_FINE_TIMESTAMPS = 0.1
+# The kind of the cached content and the path of the file
+_FileCacheKey = Tuple[str, str]
+
+
+class FileCache:
+    """Keeps the parsed content of files as long as the files are unchanged
+
+    A file is regarded as unchanged as long as its signature (modification
+    time, size and inode) is. Files are only cached once their signature can
+    be relied on, see reliable_file_signature(): A file replaced twice within
+    one timestamp tick may get the same size and the freed inode again. The
+    cache is thread safe and bounded by the total size of the cached files,
+    the least recently used entries are evicted beyond it. The cached content
+    must not be modified by the users of the cache, it is shared between them."""
+    def __init__(self, max_size: int) -> None:
+        super(FileCache, self).__init__()
+        self.max_size = max_size
+        self._entries: 'OrderedDict[_FileCacheKey, Tuple[FileSignature, Any, int]]' = OrderedDict()
+        self._size = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: _FileCacheKey, signature: Optional[FileSignature]) -> Any:
+        """Returns the cached content of the file or None if it is not cached or has changed"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != signature:
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry[1]
+
+    def add(self, key: _FileCacheKey, signature: FileSignature, content: Any, size: int) -> None:
+        with self._lock:
+            former_entry = self._entries.pop(key, None)
+            if former_entry is not None:
+                self._size -= former_entry[2]
+
+            if size > self.max_size:
+                return
+
+            self._entries[key] = (signature, content, size)
+            self._size += size
+            while self._size > self.max_size:
+                _evicted_key, (_signature, _content,
+                               evicted_size) = self._entries.popitem(last=False)
+                self._size -= evicted_size
+                self._evictions += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "entries": len(self._entries),
+                "size": self._size,
+            }
+
+
+_file_cache: Optional[FileCache] = None
+
+
+def enable_file_cache(max_size: int = 32 * 1024 * 1024) -> None:
+    """Enables the file cache of load_object_from_file() and load_mk_file() for this process
+
+    The size is the total size of the cached files in bytes."""
+    global _file_cache
+    _file_cache = FileCache(max_size)
+
+
+def disable_file_cache() -> None:
+    global _file_cache
+    _file_cache = None
+
+
+def file_cache_stats() -> Optional[Dict[str, int]]:
+    """Returns the hits, misses and evictions of the file cache, None if it is not enabled"""
+    if _file_cache is None:
+        return None
+    return _file_cache.stats()
+
+
+def file_signature(path: Union[Path, str]) -> Optional[FileSignature]:
+    """Returns the signature of the file (or directory), None if it does not exist"""
+    try:
+        stat = os.stat(str(path))
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+
+def reliable_file_signature(path: Union[Path, str]) -> Tuple[bool, Optional[FileSignature]]:
+    """Returns whether or not the signature can be relied on and the signature
+
+    Timestamps are not exact enough to tell changes within a short time apart: A
+    file changed shortly before may change again without changing its signature.
+    The signature has to be taken before the file is read. What has been read
+    along with a signature which can not be relied on must not be kept, the file
+    has to be read again the next time."""
+    now = time.time()
+    signature = file_signature(path)
+    if signature is None:
+        return True, None
+    mtime_ns = signature[0]
+    racy_seconds = _RACY_SECONDS_FINE_TIMESTAMPS if mtime_ns % 1000000000 else _RACY_SECONDS
+    return now - mtime_ns / 1e9 > racy_seconds, signature
+
+
+def _load_object_through_file_cache(cache: FileCache, path: Union[Path, str], default: Any,
+                                    lock: bool) -> Any:
+    if lock:
+        aquire_lock(path)
+
+    # The signature is taken before reading the file: A file changing in between is cached with
+    # the outdated signature and simply read again the next time.
+    key = ("object", str(path))
+    reliable, signature = reliable_file_signature(path)
+    cached = cache.get(key, signature)
+    if cached is None:
+        content = cast(bytes, _load_data_from_file(path, lock=lock))
+        if not content:
+            return default
+
+        codec = _object_codecs.get(content[:1])
+        if codec is not None:
+            cached = codec, content[1:]
+        else:
+            # The data structures of repr() files are cached marshalled: Unmarshalling is fast
+            # and every caller gets its own copy, which it is free to modify.
+            cached = MARSHAL_CODEC, MARSHAL_CODEC.dumps(
+                ast.literal_eval(_decode_object_file(path, content, lock)))
+
+        if reliable and signature is not None:
+            cache.add(key, signature, cached, len(content))
+
+    codec, raw = cached
+    return codec.loads(raw)
+
+
+def _compile_mk_file_through_file_cache(cache: FileCache, path: Path) -> CodeType:
+    # Code objects are immutable, the result of load_mk_file() is created by executing it
+    key = ("mk", str(path))
+    reliable, signature = reliable_file_signature(path)
+    code = cache.get(key, signature)
+    if code is None:
+        with path.open(mode="rb") as f:
+            content = f.read()
+        code = compile(content, "<string>", "exec")
+        if reliable and signature is not None:
+            cache.add(key, signature, code, len(content))
+    return code
+
+
 #.
 #   .--File locking--------------------------------------------------------.
 #   |          _____ _ _        _            _    _                        |
@@ -9,9 +9,12 @@ structured monitoring data of Check_MK.
 """
 
 import gzip
+import marshal
+import os
 import re
 import pprint
-from typing import AnyStr, Dict, List, Optional
+import struct
+from typing import AnyStr, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
 
 from six import ensure_binary, ensure_str
 
@@ -112,11 +115,20 @@ class StructuredDataTree:
         # TODO: Can be set to encoding="utf-8" once we are on Python 3 only
         with gzip.open(filepath + ".gz", "wb") as f:
             f.write(ensure_binary(repr(output) + "\n"))
+        _save_binary_tree(filepath, output)
         # Inform Livestatus about the latest inventory update
         store.save_text_to_file("%s/.last" % path, u"")
 
-    def load_from(self, filepath):
-        raw_tree = store.load_object_from_file(filepath)
+    def load_from(self, filepath, tree_paths=None):
+        """Loads the tree saved by save_to()
+
+        With tree_paths (lists of edges, like the paths of get_sub_container())
+        only the subtrees of these paths are loaded."""
+        raw_tree = _load_binary_tree(filepath, tree_paths)
+        if raw_tree is None:
+            raw_tree = store.load_object_from_file(filepath)
+            if raw_tree and tree_paths is not None:
+                raw_tree = _get_raw_subtrees(raw_tree, tree_paths)
         return self.create_tree_from_raw_tree(raw_tree)
 
     def create_tree_from_raw_tree(self, raw_tree):
@@ -1011,3 +1023,137 @@ def _changed_delta_tree_node(old_value, new_value):
 
 def _identical_delta_tree_node(value):
     return (value, value)
+
+
+#   ---binary tree file-----------------------------------------------------
+
+# Next to the tree file (the repr()'d raw tree, which is also what Livestatus
+# hands out) save_to() writes a binary tree file which can be read partially:
+#
+#     header: magic (including the version of the format), size and mtime of
+#             the tree file written along with it, length of the index
+#     index:  marshalled list of (path, offset, length, is_list), one entry
+#             per dict and per list of the raw tree in depth first order
+#     chunks: the marshalled scalar values of a dict or the complete list
+#
+# The chunks of a subtree follow each other and are read in one go. The binary
+# tree file is only used as long as its tree file has not been replaced (e.g.
+# by a former version), otherwise the tree file is read.
+
+_BINARY_TREE_MAGIC = b"CMKINV\x00\x01"
+_BINARY_TREE_HEADER = struct.Struct(">8sQqI")
+
+_RawTreePath = Tuple
+_IndexEntry = Tuple[_RawTreePath, int, int, bool]
+
+
+def binary_tree_filepath(filepath: str) -> str:
+    return filepath + ".bin"
+
+
+def _raw_tree_chunks(raw_tree: Dict, path: _RawTreePath) -> Iterator[Tuple[_RawTreePath, Dict]]:
+    yield path, {k: v for k, v in raw_tree.items() if not isinstance(v, (dict, list))}
+    for edge, value in raw_tree.items():
+        if isinstance(value, dict):
+            yield from _raw_tree_chunks(value, path + (edge,))
+        elif isinstance(value, list):
+            yield path + (edge,), value
+
+
+def _is_needed(chunk_path: _RawTreePath, is_list: bool,
+               tree_paths: Optional[Sequence[_RawTreePath]]) -> bool:
+    """Whether the chunk is part of the subtree of one of the paths
+
+    A path may point into a list (nested numerations), which is one chunk."""
+    if tree_paths is None:
+        return True
+    for path in tree_paths:
+        if chunk_path[:len(path)] == path:
+            return True
+        if is_list and path[:len(chunk_path)] == chunk_path:
+            return True
+    return False
+
+
+def _add_chunk(raw_tree: Dict, path: _RawTreePath, chunk: Dict) -> None:
+    node = raw_tree
+    for edge in path[:-1]:
+        node = node.setdefault(edge, {})
+    if isinstance(chunk, list):
+        node[path[-1]] = chunk
+    elif path:
+        node.setdefault(path[-1], {}).update(chunk)
+    else:
+        node.update(chunk)
+
+
+def _get_raw_subtrees(raw_tree: Dict, tree_paths: Iterable[Sequence]) -> Dict:
+    paths = [tuple(path) for path in tree_paths]
+    subtrees: Dict = {}
+    for path, chunk in _raw_tree_chunks(raw_tree, ()):
+        if _is_needed(path, isinstance(chunk, list), paths):
+            _add_chunk(subtrees, path, chunk)
+    return subtrees
+
+
+def _save_binary_tree(filepath: str, raw_tree: Dict) -> None:
+    index: List[_IndexEntry] = []
+    chunks: List[bytes] = []
+    offset = 0
+    try:
+        for path, chunk in _raw_tree_chunks(raw_tree, ()):
+            data = marshal.dumps(chunk)
+            index.append((path, offset, len(data), isinstance(chunk, list)))
+            chunks.append(data)
+            offset += len(data)
+        raw_index = marshal.dumps(index)
+    except ValueError:
+        # Values marshal can not handle: Only the tree file can be used
+        if os.path.exists(binary_tree_filepath(filepath)):
+            os.remove(binary_tree_filepath(filepath))
+        return
+
+    stat = os.stat(filepath)
+    header = _BINARY_TREE_HEADER.pack(_BINARY_TREE_MAGIC, stat.st_size, int(stat.st_mtime),
+                                      len(raw_index))
+    store.save_bytes_to_file(binary_tree_filepath(filepath), header + raw_index + b"".join(chunks))
+
+
+def _load_binary_tree(filepath: str, tree_paths: Optional[Iterable[Sequence]]) -> Optional[Dict]:
+    """Returns the raw tree (or the subtrees of the paths), None without usable binary tree file"""
+    try:
+        stat = os.stat(filepath)
+        with open(binary_tree_filepath(filepath), "rb") as f:
+            header = f.read(_BINARY_TREE_HEADER.size)
+            if len(header) < _BINARY_TREE_HEADER.size:
+                return None
+            magic, size, mtime, index_length = _BINARY_TREE_HEADER.unpack(header)
+            if magic != _BINARY_TREE_MAGIC or (size, mtime) != (stat.st_size, int(stat.st_mtime)):
+                return None
+            index: List[_IndexEntry] = marshal.loads(f.read(index_length))
+
+            paths = None if tree_paths is None else [tuple(path) for path in tree_paths]
+            needed = [_is_needed(path, is_list, paths) for path, _o, _l, is_list in index]
+            raw_tree: Dict = {}
+            start = 0
+            while start < len(index):
+                if not needed[start]:
+                    start += 1
+                    continue
+                end = start
+                while end < len(index) and needed[end]:
+                    end += 1
+                # Read the chunks of a subtree at once
+                run_offset = index[start][1]
+                f.seek(_BINARY_TREE_HEADER.size + index_length + run_offset)
+                data = memoryview(f.read(index[end - 1][1] + index[end - 1][2] - run_offset))
+                for path, offset, length, _is_list in index[start:end]:
+                    chunk_start = offset - run_offset
+                    _add_chunk(raw_tree, path,
+                               marshal.loads(data[chunk_start:chunk_start + length]))
+                start = end
+    except FileNotFoundError:
+        return None
+    except (EOFError, ValueError, TypeError, struct.error):
+        return None  # Broken binary tree file, e.g. after a crash
+    return raw_tree
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright (C) 2019 tribe29 GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""Benchmark opening and cancelling events of the Event Console
+
+The event status is filled with the given numbers of open events, spread over
+many hosts and rules. Then pairs of messages are fed in: The first one opens
+an event (after the event limits have been checked the way the event server
+does it), the second one cancels it again. The rate of pairs should not
+depend on the number of events that are already open.
+
+Usage: PYTHONPATH=. doc/benchmark/ec_event_status.py [--open N,N,...] [--pairs N]
+"""
+
+import argparse
+import logging
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import cmk.ec.export as ec
+from cmk.ec.history import History
+from cmk.ec.main import EventStatus, Perfcounters, StatusTableEvents, StatusTableHistory
+
+logger = logging.getLogger("cmk.mkeventd")
+
+
+def _event(host, rule_id, text):
+    now = time.time()
+    return {
+        "host": host,
+        "core_host": host,
+        "rule_id": rule_id,
+        "application": "app",
+        "text": text,
+        "phase": "open",
+        "state": 2,
+        "priority": 3,
+        "facility": 1,
+        "time": now,
+        "first": now,
+        "last": now,
+        "match_groups": (),
+        "host_in_downtime": False,
+    }
+
+
+def _open(event_status, event):
+    # The limit checks of EventServer.new_event_respecting_limits
+    with event_status.lock:
+        for ty in ["overall", "by_host", "by_rule"]:
+            event_status.get_num_existing_events_by(ty, event)
+        event_status.new_event(event)
+
+
+def _feed_pairs(event_status, pairs, hosts, rules):
+    for nr in range(pairs):
+        host = "pair-host%05d" % (nr % hosts)
+        rule = rules[nr % len(rules)]
+        _open(event_status, _event(host, rule["id"], "Link down %d" % nr))
+        event_status.cancel_events(None, StatusTableEvents.columns,
+                                   _event(host, rule["id"], "Link up %d" % nr), {
+                                       "match_groups_message": (),
+                                       "match_groups_message_ok": ()
+                                   }, rule)
+
+
+def _measure(function):
+    start = time.perf_counter()
+    result = function()
+    return time.perf_counter() - start, result
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--open",
+                        default="1000,10000,100000,200000",
+                        help="comma separated numbers of already open events")
+    parser.add_argument("--pairs", type=int, default=2000)
+    parser.add_argument("--hosts", type=int, default=5000)
+    parser.add_argument("--rules", type=int, default=50)
+    args = parser.parse_args(argv)
+
+    random.seed(42)
+    rules = [{"id": "rule%d" % nr} for nr in range(args.rules)]
+    config = ec.default_config()
+    config["debug_rules"] = False
+    for num_open in [int(number) for number in args.open.split(",")]:
+        with tempfile.TemporaryDirectory() as directory:
+            settings = ec.settings("1.2.3i45", Path(directory), Path(directory), ["mkeventd"])
+            history = History(settings, config, logger, StatusTableEvents.columns,
+                              StatusTableHistory.columns)
+            event_status = EventStatus(settings, config, Perfcounters(logger), history, logger)
+            for nr in range(num_open):
+                _open(
+                    event_status,
+                    _event("host%05d" % random.randrange(args.hosts),
+                           random.choice(rules)["id"], "Disk full %d" % nr))
+
+            duration, _result = _measure(
+                lambda s=event_status: _feed_pairs(s, args.pairs, args.hosts, rules))
+            assert len(event_status.events()) == num_open
+            print("%7d open events: %8.1f ms for %d pairs, %8.0f pairs/s" %
+                  (num_open, duration * 1000, args.pairs, args.pairs / duration))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
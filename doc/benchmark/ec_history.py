@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright (C) 2019 tribe29 GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""Benchmark the history queries of the Event Console
+
+History files with the given number of entries per day are written the way
+the event console writes them. Typical queries of the GUI are answered once
+via the indexes of the history files and once by piping every file through
+"tac | egrep" and converting the lines (the former way). The first indexed
+query includes building the indexes of all files.
+
+Usage: PYTHONPATH=. doc/benchmark/ec_history.py [--days N] [--entries-per-day N]
+"""
+
+import argparse
+import logging
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import cmk.ec.export as ec
+from cmk.ec.history import History, quote_tab
+from cmk.ec.history import _convert_history_line  # pylint: disable=protected-access
+from cmk.ec.main import StatusTableEvents, StatusTableHistory
+from cmk.ec.query import QueryGET
+
+logger = logging.getLogger("cmk.mkeventd")
+
+WHAT = ["NEW", "NEW", "COUNTREACHED", "ARCHIVED", "DELETE", "AUTODELETE"]
+
+
+class _StatusServer:
+    def __init__(self, history):
+        self._table = StatusTableHistory(logger, history)
+
+    def table(self, name):
+        return self._table
+
+
+def _write_history(history_dir, days, entries_per_day, hosts):
+    history_dir.mkdir(parents=True)
+    start = int(time.time()) // 86400 * 86400 - (days - 1) * 86400
+    event_id = 0
+    for day in range(days):
+        ts = start + day * 86400
+        lines = []
+        for i in range(entries_per_day):
+            event_id += 1
+            entry_time = ts + i * 86400.0 / entries_per_day
+            host = "host%05d" % random.randrange(hosts)
+            event = {
+                "id": event_id // 3,
+                "text": "Interface eth%d on %s changed state to down" % (i % 8, host),
+                "first": entry_time,
+                "last": entry_time,
+                "host": host,
+                "application": random.choice(["kernel", "sshd", "cron", "snmptrapd"]),
+                "rule_id": "rule%d" % random.randrange(200),
+                "priority": 3,
+                "facility": 1,
+                "state": 2,
+                "phase": "open",
+            }
+            columns = [quote_tab(str(entry_time)), quote_tab(random.choice(WHAT)), b"", b""]
+            columns += [
+                quote_tab(event.get(name[6:], default))
+                for name, default in StatusTableEvents.columns
+            ]
+            lines.append(b"\t".join(columns))
+        (history_dir / ("%d.log" % ts)).write_bytes(b"\n".join(lines) + b"\n")
+    return start + days * 86400
+
+
+# The grep optimization of the former implementation, in the order of the fields
+_GREPPING_FILTERS = [
+    'event_id', 'event_text', 'event_comment', 'event_host', 'event_host_regex', 'event_contact',
+    'event_application', 'event_rule_id', 'event_owner', 'event_ipaddress', 'event_core_host'
+]
+
+
+def _former_get(history, history_dir, query):
+    limit = query.limit
+    grep_pairs = sorted((_GREPPING_FILTERS.index(column), str(argument))
+                        for column, operator, _predicate, argument in query.filters
+                        if column in _GREPPING_FILTERS and operator in ['=', '~~'])
+    entries = []
+    for path in sorted(history_dir.glob("*.log"), reverse=True):
+        if limit is not None and limit <= 0:
+            break
+        cmd = "tac '%s'" % path
+        if grep_pairs:
+            cmd += " | egrep -i -e '%s'" % ".*".join(text for _nr, text in grep_pairs)
+        grep = subprocess.Popen(cmd, shell=True, stdout=subprocess.PIPE)  # nosec
+        assert grep.stdout is not None
+        new_entries = []
+        for line_no, line in enumerate(grep.stdout, 1):
+            if limit is not None and len(new_entries) > limit:
+                grep.kill()
+                break
+            parts = line.decode('utf-8').rstrip('\n').split('\t')
+            _convert_history_line(history, parts)
+            values = [line_no] + parts
+            if query.filter_row(values):
+                new_entries.append(values)
+        grep.wait()
+        entries += new_entries
+        if limit is not None:
+            limit -= len(new_entries)
+    return entries
+
+
+def _measure(function):
+    start = time.perf_counter()
+    result = function()
+    return time.perf_counter() - start, result
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--days", type=int, default=7)
+    parser.add_argument("--entries-per-day", type=int, default=200000)
+    parser.add_argument("--hosts", type=int, default=2000)
+    args = parser.parse_args(argv)
+
+    random.seed(42)
+    with tempfile.TemporaryDirectory() as directory:
+        settings = ec.settings("1.2.3i45", Path(directory), Path(directory), ["mkeventd"])
+        history = History(settings, ec.default_config(), logger, StatusTableEvents.columns,
+                          StatusTableHistory.columns)
+        history_dir = settings.paths.history_dir.value
+        end = _write_history(history_dir, args.days, args.entries_per_day, args.hosts)
+        print("%d days with %d entries each" % (args.days, args.entries_per_day))
+
+        queries = [
+            ("host, limit 1000", ["Filter: event_host = host00042", "Limit: 1000"]),
+            ("host regex", ["Filter: event_host ~~ host0004[0-9]"]),
+            ("host and rule id",
+             ["Filter: event_host = host00042", "Filter: event_rule_id = rule7"]),
+            ("event id", ["Filter: event_id = %d" % (args.entries_per_day // 6)]),
+            ("last hour, limit 1000", ["Filter: history_time >= %d" % (end - 3600), "Limit: 1000"]),
+            ("no filter, limit 1000", ["Limit: 1000"]),
+        ]
+        for nr, (title, headers) in enumerate(queries):
+            query = QueryGET(_StatusServer(history), ["GET history"] + headers, logger)
+            indexed_get = lambda q=query: list(history.get(q))
+            duration, indexed = _measure(indexed_get)
+            print("  %-22s indexed %8.1f ms%s" %
+                  (title, duration * 1000, " (building the indexes)" if nr == 0 else ""))
+            if nr == 0:
+                duration, indexed = _measure(indexed_get)
+                print("  %-22s indexed %8.1f ms" % (title, duration * 1000))
+            duration, former = _measure(lambda q=query: _former_get(history, history_dir, q))
+            print("  %-22s former  %8.1f ms  (%d rows)" % (title, duration * 1000, len(former)))
+            assert [row[1:] for row in indexed] == [row[1:] for row in former[:len(indexed)]]
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright (C) 2019 tribe29 GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""Benchmark the rule matching of the Event Console
+
+The syslog messages of a recorded message file (one message per line, the
+way the EC receives them) are replayed against a synthetic rule set. Every
+message is matched once against the candidates of the RuleIndex and once
+against all rules of its syslog facility and priority (the former rule
+optimizer). Without a message file, messages are generated and can be
+written with --record for later replays.
+
+Usage: PYTHONPATH=. doc/benchmark/ec_rule_matching.py [--messages FILE] [--record FILE] [--rules N]
+"""
+
+import argparse
+import logging
+import random
+import sys
+import time
+
+import cmk.ec.export as ec
+from cmk.ec.main import EventCreator, EventServer, RuleMatcher
+from cmk.ec.rule_index import RuleIndex
+
+APPLICATIONS = ["sshd", "CRON", "kernel", "postfix/smtpd", "systemd", "nginx"]
+MESSAGES = [
+    "Accepted publickey for user%d from 10.0.%d.1 port 22",
+    "Failed password for invalid user admin%d from 10.1.%d.7",
+    "sd%d: I/O error, dev sdb, sector %d",
+    "Out of memory: Killed process %d (java%d)",
+    "connect from unknown[192.168.%d.%d]",
+    "Started Session %d of user monitoring%d.",
+    "upstream timed out (110: Connection timed out) while reading response header %d/%d",
+]
+
+
+def _rules(count):
+    rules = []
+    for i in range(count):
+        rule = {"id": "rule%d" % i, "pack": "pack%d" % (i // 100), "state": 1}
+        kind = i % 5
+        if kind == 0:
+            rule["match"] = "Failed password for invalid user admin%d " % i
+        elif kind == 1:
+            rule["match"] = "^Out of memory: Killed process [0-9]+ \\(java%d\\)$" % i
+        elif kind == 2:
+            rule["match_host"] = "host%04d" % i
+        elif kind == 3:
+            rule["match"] = "I/O error, dev sd[a-z], sector %d$" % i
+            rule["match_application"] = "kernel"
+        else:
+            rule["match"] = "(upstream|downstream) timed out .* header %d/" % i
+        for key in ["match", "match_host", "match_application"]:
+            if key in rule:
+                rule[key] = EventServer._compile_matching_value(key, rule[key])  # pylint: disable=protected-access
+        rules.append(rule)
+    return rules
+
+
+def _generate_messages(count, rule_count):
+    lines = []
+    for i in range(count):
+        message = random.choice(MESSAGES) % (random.randrange(rule_count), i % 256)
+        lines.append("<%d>Oct 18 12:00:%02d host%04d %s[%d]: %s" %
+                     (random.choice([11, 12, 13, 14, 30]), i % 60, random.randrange(rule_count),
+                      random.choice(APPLICATIONS), 1000 + i, message))
+    return lines
+
+
+def _first_hits(matcher, events, candidates_of):
+    """The id of the first rule matching each event"""
+    hits = []
+    for event in events:
+        hit = None
+        for rule in candidates_of(event):
+            if matcher.event_rule_matches_non_inverted(rule, event) is not False:
+                hit = rule["id"]
+                break
+        hits.append(hit)
+    return hits
+
+
+def _measure(function):
+    start = time.perf_counter()
+    result = function()
+    return time.perf_counter() - start, result
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--messages", help="replay the syslog messages of this file")
+    parser.add_argument("--record", help="write the generated messages to this file")
+    parser.add_argument("--count", type=int, default=5000, help="number of generated messages")
+    parser.add_argument("--rules", type=int, default=2000)
+    args = parser.parse_args(argv)
+
+    random.seed(42)
+    logger = logging.getLogger("cmk.mkeventd")
+    config = ec.default_config()
+    config["debug_rules"] = False
+
+    if args.messages:
+        with open(args.messages, encoding="utf-8", errors="replace") as messages:
+            lines = messages.read().splitlines()
+    else:
+        lines = _generate_messages(args.count, args.rules)
+        if args.record:
+            with open(args.record, "w", encoding="utf-8") as record:
+                record.write("\n".join(lines) + "\n")
+
+    event_creator = EventCreator(logger, config)
+    events = [event_creator.create_event_from_line(line, ("127.0.0.1", 514)) for line in lines]
+    rules = _rules(args.rules)
+    # None of the synthetic rules has a facility or priority condition
+    rule_hash = {facility: {prio: rules for prio in range(8)} for facility in range(32)}
+    matcher = RuleMatcher(logger, config)
+
+    duration, index = _measure(lambda: RuleIndex(rules, rule_hash))
+    print("%d messages, %d rules" % (len(events), len(rules)))
+    print("  compile index    %8.1f ms" % (duration * 1000))
+
+    duration, candidates = _measure(lambda: [index.candidates(event) for event in events])
+    print("  candidates       %8.1f ms  %.1f rules per message" %
+          (duration * 1000, sum(map(len, candidates)) / max(len(events), 1)))
+
+    duration, indexed = _measure(lambda: _first_hits(matcher, events, index.candidates))
+    print("  indexed matching %8.1f ms  %8.0f messages/s" %
+          (duration * 1000, len(events) / duration))
+
+    duration, hashed = _measure(lambda: _first_hits(
+        matcher, events, lambda event: rule_hash[event["facility"]][event["priority"]]))
+    print("  hashed matching  %8.1f ms  %8.0f messages/s" %
+          (duration * 1000, len(events) / duration))
+
+    assert indexed == hashed
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright (C) 2019 tribe29 GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""Benchmark saving and loading the event status of the Event Console
+
+For every given number of open events the status is saved and loaded once
+the former way (repr() and ast.literal_eval() of the complete status) and
+once via snapshot and journal: A snapshot is written, then a number of saves
+each append the changes of some events, finally the status is recovered from
+snapshot and journal.
+
+ast.literal_eval() needs about 100 times the size of the status file in
+memory, so the former load is only measured up to --former-max events.
+
+Usage: PYTHONPATH=. doc/benchmark/ec_status_persistence.py [--events N,N,...] [--changes N]
+       [--former-max N]
+"""
+
+import argparse
+import ast
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import cmk.ec.export as ec
+from cmk.ec.history import History
+from cmk.ec.main import EventStatus, Perfcounters, StatusTableEvents, StatusTableHistory
+
+logger = logging.getLogger("cmk.mkeventd")
+
+
+def _event(nr):
+    now = time.time()
+    host = "host%05d" % random.randrange(20000)
+    event = {name[6:]: default for name, default in StatusTableEvents.columns}
+    event.update({
+        "host": host,
+        "core_host": host,
+        "ipaddress": "10.0.%d.%d" % (nr // 256 % 256, nr % 256),
+        "rule_id": "rule%d" % random.randrange(500),
+        "text": "Interface eth%d changed state to down (%d)" % (nr % 8, nr),
+        "application": random.choice(["kernel", "sshd", "cron", "snmptrapd"]),
+        "phase": "open",
+        "time": now,
+        "first": now,
+        "last": now,
+        "match_groups": ("eth%d" % (nr % 8),),
+        "match_groups_syslog_application": (),
+        "contact_groups": None,
+        "contact_groups_notify": False,
+        "host_in_downtime": False,
+    })
+    del event["id"]
+    return event
+
+
+def _former_save(path, status):
+    path_new = path.parent / (path.name + '.new')
+    with path_new.open(mode='wb') as f:
+        f.write((repr(status) + "\n").encode("utf-8"))
+        f.flush()
+        os.fsync(f.fileno())
+    path_new.rename(path)
+
+
+def _change(event_status, changes):
+    """Changes, deletes and creates some events, the way the event console does"""
+    events = event_status.events()
+    for event in random.sample(events, min(changes, len(events))):
+        if random.random() < 0.2:
+            event_status.remove_event(event)
+            event_status.new_event(_event(random.randrange(1000000)))
+        else:
+            event["phase"] = "ack"
+            event["comment"] = "Ticket %d" % random.randrange(100000)
+            event_status.event_changed(event)
+
+
+def _measure(function):
+    start = time.perf_counter()
+    result = function()
+    return time.perf_counter() - start, result
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--events", default="20000,100000,1000000", help="comma separated numbers")
+    parser.add_argument("--changes", type=int, default=1000, help="changed events per save")
+    parser.add_argument("--saves", type=int, default=10, help="saves after the snapshot")
+    parser.add_argument("--former-max", type=int, default=20000)
+    args = parser.parse_args(argv)
+
+    random.seed(42)
+    config = ec.default_config()
+    for num_events in [int(number) for number in args.events.split(",")]:
+        with tempfile.TemporaryDirectory() as directory:
+            settings = ec.settings("1.2.3i45", Path(directory), Path(directory), ["mkeventd"])
+            path = settings.paths.status_file.value
+            path.parent.mkdir(parents=True)
+            history = History(settings, config, logger, StatusTableEvents.columns,
+                              StatusTableHistory.columns)
+            event_status = EventStatus(settings, config, Perfcounters(logger), history, logger)
+            for nr in range(num_events):
+                event_status.new_event(_event(nr))
+            print("%d events" % num_events)
+
+            status = event_status.pack_status()
+            duration, _result = _measure(lambda s=status: _former_save(path, s))
+            print("  former save         %9.1f ms  %6.1f MB" %
+                  (duration * 1000, path.stat().st_size / 1e6))
+            del status
+            if num_events <= args.former_max:
+                duration, _result = _measure(
+                    lambda: ast.literal_eval(path.read_text(encoding="utf-8")))
+                print("  former load         %9.1f ms" % (duration * 1000))
+            else:
+                print("  former load         skipped (see --former-max)")
+            path.unlink()
+
+            duration, _result = _measure(event_status.save_status)
+            print("  snapshot save       %9.1f ms  %6.1f MB" %
+                  (duration * 1000, path.stat().st_size / 1e6))
+            total = 0.0
+            for _nr in range(args.saves):
+                _change(event_status, args.changes)
+                duration, _result = _measure(event_status.save_status)
+                total += duration
+            print("  journal save        %9.1f ms  (average of %d saves of %d changes)" %
+                  (total * 1000 / args.saves, args.saves, args.changes))
+
+            # Only a sample is compared, two event states of 1M events need too much memory
+            sample = random.sample(event_status.events(), min(1000, num_events))
+            expected = event_status.pack_status()
+            expected["events"] = len(expected["events"])
+            del event_status
+
+            recovered = EventStatus(settings, config, Perfcounters(logger), history, logger)
+            duration, _result = _measure(lambda r=recovered: r.load_status(None))
+            print("  snapshot + journal  %9.1f ms  %6.1f MB" %
+                  (duration * 1000, path.stat().st_size / 1e6))
+            assert [recovered.event(event["id"]) for event in sample] == sample
+            status = recovered.pack_status()
+            status["events"] = len(status["events"])
+            assert status == expected
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
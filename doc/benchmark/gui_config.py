@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright (C) 2019 tribe29 GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""Benchmark loading the GUI configuration with and without the config snapshot
+
+A configuration directory like the one of a site with a larger WATO
+configuration is created: multisite.mk and WATO managed files in multisite.d
+for global settings, sites, tags, groups and a number of further files. Then
+the configuration is loaded like every GUI request does. The snapshot is
+discarded before every cold load, the warm loads reuse it.
+
+Has to be executed in a site (or with OMD_SITE set).
+
+Usage: PYTHONPATH=. doc/benchmark/gui_config.py [--files N] [--sites N] [--loads N]
+"""
+
+import argparse
+import os
+import pprint
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import cmk.utils.paths
+
+import cmk.gui.config as config
+
+
+def _write_config(config_dir, number_of_files, number_of_sites):
+    wato_dir = config_dir / "multisite.d" / "wato"
+    wato_dir.mkdir(parents=True)
+    (config_dir / "multisite.mk").write_text(u"debug = False\nsoft_query_limit = 2000\n")
+    (wato_dir / "global.mk").write_text(u"".join(u"%s = %r\n" % item for item in [
+        ("show_livestatus_errors", False),
+        ("table_row_limit", 200),
+        ("start_url", "dashboard.py"),
+        ("page_heading", u"Checkmk %s"),
+        ("user_idle_timeout", 5400),
+    ]))
+    (wato_dir / "sites.mk").write_text(u"sites.update(%s)\n" % pprint.pformat({
+        "site%03d" % nr: {
+            "alias": u"Site number %d" % nr,
+            "socket": ("tcp", {
+                "address": ("10.0.%d.%d" % (nr // 256, nr % 256), 6557),
+                "tls": ("encrypted", {
+                    "verify": True
+                }),
+            }),
+            "disable_wato": True,
+            "insecure": False,
+            "multisiteurl": "http://10.0.%d.%d/site%03d/check_mk/" % (nr // 256, nr % 256, nr),
+            "persist": False,
+            "replicate_ec": True,
+            "replicate_mkps": True,
+            "replication": "slave",
+            "status_host": None,
+            "timeout": 10,
+            "url_prefix": "/site%03d/" % nr,
+            "user_login": True,
+        } for nr in range(number_of_sites)
+    }))
+    (wato_dir / "tags.mk").write_text(u"wato_tags.update(%s)\n" % pprint.pformat({
+        "tag_groups": [{
+            "id": "group%d" % group,
+            "title": u"Tag group %d" % group,
+            "tags": [{
+                "id": "group%d_tag%d" % (group, tag),
+                "title": u"Tag %d" % tag,
+                "aux_tags": [],
+            } for tag in range(10)],
+        } for group in range(20)],
+        "aux_tags": [],
+    }))
+    (wato_dir / "groups.mk").write_text(
+        u"multisite_contactgroups.update(%s)\n" %
+        pprint.pformat({"group%d" % nr: {
+            "alias": u"Contact group %d" % nr
+        } for nr in range(200)}))
+    for nr in range(number_of_files):
+        (wato_dir / ("plugin%03d.mk" % nr)).write_text(
+            u"user_localizations.update(%s)\n" % pprint.pformat(
+                {u"Text %d.%d" % (nr, text): {
+                    "de": u"Text %d" % text
+                } for text in range(20)}))
+
+    # Files changed just now are not part of a snapshot, see store.reliable_file_signature()
+    for path in config_dir.glob("**/*.mk"):
+        os.utime(str(path), (time.time() - 10,) * 2)
+
+
+def _measure(function):
+    start = time.perf_counter()
+    result = function()
+    return time.perf_counter() - start, result
+
+
+def _cold_load():
+    config._config_snapshot = None
+    config.load_config()
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--files", type=int, default=50, help="further files in multisite.d")
+    parser.add_argument("--sites", type=int, default=50)
+    parser.add_argument("--loads", type=int, default=100)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        cmk.utils.paths.default_config_dir = directory
+        _write_config(Path(directory), args.files, args.sites)
+
+        # The first load of a process loads the config plugins
+        config.load_config()
+
+        for title, load in [("cold", _cold_load), ("warm", config.load_config)]:
+            duration, _result = _measure(lambda: [load() for _nr in range(args.loads)])
+            print("%s load_config(): %8.2f ms" % (title, duration * 1000 / args.loads))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright (C) 2019 tribe29 GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""Benchmark the HW/SW inventory history of a host
+
+A host with a large table of software packages is inventorized a number of
+times, each time a few packages are updated, installed or removed. The former
+archive (the complete former tree per change) is compared with the chain of
+deltas: their size on disk and the time to build the history of the host,
+which former versions did by loading and comparing consecutive trees (or, once
+cached, by loading the cached deltas).
+
+Usage: PYTHONPATH=. doc/benchmark/inventory_history.py [--snapshots N] [--packages N]
+       [--changes N]
+"""
+
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import cmk.utils.inventory_archive as inventory_archive
+import cmk.utils.paths
+import cmk.utils.store as store
+from cmk.utils.structured_data import StructuredDataTree
+
+_HOSTNAME = "heute"
+
+
+def _tree(packages):
+    tree = StructuredDataTree()
+    tree.get_dict("hardware.cpu.").update({"model": "Intel(R) Xeon(R) CPU", "cores": 8})
+    tree.get_dict("software.os.").update({"name": "Ubuntu 20.04", "kernel_version": "5.4.0"})
+    tree.get_list("software.packages:").extend({
+        "name": name,
+        "version": version,
+        "arch": "amd64",
+        "package_type": "deb",
+        "summary": "Summary of %s" % name,
+    } for name, version in sorted(packages.items()))
+    tree.normalize_nodes()
+    return tree
+
+
+def _change(packages, changes, nr):
+    for name in random.sample(sorted(packages), changes):
+        packages[name] = "%s.%d" % (packages[name], nr)
+    if nr % 10 == 0:
+        del packages[random.choice(sorted(packages))]
+        packages["new-package%d" % nr] = "1.0"
+
+
+def _former_history(former_dir, timestamps):
+    """What former versions did without cached deltas: compare consecutive trees"""
+    history = []
+    previous_tree = StructuredDataTree()
+    for timestamp in timestamps:
+        tree = StructuredDataTree().create_tree_from_raw_tree(
+            store.load_object_from_file(former_dir / str(timestamp)))
+        history.append((timestamp, tree.compare_with(previous_tree)))
+        previous_tree = tree
+    return history
+
+
+def _cached_history(cache_dir, timestamps):
+    """What former versions did with cached deltas"""
+    history = []
+    for timestamp in timestamps:
+        new, changed, removed, raw_delta_tree = store.load_object_from_file(cache_dir /
+                                                                            str(timestamp))
+        history.append(
+            (timestamp, (new, changed, removed,
+                         StructuredDataTree().create_tree_from_raw_tree(raw_delta_tree))))
+    return history
+
+
+def _history():
+    history = []
+    for timestamp in inventory_archive.get_archived_timestamps(_HOSTNAME)[1]:
+        loaded = inventory_archive.load_delta(_HOSTNAME, timestamp)
+        assert loaded is not None
+        history.append((timestamp, loaded[0]))
+    return history
+
+
+def _size(directory):
+    return sum(path.stat().st_size for path in directory.iterdir())
+
+
+def _measure(function):
+    start = time.perf_counter()
+    result = function()
+    return time.perf_counter() - start, result
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--snapshots", type=int, default=1000)
+    parser.add_argument("--packages", type=int, default=1000)
+    parser.add_argument("--changes", type=int, default=3, help="updated packages per snapshot")
+    args = parser.parse_args(argv)
+
+    random.seed(42)
+    with tempfile.TemporaryDirectory() as directory:
+        cmk.utils.paths.inventory_archive_dir = str(Path(directory, "inventory_archive"))
+        former_dir = Path(directory, "former_archive")
+        cache_dir = Path(directory, "delta_cache")
+        former_dir.mkdir()
+        cache_dir.mkdir()
+
+        packages = {"package%d" % nr: "1.%d" % nr for nr in range(args.packages)}
+        timestamps = [1600000000 + nr * 86400 for nr in range(args.snapshots)]
+        previous_tree = StructuredDataTree()
+        compare_duration = 0.0
+        for nr, timestamp in enumerate(timestamps):
+            if nr:
+                _change(packages, args.changes, nr)
+            tree = _tree(packages)
+            store.save_object_to_file(former_dir / str(timestamp), tree.get_raw_tree())
+            duration, delta = _measure(lambda t=tree, p=previous_tree: t.compare_with(p))
+            compare_duration += duration
+            inventory_archive.save_delta(_HOSTNAME, timestamp, tree, previous_tree)
+            new, changed, removed, delta_tree = delta
+            store.save_object_to_file(cache_dir / str(timestamp),
+                                      (new, changed, removed, delta_tree.get_raw_tree()))
+            previous_tree = tree
+
+        print("%d snapshots of %d packages, %d changes each" %
+              (args.snapshots, args.packages, args.changes))
+        former_size = _size(former_dir)
+        delta_size = _size(Path(cmk.utils.paths.inventory_archive_dir, _HOSTNAME))
+        print("  former archive (complete trees)  %9.1f MB" % (former_size / 1e6))
+        print("  chain of deltas                  %9.1f MB  (%.1f%% of the former archive)" %
+              (delta_size / 1e6, delta_size * 100.0 / former_size))
+        print("  delta computation per snapshot   %9.1f ms" %
+              (compare_duration * 1000 / args.snapshots))
+
+        duration, former_history = _measure(lambda: _former_history(former_dir, timestamps))
+        print("  former history, not cached       %9.1f ms" % (duration * 1000))
+        duration, _result = _measure(lambda: _cached_history(cache_dir, timestamps))
+        print("  former history, cached deltas    %9.1f ms" % (duration * 1000))
+        duration, history = _measure(_history)
+        print("  history from the chain of deltas %9.1f ms" % (duration * 1000))
+
+        assert [timestamp for timestamp, _delta in history] == timestamps
+        for (_timestamp, delta), (_former_timestamp, former_delta) in zip(history, former_history):
+            assert delta[:3] == former_delta[:3]
+            assert delta[3].is_equal(former_delta[3])
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright (C) 2019 tribe29 GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""Benchmark reading the HW/SW inventory trees of many hosts
+
+The inventory trees of the hosts are saved once, then all of them are read
+the way the views of the GUI do: completely, only for a column like the CPU
+model and only for the table of software packages. The former way of reading
+(the complete tree file via ast.literal_eval()) is measured as well.
+
+Usage: PYTHONPATH=. doc/benchmark/inventory_tree.py [--hosts N] [--packages N]
+       [--interfaces N]
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+
+import cmk.utils.store as store
+from cmk.utils.structured_data import StructuredDataTree
+
+
+def _tree(nr, packages, interfaces):
+    tree = StructuredDataTree()
+    tree.get_dict("hardware.cpu.").update({
+        "model": "Intel(R) Xeon(R) CPU E5-2680 v%d @ 2.70GHz" % (nr % 4),
+        "cores": 8,
+        "threads": 16,
+        "max_speed": 2700000000.0,
+    })
+    tree.get_dict("hardware.memory.").update({"total_ram_usable": 68719476736})
+    tree.get_dict("software.os.").update({"name": "Ubuntu 20.04", "kernel_version": "5.4.0"})
+    tree.get_list("software.packages:").extend({
+        "name": "package%d" % index,
+        "version": "1.%d.%d" % (index % 10, nr % 7),
+        "arch": "amd64",
+        "package_type": "deb",
+        "summary": "Summary of package %d" % index,
+    } for index in range(packages))
+    tree.get_list("networking.interfaces:").extend({
+        "index": index,
+        "description": "eth%d" % index,
+        "alias": "Interface %d" % index,
+        "speed": 1000000000,
+        "phys_address": "00:50:56:%02x:%02x:%02x" % (nr % 256, index % 256, nr // 256 % 256),
+        "oper_status": 1,
+        "admin_status": 1,
+        "available": False,
+    } for index in range(interfaces))
+    return tree
+
+
+def _former_load(filepaths):
+    return [
+        StructuredDataTree().create_tree_from_raw_tree(store.load_object_from_file(filepath))
+        for filepath in filepaths
+    ]
+
+
+def _load(filepaths, tree_paths=None):
+    return [StructuredDataTree().load_from(filepath, tree_paths) for filepath in filepaths]
+
+
+def _measure(function):
+    start = time.perf_counter()
+    result = function()
+    return time.perf_counter() - start, result
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--hosts", type=int, default=1000)
+    parser.add_argument("--packages", type=int, default=1500, help="software packages per host")
+    parser.add_argument("--interfaces", type=int, default=50, help="interfaces per host")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        filepaths = []
+        for nr in range(args.hosts):
+            _tree(nr, args.packages, args.interfaces).save_to(directory, "host%05d" % nr)
+            filepaths.append("%s/host%05d" % (directory, nr))
+
+        print("%d hosts with %d packages and %d interfaces" %
+              (args.hosts, args.packages, args.interfaces))
+        duration, former_trees = _measure(lambda: _former_load(filepaths))
+        print("  former load of the complete trees  %8.1f ms" % (duration * 1000))
+
+        duration, trees = _measure(lambda: _load(filepaths))
+        print("  load of the complete trees         %8.1f ms" % (duration * 1000))
+        assert all(tree.is_equal(former) for tree, former in zip(trees, former_trees))
+        del former_trees, trees
+
+        duration, trees = _measure(lambda: _load(filepaths, [["hardware", "cpu"]]))
+        print("  load of .hardware.cpu.             %8.1f ms" % (duration * 1000))
+        assert all(tree.get_sub_attributes(["hardware", "cpu"]) for tree in trees)
+        assert not any(tree.has_edge("software") for tree in trees)
+
+        duration, trees = _measure(lambda: _load(filepaths, [["software", "packages"]]))
+        print("  load of .software.packages:        %8.1f ms" % (duration * 1000))
+        assert all(
+            len(tree.get_sub_numeration(["software", "packages"]).get_child_data()) == args.packages
+            for tree in trees)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
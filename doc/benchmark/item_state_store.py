@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright (C) 2019 tribe29 GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""Benchmark the binary item state files against the former repr()'d dicts
+
+For every size a host with that many counters of the shape used by the
+interface checks is created. A check cycle loads the states, looks up and
+updates 1000 of them and saves the changes.
+
+Usage: PYTHONPATH=. doc/benchmark/item_state_store.py [--sizes 10000,100000,1000000]
+"""
+
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import cmk.utils.store as store
+
+import cmk.base.item_state_store as item_state_store
+
+
+def _states(size):
+    return {("if64", str(i // 20), "counter_%d" % (i % 20)): (1600000000.0 + i, i * 1000)
+            for i in range(size)}
+
+
+def _measure(function):
+    start = time.perf_counter()
+    result = function()
+    return time.perf_counter() - start, result
+
+
+def _legacy_cycle(path, keys):
+    states = store.load_object_from_file(path, default={})
+    for key in keys:
+        states[key] = (states[key][0] + 60, states[key][1] + 1)
+    store.save_object_to_file(path, states)
+
+
+def _binary_cycle(path, keys):
+    states = item_state_store.LazyItemStates(item_state_store.load(path))
+    updated = {}
+    for key in keys:
+        updated[key] = (states[key][0] + 60, states[key][1] + 1)
+    item_state_store.save_changes(path, updated, [])
+    states.close()
+
+
+def _bench(directory, size, lookups, legacy):
+    states = _states(size)
+    keys = random.sample(list(states), min(lookups, size))
+
+    print("%d keys" % size)
+    binary_path = directory / ("binary-%d" % size)
+    duration, _result = _measure(lambda: item_state_store.save_changes(binary_path, states, []))
+    print("  binary  write %8.1f ms  %10d bytes" % (duration * 1000, binary_path.stat().st_size))
+    duration, loaded = _measure(lambda: item_state_store.load(binary_path))
+    print("  binary  open  %8.1f ms" % (duration * 1000))
+    duration, _result = _measure(lambda: [loaded[key] for key in keys])
+    print("  binary  %d lookups %8.1f ms" % (len(keys), duration * 1000))
+    loaded.close()
+    duration, _result = _measure(lambda: _binary_cycle(binary_path, keys))
+    print("  binary  check cycle %8.1f ms" % (duration * 1000))
+
+    if not legacy:
+        return
+    legacy_path = directory / ("legacy-%d" % size)
+    duration, _result = _measure(lambda: store.save_object_to_file(legacy_path, states))
+    print("  repr()  write %8.1f ms  %10d bytes" % (duration * 1000, legacy_path.stat().st_size))
+    duration, _result = _measure(lambda: store.load_object_from_file(legacy_path))
+    print("  repr()  load  %8.1f ms" % (duration * 1000))
+    duration, _result = _measure(lambda: _legacy_cycle(legacy_path, keys))
+    print("  repr()  check cycle %8.1f ms" % (duration * 1000))
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--sizes", default="10000,100000,1000000")
+    parser.add_argument("--lookups", type=int, default=1000)
+    parser.add_argument("--legacy-max-size",
+                        type=int,
+                        default=100000,
+                        help="skip the repr() format above this size (it needs minutes)")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        for size in map(int, args.sizes.split(",")):
+            _bench(Path(directory), size, args.lookups, size <= args.legacy_max_size)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright (C) 2019 tribe29 GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""Benchmark the decoding of livestatus responses by the Python API
+
+A response with the columns of the service views is created in the python3
+format and in the JSON format, both the way livestatus renders them. The
+python3 one is decoded with ast.literal_eval (the former way), the JSON one
+with the JSONRowDecoder in chunks as it is read from the socket.
+
+Usage: PYTHONPATH=. doc/benchmark/livestatus_client.py [--rows N] [--memory]
+"""
+
+import argparse
+import ast
+import json
+import sys
+import time
+import tracemalloc
+
+import livestatus
+
+
+def _rows(count):
+    return [[
+        "host%05d" % (i // 20),
+        "Interface %d" % i,
+        i % 4,
+        1600000000 + i,
+        "OK - [eth%d] (up) MAC: 00:25:90:7a:1b:c2, 1 GBit/s, In: 1.2 kB/s" % i,
+        "in=%d;;;0;125000000 out=%d;;;0;125000000" % (i, 2 * i),
+        ["networking", "prod"],
+        {
+            "TAGS": "/wato/ cmk-agent lan prod tcp",
+            "FILENAME": "/wato/hosts.mk"
+        },
+        0.25,
+        "<blob %d>" % i,
+    ] for i in range(count)]
+
+
+def _python3_response(rows):
+    lines = []
+    for row in rows:
+        line = repr(row[:-1])[:-1] + ", b%s]" % repr(row[-1])
+        lines.append(line)
+    return ("[" + ",\n".join(lines) + "]\n").encode("utf-8")
+
+
+def _json_response(rows):
+    return ("[" + ",\n".join(json.dumps(row, separators=(",", ":")) for row in rows) +
+            "]\n").encode("ascii")
+
+
+def _decode_json(response, chunk_size):
+    decoder = livestatus.JSONRowDecoder([9], column_headers=False)
+    rows = []
+    for offset in range(0, len(response), chunk_size):
+        rows += decoder.feed(response[offset:offset + chunk_size],
+                             final=offset + chunk_size >= len(response))
+    return rows
+
+
+def _measure(function):
+    start = time.perf_counter()
+    result = function()
+    return time.perf_counter() - start, result
+
+
+def _peak_memory(function):
+    tracemalloc.start()
+    function()
+    _current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--chunk-size", type=int, default=256 * 1024)
+    parser.add_argument("--memory",
+                        action="store_true",
+                        help="also trace the peak memory usage (slow)")
+    args = parser.parse_args(argv)
+
+    rows = _rows(args.rows)
+    python3_response = _python3_response(rows)
+    json_response = _json_response(rows)
+    print("%d rows, python3 %d bytes, json %d bytes" %
+          (args.rows, len(python3_response), len(json_response)))
+
+    decode_python3 = lambda: ast.literal_eval(python3_response.decode("utf-8"))
+    decode_json = lambda: _decode_json(json_response, args.chunk_size)
+
+    duration, python3_rows = _measure(decode_python3)
+    print("  python3 literal_eval %8.1f ms" % (duration * 1000))
+    duration, json_rows = _measure(decode_json)
+    print("  json    decoder      %8.1f ms" % (duration * 1000))
+
+    if args.memory:
+        print("  python3 literal_eval peak %8.1f MB" % (_peak_memory(decode_python3) / 2**20))
+        print("  json    decoder      peak %8.1f MB" % (_peak_memory(decode_json) / 2**20))
+
+    assert python3_rows == json_rows
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright (C) 2019 tribe29 GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""Benchmark storing and reading piggyback data
+
+A number of sources (think of vSphere or Kubernetes) each send piggyback data
+for many piggybacked hosts per turn. Measured are the turns of all sources,
+the lookup of the piggyback data of every piggybacked host (which is what the
+checks of the piggybacked hosts do) and the check whether a host has
+piggyback data at all (which is done for every host when the configuration
+is loaded).
+
+Usage: PYTHONPATH=. doc/benchmark/piggyback_store.py [--sources N] [--hosts N] [--turns N]
+       [--dir DIR]
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import cmk.utils.paths
+import cmk.utils.piggyback as piggyback
+
+_TIME_SETTINGS: piggyback.PiggybackTimeSettings = [(None, "max_cache_age", 3600)]
+
+
+def _raw_data(source_hostname, nr, turn):
+    return [
+        b"<<<esx_vsphere_vm>>>",
+        b"name vm%05d" % nr,
+        b"summary.quickStats.uptimeSeconds %d" % (turn * 60),
+        b"runtime.powerState poweredOn",
+        b"<<<labels:sep(0)>>>",
+        b'{"cmk/vsphere_object": "vm", "source": "%s"}' % source_hostname.encode("ascii"),
+    ]
+
+
+def _turns(sources, hosts, turns):
+    for turn in range(turns):
+        for source_hostname in sources:
+            piggyback.store_piggyback_raw_data(
+                source_hostname,
+                {"vm%05d" % nr: _raw_data(source_hostname, nr, turn) for nr in range(hosts)})
+
+
+def _lookups(hosts):
+    return sum(
+        len(piggyback.get_piggyback_raw_data("vm%05d" % nr, _TIME_SETTINGS)) for nr in range(hosts))
+
+
+def _has_data(hosts):
+    return sum(
+        piggyback.has_piggyback_raw_data("vm%05d" % nr, _TIME_SETTINGS) for nr in range(hosts))
+
+
+def _measure(function):
+    start = time.perf_counter()
+    result = function()
+    return time.perf_counter() - start, result
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--sources", type=int, default=2)
+    parser.add_argument("--hosts", type=int, default=3000, help="piggybacked hosts per source")
+    parser.add_argument("--turns", type=int, default=5)
+    parser.add_argument("--dir", help="directory for the files (default: temporary directory)")
+    args = parser.parse_args(argv)
+
+    sources = ["source%d" % nr for nr in range(args.sources)]
+    with tempfile.TemporaryDirectory(dir=args.dir) as directory:
+        cmk.utils.paths.piggyback_dir = Path(directory, "piggyback")
+        cmk.utils.paths.piggyback_source_dir = Path(directory, "piggyback_sources")
+        cmk.utils.paths.piggyback_packed_dir = Path(directory, "piggyback_packed")
+
+        duration, _result = _measure(lambda: _turns(sources, args.hosts, args.turns))
+        print("%d turns of %d sources with %d hosts: %8.1f ms per turn" %
+              (args.turns, args.sources, args.hosts, duration * 1000 / args.turns))
+
+        duration, found = _measure(lambda: _lookups(args.hosts))
+        assert found == args.hosts * args.sources
+        print("get_piggyback_raw_data of %d hosts:   %8.1f ms" % (args.hosts, duration * 1000))
+
+        duration, found = _measure(lambda: _has_data(args.hosts))
+        assert found == args.hosts
+        print("has_piggyback_raw_data of %d hosts:   %8.1f ms" % (args.hosts, duration * 1000))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
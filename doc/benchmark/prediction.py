@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright (C) 2019 tribe29 GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""Benchmark the computation and the lookup of predictive levels
+
+The prediction of a metric with daily slices over a horizon of four weeks is
+computed from RRD data with a step of one minute: Every slice is upsampled to
+the time window of the youngest one and the statistics of every time column
+are computed. This is compared with the former implementation, which did both
+point by point in Python. Then the reference of the current time is looked up
+in the saved prediction, which is what every check with predictive levels
+does, compared with loading the former JSON prediction file.
+
+Usage: PYTHONPATH=. doc/benchmark/prediction.py [--days N] [--step SECONDS] [--lookups N]
+"""
+
+import argparse
+import json
+import math
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import cmk.utils.prediction as utils_prediction
+from cmk.utils.prediction import TimeSeries
+
+import cmk.base.prediction as prediction
+
+_SLICE = 86400
+
+
+def _rrd_column(time_windows, step):
+    rand = random.Random(42)
+    series = {}
+    for start, end in time_windows:
+        # Like the RRDs, the returned time window contains the queried one
+        rrd_start, rrd_end = start - start % step, end - end % step + step
+        series[(start, end)] = TimeSeries([
+            None if rand.random() < 0.01 else rand.uniform(0, 100)
+            for _t in range(rrd_start, rrd_end, step)
+        ], (rrd_start, rrd_end, step))
+    return lambda start, end: series[(start, end)]
+
+
+def _former_bfill_upsample(ts, twindow, shift):
+    upsa = []
+    i = 0
+    start, end, step = twindow
+    current_times = utils_prediction.rrd_timestamps(ts.twindow)
+    if start != ts.start or end != ts.end or step != ts.step:
+        for t in range(start, end, step):
+            if t >= current_times[i] + shift:
+                i += 1
+            upsa.append(ts.values[i])
+        return upsa
+    return ts.values
+
+
+def _former_stdev(point_line, average):
+    samples = len(point_line)
+    if samples == 1:
+        return abs(average)
+    return math.sqrt(abs(sum(p**2 for p in point_line) - average**2 * samples) / float(samples - 1))
+
+
+def _former_data_stats(slices):
+    descriptors = []
+    for time_column in zip(*slices):
+        point_line = [x for x in time_column if x is not None]
+        if point_line:
+            average = sum(point_line) / float(len(point_line))
+            descriptors.append([
+                average,
+                min(point_line),
+                max(point_line),
+                _former_stdev(point_line, average),
+            ])
+        else:
+            descriptors.append([None, None, None, None])
+    return descriptors
+
+
+def _former_calculate(time_windows, rrd_column):
+    from_time = time_windows[0][0]
+    slices = [(rrd_column(start, end), from_time - start) for start, end in time_windows]
+    twindow = slices[0][0].twindow
+    return twindow, _former_data_stats(
+        [_former_bfill_upsample(ts, twindow, shift) for ts, shift in slices])
+
+
+def _former_lookup(pred_file, rel_time):
+    with open(pred_file) as f:
+        data_for_pred = json.loads(f.read())
+    index = int(rel_time / data_for_pred["step"])
+    return dict(zip(data_for_pred["columns"], data_for_pred["points"][index]))
+
+
+def _measure(function):
+    start = time.perf_counter()
+    result = function()
+    return time.perf_counter() - start, result
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--days", type=int, default=28, help="horizon (one slice per day)")
+    parser.add_argument("--step", type=int, default=60, help="step of the RRD data")
+    parser.add_argument("--lookups", type=int, default=1000)
+    args = parser.parse_args(argv)
+
+    now = 1600000000 - 1600000000 % _SLICE + 12 * 3600
+    time_windows = [
+        (now - nr * _SLICE - 12 * 3600, now - nr * _SLICE + 12 * 3600) for nr in range(args.days)
+    ]
+
+    # numpy is imported on demand: Do not measure its import
+    prediction.data_stats([[1.0]])
+
+    rrd_column = _rrd_column(time_windows, args.step)
+    duration, former = _measure(lambda: _former_calculate(time_windows, rrd_column))
+    twindow, former_points = former
+    print("former prediction of %d slices of %d points: %8.1f ms" %
+          (args.days, len(former_points), duration * 1000))
+
+    duration, data_for_pred = _measure(
+        lambda: prediction.calculate_data_for_prediction(time_windows, rrd_column))
+    print("vectorized prediction:                       %8.1f ms" % (duration * 1000))
+    assert data_for_pred["data_twindow"] == list(twindow[:2])
+    for former_point, point in zip(former_points, data_for_pred["points"]):
+        assert [None if v is None else round(v, 6) for v in former_point
+               ] == [None if v is None else round(v, 6) for v in point]
+
+    with tempfile.TemporaryDirectory() as directory:
+        former_file = Path(directory, "former")
+        former_file.write_text(json.dumps(data_for_pred))
+        pred_file = Path(directory, "everyday")
+        utils_prediction.save_prediction_data(str(pred_file), data_for_pred)
+        print("prediction file: JSON %d bytes, binary %d bytes" %
+              (former_file.stat().st_size, pred_file.stat().st_size))
+
+        rel_times = [nr * 86399 // args.lookups for nr in range(args.lookups)]
+        duration, former_references = _measure(
+            lambda: [_former_lookup(str(former_file), rel_time) for rel_time in rel_times])
+        print("%d lookups in JSON prediction file:         %8.1f ms" %
+              (args.lookups, duration * 1000))
+
+        duration, references = _measure(lambda: [
+            utils_prediction.retrieve_prediction_reference(str(pred_file), rel_time, "everyday")
+            for rel_time in rel_times
+        ])
+        print("%d lookups in binary prediction file:       %8.1f ms" %
+              (args.lookups, duration * 1000))
+        assert references == former_references
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright (C) 2019 tribe29 GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""Benchmark the service ruleset lookup of the RulesetMatcher
+
+A synthetic configuration with hosts in several folders and with several
+tag combinations is created. The rules of the ruleset match on folders, tags
+and host names combined with service description patterns. The rules of
+every service of every host are looked up once via the ServiceRulesetIndex
+and once by checking every rule (the former lookup).
+
+Usage: PYTHONPATH=. doc/benchmark/ruleset_matcher.py [--hosts N] [--services N] [--rules N]
+"""
+
+import argparse
+import random
+import sys
+import time
+
+from cmk.utils.labels import LabelManager
+from cmk.utils.rulesets.ruleset_matcher import RulesetMatcher, RulesetMatchObject
+
+SERVICE_NAMES = [
+    "CPU load",
+    "CPU utilization",
+    "Memory",
+    "Uptime",
+    "Interface %d",
+    "Filesystem /var/%d",
+    "Mount options of /mnt/%d",
+    "Check_MK",
+    "NTP Time",
+    "Process %d",
+]
+TAGS = [("criticality", ["prod", "test", "critical"]), ("networking", ["lan", "dmz", "wan"])]
+
+
+def _services(count):
+    return [SERVICE_NAMES[i % len(SERVICE_NAMES)].replace("%d", str(i)) for i in range(count)]
+
+
+def _ruleset(count, hostnames):
+    rules = []
+    for i in range(count):
+        condition = {}
+        kind = i % 4
+        if kind == 0:
+            condition["host_folder"] = "/wato/folder%d/" % (i % 10)
+        elif kind == 1:
+            group, values = TAGS[i % len(TAGS)]
+            condition["host_tags"] = {group: values[i % len(values)]}
+        elif kind == 2:
+            condition["host_name"] = random.sample(hostnames, 5)
+
+        service = SERVICE_NAMES[i % len(SERVICE_NAMES)]
+        if i % 3:
+            condition["service_description"] = [service.replace("%d", "%d$" % i)]
+        else:
+            condition["service_description"] = [{"$regex": service.replace("%d", ".*")}]
+        rules.append({"value": i, "condition": condition, "options": {}})
+    return rules
+
+
+def _matcher(hostnames):
+    tags = {}
+    for hostname in hostnames:
+        tags[hostname] = {random.choice(values) for _group, values in TAGS}
+    return RulesetMatcher(
+        tag_to_group_map={tag: group for group, values in TAGS for tag in values},
+        host_tag_lists=tags,
+        host_paths={h: "/wato/folder%d/" % (i % 10) for i, h in enumerate(hostnames)},
+        labels=LabelManager({}, [], [], lambda host_name, service_description: {}),
+        all_configured_hosts=set(hostnames),
+        clusters_of={},
+        nodes_of={},
+    )
+
+
+def _linear_values(matcher, index, match_object, cache):
+    """The lookup before the index: Check all rules of the ruleset"""
+    for value, hosts, labels, labels_cache_id, pattern in index.rules:
+        if match_object.host_name not in hosts:
+            continue
+        cache_id = (match_object.service_cache_id, pattern, labels_cache_id)
+        if cache_id not in cache:
+            cache[cache_id] = matcher._matches_service_conditions(  # pylint: disable=protected-access
+                pattern, labels, match_object)
+        if cache[cache_id]:
+            yield value
+
+
+def _measure(function):
+    start = time.perf_counter()
+    result = function()
+    return time.perf_counter() - start, result
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--hosts", type=int, default=1000)
+    parser.add_argument("--services", type=int, default=100, help="services per host")
+    parser.add_argument("--rules", type=int, default=300)
+    args = parser.parse_args(argv)
+
+    random.seed(42)
+    hostnames = ["host%05d" % i for i in range(args.hosts)]
+    services = _services(args.services)
+    ruleset = _ruleset(args.rules, hostnames)
+    match_objects = [RulesetMatchObject(h, s) for h in hostnames for s in services]
+
+    matcher = _matcher(hostnames)
+    duration, index = _measure(lambda: matcher.ruleset_optimizer.get_service_ruleset(
+        ruleset, with_foreign_hosts=False, is_binary=False))
+    print("%d hosts, %d services, %d rules" % (args.hosts, len(match_objects), args.rules))
+    print("  compile ruleset  %8.1f ms" % (duration * 1000))
+
+    duration, indexed = _measure(lambda: [
+        list(matcher.get_service_ruleset_values(o, ruleset, is_binary=False)) for o in match_objects
+    ])
+    print("  indexed lookup   %8.1f ms" % (duration * 1000))
+
+    cache: dict = {}
+    duration, linear = _measure(
+        lambda: [list(_linear_values(matcher, index, o, cache)) for o in match_objects])
+    print("  linear lookup    %8.1f ms" % (duration * 1000))
+
+    assert indexed == linear
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
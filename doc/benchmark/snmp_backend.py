@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright (C) 2019 tribe29 GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""Benchmark the SNMP backends against a simulated agent on localhost
+
+The simulated agent answers SNMPv2c GET, GETNEXT and GETBULK requests for an
+interface table with the given number of rows. Every backend walks all columns
+of the table. The ClassicSNMPBackend is only measured if the Net-SNMP command
+line tools are installed.
+
+Usage: PYTHONPATH=. doc/benchmark/snmp_backend.py [--rows N] [--rounds N]
+"""
+
+import argparse
+import bisect
+import logging
+import shutil
+import socket
+import sys
+import threading
+import time
+
+from cmk.snmplib.type_defs import SNMPHostConfig
+
+import cmk.fetchers.snmp_backend._ber as ber
+from cmk.fetchers.snmp_backend import ClassicSNMPBackend, NativeSNMPBackend
+
+IF_TABLE = ".1.3.6.1.2.1.2.2.1"
+IF_COLUMNS = 22
+
+
+class SimulatedAgent:
+    def __init__(self, rows):
+        walk = {}
+        for column in range(1, IF_COLUMNS + 1):
+            for index in range(1, rows + 1):
+                walk["%s.%d.%d" % (IF_TABLE, column, index)] = (ber.encode_octet_string(
+                    b"eth%d" % index) if column == 2 else ber.encode_integer(index * column))
+        self._oids = sorted(walk, key=ber.oid_to_tuple)
+        self._keys = [ber.oid_to_tuple(o) for o in self._oids]
+        self._walk = walk
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.bind(("127.0.0.1", 0))
+        self.port = self.socket.getsockname()[1]
+        threading.Thread(target=self._serve, daemon=True).start()
+
+    def _next(self, oid):
+        index = bisect.bisect_right(self._keys, ber.oid_to_tuple(oid))
+        if index == len(self._oids):
+            return oid, ber.encode_tlv(ber.TAG_END_OF_MIB_VIEW, b"")
+        return self._oids[index], self._walk[self._oids[index]]
+
+    def _answer(self, pdu):
+        if pdu.pdu_type == ber.PDU_GET:
+            varbinds = [(vb.oid, self._walk.get(vb.oid) or
+                         ber.encode_tlv(ber.TAG_NO_SUCH_OBJECT, b"")) for vb in pdu.varbinds]
+        elif pdu.pdu_type == ber.PDU_GETNEXT:
+            varbinds = [self._next(vb.oid) for vb in pdu.varbinds]
+        else:
+            varbinds = []
+            oid = pdu.varbinds[0].oid
+            for _i in range(pdu.error_index):
+                oid, value = self._next(oid)
+                varbinds.append((oid, value))
+        return ber.encode_sequence(
+            ber.encode_integer(pdu.request_id),
+            ber.encode_integer(0),
+            ber.encode_integer(0),
+            ber.encode_sequence(*(ber.encode_sequence(ber.encode_oid(o), v) for o, v in varbinds)),
+            tag=ber.PDU_RESPONSE,
+        )
+
+    def _serve(self):
+        while True:
+            data, address = self.socket.recvfrom(65535)
+            _tag, start, end = ber.decode_tlv(data)
+            version, community, pdu = ber.decode_sequence(data, start, end)
+            self.socket.sendto(
+                ber.encode_sequence(
+                    data[version[1] - 2:version[2]],
+                    data[community[1] - 2:community[2]],
+                    self._answer(ber.decode_pdu_element(data, *pdu)),
+                ), address)
+
+
+def _snmp_config(port, bulk_size):
+    return SNMPHostConfig(
+        is_ipv6_primary=False,
+        hostname="benchmark",
+        ipaddress="127.0.0.1",
+        credentials="public",
+        port=port,
+        is_bulkwalk_host=True,
+        is_snmpv2or3_without_bulkwalk_host=False,
+        bulk_walk_size_of=bulk_size,
+        timing={},
+        oid_range_limits=[],
+        snmpv3_contexts=[],
+        character_encoding=None,
+        is_usewalk_host=False,
+        is_inline_snmp_host=False,
+        is_native_snmp_host=True,
+        record_stats=False,
+    )
+
+
+def _measure(title, rounds, function):
+    durations = []
+    for _round in range(rounds):
+        start = time.perf_counter()
+        rows = function()
+        durations.append(time.perf_counter() - start)
+    print("%-32s %8.1f ms (best of %d, %d OIDs)" % (title, min(durations) * 1000, rounds, rows))
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--rows", type=int, default=200, help="rows of the interface table")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--bulk-size", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    agent = SimulatedAgent(args.rows)
+    config = _snmp_config(agent.port, args.bulk_size)
+    logger = logging.getLogger("cmk.benchmark")
+    columns = ["%s.%d" % (IF_TABLE, c) for c in range(1, IF_COLUMNS + 1)]
+
+    def walk_all(backend):
+        return lambda: sum(len(backend.walk(c)) for c in columns)
+
+    native = NativeSNMPBackend(config, logger)
+    _measure("NativeSNMPBackend.walk", args.rounds, walk_all(native))
+    _measure("NativeSNMPBackend.walk_many", args.rounds,
+             lambda: sum(len(r) for r in native.walk_many(columns)))
+
+    if shutil.which("snmpbulkwalk"):
+        _measure("ClassicSNMPBackend.walk", args.rounds,
+                 walk_all(ClassicSNMPBackend(config, logger)))
+    else:
+        print("ClassicSNMPBackend: skipped, snmpbulkwalk not found")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright (C) 2019 tribe29 GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""Benchmark saving and loading object files with the codecs of cmk.utils.store
+
+Typical objects are saved and loaded with save_object_to_file() and
+load_object_from_file(), once as repr() (the default) and once with the
+marshal codec. The objects are built to a given size of their repr():
+
+  sections: persisted agent sections (section name: (from, until, lines))
+  hosts:    host attributes as saved by WATO (host name: attributes)
+  states:   item states ((check, item, key): (timestamp, value))
+
+ast.literal_eval() needs more than 100 times the size of a repr() file in
+memory, loading larger files as repr() is skipped by default for this reason.
+
+Usage: PYTHONPATH=. doc/benchmark/store_codec.py [--sizes KB,...] [--objects NAME,...]
+       [--max-repr-load KB] [--dir DIR]
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import cmk.utils.store as store
+
+
+def _sections(nr):
+    return ("section_%d" % nr, (1600000000.0 + nr, 1600000120.0 + nr, [[
+        "/dev/sda%d" % line,
+        "ext4",
+        str(1024 * line),
+        str(512 * line),
+        "50%",
+        "/var/lib/%d" % line,
+    ] for line in range(20)]))
+
+
+def _hosts(nr):
+    return ("host%06d" % nr, {
+        "alias": u"Host number %d" % nr,
+        "ipaddress": "10.%d.%d.%d" % (nr // 65536 % 256, nr // 256 % 256, nr % 256),
+        "tag_agent": "cmk-agent",
+        "tag_criticality": "prod",
+        "labels": {
+            u"os": u"linux",
+            u"location": u"dc%d" % (nr % 4)
+        },
+        "meta_data": {
+            "created_at": 1600000000.0 + nr,
+            "created_by": u"cmkadmin",
+            "updated_at": 1600000000.0 + nr,
+        },
+    })
+
+
+def _states(nr):
+    return (("if64.in", "%d" % (nr % 48), "in_octets_%d" % nr), (1600000000.0 + nr, nr * 4711))
+
+
+_OBJECTS = {
+    "sections": _sections,
+    "hosts": _hosts,
+    "states": _states,
+}
+
+
+def _build(make_entry, size):
+    """Adds entries until the repr() of the object has (about) the given size"""
+    obj = dict([make_entry(0)])
+    entry_size = len(repr(obj))
+    obj.update(make_entry(nr) for nr in range(1, max(1, size // entry_size)))
+    return obj
+
+
+def _measure(function):
+    start = time.perf_counter()
+    result = function()
+    return time.perf_counter() - start, result
+
+
+def _repeat(function, size):
+    # Small objects are saved and loaded repeatedly for a measurable duration
+    repetitions = max(1, 1024 * 1024 // size)
+    duration, result = _measure(lambda: [function() for _nr in range(repetitions)][-1])
+    return duration / repetitions, result
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--sizes",
+                        default="1,1024,51200",
+                        help="sizes in KB (default: %(default)s)")
+    parser.add_argument("--objects", default=",".join(_OBJECTS))
+    parser.add_argument("--max-repr-load",
+                        type=int,
+                        default=16384,
+                        help="largest size in KB to load as repr() (default: %(default)s)")
+    parser.add_argument("--dir", help="directory for the files (default: temporary directory)")
+    args = parser.parse_args(argv)
+
+    print("%-8s %8s  %-7s %10s %10s %10s" %
+          ("object", "size", "codec", "file size", "save (ms)", "load (ms)"))
+    with tempfile.TemporaryDirectory(dir=args.dir) as directory:
+        path = Path(directory, "object.mk")
+        for name in args.objects.split(","):
+            for size in [int(kb) * 1024 for kb in args.sizes.split(",")]:
+                obj = _build(_OBJECTS[name], size)
+                for codec_name, codec in [("repr", None), ("marshal", store.MARSHAL_CODEC)]:
+                    save_duration, _result = _repeat(
+                        lambda: store.save_object_to_file(path, obj, codec=codec), size)
+                    file_size = path.stat().st_size
+                    if codec is None and size > args.max_repr_load * 1024:
+                        load = "skipped"
+                    else:
+                        load_duration, loaded = _repeat(lambda: store.load_object_from_file(path),
+                                                        size)
+                        assert loaded == obj
+                        load = "%.2f" % (load_duration * 1000)
+                    print("%-8s %7dK  %-7s %9dK %10.2f %10s" %
+                          (name, size // 1024, codec_name, file_size // 1024, save_duration * 1000,
+                           load))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright (C) 2019 tribe29 GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""Benchmark repeated loading of unchanged files with and without the file cache
+
+A users.mk like configuration file is loaded with load_mk_file() and a
+contacts like object file with load_object_from_file() over and over again,
+like a long-lived process does, once without and once with the file cache of
+cmk.utils.store enabled.
+
+Usage: PYTHONPATH=. doc/benchmark/store_file_cache.py [--users N] [--loads N]
+"""
+
+import argparse
+import os
+import pprint
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import cmk.utils.store as store
+
+
+def _users(number):
+    return {
+        "user%04d" % nr: {
+            "alias": u"User number %d" % nr,
+            "email": "user%d@example.com" % nr,
+            "contactgroups": ["all", "group%d" % (nr % 10)],
+            "roles": ["user"],
+            "locked": False,
+            "notifications_enabled": True,
+            "host_notification_options": "durfs",
+            "service_notification_options": "wucrfs",
+        } for nr in range(number)
+    }
+
+
+def _measure(function):
+    start = time.perf_counter()
+    result = function()
+    return time.perf_counter() - start, result
+
+
+def _load_repeatedly(load, loads):
+    return _measure(lambda: [load() for _nr in range(loads)][-1])
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--loads", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    users = _users(args.users)
+    with tempfile.TemporaryDirectory() as directory:
+        mk_path = Path(directory, "users.mk")
+        store.save_mk_file(mk_path, "multisite_users.update(%s)" % pprint.pformat(users))
+        object_path = Path(directory, "contacts.mk")
+        store.save_object_to_file(object_path, users, pretty=True)
+        # Files changed just now are not cached, see store.reliable_file_signature()
+        for path in [mk_path, object_path]:
+            os.utime(str(path), (time.time() - 10,) * 2)
+        print("%d users, users.mk %d bytes, contacts.mk %d bytes, %d loads each" %
+              (args.users, mk_path.stat().st_size, object_path.stat().st_size, args.loads))
+
+        for title, load in [
+            ("load_mk_file", lambda: store.load_mk_file(mk_path, {"multisite_users": {}})),
+            ("load_object_from_file", lambda: store.load_object_from_file(object_path)),
+        ]:
+            store.disable_file_cache()
+            uncached_duration, uncached = _load_repeatedly(load, args.loads)
+            store.enable_file_cache()
+            cached_duration, cached = _load_repeatedly(load, args.loads)
+            assert cached == uncached
+            print(
+                "%-22s without cache %8.2f ms, with cache %8.2f ms per load" %
+                (title, uncached_duration * 1000 / args.loads, cached_duration * 1000 / args.loads))
+            print("%-22s %s" % ("", store.file_cache_stats()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
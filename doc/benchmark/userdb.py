@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright (C) 2019 tribe29 GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""Benchmark loading the users of the GUI with and without the user database
+
+The files of a number of (LDAP synchronized) users are created in a temporary
+directory: contacts.mk, users.mk, htpasswd, auth.serials and the files in the
+directories of the users. Then the users are loaded like a GUI request does:
+
+  cold:        Without the user database and its cache file (every load reads
+               all files, like before the user database)
+  cache file:  In a new process (the user database is loaded from its cache file)
+  warm:        With the user database of the process
+
+Finally, single users and the members of a contact group are looked up.
+
+Has to be executed in a site (or with OMD_SITE set).
+
+Usage: PYTHONPATH=. doc/benchmark/userdb.py [--users N] [--loads N]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import cmk.utils.paths
+import cmk.utils.store as store
+
+import cmk.gui.userdb as userdb
+from cmk.gui.globals import AppContext
+
+
+def _set_paths(directory):
+    cmk.utils.paths.check_mk_config_dir = directory + "/etc/check_mk/conf.d"
+    cmk.utils.paths.default_config_dir = directory + "/etc/check_mk"
+    cmk.utils.paths.htpasswd_file = directory + "/etc/htpasswd"
+    cmk.utils.paths.var_dir = directory + "/var/check_mk"
+    cmk.utils.paths.tmp_dir = directory + "/tmp/check_mk"
+
+
+def _write_users(number):
+    users = {
+        "user%05d" % nr: {
+            "alias": u"User number %d" % nr,
+            "connector": "ldap_1",
+            "contactgroups": ["all", "group%d" % (nr % 50)],
+            "email": u"user%d@example.com" % nr,
+            "locked": False,
+            "roles": ["user"],
+            "serial": 1,
+            "language": "de",
+            "start_url": None,
+            "ui_theme": None,
+        } for nr in range(number)
+    }
+    contacts = {
+        user_id: {
+            "alias": user["alias"],
+            "contactgroups": user["contactgroups"],
+            "email": user["email"],
+            "pager": "",
+            "notifications_enabled": True,
+            "disable_notifications": {},
+        } for user_id, user in users.items()
+    }
+    store.makedirs(cmk.utils.paths.check_mk_config_dir + "/wato")
+    store.makedirs(cmk.utils.paths.default_config_dir + "/multisite.d/wato")
+    store.makedirs(cmk.utils.paths.var_dir + "/web")
+    store.save_to_mk_file(userdb._root_dir() + "contacts.mk", "contacts", contacts, True)
+    store.save_to_mk_file(userdb._multisite_dir() + "users.mk", "multisite_users", users, True)
+    store.save_text_to_file(
+        cmk.utils.paths.htpasswd_file,
+        u"".join(u"%s:$5$rounds=535000$0123456789abcdef$%s\n" % (user_id, "x" * 43)
+                 for user_id in users))
+    store.save_text_to_file("%s/auth.serials" % os.path.dirname(cmk.utils.paths.htpasswd_file),
+                            u"".join(u"%s:1\n" % user_id for user_id in users))
+    for user_id in users:
+        for attr, value in [
+            ("num_failed_logins", 0),
+            ("last_pw_change", 1600000000),
+            ("last_seen", 1600000000.0),
+            ("enforce_pw_change", 0),
+            ("session_id", "0123456789abcdef|1600000000"),
+        ]:
+            userdb.save_custom_attr(user_id, attr, value)
+
+    # Files changed just now are not cached by the user database
+    timestamp = time.time() - 60
+    for root, directories, files in os.walk(cmk.utils.paths.var_dir):
+        for name in directories + files:
+            os.utime(os.path.join(root, name), (timestamp, timestamp))
+    for path in [
+            userdb._root_dir() + "contacts.mk",
+            userdb._multisite_dir() + "users.mk",
+            cmk.utils.paths.htpasswd_file,
+            "%s/auth.serials" % os.path.dirname(cmk.utils.paths.htpasswd_file),
+    ]:
+        os.utime(path, (timestamp, timestamp))
+
+
+def _measure(function):
+    start = time.perf_counter()
+    result = function()
+    return time.perf_counter() - start, result
+
+
+def _request(function):
+    with AppContext(None):
+        return function()
+
+
+def _discard_user_database(cache_file=True):
+    userdb._user_database = None
+    userdb._user_dir_attributes_cache.clear()
+    if cache_file:
+        userdb._user_database_cache_path().unlink()
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--users", type=int, default=15000)
+    parser.add_argument("--loads", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as directory:
+        _set_paths(directory)
+        _write_users(args.users)
+
+        users = _request(userdb.load_users)
+        for title, discard in [
+            ("cold", _discard_user_database),
+            ("cache file", lambda: _discard_user_database(cache_file=False)),
+            ("warm", lambda: None),
+        ]:
+            duration = 0.0
+            for _nr in range(args.loads):
+                discard()
+                load_duration, loaded = _measure(lambda: _request(userdb.load_users))
+                duration += load_duration
+                assert loaded == users
+            print("load_users() of %d users, %-10s %8.1f ms" %
+                  (args.users, title + ":", duration * 1000 / args.loads))
+
+        user_ids = sorted(users)[::max(1, args.users // 1000)]
+        duration, _result = _measure(
+            lambda: [_request(lambda: userdb.load_user(user_id)) for user_id in user_ids])
+        print("load_user():                            %8.3f ms" %
+              (duration * 1000 / len(user_ids)))
+
+        duration, members = _measure(
+            lambda: _request(lambda: userdb.load_users_of_contactgroup("group1")))
+        print("load_users_of_contactgroup() (%d users): %6.1f ms" % (len(members), duration * 1000))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright (C) 2019 tribe29 GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""Benchmark exporting the rows of a view buffered and streamed
+
+The rows of a services view are exported with the exporters of the GUI (CSV,
+JSON and Python) like the WSGI server sends the response:
+
+  buffered:  All rows are received before the export and the complete
+             response is produced before it is sent (like before streaming)
+  streamed:  The rows are received while the response is sent in chunks, the
+             chunks are dropped after being "sent"
+
+The time until the first chunk of the response, the total time and the peak
+memory (tracemalloc) are measured. The cells simply export the values of the
+rows, the painters of the GUI are not involved.
+
+Has to be executed in a site (or with OMD_SITE set).
+
+Usage: PYTHONPATH=. doc/benchmark/view_export.py [--rows N] [--formats FORMAT,...]
+"""
+
+import argparse
+import logging
+import sys
+import time
+import tracemalloc
+
+from werkzeug.test import create_environ
+
+import cmk.gui.htmllib as htmllib
+import cmk.gui.modules as modules
+from cmk.gui.globals import AppContext, RequestContext, html
+from cmk.gui.http import Request
+from cmk.gui.plugins.views import exporter_registry
+
+_COLUMNS = ["host_name", "service_description", "service_state", "service_plugin_output"]
+
+
+class _Cell:
+    def __init__(self, column):
+        self._column = column
+
+    def export_title(self):
+        return self._column
+
+    def render_for_export(self, row):
+        return row[self._column]
+
+
+class _View:
+    name = "services"
+    spec = {"name": "services", "title": u"Services"}
+    group_cells = []
+    row_cells = [_Cell(column) for column in _COLUMNS]
+
+
+def _iter_rows(number):
+    for nr in range(number):
+        yield {
+            "site": "heute",
+            "host_name": "host%05d" % (nr // 20),
+            "service_description": "Service %d" % (nr % 20),
+            "service_state": nr % 4,
+            "service_plugin_output": "OK - %d processes, %d MB memory used" % (nr, nr % 977),
+        }
+
+
+def _export(export_format, rows, streamed, start):
+    environ = create_environ("/view.py?output_format=%s" % export_format)
+    with AppContext(None), RequestContext(htmllib.html(Request(environ))):
+        if streamed:
+            exporter_registry[export_format].handler(_View(), rows)
+        else:
+            # Like the buffered export of views
+            with html.plugged():
+                exporter_registry[export_format].handler(_View(), rows)
+        response = html.response
+
+    first_chunk = None
+    size = 0
+    for chunk in response.response:
+        if first_chunk is None:
+            first_chunk = time.perf_counter() - start
+        size += len(chunk)
+    return first_chunk or 0.0, size
+
+
+def _measure(function):
+    start = time.perf_counter()
+    first_chunk, size = function()
+    duration = time.perf_counter() - start
+
+    # Tracing slows down the function, its memory is measured in a second run
+    tracemalloc.start()
+    function()
+    _current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return first_chunk, duration, peak, size
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--rows", type=int, default=500000)
+    parser.add_argument("--formats", default="csv,json,python")
+    args = parser.parse_args(argv)
+
+    logging.getLogger().addHandler(logging.NullHandler())
+    with AppContext(None):
+        modules.load_all_plugins()
+
+    print("%-7s %-9s %12s %10s %10s %10s" %
+          ("format", "mode", "first chunk", "total", "peak", "size"))
+    for export_format in args.formats.split(","):
+        for title, streamed in [("buffered", False), ("streamed", True)]:
+
+            def export():
+                start = time.perf_counter()
+                rows = _iter_rows(args.rows)
+                # pylint: disable=cell-var-from-loop
+                return _export(export_format, rows if streamed else list(rows), streamed, start)
+
+            first_chunk, duration, peak, size = _measure(export)
+            print("%-7s %-9s %9.1f ms %7.0f ms %7.1f MB %7.1f MB" %
+                  (export_format, title, first_chunk * 1000, duration * 1000, peak / 1024.0 / 1024,
+                   size / 1024.0 / 1024))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
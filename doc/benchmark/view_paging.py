@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright (C) 2019 tribe29 GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""Benchmark sorting and paging a view in the GUI and by livestatus
+
+The rows of a services view sorted by plugin output and check latency are
+processed like the GUI does after receiving them from livestatus:
+
+  python:  All rows are received, converted to dicts, sorted in Python and cut
+           down to the row limit (the sorting and paging without OrderBy:)
+  paged:   Livestatus sorts the rows and only sends the page: with one site the
+           rows of the page, with several sites every site sends its first
+           rows up to the end of the page, which are merged and sorted
+
+Latency and peak memory (tracemalloc) of the GUI side are measured for both.
+With --socket the queries are also sent to a livestatus socket to measure the
+response time and size of livestatus.
+
+Has to be executed in a site (or with OMD_SITE set).
+
+Usage: PYTHONPATH=. doc/benchmark/view_paging.py [--rows N] [--sites N] [--row-limit N]
+       [--page N] [--socket PATH]
+"""
+
+import argparse
+import random
+import sys
+import time
+import tracemalloc
+
+import livestatus
+
+import cmk.gui.modules as modules
+import cmk.gui.views as views
+from cmk.gui.globals import AppContext
+
+_SORTERS = [("svcoutput", False), ("svc_check_latency", True)]
+
+
+def _livestatus_rows(number, number_of_sites):
+    random.seed(4711)
+    return [[
+        "site%d" % (nr % number_of_sites),
+        "host%05d" % (nr // 20),
+        "Service %d" % (nr % 20),
+        random.choice(["OK", "OK - all fine", "WARN - load is high", "CRIT - disk full"]),
+        random.random(),
+        0,
+    ] for nr in range(number)]
+
+
+def _measure(function):
+    start = time.perf_counter()
+    result = function()
+    duration = time.perf_counter() - start
+
+    # Tracing slows down the function, its memory is measured in a second run
+    tracemalloc.start()
+    function()
+    _current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return duration, peak, result
+
+
+def _python_path(view, columns, data, row_limit, offset):
+    rows = [dict(zip(columns, row)) for row in data]
+    views._sort_data(view, rows, view.sorters)
+    return rows[offset:offset + row_limit + 1]
+
+
+def _paged_path(view, columns, data, row_limit, offset, number_of_sites):
+    if number_of_sites == 1:
+        return [dict(zip(columns, row)) for row in data]
+    rows = [dict(zip(columns, row)) for row in data]
+    views._sort_page_rows(view, rows)
+    return rows[offset:offset + row_limit + 1]
+
+
+def _page_of_sites(view, columns, data, row_limit, offset, number_of_sites):
+    """The rows the sites send for the page, every site sends its rows sorted"""
+    rows = [dict(zip(columns, row)) for row in data]
+    views._sort_page_rows(view, rows)
+    if number_of_sites == 1:
+        rows = rows[offset:offset + row_limit + 1]
+    else:
+        rows_of_sites = {}
+        for row in rows:
+            rows_of_sites.setdefault(row["site"], []).append(row)
+        rows = [
+            row for site_rows in rows_of_sites.values()
+            for row in site_rows[:offset + row_limit + 1]
+        ]
+    return [[row[column] for column in columns] for row in rows]
+
+
+def _query_socket(socket_path, query):
+    connection = livestatus.SingleSiteConnection("unix:" + socket_path)
+    start = time.perf_counter()
+    rows = connection.query(query)
+    return time.perf_counter() - start, rows
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--sites", type=int, default=1)
+    parser.add_argument("--row-limit", type=int, default=1000)
+    parser.add_argument("--page", type=int, default=1)
+    parser.add_argument("--socket", help="livestatus socket to send the queries to")
+    args = parser.parse_args(argv)
+
+    with AppContext(None):
+        modules.load_all_plugins()
+    view = views.View("paging", {"datasource": "services", "painters": [], "sorters": []}, {})
+    view.user_sorters = _SORTERS
+    view.row_limit = args.row_limit
+    offset = (args.page - 1) * args.row_limit
+
+    order_by = [
+        column for entry in view.sorters for column, _descending in entry.sorter.livestatus_order_by
+    ]
+    columns = ["site", "host_name", "service_description"] + order_by + ["service_state"]
+
+    data = _livestatus_rows(args.rows, args.sites)
+    page_data = _page_of_sites(view, columns, data, args.row_limit, offset, args.sites)
+
+    python_duration, python_peak, python_rows = _measure(
+        lambda: _python_path(view, columns, data, args.row_limit, offset))
+    paged_duration, paged_peak, paged_rows = _measure(
+        lambda: _paged_path(view, columns, page_data, args.row_limit, offset, args.sites))
+    assert paged_rows == python_rows
+
+    print("%d rows on %d sites, page %d of %d rows" %
+          (args.rows, args.sites, args.page, args.row_limit))
+    print("python: %6d rows received %9.1f ms %9.1f MB peak" %
+          (len(data), python_duration * 1000, python_peak / 1024.0 / 1024))
+    print("paged:  %6d rows received %9.1f ms %9.1f MB peak" %
+          (len(page_data), paged_duration * 1000, paged_peak / 1024.0 / 1024))
+
+    if args.socket:
+        query = "GET services\nColumns: %s\n" % " ".join(columns[1:])
+        headers = "".join("OrderBy: %s %s\n" %
+                          (column, "desc" if descending != entry.negate else "asc")
+                          for entry in view.sorters
+                          for column, descending in entry.sorter.livestatus_order_by)
+        for title, lql in [
+            ("full", query),
+            ("paged", query + headers + "Offset: %d\nLimit: %d\n" % (offset, args.row_limit + 1)),
+        ]:
+            duration, rows = _query_socket(args.socket, lql)
+            print("livestatus %-5s %6d rows %9.1f ms" % (title + ":", len(rows), duration * 1000))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
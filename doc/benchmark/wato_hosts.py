@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright (C) 2019 tribe29 GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+"""Benchmark loading the WATO hosts with and without the host index
+
+A WATO folder tree with a number of folders and hosts is created in a temporary
+directory. Then the hosts are loaded like a GUI request does:
+
+  cold:        Without the host index (every hosts.mk is executed, like before
+               the host index)
+  cache file:  In a new process (the host index is loaded from its cache file)
+  warm:        With the host index of the process
+
+Finally, single hosts are looked up and the hosts are searched by name. With
+--file-cache the file cache of cmk.utils.store is enabled like in the GUI.
+
+Has to be executed in a site (or with OMD_SITE set).
+
+Usage: PYTHONPATH=. doc/benchmark/wato_hosts.py [--folders N] [--hosts N] [--loads N]
+       [--file-cache]
+"""
+
+import argparse
+import gc
+import logging
+import os
+import sys
+import tempfile
+import time
+
+import cmk.utils.paths
+import cmk.utils.store as store
+
+import cmk.gui.config as config
+import cmk.gui.modules as modules
+import cmk.gui.watolib.hosts_and_folders as hosts_and_folders
+from cmk.gui.globals import AppContext
+
+
+def _set_paths(directory):
+    cmk.utils.paths.check_mk_config_dir = directory + "/etc/check_mk/conf.d"
+    cmk.utils.paths.default_config_dir = directory + "/etc/check_mk"
+    cmk.utils.paths.tmp_dir = directory + "/tmp/check_mk"
+    cmk.utils.paths.var_dir = directory + "/var/check_mk"
+
+
+def _write_folders(number_of_folders, hosts_per_folder):
+    wato_dir = cmk.utils.paths.check_mk_config_dir + "/wato"
+    for nr in range(number_of_folders):
+        folder_dir = "%s/folder%02d/sub%04d" % (wato_dir, nr % 30, nr)
+        store.makedirs(folder_dir)
+        for path in [os.path.dirname(folder_dir), folder_dir]:
+            store.save_object_to_file(
+                path + "/.wato", {
+                    "title": os.path.basename(path),
+                    "attributes": {
+                        "meta_data": {}
+                    },
+                    "num_hosts": hosts_per_folder,
+                })
+
+        host_names = ["host%03d-%05d" % (nr, host_nr) for host_nr in range(hosts_per_folder)]
+        host_attributes = {
+            host_name: {
+                "alias": u"Host %s" % host_name,
+                "ipaddress": "10.%d.%d.%d" % (nr // 256, nr % 256, host_nr),
+                "tag_agent": "cmk-agent",
+                "labels": {
+                    u"os": u"linux"
+                },
+                "meta_data": {
+                    "created_at": 1600000000.0,
+                    "updated_at": 1600000000.0,
+                    "created_by": u"cmkadmin",
+                },
+            } for host_nr, host_name in enumerate(host_names)
+        }
+        store.save_text_to_file(
+            folder_dir + "/hosts.mk", u"all_hosts += %r\n\nhost_tags.update(%r)\n\n"
+            u"ipaddresses.update(%r)\n\nhost_attributes.update(%r)\n" % (
+                host_names,
+                {host_name: {
+                    "agent": "cmk-agent"
+                } for host_name in host_names},
+                {
+                    host_name: attributes["ipaddress"]
+                    for host_name, attributes in host_attributes.items()
+                },
+                host_attributes,
+            ))
+
+    # Files changed just now are not kept by the host index
+    timestamp = time.time() - 60
+    for root, _directories, files in os.walk(wato_dir):
+        for name in files:
+            os.utime(os.path.join(root, name), (timestamp, timestamp))
+
+
+def _measure(function):
+    # The garbage of the former run would otherwise be collected during the measurement
+    gc.collect()
+    start = time.perf_counter()
+    result = function()
+    return time.perf_counter() - start, result
+
+
+def _request(function):
+    with AppContext(None):
+        config.user = config.LoggedInSuperUser()
+        return function()
+
+
+def _discard_host_index(cache_file=True):
+    hosts_and_folders._host_index = hosts_and_folders._HostIndex()
+    if cache_file:
+        hosts_and_folders._host_index_cache_path().unlink(missing_ok=True)
+
+
+def _load_hosts():
+    return {
+        host_name: host.effective_attributes()
+        for host_name, host in hosts_and_folders.Host.all().items()
+    }
+
+
+def _search_hosts(name):
+    search_folder = hosts_and_folders.SearchFolder(hosts_and_folders.Folder.root_folder(),
+                                                   {".name": name})
+    return search_folder.hosts()
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--folders", type=int, default=3000)
+    parser.add_argument("--hosts", type=int, default=20, help="hosts per folder")
+    parser.add_argument("--loads", type=int, default=3, help="the best load is reported")
+    parser.add_argument("--file-cache", action="store_true")
+    args = parser.parse_args(argv)
+
+    if args.file_cache:
+        store.enable_file_cache()
+
+    logging.getLogger().addHandler(logging.NullHandler())
+    with tempfile.TemporaryDirectory() as directory:
+        _set_paths(directory)
+        _write_folders(args.folders, args.hosts)
+        with AppContext(None):
+            modules.load_all_plugins()
+
+        hosts = _request(_load_hosts)
+        number_of_hosts = len(hosts)
+        for title, discard in [
+            ("cold", _discard_host_index),
+            ("cache file", lambda: _discard_host_index(cache_file=False)),
+            ("warm", lambda: None),
+        ]:
+            durations = []
+            for _nr in range(args.loads):
+                discard()
+                load_duration, loaded = _measure(lambda: _request(_load_hosts))
+                durations.append(load_duration)
+                assert loaded == hosts
+                # A lookup writes the cache file for the next "new process"
+                _request(lambda: hosts_and_folders.Host.host("unknown"))
+            print("Host.all() of %d hosts, %-10s %9.1f ms" %
+                  (number_of_hosts, title + ":", min(durations) * 1000))
+
+        host_names = sorted(hosts)[::max(1, number_of_hosts // 100)]
+        duration, _result = _measure(
+            lambda:
+            [_request(lambda: hosts_and_folders.Host.host(host_name)) for host_name in host_names])
+        print("Host.host() (one per request):          %9.1f ms" %
+              (duration * 1000 / len(host_names)))
+
+        duration, found = _measure(lambda: _request(lambda: _search_hosts("host017-")))
+        print("Search by host name (%d hosts found):   %9.1f ms" % (len(found), duration * 1000))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
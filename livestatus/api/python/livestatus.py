@@ -10,8 +10,11 @@ import time
 import re
 import os
 import ast
+import json
+import selectors
 import ssl
-from typing import NewType, AnyStr, Any, Type, List, Tuple, Union, Dict, Pattern, Optional, Set
+from typing import (NewType, AnyStr, Any, Callable, Type, List, Tuple, Union, Dict, Iterator,
+                    Pattern, Optional, Set)
 
 # TODO: Find a better solution for this issue. Astroid 2.x bug prevents us from using NewType :(
 # (https://github.com/PyCQA/pylint/issues/2296)
@@ -43,6 +46,16 @@ persistent_connections: Dict[str, socket.socket] = {}
 # Regular expression for removing Cache: headers if caching is not allowed
 remove_cache_regex: Pattern = re.compile("\nCache:[^\n]*")
 
+# TODO: This mechanism does not take different connection options into account
+# The names of the blob columns per table of the sites, learned once per socket
+blob_columns: Dict[str, Optional[Dict[str, Set[str]]]] = {}
+# Sites which failed to tell their blob columns are asked again after this many seconds
+_BLOB_COLUMNS_RETRY_INTERVAL = 300.0
+_blob_columns_retry_at: Dict[str, float] = {}
+
+# Size of the chunks a response in JSON format is decoded in
+_RECV_CHUNK_SIZE = 256 * 1024
+
 
 def _ensure_unicode(value: Union[str, bytes]) -> str:
     if isinstance(value, str):
@@ -128,6 +141,179 @@ def create_client_socket(family: socket.AddressFamily, tls: bool, verify: bool,
     return context.wrap_socket(sock)
 
 
+def json_blob_positions(query: str, tables: Dict[str, Set[str]]) -> Optional[List[int]]:
+    """Positions of the blob columns in the rows of the query
+
+    tables holds the names of the blob columns per table. The JSON output
+    format differs from the python3 one only in the blob columns: They are
+    sent as strings of latin-1 characters instead of bytes. None is returned
+    in case the positions can not be told from the query, e.g. when all
+    columns of the table are requested. Such queries have to be answered in
+    the python3 format.
+    """
+    lines = query.split("\n")
+    request = lines[0].split()
+    if len(request) != 2 or request[0] != "GET":
+        return None
+
+    columns: List[str] = []
+    has_stats = False
+    for line in lines[1:]:
+        if line.startswith("Columns:"):
+            columns += line[8:].split()
+        elif line.startswith("Stats"):
+            has_stats = True
+
+    if not columns and not has_stats:
+        return None
+    # Dynamic columns (name:arguments) are not listed in the columns table
+    if any(":" in column for column in columns):
+        return None
+
+    blobs = tables.get(request[1], set())
+    return [index for index, column in enumerate(columns) if column in blobs]
+
+
+class JSONRowDecoder:
+    """Decodes the rows of a response in the JSON format while it is received
+
+    Livestatus writes one row per line and escapes all control characters
+    within strings. Every newline thus terminates a row and the complete lines
+    of the received data can be decoded at once, without waiting for the whole
+    response.
+    """
+    def __init__(self, blob_positions: List[int], column_headers: bool) -> None:
+        super(JSONRowDecoder, self).__init__()
+        self._blob_positions = blob_positions
+        # The header row must not be converted to bytes
+        self._skip_row = column_headers
+        self._pending: List[bytes] = []
+        self._started = False
+
+    def feed(self, data: bytes, final: bool) -> List[LivestatusRow]:
+        """Decode the rows completed by the data, final marks the end of the response"""
+        if not final and b"\n" not in data:
+            self._pending.append(data)
+            return []
+
+        received = b"".join(self._pending) + data if self._pending else data
+        if final:
+            # The response is terminated by "]\n"
+            lines, rest = received.rstrip()[:-1], b""
+        else:
+            # The rows are separated by ",\n"
+            lines, _newline, rest = received.rpartition(b"\n")
+            lines = lines[:-1]
+        self._pending = [rest] if rest else []
+
+        if not self._started:
+            # The response starts with "["
+            lines = lines[1:]
+            self._started = True
+        if not lines.strip():
+            return []
+
+        rows = json.loads(b"[" + lines + b"]")
+        if self._blob_positions:
+            self._restore_blobs(rows)
+        return rows
+
+    def _restore_blobs(self, rows: List[LivestatusRow]) -> None:
+        for row in rows:
+            if self._skip_row:
+                self._skip_row = False
+                continue
+            for index in self._blob_positions:
+                value = row[index]
+                if isinstance(value, str):
+                    row[index] = value.encode("latin-1")
+
+
+class ResponseReader:
+    """Parses a response with a fixed16 header while it is received
+
+    Responses in the JSON format are decoded row by row, the ones in the
+    python3 format once they are complete. The data fed must not exceed the
+    number of bytes wanted.
+    """
+    def __init__(self, blob_positions: Optional[List[int]], column_headers: bool) -> None:
+        super(ResponseReader, self).__init__()
+        self._header = b""
+        self._code = ""
+        self._remaining = 0
+        self._body: List[bytes] = []
+        self._decoder = (None if blob_positions is None else JSONRowDecoder(
+            blob_positions, column_headers))
+        self.complete = False
+
+    @property
+    def wanted(self) -> int:
+        """The number of bytes to read next"""
+        if len(self._header) < 16:
+            return 16 - len(self._header)
+        return min(self._remaining, _RECV_CHUNK_SIZE)
+
+    def feed(self, data: bytes) -> List[LivestatusRow]:
+        """Process the received data, returns the rows completed by it"""
+        if len(self._header) < 16:
+            self._header += data
+            if len(self._header) == 16:
+                self._parse_header()
+            return []
+
+        self._remaining -= len(data)
+        if self._code == "200" and self._decoder is not None:
+            try:
+                rows = self._decoder.feed(data, final=self._remaining == 0)
+            except ValueError:
+                raise MKLivestatusSocketError("Malformed output")
+            self.complete = self._remaining == 0
+            return rows
+
+        self._body.append(data)
+        return self._finish() if self._remaining == 0 else []
+
+    def _parse_header(self) -> None:
+        # Headers are always ASCII encoded
+        self._code = self._header[0:3].decode("ascii")
+        try:
+            self._remaining = int(self._header[4:15].lstrip())
+        except Exception:
+            raise MKLivestatusSocketError(
+                "Malformed output. Livestatus TCP socket might be unreachable or wrong"
+                "encryption settings are used.")
+        if self._remaining == 0:
+            self._finish()
+
+    def _finish(self) -> List[LivestatusRow]:
+        self.complete = True
+        data = b"".join(self._body).decode("utf-8")
+
+        if self._code == "200":
+            try:
+                return ast.literal_eval(data)
+            except Exception:
+                raise MKLivestatusSocketError("Malformed output")
+
+        if self._code == "404":
+            raise MKLivestatusTableNotFoundError("Not Found (%s): %s" % (self._code, data.strip()))
+
+        raise MKLivestatusQueryError("%s: %s" % (self._code, data.strip()))
+
+
+class QueryStats:
+    """Statistics of the last query sent over a connection"""
+    def __init__(self, started: float) -> None:
+        super(QueryStats, self).__init__()
+        self.started = started
+        # Seconds until the first byte of the response was received
+        self.latency: Optional[float] = None
+        # Seconds until the response was complete
+        self.duration: Optional[float] = None
+        self.bytes_received = 0
+        self.rows = 0
+
+
 #.
 #   .--Helpers-------------------------------------------------------------.
 #   |                  _   _      _                                        |
@@ -148,6 +334,12 @@ class Helpers:
               add_headers: Union[str, bytes] = u"") -> 'LivestatusResponse':
         raise NotImplementedError()
 
+    def query_iter(self,
+                   query: 'QueryTypes',
+                   add_headers: Union[str, bytes] = u"") -> Iterator[LivestatusRow]:
+        """Issues a query and yields the rows of the response while they are received"""
+        raise NotImplementedError()
+
     def query_value(self, query: 'QueryTypes', deflt: Any = NO_DEFAULT) -> LivestatusColumn:
         """Issues a query that returns exactly one line and one columns and returns
            the response as a single value"""
@@ -304,6 +496,11 @@ class SingleSiteConnection(Helpers):
         self.socket: Optional[socket.socket] = None
         self.timeout: Optional[int] = None
         self.successful_persistence = False
+        # How to decode the response to the query sent last: The positions of
+        # the blob columns in JSON format or None for the python3 format
+        self._blob_positions: Optional[List[int]] = None
+        self._column_headers = False
+        self.stats = QueryStats(0.0)
 
         # Whether to establish an encrypted connection
         self.tls = tls
@@ -443,14 +640,16 @@ class SingleSiteConnection(Helpers):
         if not self.allow_cache:
             query = remove_cache_regex.sub("", query)
 
-        if self.socket is None:
-            self.connect()
-
         if not query.endswith("\n"):
             query += "\n"
         query += self.auth_header + self.add_headers
+        self._set_output_format(query + add_headers)
+
+        if self.socket is None:
+            self.connect()
+
         query += "Localtime: %d\n" % int(time.time())
-        query += "OutputFormat: python3\n"
+        query += "OutputFormat: %s\n" % ("python3" if self._blob_positions is None else "json")
         query += "KeepAlive: on\n"
         query += "ResponseHeader: fixed16\n"
         query += add_headers
@@ -465,6 +664,7 @@ class SingleSiteConnection(Helpers):
         try:
             # TODO: Use socket.sendall()
             # socket.send() only works with byte strings
+            self.stats = QueryStats(time.time())
             self.socket.send(query.encode("utf-8"))
         except IOError as e:
             if self.persist:
@@ -481,6 +681,45 @@ class SingleSiteConnection(Helpers):
 
             raise MKLivestatusSocketError("RC1:" + str(e))
 
+    def _set_output_format(self, query: str) -> None:
+        """Answer the query in JSON format in case the positions of its blob columns are known"""
+        self._blob_positions = None
+        tables = self._blob_columns()
+        if tables is not None:
+            self._blob_positions = json_blob_positions(query, tables)
+
+        self._column_headers = False
+        for line in query.split("\n"):
+            if line.startswith("ColumnHeaders:"):
+                self._column_headers = line[14:].strip() == "on"
+
+    def _blob_columns(self) -> Optional[Dict[str, Set[str]]]:
+        """The names of the blob columns per table of the site, None while they are unknown
+
+        In case the site fails to tell them, the queries are answered in the python3
+        format until the site is asked again after _BLOB_COLUMNS_RETRY_INTERVAL seconds."""
+        if self.socketurl in blob_columns:
+            return blob_columns[self.socketurl]
+        if time.time() < _blob_columns_retry_at.get(self.socketurl, 0.0):
+            return None
+
+        # The query of the column types itself is answered in the python3 format
+        blob_columns[self.socketurl] = None
+        try:
+            rows = self.do_query(Query(u"GET columns\nColumns: table name\nFilter: type = blob\n"),
+                                 u"ColumnHeaders: off\n")
+        except MKLivestatusException:
+            del blob_columns[self.socketurl]
+            _blob_columns_retry_at[self.socketurl] = time.time() + _BLOB_COLUMNS_RETRY_INTERVAL
+            return None
+
+        tables: Dict[str, Set[str]] = {}
+        for table, name in rows:
+            tables.setdefault(table, set()).add(name)
+        blob_columns[self.socketurl] = tables
+        _blob_columns_retry_at.pop(self.socketurl, None)
+        return tables
+
     # Reads a response from the livestatus socket. If the socket is closed
     # by the livestatus server, we automatically make a reconnect and send
     # the query again (once). This is due to timeouts during keepalive.
@@ -488,39 +727,34 @@ class SingleSiteConnection(Helpers):
                       query: Optional[Query] = None,
                       add_headers: str = "",
                       timeout_at: Optional[float] = None) -> LivestatusResponse:
-        try:
-            # Headers are always ASCII encoded
-            resp = self.receive_data(16)
-            code = resp[0:3].decode("ascii")
-            try:
-                length = int(resp[4:15].lstrip())
-            except Exception:
-                self.disconnect()
-                raise MKLivestatusSocketError(
-                    "Malformed output. Livestatus TCP socket might be unreachable or wrong"
-                    "encryption settings are used.")
+        return LivestatusResponse(list(self.iter_response(query, add_headers, timeout_at)))
 
-            data = self.receive_data(length).decode("utf-8")
-
-            if code == "200":
-                try:
-                    return ast.literal_eval(data)
-                except Exception:
-                    self.disconnect()
-                    raise MKLivestatusSocketError("Malformed output")
+    def iter_response(self,
+                      query: Optional[Query] = None,
+                      add_headers: str = "",
+                      timeout_at: Optional[float] = None) -> Iterator[LivestatusRow]:
+        """Like recv_response(), but the rows are yielded while they are received
 
-            elif code == "404":
-                raise MKLivestatusTableNotFoundError("Not Found (%s): %s" % (code, data.strip()))
+        The query is only sent again in case the connection broke down before
+        the first row was received. When the caller stops the iteration before
+        the end of the response, the connection is closed.
+        """
+        received_rows = False
+        try:
+            for row in self._read_response():
+                received_rows = True
+                yield row
 
-            else:
-                raise MKLivestatusQueryError("%s: %s" % (code, data.strip()))
+        except GeneratorExit:
+            self.disconnect()
+            raise
 
         except (MKLivestatusSocketClosed, IOError) as e:
             # In case of an IO error or the other side having
             # closed the socket do a reconnect and try again
             self.disconnect()
             now = time.time()
-            if query and (not timeout_at or timeout_at > now):
+            if query and not received_rows and (not timeout_at or timeout_at > now):
                 if timeout_at is None:
                     # Try until timeout reached in case there was a timeout configured.
                     # Otherwise only retry once.
@@ -531,9 +765,9 @@ class SingleSiteConnection(Helpers):
                 time.sleep(0.1)
                 self.connect()
                 self.send_query(query, add_headers)
-                return self.recv_response(
-                    query, add_headers,
-                    timeout_at)  # do not send query again -> danger of infinite loop
+                # do not send query again -> danger of infinite loop
+                yield from self.iter_response(query, add_headers, timeout_at)
+                return
             raise MKLivestatusSocketError(str(e))
 
         except MKLivestatusTableNotFoundError:
@@ -546,6 +780,57 @@ class SingleSiteConnection(Helpers):
             # FIXME: ? self.disconnect()
             raise MKLivestatusSocketError("Unhandled exception: %s" % e)
 
+    def _read_response(self) -> Iterator[LivestatusRow]:
+        if self.socket is None:
+            raise MKLivestatusSocketError("Socket to '%s' is not connected" % self.socketurl)
+
+        reader = self.response_reader()
+        # Timeout is only honored when connecting
+        self.socket.settimeout(None)
+        while not reader.complete:
+            yield from self.read_response_data(reader)
+
+    def response_reader(self) -> ResponseReader:
+        """The reader of the response to the query sent last"""
+        return ResponseReader(self._blob_positions, self._column_headers)
+
+    def read_response_data(self, reader: ResponseReader) -> List[LivestatusRow]:
+        """Receive the next part of the response, returns the rows completed by it
+
+        In case of a non blocking socket, nothing is returned when no data is
+        available.
+        """
+        if self.socket is None:
+            raise MKLivestatusSocketError("Socket to '%s' is not connected" % self.socketurl)
+
+        try:
+            data = self.socket.recv(reader.wanted)
+        except (BlockingIOError, ssl.SSLWantReadError, ssl.SSLWantWriteError):
+            return []
+        if not data:
+            raise MKLivestatusSocketClosed(
+                "Read zero data from socket, nagios server closed connection")
+
+        now = time.time()
+        if self.stats.latency is None:
+            self.stats.latency = now - self.stats.started
+        self.stats.bytes_received += len(data)
+
+        try:
+            rows = reader.feed(data)
+        except (MKLivestatusSocketError, UnicodeDecodeError):
+            self.disconnect()
+            raise
+
+        self.stats.rows += len(rows)
+        if reader.complete:
+            self.stats.duration = now - self.stats.started
+        return rows
+
+    def has_buffered_data(self) -> bool:
+        """Whether received data is buffered by the TLS layer, unnoticed by select()"""
+        return isinstance(self.socket, ssl.SSLSocket) and self.socket.pending() > 0
+
     def set_prepend_site(self, p: bool) -> None:
         self.prepend_site = p
 
@@ -573,6 +858,24 @@ class SingleSiteConnection(Helpers):
                 row.insert(0, b"")
         return response
 
+    def query_iter(self,
+                   query: 'QueryTypes',
+                   add_headers: Union[str, bytes] = u"") -> Iterator[LivestatusRow]:
+
+        # Normalize argument types
+        normalized_add_headers = _ensure_unicode(add_headers)
+        normalized_query = Query(query) if not isinstance(query, Query) else query
+
+        if self.limit is not None:
+            normalized_query = Query(u"%sLimit: %d\n" % (normalized_query, self.limit),
+                                     normalized_query.suppress_exceptions)
+
+        self.send_query(normalized_query, normalized_add_headers)
+        for row in self.iter_response(normalized_query, normalized_add_headers):
+            if self.prepend_site:
+                row.insert(0, b"")
+            yield row
+
     # TODO: Cleanup all call sites to hand over str types
     def command(self, command: AnyStr, site: Optional[SiteId] = None) -> None:
         self.do_command(command)
@@ -646,6 +949,10 @@ class MultiSiteConnection(Helpers):
         self.only_sites: OnlySites = None
         self.limit: Optional[int] = None
         self.parallelize = True
+        self.query_timeout: Optional[float] = None
+        self._query_stats: Dict[SiteId, QueryStats] = {}
+        # Set while the responses to a query are read, see query_iter()
+        self._reading_responses = False
 
         # Status host: A status host helps to prevent trying to connect
         # to a remote site which is unreachable. This is done by looking
@@ -847,6 +1154,7 @@ class MultiSiteConnection(Helpers):
         return self.query_non_parallel(normalized_query, normalized_add_headers)
 
     def query_non_parallel(self, query: Query, add_headers: str = u"") -> LivestatusResponse:
+        self._ensure_no_responses_pending()
         result = LivestatusResponse([])
         stillalive = []
         limit = self.limit
@@ -880,6 +1188,50 @@ class MultiSiteConnection(Helpers):
     # of Limit: since all sites are queried in parallel, the Limit: is simply
     # applied to all sites - resulting in possibly more results then Limit requests.
     def query_parallel(self, query: Query, add_headers: str = u"") -> LivestatusResponse:
+        site_order = [sitename for sitename, _site, _connection in self.connections]
+        rows_of_sites: Dict[SiteId, List[LivestatusRow]] = {}
+        complete_sites = set()
+        for sitename, rows, complete in self._iter_parallel(query, add_headers):
+            rows_of_sites.setdefault(sitename, []).extend(rows)
+            if complete:
+                complete_sites.add(sitename)
+
+        # The rows of sites that failed in the middle of their response are dropped
+        result = LivestatusResponse([])
+        for sitename in site_order:
+            if sitename in complete_sites:
+                result += rows_of_sites.get(sitename, [])
+        return result
+
+    def query_iter(self,
+                   query: 'QueryTypes',
+                   add_headers: Union[str, bytes] = u"") -> Iterator[LivestatusRow]:
+        """Like query_parallel(), but the rows are yielded while they are received
+
+        The rows of the sites are yielded in the order they arrive in. A site
+        failing in the middle of its response is marked as dead, but the rows
+        of it that have already been yielded can not be taken back.
+
+        The connections to the sites are busy until the iteration has ended:
+        Other queries and commands raise a RuntimeError until then.
+        """
+        normalized_add_headers = _ensure_unicode(add_headers)
+        normalized_query = Query(query) if not isinstance(query, Query) else query
+
+        for _sitename, rows, _complete in self._iter_parallel(normalized_query,
+                                                              normalized_add_headers):
+            yield from rows
+
+    def _iter_parallel(self, query: Query,
+                       add_headers: str) -> Iterator[Tuple[SiteId, List[LivestatusRow], bool]]:
+        """Send the query to all sites, then yield the rows of the sites as they arrive
+
+        Yields the site, the rows received and whether the response of the site
+        is complete. The responses of all sites are read concurrently, sites not
+        answering within their query timeout are marked as dead.
+        """
+        self._ensure_no_responses_pending()
+        prepend_site = self.prepend_site
         stillalive = []
         if self.only_sites is not None:
             connect_to_sites = [c for c in self.connections if c[0] in self.only_sites]
@@ -888,52 +1240,157 @@ class MultiSiteConnection(Helpers):
         else:
             connect_to_sites = self.connections
 
-        limit = self.limit
-        if limit is not None:
-            limit_header = u"Limit: %d\n" % limit
-        else:
-            limit_header = u""
+        if self.limit is not None:
+            add_headers += u"Limit: %d\n" % self.limit
+
+        suppress_exceptions = tuple(query.suppress_exceptions)
+        selector = selectors.DefaultSelector()
+        readers: Dict[SiteId, ResponseReader] = {}
+        # The sockets registered with the selector, the connections drop their
+        # socket on errors
+        registered: Dict[SiteId, socket.socket] = {}
+        resent: Set[SiteId] = set()
+
+        def send(entry: Tuple[SiteId, SiteConfiguration, SingleSiteConnection]) -> None:
+            sitename, _site, connection = entry
+            connection.send_query(query, add_headers)
+            assert connection.socket is not None
+            readers[sitename] = connection.response_reader()
+            connection.socket.setblocking(False)
+            selector.register(connection.socket, selectors.EVENT_READ, entry)
+            registered[sitename] = connection.socket
+
+        def finish(entry: Tuple[SiteId, SiteConfiguration, SingleSiteConnection],
+                   error: Optional[Exception] = None) -> None:
+            sitename, site, connection = entry
+            if sitename in registered:
+                selector.unregister(registered.pop(sitename))
+            if connection.socket is not None:
+                connection.socket.settimeout(None)
+
+            if error is None or isinstance(error, suppress_exceptions):
+                stillalive.append(entry)
+                return
+
+            connection.disconnect()
+            self.deadsites[sitename] = {
+                "exception": error,
+                "site": site,
+            }
 
         # First send all queries
-        for sitename, site, connection in connect_to_sites:
+        for entry in connect_to_sites:
             try:
-                connection.send_query(query, add_headers + limit_header)
+                send(entry)
             except Exception as e:
-                self.deadsites[sitename] = {
-                    "exception": e,
-                    "site": site,
-                }
+                finish(entry, e)
 
-        suppress_exceptions = tuple(query.suppress_exceptions)
+        self._reading_responses = True
+        try:
+            while selector.get_map():
+                for key, _events in selector.select(self._select_timeout(selector)):
+                    entry = key.data
+                    sitename, _site, connection = entry
+                    reader = readers[sitename]
+                    try:
+                        rows = connection.read_response_data(reader)
+                        while not reader.complete and connection.has_buffered_data():
+                            rows += connection.read_response_data(reader)
+
+                    except (MKLivestatusSocketClosed, IOError) as e:
+                        # In case of an IO error or the other side having closed the
+                        # socket before answering, reconnect and send the query again
+                        # (once). This is due to timeouts during keepalive.
+                        if connection.stats.bytes_received or sitename in resent:
+                            finish(entry, MKLivestatusSocketError(str(e)))
+                            continue
+                        resent.add(sitename)
+                        selector.unregister(registered.pop(sitename))
+                        connection.disconnect()
+                        try:
+                            send(entry)
+                        except Exception as e:
+                            finish(entry, e)
+                        continue
 
-        # Then retrieve all answers. We will be as slow as the slowest of all
-        # connections.
-        result = LivestatusResponse([])
-        for sitename, site, connection in connect_to_sites:
-            try:
-                r = connection.recv_response(query, add_headers + limit_header)
-                stillalive.append((sitename, site, connection))
-                if self.prepend_site:
-                    for row in r:
-                        row.insert(0, sitename)
-                result += r
-            except suppress_exceptions:  # pylint: disable=catching-non-exception
-                stillalive.append((sitename, site, connection))
-                continue
+                    except MKLivestatusTableNotFoundError as e:
+                        finish(entry, e)
+                        continue
 
-            except Exception as e:
-                connection.disconnect()
-                self.deadsites[sitename] = {
-                    "exception": e,
-                    "site": site,
-                }
+                    except Exception as e:
+                        finish(entry, MKLivestatusSocketError("Unhandled exception: %s" % e))
+                        continue
 
-        self.connections = stillalive
-        return result
+                    if prepend_site:
+                        for row in rows:
+                            row.insert(0, sitename)
+                    if reader.complete:
+                        finish(entry)
+                    if rows or reader.complete:
+                        yield sitename, rows, reader.complete
+
+                self._finish_timed_out_sites(selector, finish)
+        finally:
+            # The iteration has been stopped by the caller. The sites have not
+            # failed, but their responses have to be dropped.
+            for key in list(selector.get_map().values()):
+                selector.unregister(key.fileobj)
+                key.data[2].disconnect()
+                stillalive.append(key.data)
+            selector.close()
+            self._reading_responses = False
+            self.connections = stillalive
+            self._query_stats = {
+                sitename: connection.stats for sitename, _site, connection in connect_to_sites
+            }
+
+    def _ensure_no_responses_pending(self) -> None:
+        if self._reading_responses:
+            raise RuntimeError("Livestatus query sent while the responses to another query "
+                               "are read, the iteration over query_iter() has to end first")
+
+    def _query_timeout(self, site: SiteConfiguration) -> Optional[float]:
+        return site.get("query_timeout", self.query_timeout)
+
+    def _select_timeout(self, selector: selectors.BaseSelector) -> Optional[float]:
+        deadlines = []
+        for key in selector.get_map().values():
+            _sitename, site, connection = key.data
+            timeout = self._query_timeout(site)
+            if timeout is not None:
+                deadlines.append(connection.stats.started + timeout)
+        if not deadlines:
+            return None
+        return max(0.0, min(deadlines) - time.time())
+
+    def _finish_timed_out_sites(self, selector: selectors.BaseSelector,
+                                finish: Callable[..., None]) -> None:
+        now = time.time()
+        for key in list(selector.get_map().values()):
+            sitename, site, connection = key.data
+            timeout = self._query_timeout(site)
+            if timeout is not None and now >= connection.stats.started + timeout:
+                finish(
+                    key.data,
+                    MKLivestatusSocketError("Site %s did not answer within %s seconds" %
+                                            (sitename, timeout)))
+
+    def set_query_timeout(self, timeout: Optional[float] = None) -> None:
+        """Mark sites as dead that do not answer a query within timeout seconds
+
+        The timeout can be set per site with the "query_timeout" of the site
+        configuration. None waits for the sites infinitely.
+        """
+        self.query_timeout = timeout
+
+    def query_stats(self) -> Dict[SiteId, QueryStats]:
+        """Latency and size of the responses of the sites to the last parallel query"""
+        return self._query_stats
 
     # TODO: Is this SiteId(...) the way to go? Without this mypy complains about incompatible bytes
     # vs. Optional[SiteId]
     def command(self, command: AnyStr, sitename: Optional[SiteId] = SiteId("local")) -> None:
+        self._ensure_no_responses_pending()
         if sitename in self.deadsites:
             raise MKLivestatusSocketError("Connection to site %s is dead: %s" %
                                           (sitename, self.deadsites[sitename]["exception"]))
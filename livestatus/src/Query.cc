@@ -20,15 +20,19 @@
 #include "AndingFilter.h"
 #include "ChronoUtils.h"
 #include "Column.h"
+#include "DoubleColumn.h"
 #include "Filter.h"
+#include "IntColumn.h"
 #include "Logger.h"
 #include "MonitoringCore.h"
 #include "NullColumn.h"
 #include "OringFilter.h"
 #include "OutputBuffer.h"
 #include "StatsColumn.h"
+#include "StringColumn.h"
 #include "StringUtils.h"
 #include "Table.h"
+#include "TimeColumn.h"
 #include "Triggers.h"
 #include "auth.h"
 #include "opids.h"
@@ -81,6 +85,8 @@ Query::Query(const std::list<std::string> &lines, Table &table,
     , _show_column_headers(true)
     , _output_format(OutputFormat::broken_csv)
     , _limit(-1)
+    , _offset(0)
+    , _sorted_rows_size(0)
     , _time_limit(-1)
     , _time_limit_timeout(0)
     , _current_line(0)
@@ -132,6 +138,10 @@ Query::Query(const std::list<std::string> &lines, Table &table,
                 parseColumnHeadersLine(arguments);
             } else if (header == "Limit") {
                 parseLimitLine(arguments);
+            } else if (header == "Offset") {
+                parseOffsetLine(arguments);
+            } else if (header == "OrderBy") {
+                parseOrderByLine(arguments);
             } else if (header == "Timelimit") {
                 parseTimelimitLine(arguments);
             } else if (header == "AuthUser") {
@@ -180,6 +190,11 @@ Query::Query(const std::list<std::string> &lines, Table &table,
         _show_column_headers = true;
     }
 
+    if (doStats() && (doOrderBy() || _offset > 0)) {
+        _output.setError(OutputBuffer::ResponseCode::invalid_header,
+                         "OrderBy and Offset can not be used with Stats");
+    }
+
     _filter = AndingFilter::make(Filter::Kind::row, filters);
     _wait_condition =
         AndingFilter::make(Filter::Kind ::wait_condition, wait_conditions);
@@ -529,6 +544,32 @@ void Query::parseLimitLine(char *line) {
     _limit = nextNonNegativeIntegerArgument(&line);
 }
 
+void Query::parseOffsetLine(char *line) {
+    _offset = nextNonNegativeIntegerArgument(&line);
+}
+
+void Query::parseOrderByLine(char *line) {
+    auto column = _table.column(nextStringArgument(&line));
+    if (dynamic_cast<const IntColumn *>(column.get()) == nullptr &&
+        dynamic_cast<const DoubleColumn *>(column.get()) == nullptr &&
+        dynamic_cast<const TimeColumn *>(column.get()) == nullptr &&
+        dynamic_cast<const StringColumn *>(column.get()) == nullptr) {
+        throw std::runtime_error("can not order by column '" + column->name() +
+                                 "'");
+    }
+    bool descending = false;
+    if (auto *direction = next_field(&line)) {
+        if (std::string(direction) == "desc") {
+            descending = true;
+        } else if (std::string(direction) != "asc") {
+            throw std::runtime_error("expected 'asc' or 'desc'");
+        }
+    }
+    checkNoArguments(line);
+    _order_by.push_back(OrderBy{column, descending});
+    _all_columns.insert(column);
+}
+
 void Query::parseTimelimitLine(char *line) {
     _time_limit = nextNonNegativeIntegerArgument(&line);
     _time_limit_timeout = time(nullptr) + _time_limit;
@@ -583,6 +624,8 @@ void Query::parseLocaltimeLine(char *line) {
 
 bool Query::doStats() const { return !_stats_columns.empty(); }
 
+bool Query::doOrderBy() const { return !_order_by.empty(); }
+
 bool Query::process() {
     // Precondition: output has been reset
     auto start_time = std::chrono::system_clock::now();
@@ -652,8 +695,16 @@ bool Query::processDataset(Row row) {
     if (_filter->accepts(row, _auth_user, _timezone_offset) &&
         (_auth_user == nullptr || _table.isAuthorized(row, _auth_user))) {
         _current_line++;
-        if (_limit >= 0 && static_cast<int>(_current_line) > _limit) {
-            return false;
+        // With OrderBy:, Offset: and Limit: are applied to the sorted rows in
+        // finish().
+        if (!doOrderBy()) {
+            if (static_cast<int>(_current_line) <= _offset) {
+                return true;
+            }
+            if (_limit >= 0 &&
+                static_cast<int>(_current_line) > _offset + _limit) {
+                return false;
+            }
         }
 
         // When we reach the time limit we let the query fail. Otherwise the
@@ -670,20 +721,13 @@ bool Query::processDataset(Row row) {
             // then.  :-/ The slightly hacky workaround is to pre-render all
             // non-stats columns into a single string here (RowFragment) and
             // output it later in a verbatim manner.
-            std::ostringstream os;
-            {
-                auto renderer =
-                    Renderer::make(_output_format, os, _output.getLogger(),
-                                   _separators, _data_encoding);
-                QueryRenderer q(*renderer, EmitBeginEnd::off);
-                RowRenderer r(q);
-                for (const auto &column : _columns) {
-                    column->output(row, r, _auth_user, _timezone_offset);
-                }
-            }
-            for (const auto &aggr : getAggregatorsFor(RowFragment{os.str()})) {
+            for (const auto &aggr : getAggregatorsFor(renderRow(row))) {
                 aggr->consume(row, _auth_user, timezoneOffset());
             }
+        } else if (doOrderBy()) {
+            // The same workaround for sorted rows: They are output in
+            // finish(), so they are pre-rendered together with their sort keys.
+            return addSortedRow(row);
         } else {
             assert(_renderer_query);  // Missing call to `process()`.
             RowRenderer r(*_renderer_query);
@@ -695,7 +739,112 @@ bool Query::processDataset(Row row) {
     return true;
 }
 
+RowFragment Query::renderRow(Row row) const {
+    std::ostringstream os;
+    {
+        auto renderer = Renderer::make(_output_format, os, _output.getLogger(),
+                                       _separators, _data_encoding);
+        QueryRenderer q(*renderer, EmitBeginEnd::off);
+        RowRenderer r(q);
+        for (const auto &column : _columns) {
+            column->output(row, r, _auth_user, _timezone_offset);
+        }
+    }
+    return RowFragment{os.str()};
+}
+
+bool Query::addSortedRow(Row row) {
+    SortedRow sorted_row;
+    for (const auto &order_by : _order_by) {
+        sorted_row.keys.push_back(sortValue(*order_by.column, row));
+    }
+    sorted_row.index = _current_line;
+
+    auto compare = [this](const SortedRow &a, const SortedRow &b) {
+        return lessThan(a, b);
+    };
+    // Only the first Offset: + Limit: rows can be part of the answer, the
+    // rows behind them are not even rendered.
+    if (_limit >= 0 && _sorted_rows.size() >= static_cast<size_t>(_offset) +
+                                                  static_cast<size_t>(_limit)) {
+        if (_sorted_rows.empty() ||
+            !lessThan(sorted_row, _sorted_rows.front())) {
+            return true;
+        }
+        std::pop_heap(_sorted_rows.begin(), _sorted_rows.end(), compare);
+        _sorted_rows_size -= _sorted_rows.back().fragment._str.size();
+        _sorted_rows.pop_back();
+    }
+
+    sorted_row.fragment = renderRow(row);
+    _sorted_rows_size += sorted_row.fragment._str.size();
+    if (_sorted_rows_size > _max_response_size) {
+        _output.setError(OutputBuffer::ResponseCode::limit_exceeded,
+                         "Maximum response size of " +
+                             std::to_string(_max_response_size) +
+                             " bytes exceeded!");
+        return false;
+    }
+    _sorted_rows.push_back(std::move(sorted_row));
+    if (_limit >= 0) {
+        std::push_heap(_sorted_rows.begin(), _sorted_rows.end(), compare);
+    }
+    return true;
+}
+
+SortValue Query::sortValue(const Column &column, Row row) const {
+    if (const auto *ic = dynamic_cast<const IntColumn *>(&column)) {
+        return {static_cast<double>(ic->getValue(row, _auth_user)), {}, {}};
+    }
+    if (const auto *dc = dynamic_cast<const DoubleColumn *>(&column)) {
+        return {dc->getValue(row), {}, {}};
+    }
+    if (const auto *tc = dynamic_cast<const TimeColumn *>(&column)) {
+        return {static_cast<double>(std::chrono::system_clock::to_time_t(
+                    tc->getValue(row, _timezone_offset))),
+                {},
+                {}};
+    }
+    auto text = dynamic_cast<const StringColumn &>(column).getValue(row);
+    auto folded = text;
+    std::transform(folded.begin(), folded.end(), folded.begin(),
+                   [](unsigned char c) { return std::tolower(c); });
+    return {0, std::move(folded), std::move(text)};
+}
+
+bool Query::lessThan(const SortedRow &a, const SortedRow &b) const {
+    for (size_t i = 0; i < _order_by.size(); ++i) {
+        const auto &x = _order_by[i].descending ? b.keys[i] : a.keys[i];
+        const auto &y = _order_by[i].descending ? a.keys[i] : b.keys[i];
+        if (x.number != y.number) {
+            return x.number < y.number;
+        }
+        if (x.folded != y.folded) {
+            return x.folded < y.folded;
+        }
+        if (x.text != y.text) {
+            return x.text < y.text;
+        }
+    }
+    return a.index < b.index;
+}
+
 void Query::finish(QueryRenderer &q) {
+    if (doOrderBy()) {
+        std::sort(_sorted_rows.begin(), _sorted_rows.end(),
+                  [this](const SortedRow &a, const SortedRow &b) {
+                      return lessThan(a, b);
+                  });
+        auto end = _limit < 0 ? _sorted_rows.size()
+                              : std::min(_sorted_rows.size(),
+                                         static_cast<size_t>(_offset) +
+                                             static_cast<size_t>(_limit));
+        for (auto i = static_cast<size_t>(_offset); i < end; ++i) {
+            RowRenderer r(q);
+            r.output(_sorted_rows[i].fragment);
+        }
+    }
+
     if (doStats()) {
         for (const auto &group : _stats_groups) {
             RowRenderer r(q);
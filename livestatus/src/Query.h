@@ -37,6 +37,23 @@ class Logger;
 class OutputBuffer;
 class Table;
 
+// The values of the OrderBy: columns of a row, numbers (int, double and time
+// columns) and strings. Strings are ordered case-insensitively, differences in
+// case only decide between otherwise equal strings.
+struct SortValue {
+    double number;
+    std::string folded;
+    std::string text;
+};
+
+// A row of a query with OrderBy:, rendered in advance like the rows of stats
+// queries. The index of the row keeps the order of equal rows stable.
+struct SortedRow {
+    std::vector<SortValue> keys;
+    unsigned index;
+    RowFragment fragment;
+};
+
 class Query {
 public:
     Query(const std::list<std::string> &lines, Table &table,
@@ -75,6 +92,11 @@ private:
     using LogicalConnective =
         std::function<std::unique_ptr<Filter>(Filter::Kind, const Filters &)>;
 
+    struct OrderBy {
+        std::shared_ptr<Column> column;
+        bool descending;
+    };
+
     const Encoding _data_encoding;
     const size_t _max_response_size;
     OutputBuffer &_output;
@@ -92,6 +114,12 @@ private:
     bool _show_column_headers;
     OutputFormat _output_format;
     int _limit;
+    int _offset;
+    std::vector<OrderBy> _order_by;
+    // With Limit:, only the first Offset: + Limit: rows are kept, as a heap
+    // with the last of them on top.
+    std::vector<SortedRow> _sorted_rows;
+    size_t _sorted_rows_size;
     int _time_limit;
     time_t _time_limit_timeout;
     unsigned _current_line;
@@ -117,6 +145,8 @@ private:
     void parseColumnsLine(char *line);
     void parseColumnHeadersLine(char *line);
     void parseLimitLine(char *line);
+    void parseOffsetLine(char *line);
+    void parseOrderByLine(char *line);
     void parseTimelimitLine(char *line);
     void parseSeparatorsLine(char *line);
     void parseOutputFormatLine(char *line);
@@ -129,6 +159,11 @@ private:
     void parseLocaltimeLine(char *line);
     void start(QueryRenderer &q);
     void finish(QueryRenderer &q);
+    RowFragment renderRow(Row row) const;
+    bool doOrderBy() const;
+    bool addSortedRow(Row row);
+    SortValue sortValue(const Column &column, Row row) const;
+    bool lessThan(const SortedRow &a, const SortedRow &b) const;
 
     // NOTE: We cannot make this 'const' right now, it adds entries into
     // _stats_groups.
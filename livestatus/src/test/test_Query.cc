@@ -0,0 +1,113 @@
+// Copyright (C) 2019 tribe29 GmbH - License: GNU General Public License v2
+// This file is part of Checkmk (https://checkmk.com). It is subject to the
+// terms and conditions defined in the file COPYING, which is part of this
+// source code package.
+
+#include <algorithm>
+#include <filesystem>
+#include <fstream>
+#include <list>
+#include <string>
+#include <utility>
+#include <vector>
+
+#include "NagiosCore.h"
+#include "TableCrashReports.h"
+#include "TableQueryHelper.h"
+#include "data_encoding.h"
+#include "gtest/gtest.h"
+#include "test/Utilities.h"
+
+namespace fs = std::filesystem;
+
+namespace {
+// The crash reports table is the one table which is easily filled without a
+// running core, its columns are strings.
+std::string id(int number) {
+    return "8966a88e-e369-11e9-981a-acbc328d0e0" + std::to_string(number);
+}
+
+std::string rows(const std::vector<std::pair<std::string, int>> &reports) {
+    std::string result;
+    for (const auto &[component, number] : reports) {
+        result += component + ";" + id(number) + "\n";
+    }
+    return result;
+}
+
+class OrderByFixture : public ::testing::Test {
+public:
+    const fs::path basepath{fs::temp_directory_path() / "query_tests" /
+                            random_string(12)};
+    NagiosCore core{paths_(), NagiosLimits{}, NagiosAuthorization{},
+                    Encoding::utf8};
+    TableCrashReports table{&core};
+
+    void SetUp() override {
+        for (const auto &[component, number] :
+             std::vector<std::pair<std::string, int>>{
+                 {"gui", 3}, {"base", 1}, {"Gui", 5}, {"cmc", 2}, {"gui", 4}}) {
+            auto directory = basepath / component / id(number);
+            fs::create_directories(directory);
+            std::ofstream ofs(directory / "crash.info");
+            ofs << "{}\n";
+        }
+    }
+    void TearDown() override { fs::remove_all(basepath); }
+
+    std::string query(const std::list<std::string> &headers) {
+        std::list<std::string> lines{"Columns: component id\n"};
+        lines.insert(lines.end(), headers.begin(), headers.end());
+        return mk::test::query(table, lines);
+    }
+
+private:
+    // cppcheck-suppress unusedPrivateFunction
+    [[nodiscard]] NagiosPaths paths_() const {
+        NagiosPaths p{};
+        p._crash_reports_path = basepath;
+        return p;
+    }
+};
+}  // namespace
+
+TEST_F(OrderByFixture, Ascending) {
+    auto expected =
+        rows({{"base", 1}, {"cmc", 2}, {"gui", 3}, {"gui", 4}, {"Gui", 5}});
+    EXPECT_EQ(expected, query({"OrderBy: id\n"}));
+    EXPECT_EQ(expected, query({"OrderBy: id asc\n"}));
+}
+
+TEST_F(OrderByFixture, Descending) {
+    EXPECT_EQ(
+        rows({{"Gui", 5}, {"gui", 4}, {"gui", 3}, {"cmc", 2}, {"base", 1}}),
+        query({"OrderBy: id desc\n"}));
+}
+
+TEST_F(OrderByFixture, StringsIgnoreCaseFirst) {
+    EXPECT_EQ(
+        rows({{"base", 1}, {"cmc", 2}, {"Gui", 5}, {"gui", 3}, {"gui", 4}}),
+        query({"OrderBy: component\n", "OrderBy: id\n"}));
+    EXPECT_EQ(
+        rows({{"gui", 4}, {"gui", 3}, {"Gui", 5}, {"cmc", 2}, {"base", 1}}),
+        query({"OrderBy: component desc\n", "OrderBy: id desc\n"}));
+}
+
+TEST_F(OrderByFixture, LimitAndOffset) {
+    EXPECT_EQ(rows({{"base", 1}, {"cmc", 2}}),
+              query({"OrderBy: id\n", "Limit: 2\n"}));
+    EXPECT_EQ(rows({{"gui", 3}, {"gui", 4}}),
+              query({"OrderBy: id\n", "Offset: 2\n", "Limit: 2\n"}));
+    EXPECT_EQ(rows({{"Gui", 5}}),
+              query({"OrderBy: id\n", "Offset: 4\n", "Limit: 2\n"}));
+    EXPECT_EQ("", query({"OrderBy: id\n", "Offset: 5\n"}));
+    EXPECT_EQ("", query({"OrderBy: id\n", "Limit: 0\n"}));
+}
+
+TEST_F(OrderByFixture, OffsetWithoutOrderBy) {
+    auto all = query({});
+    EXPECT_EQ(all.substr(all.find('\n') + 1), query({"Offset: 1\n"}));
+    auto some = query({"Offset: 1\n", "Limit: 3\n"});
+    EXPECT_EQ(3, std::count(some.begin(), some.end(), '\n'));
+    EXPECT_EQ("", query({"Offset: 5\n"}));
+}
@@ -251,6 +251,7 @@ def save_tmpfs_dump(site):
     save_paths = [
         Path(site.tmp_dir) / "check_mk" / "piggyback",
         Path(site.tmp_dir) / "check_mk" / "piggyback_sources",
+        Path(site.tmp_dir) / "check_mk" / "piggyback_packed",
     ]
 
     dump_path = _tmpfs_dump_path(site)
@@ -21,7 +21,7 @@ import cmk.utils.paths
 import cmk.snmplib.snmp_cache as snmp_cache
 from cmk.snmplib.type_defs import SNMPHostConfig
 
-from cmk.fetchers.snmp_backend import ClassicSNMPBackend, StoredWalkSNMPBackend
+from cmk.fetchers.snmp_backend import ClassicSNMPBackend, NativeSNMPBackend, StoredWalkSNMPBackend
 try:
     from cmk.fetchers.cee.snmp_backend.inline import InlineSNMPBackend
 except ImportError:
@@ -157,8 +157,9 @@ def _is_listening(process_def):
     return True
 
 
-@pytest.fixture(name="backend",
-                params=[ClassicSNMPBackend, StoredWalkSNMPBackend, InlineSNMPBackend])
+@pytest.fixture(
+    name="backend",
+    params=[ClassicSNMPBackend, NativeSNMPBackend, StoredWalkSNMPBackend, InlineSNMPBackend])
 def backend_fixture(request, snmp_data_dir):
     backend = request.param
     if backend is None:
@@ -180,6 +181,7 @@ def backend_fixture(request, snmp_data_dir):
         character_encoding=None,
         is_usewalk_host=backend is StoredWalkSNMPBackend,
         is_inline_snmp_host=backend is InlineSNMPBackend,
+        is_native_snmp_host=backend is NativeSNMPBackend,
         record_stats=False,
     )
 
@@ -19,6 +19,8 @@ from cmk.utils.type_defs import CheckPluginName, ConfigSerial, LATEST_SERIAL
 
 import cmk.base.config as config
 import cmk.base.core_config as core_config
+import cmk.base.ip_lookup as ip_lookup
+from cmk.base.caching import config_cache as _config_cache
 import cmk.base.nagios_utils
 from cmk.base.core_factory import create_core
 from cmk.base.check_utils import Service
@@ -286,3 +288,46 @@ def test_new_helper_config_serial():
     assert core_config.new_helper_config_serial() == ConfigSerial("1")
     assert core_config.new_helper_config_serial() == ConfigSerial("2")
     assert core_config.new_helper_config_serial() == ConfigSerial("3")
+
+
+def _host_function(hostname):
+    if hostname.startswith("warn"):
+        core_config.warning("warning of %s" % hostname)
+    return hostname.upper()
+
+
+@pytest.mark.parametrize("processes", [1, 3])
+def test_map_hosts(monkeypatch, processes):
+    monkeypatch.setattr(config, "core_config_processes", processes)
+    core_config.initialize_warnings()
+    hostnames = ["host%d" % i for i in range(20)] + ["warn1", "warn2"]
+
+    assert list(core_config.map_hosts(_host_function, hostnames)) == [
+        (hostname, hostname.upper()) for hostname in hostnames
+    ]
+    assert core_config.get_configuration_warnings() == ["warning of warn1", "warning of warn2"]
+
+
+def _getaddrinfo(hostname, *args):
+    return [(None, None, None, None, ("10.0.0.%s" % hostname,))]
+
+
+def _lookup_host(hostname):
+    return ip_lookup.cached_dns_lookup(hostname, 4, False)
+
+
+@pytest.mark.parametrize("processes", [1, 3])
+def test_map_hosts_collects_dns_lookups(monkeypatch, tmp_path, processes):
+    monkeypatch.setattr(config, "core_config_processes", processes)
+    monkeypatch.setattr(cmk.utils.paths, "var_dir", str(tmp_path))
+    monkeypatch.setattr(ip_lookup.socket, "getaddrinfo", _getaddrinfo)
+    _config_cache.clear_all()
+    hostnames = [str(i) for i in range(10)]
+
+    assert list(core_config.map_hosts(_lookup_host, hostnames)) == [
+        (hostname, "10.0.0.%s" % hostname) for hostname in hostnames
+    ]
+    assert _config_cache.get_dict("cached_dns_lookup") == {
+        (hostname, 4): "10.0.0.%s" % hostname for hostname in hostnames
+    }
+    assert (tmp_path / "ipaddresses.cache").exists()
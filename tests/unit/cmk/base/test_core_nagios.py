@@ -207,6 +207,27 @@ def test_create_nagios_host_spec(hostname, result, monkeypatch):
     assert host_spec == result
 
 
+def test_merge_host_config():
+    cfg = core_nagios.NagiosConfig(io.StringIO(), ["host1", "host2"])
+    for hostname in ["host1", "host2"]:
+        host_cfg = core_nagios.NagiosConfig(io.StringIO(), None)
+        host_cfg.hostcheck_commands_to_define.append(("check-mk-host-custom-1", hostname))
+        host_cfg.hostgroups_to_define.add(hostname)
+        host_cfg.write(
+            core_nagios._format_nagios_object("host", {
+                "host_name": hostname,
+                "check_command": "check-mk-host-custom-1",
+            }))
+        cfg.merge_host_config(host_cfg)
+
+    assert cfg.hostcheck_commands_to_define == [
+        ("check-mk-host-custom-1", "host1"),
+        ("check-mk-host-custom-2", "host2"),
+    ]
+    assert cfg.hostgroups_to_define == {"host1", "host2"}
+    assert cfg._outfile.getvalue().count("check-mk-host-custom-2\n") == 1
+
+
 @pytest.fixture(name="serial")
 def fixture_serial() -> ConfigSerial:
     return ConfigSerial("42")
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright (C) 2019 tribe29 GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+
+# pylint: disable=protected-access
+import pytest  # type: ignore[import]
+
+import cmk.utils.paths
+
+from cmk.base import item_state
+import cmk.base.item_state_store as item_state_store
+
+
+@pytest.fixture(name="counters_dir")
+def fixture_counters_dir(monkeypatch, tmp_path):
+    monkeypatch.setattr(cmk.utils.paths, "counters_dir", str(tmp_path))
+    return tmp_path
+
+
+@pytest.mark.parametrize("key", [
+    ("if64", "1", "in_octets"),
+    ("if64", None, u"sm\xf6rebr\xf6d"),
+    ("ps", b"\xff", 42),
+    (),
+])
+def test_key_round_trip(key):
+    assert item_state_store.decode_key(item_state_store.encode_key(key)) == key
+
+
+def _states(path):
+    states = item_state_store.load(path)
+    return {key: states[key] for key in states}
+
+
+def test_save_and_load(tmp_path):
+    path = tmp_path / "heute"
+    item_state_store.save_changes(path, {("a", None, "x"): (1.0, 2), ("b", "1", "y"): [1]}, [])
+    item_state_store.save_changes(path, {("a", None, "x"): (2.0, 3)}, [("b", "1", "y")])
+
+    states = item_state_store.load(path)
+    assert isinstance(states, item_state_store.ItemStateFile)
+    assert states[("a", None, "x")] == (2.0, 3)
+    assert ("b", "1", "y") not in states
+    assert ("c", None, "z") not in states
+    assert list(states) == [("a", None, "x")]
+
+
+def test_migrate_former_format(tmp_path):
+    path = tmp_path / "heute"
+    path.write_text(repr({("a", None, "x"): (1.0, 2), ("b", "1", "y"): {"z": None}}))
+    assert _states(path) == {("a", None, "x"): (1.0, 2), ("b", "1", "y"): {"z": None}}
+
+    item_state_store.save_changes(path, {("c", None, "z"): 3}, [("a", None, "x")])
+    assert path.read_bytes().startswith(item_state_store.MAGIC)
+    assert _states(path) == {("b", "1", "y"): {"z": None}, ("c", None, "z"): 3}
+
+
+def test_compaction(monkeypatch, tmp_path):
+    monkeypatch.setattr(item_state_store, "_MIN_COMPACTION_SIZE", 0)
+    path = tmp_path / "heute"
+    item_state_store.save_changes(path, {("a", str(i), "x"): i for i in range(100)}, [])
+    base_size = path.stat().st_size
+    item_state_store.save_changes(path, {("a", "1", "x"): -1}, [])
+    assert path.stat().st_size > base_size
+
+    for i in range(100):
+        item_state_store.save_changes(path, {("a", str(i), "x"): i * 2}, [])
+    states = item_state_store.load(path)
+    assert isinstance(states, item_state_store.ItemStateFile)
+    assert states.delta_size < states.base_size
+    assert _states(path) == {("a", str(i), "x"): i * 2 for i in range(100)}
+
+
+def test_incomplete_delta_is_ignored(tmp_path):
+    path = tmp_path / "heute"
+    item_state_store.save_changes(path, {("a", None, "x"): 1}, [])
+    item_state_store.save_changes(path, {("a", None, "x"): 2}, [])
+    path.write_bytes(path.read_bytes()[:-1])
+    assert _states(path) == {("a", None, "x"): 1}
+
+
+def test_save_after_incomplete_delta(tmp_path):
+    path = tmp_path / "heute"
+    item_state_store.save_changes(path, {("a", None, "x"): 1}, [])
+    item_state_store.save_changes(path, {("a", None, "x"): 2}, [])
+    path.write_bytes(path.read_bytes()[:-3])
+
+    item_state_store.save_changes(path, {("b", None, "y"): 3}, [])
+    assert _states(path) == {("a", None, "x"): 1, ("b", None, "y"): 3}
+
+
+def test_undecodable_delta_ends_the_deltas(tmp_path):
+    path = tmp_path / "heute"
+    item_state_store.save_changes(path, {("a", None, "x"): 1}, [])
+    item_state_store.save_changes(path, {("a", None, "x"): 2}, [])
+    with path.open("ab") as f:
+        f.write(item_state_store._RECORD.pack(4) + b"\xff" * 4)
+    assert _states(path) == {("a", None, "x"): 2}
+
+    item_state_store.save_changes(path, {("b", None, "y"): 3}, [])
+    assert _states(path) == {("a", None, "x"): 2, ("b", None, "y"): 3}
+
+
+def test_lazy_item_states():
+    states = item_state_store.LazyItemStates({("a", None, "x"): 1, ("b", None, "y"): 2})
+    states[("c", None, "z")] = 3
+    del states[("a", None, "x")]
+    with pytest.raises(KeyError):
+        del states[("a", None, "x")]
+
+    assert ("a", None, "x") not in states
+    assert states[("b", None, "y")] == 2
+    assert sorted(states.items()) == [(("b", None, "y"), 2), (("c", None, "z"), 3)]
+    assert len(states) == 2
+
+
+def test_concurrent_writers_merge_keys(counters_dir):
+    first = item_state.CachedItemStates()
+    second = item_state.CachedItemStates()
+    first.load("heute")
+    second.load("heute")
+
+    first.set_item_state_prefix(("if64", "1"))
+    first.set_item_state("in", (1, 2))
+    second.set_item_state_prefix(("if64", "2"))
+    second.set_item_state("in", (3, 4))
+    first.save("heute")
+    second.save("heute")
+
+    third = item_state.CachedItemStates()
+    third.load("heute")
+    assert dict(third.get_all_item_states()) == {
+        ("if64", "1", "in"): (1, 2),
+        ("if64", "2", "in"): (3, 4),
+    }
+
+    third.clear_all_item_states()
+    third.save("heute")
+    third.load("heute")
+    assert not third.get_all_item_states()
@@ -4,14 +4,24 @@
 # This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
 # conditions defined in the file COPYING, which is part of this source code package.
 
+import fcntl
+import json
 import math
 import time
 from pprint import pprint
+
+import numpy  # type: ignore[import]
 import pytest  # type: ignore[import]
 
-from cmk.base import prediction
 from testlib import on_time
 
+import cmk.utils.paths
+import cmk.utils.prediction
+import cmk.utils.store as store
+from cmk.utils.prediction import TimeSeries
+
+from cmk.base import prediction
+
 
 @pytest.mark.parametrize("group_by, timestamp, result", [
     (prediction.group_by_wday, 1543402800, ('wednesday', 43200)),
@@ -120,3 +130,126 @@ def test_time_slices(utcdate, timezone, horizon, period_info, timegroup, result)
     ])
 def test_data_stats(slices, result):
     assert prediction.data_stats(slices) == result
+
+
+def test_data_stats_array():
+    nan = float("nan")
+    stats = prediction.data_stats_array(numpy.array([
+        [1.0, nan, 3.0, nan],
+        [3.0, nan, nan, -2.0],
+    ]))
+    assert stats.shape == (4, 4)
+    assert stats[0].tolist() == pytest.approx([2.0, 1.0, 3.0, math.sqrt(2)])
+    assert numpy.isnan(stats[1]).all()
+    assert stats[2].tolist() == [3.0, 3.0, 3.0, 3.0]
+    assert stats[3].tolist() == [-2.0, -2.0, -2.0, 2.0]
+
+
+def test_data_stats_cuts_slices_to_shortest():
+    assert prediction.data_stats([[1, 2, 3], [3, 4]]) == [
+        pytest.approx([2.0, 1, 3, math.sqrt(2)]),
+        pytest.approx([3.0, 2, 4, math.sqrt(2)]),
+    ]
+
+
+_PARAMS = {"period": "wday", "horizon": 14, "levels_upper": ("absolute", (1.0, 2.0))}
+
+
+@pytest.fixture(name="rrd_queries")
+def fixture_rrd_queries(tmp_path, monkeypatch):
+    monkeypatch.setattr(cmk.utils.paths, "var_dir", str(tmp_path))
+    queries = []
+
+    def get_rrd_data_batch(hostname, service_description, requests, max_entries=400):
+        queries.append((hostname, service_description, requests))
+        return [
+            TimeSeries([2.0] * len(range(start, end, 60)), (start, end, 60))
+            for _dsname, _cf, start, end in requests
+        ]
+
+    monkeypatch.setattr(cmk.utils.prediction, "get_rrd_data_batch", get_rrd_data_batch)
+    return queries
+
+
+def _pred_dir(dsname):
+    return cmk.utils.prediction.predictions_dir("heute", "CPU load", dsname)
+
+
+def test_get_levels_fetches_slices_with_one_query(rrd_queries):
+    with on_time("2020-09-14 12:00", "UTC"):
+        assert prediction.get_levels("heute", "CPU load", "load15", _PARAMS,
+                                     "MAX") == (2.0, (3.0, 4.0, None, None))
+        assert len(rrd_queries) == 1
+        assert [request[:2] for request in rrd_queries[0][2]] == [("load15", "MAX")] * 2
+
+        # The saved prediction is used from now on
+        prediction.get_levels("heute", "CPU load", "load15", _PARAMS, "MAX")
+        assert len(rrd_queries) == 1
+
+
+def test_precompute_predictions(rrd_queries):
+    with on_time("2020-09-14 23:55", "UTC"):
+        for dsname in ["load1", "load15"]:
+            prediction.get_levels("heute", "CPU load", dsname, _PARAMS, "MAX")
+        del rrd_queries[:]
+
+        # Only the predictions of known hosts are refreshed
+        assert prediction.precompute_predictions({"morgen"}, 600, 2) == 0
+        # The predictions of monday are up to date, the ones of tuesday are missing
+        assert prediction.precompute_predictions({"heute", "morgen"}, 600, 2) == 2
+        assert prediction.precompute_predictions({"heute"}, 600, 2) == 0
+
+    # Both metrics of the service have been fetched with one query
+    assert len(rrd_queries) == 1
+    assert rrd_queries[0][:2] == ("heute", "CPU load")
+    assert sorted({request[0] for request in rrd_queries[0][2]}) == ["load1", "load15"]
+
+    info = cmk.utils.prediction.retrieve_data_for_prediction(
+        _pred_dir("load15") + "/tuesday.info", "tuesday")
+    assert info is not None
+    assert info["time"] == 1600128000  # 2020-09-15 00:00 UTC, the start of the slice
+    assert info["service_description"] == "CPU load"
+
+    with on_time("2020-09-15 00:01", "UTC"):
+        assert prediction.get_levels("heute", "CPU load", "load15", _PARAMS,
+                                     "MAX") == (2.0, (3.0, 4.0, None, None))
+    assert len(rrd_queries) == 1
+
+
+def test_precompute_lock(tmp_path, monkeypatch):
+    monkeypatch.setattr(cmk.utils.paths, "tmp_dir", str(tmp_path))
+    with prediction.precompute_lock() as locked:
+        assert locked
+    assert not store.have_lock(str(tmp_path / "precompute_predictions.lock"))
+
+    # Held by a run in another process
+    with (tmp_path / "precompute_predictions.lock").open("w") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        with prediction.precompute_lock() as locked:
+            assert not locked
+
+
+def test_precompute_predictions_of_former_version(rrd_queries):
+    with on_time("2020-09-14 23:55", "UTC"):
+        prediction.get_levels("heute", "CPU load", "load15", _PARAMS, "MAX")
+        # The info of former versions does not know the service
+        info_file = _pred_dir("load15") + "/monday.info"
+        info = cmk.utils.prediction.retrieve_data_for_prediction(info_file, "monday")
+        del info["hostname"], info["service_description"]
+        with open(info_file, "w") as f:
+            f.write(json.dumps(info))
+
+        assert prediction.precompute_predictions({"heute"}, 600, 2) == 0
+
+
+def test_precompute_predictions_of_unused_metrics(rrd_queries):
+    with on_time("2020-09-14 23:55", "UTC"):
+        prediction.get_levels("heute", "CPU load", "load15", _PARAMS, "MAX")
+
+    # Within the period of the predictions the check path may need them again
+    with on_time("2020-09-21 23:55", "UTC"):
+        assert prediction.precompute_predictions({"heute"}, 600, 2) == 2
+
+    # The service is gone or does not use predictive levels anymore
+    with on_time("2020-09-28 23:55", "UTC"):
+        assert prediction.precompute_predictions({"heute"}, 600, 2) == 0
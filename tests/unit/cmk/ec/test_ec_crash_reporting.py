@@ -4,6 +4,7 @@
 # This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
 # conditions defined in the file COPYING, which is part of this source code package.
 
+import cmk.utils.paths
 from cmk.utils.crash_reporting import crash_report_registry
 from cmk.ec.crash_reporting import ECCrashReport, CrashReportStore
 
@@ -12,7 +13,8 @@ def test_ec_crash_report_registry():
     assert crash_report_registry["ec"] == ECCrashReport
 
 
-def test_ec_crash_report_from_exception():
+def test_ec_crash_report_from_exception(monkeypatch, tmp_path):
+    monkeypatch.setattr(cmk.utils.paths, "crash_dir", tmp_path / "crashes")
     try:
         raise ValueError("DING")
     except Exception:
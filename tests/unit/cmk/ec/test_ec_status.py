@@ -45,9 +45,9 @@ class FakeStatusSocket:
 
 
 @pytest.fixture(name="settings", scope="function")
-def fixture_settings():
-    return ec.settings('1.2.3i45', pathlib.Path(cmk.utils.paths.omd_root),
-                       pathlib.Path(cmk.utils.paths.default_config_dir), ['mkeventd'])
+def fixture_settings(tmp_path):
+    return ec.settings('1.2.3i45', tmp_path, pathlib.Path(cmk.utils.paths.default_config_dir),
+                       ['mkeventd'])
 
 
 @pytest.fixture(name="lock_configuration", scope="function")
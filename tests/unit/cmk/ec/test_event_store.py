@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright (C) 2019 tribe29 GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+
+import logging
+
+import pytest  # type: ignore[import]
+
+import cmk.ec.export as ec
+from cmk.ec.event_store import EventStore
+from cmk.ec.history import History
+from cmk.ec.main import EventStatus, Perfcounters, StatusTableEvents, StatusTableHistory
+from cmk.ec.query import MKClientError
+
+logger = logging.getLogger("cmk.mkeventd")
+
+
+def _event(event_id, host, rule_id="rule", core_host=None):
+    return {
+        "id": event_id,
+        "host": host,
+        "core_host": host if core_host is None else core_host,
+        "rule_id": rule_id,
+    }
+
+
+def _ids(events):
+    return [event["id"] for event in events]
+
+
+@pytest.fixture(name="store")
+def fixture_store():
+    return EventStore([
+        _event(1, "h1", "r1"),
+        _event(2, "h2", "r1", core_host="c"),
+        _event(3, "h1", "r2"),
+        _event(4, "h2", "r2", core_host="c"),
+        _event(5, "h1", "r1"),
+    ])
+
+
+def test_lookups(store):
+    assert len(store) == 5
+    assert _ids(store) == [1, 2, 3, 4, 5]
+    assert store.get(3)["host"] == "h1"
+    assert store.get(6) is None
+    assert _ids(store.of_host("h1")) == [1, 3, 5]
+    assert _ids(store.of_core_host("c")) == [2, 4]
+    assert _ids(store.of_rule("r1")) == [1, 2, 5]
+    assert _ids(store.of_rule("r3")) == []
+    assert _ids(store.of_hosts({"h2", "h1", "h3"})) == [1, 2, 3, 4, 5]
+    assert _ids(store.of_host_and_rule("h1", "r1")) == [1, 5]
+    assert _ids(store.of_host_and_rule("h3", "r1")) == []
+    assert store.num_of_host("h2", "c") == 2
+    assert store.num_of_host("h2", "h2") == 0
+    assert store.num_of_rule("r2") == 2
+    assert store.rule_counts() == {"r1": 3, "r2": 2}
+    assert store.host_counts() == {("h1", "h1"): 3, ("h2", "c"): 2}
+
+
+def test_remove(store):
+    assert store.remove(3)["id"] == 3
+    with pytest.raises(KeyError):
+        store.remove(3)
+    assert store.oldest()["id"] == 1
+    assert store.oldest_of_host("h1")["id"] == 1
+    assert store.oldest_of_rule("r2")["id"] == 4
+
+    for event_id in [1, 2, 4, 5]:
+        store.remove(event_id)
+    assert len(store) == 0
+    assert store.oldest() is None
+    assert store.oldest_of_host("h1") is None
+    assert store.rule_counts() == {}
+    assert store.host_counts() == {}
+
+
+def test_changed(store):
+    event = store.get(1)
+    event["host"] = "h2"
+    event["core_host"] = "c"
+    store.changed(event)
+    assert _ids(store.of_host("h1")) == [3, 5]
+    assert _ids(store.of_host("h2")) == [2, 4, 1]
+    assert store.num_of_host("h2", "c") == 3
+    assert _ids(store) == [1, 2, 3, 4, 5]
+
+    store.remove(1)
+    assert _ids(store.of_host("h2")) == [2, 4]
+
+
+def test_add_replaces_event_with_same_id(store):
+    store.add(_event(2, "h3", "r3"))
+    assert _ids(store) == [1, 3, 4, 5, 2]
+    assert _ids(store.of_host("h2")) == [4]
+    assert _ids(store.of_rule("r3")) == [2]
+
+
+@pytest.fixture(name="event_status")
+def fixture_event_status(tmp_path):
+    settings = ec.settings("1.2.3i45", tmp_path, tmp_path, ["mkeventd"])
+    config = ec.default_config()
+    history = History(settings, config, logger, StatusTableEvents.columns,
+                      StatusTableHistory.columns)
+    return EventStatus(settings, config, Perfcounters(logger), history, logger)
+
+
+def test_event_status_limits(event_status):
+    for host, rule_id in [("h1", "r1"), ("h2", "r1"), ("h1", "r2"), ("h1", "r1")]:
+        event = _event(0, host, rule_id)
+        event["phase"] = "open"
+        event_status.new_event(event)
+
+    assert event_status.num_existing_events == 4
+    assert event_status.num_existing_events_by_host == {("h1", "h1"): 3, ("h2", "h2"): 1}
+    assert event_status.num_existing_events_by_rule == {"r1": 3, "r2": 1}
+    assert event_status.get_num_existing_events_by("by_host", _event(0, "h1")) == 3
+    assert event_status.get_num_existing_events_by("by_rule", _event(0, "h1", "r2")) == 1
+
+    event_status.remove_oldest_event("by_rule", _event(0, "h1", "r1"))
+    assert _ids(event_status.events()) == [2, 3, 4]
+    event_status.remove_oldest_event("by_host", _event(0, "h1"))
+    assert _ids(event_status.events()) == [2, 4]
+    event_status.remove_oldest_event("overall", _event(0, "h1"))
+    assert _ids(event_status.events()) == [4]
+
+    event_status.delete_event(4, "user")
+    assert event_status.event(4) is None
+    assert event_status.num_existing_events == 0
+    with pytest.raises(MKClientError):
+        event_status.delete_event(4, "user")
+
+
+def test_event_status_pack_and_unpack(event_status):
+    event_status.new_event(_event(0, "h1"))
+    event_status.new_event(_event(0, "h2"))
+    status = event_status.pack_status()
+    assert _ids(status["events"]) == [1, 2]
+
+    event_status.flush()
+    assert event_status.events() == []
+    event_status.unpack_status(status)
+    assert _ids(event_status.get_events({"h2"})) == [2]
+    assert _ids(event_status.get_events()) == [1, 2]
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright (C) 2019 tribe29 GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+
+# pylint: disable=protected-access
+import logging
+
+import pytest  # type: ignore[import]
+
+import cmk.ec.export as ec
+from cmk.ec.history import History
+from cmk.ec.history_index import SegmentIndex, index_path
+from cmk.ec.main import StatusTableEvents, StatusTableHistory
+from cmk.ec.query import QueryGET
+
+logger = logging.getLogger("cmk.mkeventd")
+
+
+class FakeStatusServer:
+    def __init__(self, history):
+        self._table = StatusTableHistory(logger, history)
+
+    def table(self, name):
+        return self._table
+
+
+@pytest.fixture(name="history")
+def fixture_history(tmp_path):
+    settings = ec.settings("1.2.3i45", tmp_path, tmp_path, ["mkeventd"])
+    return History(settings, ec.default_config(), logger, StatusTableEvents.columns,
+                   StatusTableHistory.columns)
+
+
+def _event(event_id, host, application="cron", rule_id="rule"):
+    return {
+        "id": event_id,
+        "host": host,
+        "application": application,
+        "rule_id": rule_id,
+        "text": "Event %d of %s" % (event_id, host),
+    }
+
+
+def _query(history, *lines):
+    query = QueryGET(FakeStatusServer(history), ["GET history"] + list(lines), logger)
+    return [(row[0], row[2], row[5]) for row in history.get(query)]  # line, what, event id
+
+
+@pytest.fixture(name="filled_history")
+def fixture_filled_history(history):
+    for event_id in range(1, 11):
+        history.add(_event(event_id, "host%d" % (event_id % 3), rule_id="rule%d" % (event_id % 2)),
+                    "NEW")
+    history.add(_event(4, "host1"), "DELETE")
+    return history
+
+
+def test_query_all_newest_first(filled_history):
+    assert _query(filled_history)[:3] == [(1, "DELETE", 4), (2, "NEW", 10), (3, "NEW", 9)]
+    assert len(_query(filled_history)) == 11
+
+
+def test_query_indexed_columns(filled_history):
+    assert _query(filled_history, "Filter: event_host = host1") == [
+        (1, "DELETE", 4),
+        (2, "NEW", 10),
+        (5, "NEW", 7),
+        (8, "NEW", 4),
+        (11, "NEW", 1),
+    ]
+    assert _query(filled_history, "Filter: event_host ~~ HOST[12]",
+                  "Filter: event_rule_id = rule0") == [(2, "NEW", 10), (4, "NEW", 8), (8, "NEW", 4),
+                                                       (10, "NEW", 2)]
+    assert _query(filled_history, "Filter: event_id = 4") == [(1, "DELETE", 4), (8, "NEW", 4)]
+    assert _query(filled_history, "Filter: event_id in 2 3") == [(9, "NEW", 3), (10, "NEW", 2)]
+    assert _query(filled_history, "Filter: event_application = sshd") == []
+
+
+def test_query_limit(filled_history):
+    assert _query(filled_history, "Filter: event_host = host1", "Limit: 2") == [(1, "DELETE", 4),
+                                                                                (2, "NEW", 10)]
+
+
+def test_query_time(filled_history):
+    assert _query(filled_history, "Filter: history_time > 0", "Limit: 1") == [(1, "DELETE", 4)]
+    assert _query(filled_history, "Filter: history_time < 1") == []
+
+
+def test_index_is_updated_and_saved(filled_history):
+    path = next(filled_history._settings.paths.history_dir.value.glob("*.log"))
+    assert _query(filled_history, "Filter: event_host = host2", "Limit: 1") == [(4, "NEW", 8)]
+
+    filled_history.add(_event(11, "host2"), "NEW")
+    assert _query(filled_history, "Filter: event_host = host2", "Limit: 1") == [(1, "NEW", 11)]
+
+    index = SegmentIndex(path)
+    index.update()
+    index.save()
+    loaded = SegmentIndex.load(path)
+    assert len(loaded) == 12
+    assert loaded.update() == 0
+    assert list(loaded.lines([("event_id", "=", lambda x: x == 11, 11)])) == [11]
+
+    filled_history.flush()
+    assert not index_path(path).exists()
+
+
+def test_index_ignores_incomplete_and_broken_lines(tmp_path):
+    path = tmp_path / "1600000000.log"
+    path.write_bytes(b"broken\n1600000000.5\tNEW\t\t\t1\n1600000001.0\tNEW")
+    index = SegmentIndex(path)
+    assert index.update() == 2
+    assert index.offsets(1) == (7, 28)
+    assert list(index.lines([("event_id", "=", lambda x: x == 1, 1)])) == [1]
+
+    with path.open("ab") as f:
+        f.write(b"\t\t\t2\n")
+    assert index.update() == 1
+    assert list(index.lines([("history_time", ">=", lambda x: x >= 1600000001, 1600000001)])) == [2]
@@ -68,6 +68,19 @@ def test_perfcounters_do_statistics(monkeypatch):
     assert pytest.approx(c._average_rates["messages"]) == 0.5899999999999999
 
 
+def test_perfcounters_count_rule():
+    c = Perfcounters(logger)
+    c.count_rule("a", 0.5, False)
+    c.count_rule("a", 0.25, True)
+    c.count_rule("b", 1.0, True)
+    assert c.get_rule_counters() == {"a": (2, 1, 0.75), "b": (1, 1, 1.0)}
+
+    c.reset_rule_counters("a")
+    assert c.get_rule_counters() == {"b": (1, 1, 1.0)}
+    c.reset_rule_counters(None)
+    assert c.get_rule_counters() == {}
+
+
 def test_perfcounters_columns_match_status_length():
     c = Perfcounters(logger)
     assert len(c.status_columns()) == len(c.get_status())
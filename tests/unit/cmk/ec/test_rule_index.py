@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright (C) 2019 tribe29 GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+
+import logging
+import pytest  # type: ignore[import]
+
+from cmk.ec.main import EventServer, RuleMatcher
+from cmk.ec.rule_index import RuleIndex, fold, required_literals
+
+
+def _compile(key, value):
+    return EventServer._compile_matching_value(key, value)
+
+
+@pytest.mark.parametrize("pattern,literals", [
+    ("foo bar", ["foo bar"]),
+    ("Foo.*Barbaz", ["barbaz", "foo"]),
+    ("^foo$", ["foo"]),
+    ("foo|barbaz", []),
+    ("(foo|bar)baz", ["baz"]),
+    ("abcd?e", ["abc", "e"]),
+    ("ab+c", ["ab", "c"]),
+    ("abc{2,3}de", ["ab", "de"]),
+    (r"disk\.full", ["disk.full"]),
+    (r"\x41bc", []),
+    (r"\d+ errors in [a-z]+ module", [" errors in ", " module"]),
+    ("(?x) foo bar", []),
+    ("failed for user sm\xf6rebr\xf6d$", ["failed for user sm", "rebr", "d"]),
+    ("failed for user sm\xf6rebr\xf6d", []),
+])
+def test_required_literals(pattern, literals):
+    assert required_literals(_compile("match", pattern)) == literals
+
+
+@pytest.mark.parametrize("text", ["DISK FULL", "disk full", "DİSK FULL", "dısk full"])
+def test_required_literal_is_found_in_folded_text(text):
+    pattern = _compile("match", "disk (is )?full")
+    assert pattern.search(text)
+    assert all(literal in fold(text) for literal in required_literals(pattern))
+
+
+def _rule(rule_id, **conditions):
+    rule = {"id": rule_id, "pack": "default"}
+    for key, value in conditions.items():
+        rule[key] = _compile(key, value)
+    return rule
+
+
+RULES = [
+    _rule("exact_host", match_host="Host1"),
+    _rule("host_regex", match_host="^web[0-9]+\\.example\\.com$"),
+    _rule("message", match="Disk full"),
+    _rule("message_regex", match="(sda|sdb) failed: .* timeout$"),
+    _rule("cancelling", match="link down", match_ok="link up"),
+    _rule("cancelling_regex", match="link down", match_ok="^.*$"),
+    _rule("application", match_application="sshd", cancel_application="cron"),
+    _rule("no_literal", match="^[0-9]+$"),
+    _rule("everything"),
+    dict(_rule("inverted", match="Disk full"), invert_matching=True),
+    _rule("combined", match_host="host2", match="disk full", match_application="kernel"),
+]
+
+
+def _event(text, host="host1", application="kernel", facility=1, priority=5):
+    return {
+        "text": text,
+        "host": host,
+        "application": application,
+        "facility": facility,
+        "priority": priority,
+        "ipaddress": "",
+    }
+
+
+@pytest.mark.parametrize("event", [
+    _event("DISK FULL on /var"),
+    _event("disk full", host="HOST2"),
+    _event("sda failed: i/o timeout", host="web12.example.com"),
+    _event("eth0: link up", application="sshd"),
+    _event("12345", application="CRON"),
+    _event("nothing to see", host="hİst1"),
+])
+def test_candidates_contain_all_matching_rules(event):
+    rule_hash = {facility: {prio: RULES for prio in range(8)} for facility in range(32)}
+    matcher = RuleMatcher(logging.getLogger("cmk.mkeventd"), {"debug_rules": False})
+    candidates = RuleIndex(RULES, rule_hash).candidates(event)
+
+    assert candidates == [rule for rule in RULES if rule in candidates]
+    for rule in RULES:
+        if matcher.event_rule_matches_non_inverted(rule, event) is not False:
+            assert rule in candidates
+    assert RULES[-2] in candidates  # inverted rules are never filtered
+
+
+def test_candidates_of_message():
+    rule_hash = {facility: {prio: RULES for prio in range(8)} for facility in range(32)}
+    candidates = RuleIndex(RULES, rule_hash).candidates(_event("disk full", host="host2"))
+    assert [rule["id"] for rule in candidates] == [
+        "message",
+        "cancelling_regex",
+        "no_literal",
+        "everything",
+        "inverted",
+        "combined",
+    ]
+
+
+def test_candidates_respect_rule_hash():
+    rule_hash = {1: {5: [RULES[2], RULES[8]]}, 2: {5: [RULES[2]]}}
+    index = RuleIndex(RULES, rule_hash)
+    assert index.candidates(_event("disk full")) == [RULES[2], RULES[8]]
+    assert index.candidates(_event("disk full", facility=2)) == [RULES[2]]
+    assert index.candidates(_event("disk full", priority=4)) == []
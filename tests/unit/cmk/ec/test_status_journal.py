@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright (C) 2019 tribe29 GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+
+import logging
+
+import pytest  # type: ignore[import]
+
+import cmk.ec.export as ec
+from cmk.ec.history import History
+from cmk.ec.main import EventStatus, Perfcounters, StatusTableEvents, StatusTableHistory
+from cmk.ec.status_journal import MAGIC, StatusJournal
+
+logger = logging.getLogger("cmk.mkeventd")
+
+
+def _event(event_id, host="host", text="text"):
+    return {
+        "id": event_id,
+        "host": host,
+        "core_host": host,
+        "ipaddress": "",
+        "rule_id": "rule",
+        "text": text,
+        "match_groups": ("a", "b"),
+        "contact_groups": None,
+    }
+
+
+def _status(events, next_event_id=1):
+    return {
+        "next_event_id": next_event_id,
+        "events": events,
+        "rule_stats": {
+            "rule": 1
+        },
+        "interval_starts": {},
+    }
+
+
+def test_snapshot_and_journal(tmp_path):
+    journal = StatusJournal(tmp_path / "status")
+    assert journal.load() is None
+    assert journal.needs_snapshot()
+
+    journal.write_snapshot(_status([_event(1), _event(2), _event(3)], next_event_id=4))
+    assert not journal.needs_snapshot()
+    journal.append([_event(2, text="changed"), _event(4)], [1], _status([], next_event_id=5))
+    journal.append([_event(5)], [4], _status([], next_event_id=6))
+
+    status = StatusJournal(tmp_path / "status").load()
+    assert status == _status([_event(2, text="changed"), _event(3), _event(5)], next_event_id=6)
+
+
+def test_interrupted_append(tmp_path):
+    path = tmp_path / "status"
+    journal = StatusJournal(path)
+    journal.write_snapshot(_status([_event(1)], next_event_id=2))
+    journal.append([_event(2)], [], _status([], next_event_id=3))
+    complete = path.stat().st_size
+    journal.append([_event(3)], [], _status([], next_event_id=4))
+
+    # Cut off the last record and then break its checksum
+    for data in [path.read_bytes()[:-3], path.read_bytes()[:-1] + b"x"]:
+        path.write_bytes(data)
+        journal = StatusJournal(path)
+        assert journal.load() == _status([_event(1), _event(2)], next_event_id=3)
+        assert journal.sizes()[0] + journal.sizes()[1] == complete
+
+    journal.append([_event(4)], [], _status([], next_event_id=5))
+    assert StatusJournal(path).load() == _status([_event(1), _event(2), _event(4)], next_event_id=5)
+
+
+def test_former_status_file(tmp_path):
+    path = tmp_path / "status"
+    path.write_text(repr(_status([_event(1)], next_event_id=2)) + "\n")
+    journal = StatusJournal(path)
+    assert journal.load() == _status([_event(1)], next_event_id=2)
+    assert journal.needs_snapshot()
+
+    journal.write_snapshot(_status([_event(1)], next_event_id=2))
+    assert path.read_bytes().startswith(MAGIC)
+
+
+def test_truncated_status_file_is_not_appended_to(tmp_path):
+    path = tmp_path / "status"
+    journal = StatusJournal(path)
+    journal.write_snapshot(_status([_event(1)]))
+    path.write_bytes(b"")
+    with pytest.raises(OSError):
+        journal.append([_event(2)], [], _status([]))
+
+
+@pytest.fixture(name="make_event_status")
+def fixture_make_event_status(tmp_path):
+    settings = ec.settings("1.2.3i45", tmp_path, tmp_path, ["mkeventd"])
+    settings.paths.status_file.value.parent.mkdir(parents=True, exist_ok=True)
+    config = ec.default_config()
+    history = History(settings, config, logger, StatusTableEvents.columns,
+                      StatusTableHistory.columns)
+
+    def make_event_status():
+        return EventStatus(settings, config, Perfcounters(logger), history, logger)
+
+    return make_event_status
+
+
+def test_event_status_saves_changes(make_event_status):
+    event_status = make_event_status()
+    for host in ["h1", "h2", "h3"]:
+        event_status.new_event(_event(0, host))
+    event_status.save_status()
+    snapshot_size, journal_size = event_status._journal.sizes()  # pylint: disable=protected-access
+    assert journal_size == 0
+
+    event = event_status.event(2)
+    event["text"] = "changed"
+    event_status.event_changed(event)
+    event_status.delete_event(1, "user")
+    event_status.new_event(_event(0, "h4"))
+    event_status.count_rule_match("rule")
+    event_status.save_status()
+    assert event_status._journal.sizes()[0] == snapshot_size  # pylint: disable=protected-access
+
+    loaded = make_event_status()
+    loaded.load_status(None)
+    assert loaded.pack_status() == event_status.pack_status()
+    assert [event["id"] for event in loaded.events()] == [2, 3, 4]
+    assert loaded.event(2)["text"] == "changed"
+    assert loaded.get_rule_stats() == [("rule", 1)]
+
+    # Appended to the journal of the loaded file
+    loaded.delete_event(2, "user")
+    loaded.save_status()
+    reloaded = make_event_status()
+    reloaded.load_status(None)
+    assert [event["id"] for event in reloaded.events()] == [3, 4]
+
+
+def test_event_status_failed_save_is_not_lost(make_event_status, monkeypatch):
+    event_status = make_event_status()
+    for host in ["h1", "h2"]:
+        event_status.new_event(_event(0, host))
+    event_status.save_status()
+
+    def fail(*args):
+        raise OSError("No space left on device")
+
+    event_status.new_event(_event(0, "h3"))
+    with monkeypatch.context() as m:
+        m.setattr(StatusJournal, "append", fail)
+        m.setattr(StatusJournal, "write_snapshot", fail)
+        with pytest.raises(OSError):
+            event_status.save_status()
+
+    # The next save contains the event whose change has not been saved
+    event_status.delete_event(1, "user")
+    event_status.save_status()
+    loaded = make_event_status()
+    loaded.load_status(None)
+    assert [event["id"] for event in loaded.events()] == [2, 3]
@@ -37,6 +37,7 @@ def test_snmp_port_spec(port, expected):
         character_encoding=None,
         is_usewalk_host=False,
         is_inline_snmp_host=False,
+        is_native_snmp_host=False,
         record_stats=False,
     )
     assert ClassicSNMPBackend(snmp_config, logger)._snmp_port_spec() == expected
@@ -62,6 +63,7 @@ def test_snmp_proto_spec(monkeypatch, is_ipv6, expected):
         character_encoding=None,
         is_usewalk_host=False,
         is_inline_snmp_host=False,
+        is_native_snmp_host=False,
         record_stats=False,
     )
     assert ClassicSNMPBackend(snmp_config, logger)._snmp_proto_spec() == expected
@@ -93,6 +95,7 @@ SNMPSettings = collections.namedtuple("SNMPSettings", [
             character_encoding=None,
             is_usewalk_host=False,
             is_inline_snmp_host=False,
+            is_native_snmp_host=False,
             record_stats=False,
         ),
         context_name=None,
@@ -119,6 +122,7 @@ SNMPSettings = collections.namedtuple("SNMPSettings", [
             character_encoding=None,
             is_usewalk_host=False,
             is_inline_snmp_host=False,
+            is_native_snmp_host=False,
             record_stats=False,
         ),
         context_name="blabla",
@@ -145,6 +149,7 @@ SNMPSettings = collections.namedtuple("SNMPSettings", [
             character_encoding=None,
             is_usewalk_host=False,
             is_inline_snmp_host=False,
+            is_native_snmp_host=False,
             record_stats=False,
         ),
         context_name="blabla",
@@ -171,6 +176,7 @@ SNMPSettings = collections.namedtuple("SNMPSettings", [
             character_encoding=None,
             is_usewalk_host=False,
             is_inline_snmp_host=False,
+            is_native_snmp_host=False,
             record_stats=False,
         ),
         context_name=None,
@@ -197,6 +203,7 @@ SNMPSettings = collections.namedtuple("SNMPSettings", [
             character_encoding=None,
             is_usewalk_host=False,
             is_inline_snmp_host=False,
+            is_native_snmp_host=False,
             record_stats=False,
         ),
         context_name=None,
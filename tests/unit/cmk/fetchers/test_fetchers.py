@@ -275,6 +275,7 @@ class TestSNMPFetcher:
                 character_encoding=None,
                 is_usewalk_host=False,
                 is_inline_snmp_host=False,
+                is_native_snmp_host=False,
                 record_stats=False,
             ),
         )
@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright (C) 2019 tribe29 GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+
+import bisect
+import hashlib
+import socket
+import threading
+
+import pytest  # type: ignore[import]
+
+from cmk.utils.exceptions import MKSNMPError
+from cmk.utils.log import logger
+
+from cmk.snmplib.type_defs import SNMPHostConfig
+
+import cmk.fetchers.snmp_backend._ber as ber
+import cmk.fetchers.snmp_backend._usm as usm
+import cmk.fetchers.snmp_backend.native as native
+from cmk.fetchers.snmp_backend import NativeSNMPBackend
+
+WALK = {
+    ".1.3.6.1.2.1.1.1.0": b"Linux zeus 4.8.6.5-smp",
+    ".1.3.6.1.2.1.1.5.0": b"zeus",
+    ".1.3.6.1.2.1.2.2.1.1.1": 1,
+    ".1.3.6.1.2.1.2.2.1.1.2": 2,
+    ".1.3.6.1.2.1.2.2.1.1.10": 10,
+    ".1.3.6.1.2.1.2.2.1.2.1": b"lo",
+    ".1.3.6.1.2.1.2.2.1.2.2": b"eth0",
+    ".1.3.6.1.2.1.2.2.1.2.10": b"\xb2\xe0},M\x15",
+    ".1.3.6.1.2.1.2.2.1.3.1": 24,
+}
+
+
+class SimulatedAgent:
+    """SNMPv1/v2c agent answering from a dict in a background thread"""
+    def __init__(self, walk):
+        self._oids = sorted(walk, key=ber.oid_to_tuple)
+        self._keys = [ber.oid_to_tuple(o) for o in self._oids]
+        self._walk = walk
+        self.socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.socket.bind(("127.0.0.1", 0))
+        self.port = self.socket.getsockname()[1]
+        self.requests = 0
+        self._thread = threading.Thread(target=self._serve, daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self.socket.close()
+
+    def _value(self, oid):
+        value = self._walk[oid]
+        if isinstance(value, int):
+            return ber.encode_integer(value)
+        return ber.encode_octet_string(value)
+
+    def _next(self, oid):
+        index = bisect.bisect_right(self._keys, ber.oid_to_tuple(oid))
+        if index == len(self._oids):
+            return oid, ber.encode_tlv(ber.TAG_END_OF_MIB_VIEW, b"")
+        return self._oids[index], self._value(self._oids[index])
+
+    def _answer(self, pdu):
+        varbinds = []
+        if pdu.pdu_type == ber.PDU_GET:
+            for vb in pdu.varbinds:
+                if vb.oid in self._walk:
+                    varbinds.append((vb.oid, self._value(vb.oid)))
+                else:
+                    varbinds.append((vb.oid, ber.encode_tlv(ber.TAG_NO_SUCH_OBJECT, b"")))
+        elif pdu.pdu_type == ber.PDU_GETNEXT:
+            varbinds = [self._next(vb.oid) for vb in pdu.varbinds]
+        else:
+            oid = pdu.varbinds[0].oid
+            for _i in range(pdu.error_index):
+                oid, value = self._next(oid)
+                varbinds.append((oid, value))
+        return ber.encode_sequence(
+            ber.encode_integer(pdu.request_id),
+            ber.encode_integer(0),
+            ber.encode_integer(0),
+            ber.encode_sequence(*(ber.encode_sequence(ber.encode_oid(o), v) for o, v in varbinds)),
+            tag=ber.PDU_RESPONSE,
+        )
+
+    def _serve(self):
+        while True:
+            try:
+                data, address = self.socket.recvfrom(65535)
+            except OSError:
+                return
+            self.requests += 1
+            _tag, start, end = ber.decode_tlv(data)
+            version, community, pdu = ber.decode_sequence(data, start, end)
+            if data[community[1]:community[2]] != b"public":
+                continue
+            response = ber.encode_sequence(
+                data[version[1] - 2:version[2]],
+                data[community[1] - 2:community[2]],
+                self._answer(ber.decode_pdu_element(data, *pdu)),
+            )
+            self.socket.sendto(response, address)
+
+
+@pytest.fixture(name="agent")
+def fixture_agent():
+    agent = SimulatedAgent(WALK)
+    yield agent
+    native.close_sessions()
+    agent.close()
+
+
+def _snmp_config(port, **kwargs):
+    config = SNMPHostConfig(
+        is_ipv6_primary=False,
+        hostname="zeus",
+        ipaddress="127.0.0.1",
+        credentials="public",
+        port=port,
+        is_bulkwalk_host=True,
+        is_snmpv2or3_without_bulkwalk_host=False,
+        bulk_walk_size_of=2,
+        timing={
+            "timeout": 0.2,
+            "retries": 1
+        },
+        oid_range_limits=[],
+        snmpv3_contexts=[],
+        character_encoding=None,
+        is_usewalk_host=False,
+        is_inline_snmp_host=False,
+        is_native_snmp_host=True,
+        record_stats=False,
+    )
+    return config.update(**kwargs)
+
+
+@pytest.mark.parametrize("oid", [
+    ".1.3.6.1.2.1.1.1.0",
+    ".1.3.6.1.4.1.2021.11.9999999999",
+    ".2.25.1",
+    ".0.0",
+])
+def test_oid_round_trip(oid):
+    encoded = ber.encode_oid(oid)
+    assert ber.decode_pdu(
+        ber.encode_sequence(
+            ber.encode_integer(1),
+            ber.encode_integer(0),
+            ber.encode_integer(0),
+            ber.encode_sequence(ber.encode_sequence(encoded, ber.encode_integer(-129))),
+            tag=ber.PDU_RESPONSE,
+        )).varbinds == [ber.VarBind(oid, ber.TAG_INTEGER, b"-129")]
+
+
+@pytest.mark.parametrize("tag,payload,expected", [
+    (ber.TAG_COUNTER32, b"\x00\xff\xff\xff\xff", b"4294967295"),
+    (ber.TAG_COUNTER64, b"\x01\x00\x00\x00\x00\x00\x00\x00\x00", b"18446744073709551616"),
+    (ber.TAG_TIMETICKS, b"\x01\x00", b"256"),
+    (ber.TAG_IP_ADDRESS, b"\x0a\x00\x00\x01", b"10.0.0.1"),
+    (ber.TAG_OID, ber.encode_oid(".1.3.6.1")[2:], b".1.3.6.1"),
+    (ber.TAG_END_OF_MIB_VIEW, b"", None),
+])
+def test_decode_values(tag, payload, expected):
+    pdu = ber.decode_pdu(
+        ber.encode_sequence(
+            ber.encode_integer(1),
+            ber.encode_integer(0),
+            ber.encode_integer(0),
+            ber.encode_sequence(
+                ber.encode_sequence(ber.encode_oid(".1.2"), ber.encode_tlv(tag, payload))),
+            tag=ber.PDU_RESPONSE,
+        ))
+    assert pdu.varbinds[0].value == expected
+
+
+def test_long_form_length():
+    value = b"x" * 300
+    tag, start, end = ber.decode_tlv(ber.encode_octet_string(value))
+    assert tag == ber.TAG_OCTET_STRING
+    assert (start, end) == (4, 304)
+
+
+def test_truncated_data():
+    with pytest.raises(ber.BERError):
+        ber.decode_tlv(ber.encode_octet_string(b"abc")[:-1])
+
+
+def test_usm_key_localization():
+    # RFC 3414, A.3.1 and A.3.2
+    engine_id = bytes.fromhex("000000000000000000000002")
+    assert usm.localize_key(
+        hashlib.md5,
+        usm.password_to_key(hashlib.md5, b"maplesyrup"),
+        engine_id,
+    ).hex() == "526f5eed9fcce26f8964c2930787d82b"
+    assert usm.localize_key(
+        hashlib.sha1,
+        usm.password_to_key(hashlib.sha1, b"maplesyrup"),
+        engine_id,
+    ).hex() == "6695febc9288e36282235fc7151f128497b38f3f"
+
+
+@pytest.mark.parametrize("priv_protocol", ["DES", "AES"])
+def test_usm_privacy_round_trip(priv_protocol):
+    user = usm.USMUser(("authPriv", "sha", "user", "authpass", priv_protocol, "privpass"))
+    user.localize(b"\x80\x00\x1f\x88\x04")
+    encrypted, priv_params = user.encrypt(b"scoped pdu", 3, 4711)
+    assert encrypted[:10] != b"scoped pdu"
+    assert user.decrypt(encrypted, priv_params, 3, 4711)[:10] == b"scoped pdu"
+
+
+@pytest.mark.parametrize("priv_protocol,encrypted,priv_params", [
+    ("DES", b"1234567", b"12345678"),
+    ("AES", b"12345678", b"1234"),
+])
+def test_undecryptable_message(agent, priv_protocol, encrypted, priv_params):
+    credentials = ("authPriv", "sha", "user", "authpass", priv_protocol, "privpass")
+    session = native.SNMPSession(_snmp_config(agent.port, credentials=credentials))
+    assert session._user is not None
+    session._user.localize(b"\x80\x00\x1f\x88\x04")
+    message = session._encode_v3_message(
+        1,
+        ber.encode_octet_string(encrypted),
+        flags=0x02,
+        engine_id=b"\x80\x00\x1f\x88\x04",
+        user_name=b"user",
+        priv_params=priv_params,
+    )
+    with pytest.raises(ber.BERError, match="Undecryptable PDU"):
+        session._decode(message)
+    session.close()
+
+
+@pytest.mark.parametrize("credentials", [
+    ("authPriv", "md5", "user", "pass", "3DES", "pass"),
+    ("authNoPriv", "md4", "user", "pass"),
+    ("noauth", "user"),
+])
+def test_usm_invalid_credentials(credentials):
+    with pytest.raises(Exception):
+        usm.USMUser(credentials)
+
+
+@pytest.mark.parametrize("bulk", [True, False])
+def test_walk(agent, bulk):
+    backend = NativeSNMPBackend(_snmp_config(agent.port, is_bulkwalk_host=bulk), logger)
+    assert backend.walk(".1.3.6.1.2.1.2.2.1.2") == [
+        (".1.3.6.1.2.1.2.2.1.2.1", b"lo"),
+        (".1.3.6.1.2.1.2.2.1.2.2", b"eth0"),
+        (".1.3.6.1.2.1.2.2.1.2.10", b"\xb2\xe0},M\x15"),
+    ]
+
+
+def test_walk_many(agent):
+    backend = NativeSNMPBackend(_snmp_config(agent.port), logger)
+    assert backend.walk_many([".1.3.6.1.2.1.2.2.1.1", ".1.3.6.1.2.1.2.2.1.3"]) == [
+        [
+            (".1.3.6.1.2.1.2.2.1.1.1", b"1"),
+            (".1.3.6.1.2.1.2.2.1.1.2", b"2"),
+            (".1.3.6.1.2.1.2.2.1.1.10", b"10"),
+        ],
+        [(".1.3.6.1.2.1.2.2.1.3.1", b"24")],
+    ]
+
+
+def test_walk_leaf_and_end_of_mib(agent):
+    backend = NativeSNMPBackend(_snmp_config(agent.port), logger)
+    assert backend.walk(".1.3.6.1.2.1.1.5.0") == [(".1.3.6.1.2.1.1.5.0", b"zeus")]
+    assert backend.walk(".1.3.6.1.2.1.3") == []
+
+
+def test_get(agent):
+    backend = NativeSNMPBackend(_snmp_config(agent.port), logger)
+    assert backend.get(".1.3.6.1.2.1.1.1.0") == b"Linux zeus 4.8.6.5-smp"
+    assert backend.get(".1.3.6.1.2.1.1.2.0") is None
+    assert backend.get(".1.3.6.1.2.1.1.*") == b"Linux zeus 4.8.6.5-smp"
+    assert backend.get(".1.3.6.1.2.1.4.*") is None
+
+
+def test_socket_is_reused(agent):
+    NativeSNMPBackend(_snmp_config(agent.port), logger).get(".1.3.6.1.2.1.1.1.0")
+    sockets = [s.fileno() for s in native._sessions.values()]
+    NativeSNMPBackend(_snmp_config(agent.port), logger).get(".1.3.6.1.2.1.1.5.0")
+    assert [s.fileno() for s in native._sessions.values()] == sockets
+
+
+def test_close_sessions(agent):
+    NativeSNMPBackend(_snmp_config(agent.port), logger).get(".1.3.6.1.2.1.1.1.0")
+    sessions = list(native._sessions.values())
+    native.close_sessions()
+    assert not native._sessions
+    assert [s.fileno() for s in sessions] == [-1]
+
+
+def test_timeout(agent):
+    backend = NativeSNMPBackend(_snmp_config(agent.port, credentials="wrong"), logger)
+    with pytest.raises(MKSNMPError, match="Timeout: No Response from"):
+        backend.walk(".1.3.6.1.2.1.2.2.1.2")
+    assert backend.get(".1.3.6.1.2.1.1.1.0") is None
@@ -4,8 +4,13 @@
 # This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
 # conditions defined in the file COPYING, which is part of this source code package.
 
+import logging
+
 import pytest  # type: ignore[import]
 
+from livestatus import QueryStats
+
+import cmk.gui.plugins.views.utils as utils
 from cmk.gui.plugins.views.utils import (
     SorterSpec,
     _parse_url_sorters,
@@ -24,3 +29,34 @@ def test_url_sorters_parse_encode(url, sorters):
     sorters = [SorterSpec(*s) for s in sorters]
     assert _parse_url_sorters(url) == sorters
     assert _encode_sorter_url(sorters) == url
+
+
+class _FakeLive:
+    def set_auth_domain(self, domain):
+        pass
+
+    def set_only_sites(self, only_sites=None):
+        pass
+
+    def set_prepend_site(self, prepend_site):
+        pass
+
+    def set_limit(self, limit=None):
+        pass
+
+    def query_iter(self, query):
+        yield ["remote", "heute"]
+
+    def query_stats(self):
+        stats = QueryStats(0.0)
+        stats.latency, stats.duration, stats.bytes_received, stats.rows = 0.5, 1.5, 42, 1
+        return {"remote": stats}
+
+
+def test_iter_livestatus_logs_query_stats(register_builtin_html, monkeypatch, caplog):
+    monkeypatch.setattr(utils.sites, "live", _FakeLive)
+    with caplog.at_level(logging.DEBUG, logger="cmk.web"):
+        rows = list(utils.iter_livestatus("GET hosts\n", None, None, "read"))
+    assert rows == [["remote", "heute"]]
+    assert ("Livestatus response of site remote: latency 0.5, duration 1.5, 42 bytes, 1 rows"
+            in caplog.messages)
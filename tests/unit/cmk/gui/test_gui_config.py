@@ -7,6 +7,8 @@
 # pylint: disable=redefined-outer-name
 
 import json
+import os
+import time
 from flask_babel.speaklater import LazyString  # type: ignore[import]
 
 import pytest  # type: ignore[import]
@@ -841,6 +843,99 @@ def test_migrate_old_site_config(site, result):
     assert config.migrate_old_site_config({"mysite": site}) == {"mysite": result}
 
 
+@pytest.fixture(name="config_dir")
+def fixture_config_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(cmk.utils.paths, "default_config_dir", str(tmp_path))
+    monkeypatch.setattr(config, "_config_snapshot", None)
+    (tmp_path / "multisite.d" / "wato").mkdir(parents=True)
+    return tmp_path
+
+
+@pytest.fixture(name="loaded_hooks")
+def fixture_loaded_hooks(monkeypatch):
+    loaded_hooks = []
+    monkeypatch.setattr(config, "_post_config_load_hooks",
+                        [lambda: loaded_hooks.append(config.soft_query_limit)])
+    return loaded_hooks
+
+
+def _make_reliable(path):
+    """Backdates the file as if it had not been changed recently, see reliable_file_signature()"""
+    mtime = time.time() - 10
+    os.utime(str(path), (mtime, mtime))
+
+
+def test_load_config_reuses_snapshot(register_builtin_html, config_dir, loaded_hooks):
+    (config_dir / "multisite.d" / "wato" / "global.mk"
+    ).write_text(u"soft_query_limit = 42\nuser_localizations[u'Host'] = {'de': u'Gerät'}\n")
+    _make_reliable(config_dir / "multisite.d" / "wato" / "global.mk")
+
+    config.load_config()
+    snapshot = config._config_snapshot
+    assert snapshot is not None
+
+    # A request modifying the configuration does not affect the following ones
+    config.soft_query_limit = 23
+    config.user_localizations[u"Host"]["de"] = u"Wirt"
+    config.sites.clear()
+
+    config.load_config()
+    assert config._config_snapshot is snapshot
+    assert config.soft_query_limit == 42
+    assert config.user_localizations[u"Host"] == {"de": u"Gerät"}
+    assert list(config.sites) == [cmk_version.omd_site()]
+    assert loaded_hooks == [42, 42]
+
+
+def test_load_config_rebuilds_snapshot_on_change(register_builtin_html, config_dir, loaded_hooks):
+    config.load_config()
+    snapshot = config._config_snapshot
+    assert config.soft_query_limit == 1000
+
+    (config_dir / "multisite.d" / "wato" / "global.mk").write_text(u"soft_query_limit = 42\n")
+    config.load_config()
+    assert config._config_snapshot is not snapshot
+    assert config.soft_query_limit == 42
+
+    (config_dir / "multisite.d" / "wato" / "global.mk").unlink()
+    config.load_config()
+    assert config.soft_query_limit == 1000
+    assert loaded_hooks == [1000, 42, 1000]
+
+
+def test_load_config_skips_snapshot_of_recently_changed_files(register_builtin_html, config_dir):
+    (config_dir / "multisite.d" / "wato" / "global.mk").write_text(u"soft_query_limit = 42\n")
+    config.load_config()
+    assert config._config_snapshot is None
+    assert config.soft_query_limit == 42
+
+    _make_reliable(config_dir / "multisite.d" / "wato" / "global.mk")
+    config.load_config()
+    assert config._config_snapshot is not None
+    assert config.soft_query_limit == 42
+
+
+def test_load_config_rebuilds_snapshot_on_tag_change(register_builtin_html, config_dir):
+    config.load_config()
+    assert not config.tags.tag_group_exists("criticality2")
+
+    (config_dir / "multisite.d" / "wato" / "tags.mk").write_text(
+        u"wato_tags.update(%r)\n" % {
+            "tag_groups": [{
+                "id": "criticality2",
+                "title": u"Criticality 2",
+                "tags": [{
+                    "id": "prod2",
+                    "title": u"Productive system 2",
+                    "aux_tags": [],
+                }],
+            }],
+            "aux_tags": [],
+        })
+    config.load_config()
+    assert config.tags.tag_group_exists("criticality2")
+
+
 @pytest.fixture()
 def theme_dirs(tmp_path, monkeypatch):
     theme_path = tmp_path / "htdocs" / "themes"
@@ -69,3 +69,16 @@ def test_encode_socket_for_livestatus(site_spec, result):
 ])
 def test_site_config_for_livestatus_tcp_tls(site_spec, result):
     assert sites._site_config_for_livestatus("mysite", site_spec) == result
+
+
+@pytest.mark.parametrize("timeout,query_timeout", [
+    (None, None),
+    (0, None),
+    (2, 20),
+])
+def test_site_config_for_livestatus_query_timeout(timeout, query_timeout):
+    site_spec = {"socket": ("local", None), "proxy": None}
+    if timeout is not None:
+        site_spec["timeout"] = timeout
+    site = sites._site_config_for_livestatus("mysite", site_spec)
+    assert site.get("query_timeout") == query_timeout
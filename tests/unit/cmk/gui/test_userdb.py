@@ -4,6 +4,7 @@
 # This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
 # conditions defined in the file COPYING, which is part of this source code package.
 
+import os
 import time
 import pytest
 from pathlib import Path
@@ -378,6 +379,77 @@ def test_user_attribute_sync_plugins(monkeypatch):
     assert "vip" not in ldap.ldap_attribute_plugin_registry
 
 
+@pytest.fixture(name="aged_user_sources")
+def fixture_aged_user_sources(user_id, monkeypatch):
+    """Makes the source files of the user database old enough to be cached"""
+    monkeypatch.setattr(userdb, "_user_database", None)
+    g.pop("users", None)
+
+    timestamp = time.time() - 10
+    for path in [
+            userdb._root_dir() + "contacts.mk",
+            userdb._multisite_dir() + "users.mk",
+            cmk.utils.paths.htpasswd_file,
+            "%s/auth.serials" % os.path.dirname(cmk.utils.paths.htpasswd_file),
+            "%s/web/%s" % (cmk.utils.paths.var_dir, user_id),
+    ]:
+        if os.path.exists(path):
+            os.utime(path, (timestamp, timestamp))
+
+
+def test_load_users_reuses_user_database(user_id, aged_user_sources):
+    users = userdb.load_users()
+    users[user_id]["alias"] = u"Changed"
+    del g.users
+
+    database = userdb._user_database
+    assert database is not None
+    assert userdb.load_users()[user_id]["alias"] == user_id
+    assert userdb._user_database is database
+
+
+def test_load_users_from_user_database_cache_file(user_id, aged_user_sources, monkeypatch):
+    users = userdb.load_users()
+    del g.users
+
+    monkeypatch.setattr(userdb, "_user_database", None)
+    monkeypatch.setattr(userdb, "_merge_user_sources", lambda: pytest.fail("Sources were read"))
+    assert userdb.load_users() == users
+
+
+def test_load_users_after_change(user_id, aged_user_sources):
+    assert user_id in userdb.load_users()
+    del g.users
+
+    users = userdb.load_users(lock=True)
+    users[user_id]["alias"] = u"Changed"
+    userdb.save_users(users)
+    del g.users
+
+    assert userdb.load_users()[user_id]["alias"] == u"Changed"
+
+
+def test_load_user(user_id, aged_user_sources):
+    user = userdb.load_user(user_id)
+    assert userdb.load_user(UserId(u"unknown")) is None
+    assert "users" not in g
+    assert user == userdb.load_users()[user_id]
+
+
+def test_load_users_of_contactgroup(user_id):
+    users = userdb.load_users(lock=True)
+    users[user_id]["contactgroups"] = ["all"]
+    userdb.save_users(users)
+    del g.users
+
+    assert user_id in userdb.load_users_of_contactgroup("all")
+    assert userdb.load_users_of_contactgroup("nobody") == {}
+    assert "users" not in g
+    assert list(userdb.load_users_of_contactgroup("all")) == [
+        uid for uid, user in userdb.load_users().items() if "all" in user.get("contactgroups", [])
+    ]
+
+
 def test_check_credentials_local_user(with_user):
     username, password = with_user
     assert userdb.check_credentials(username, password) == username
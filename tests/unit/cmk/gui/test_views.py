@@ -7,15 +7,20 @@
 # yapf: disable
 
 import copy
+import json
+import re
 from typing import Any, Dict
 
 import pytest  # type: ignore[import]
 
+import livestatus
+
 import cmk.gui.config as config
 import cmk.utils.version as cmk_version
 
 pytestmark = pytest.mark.usefixtures("load_plugins")
 
+from cmk.gui.exceptions import MKGeneralException
 from cmk.gui.globals import html
 from cmk.gui.valuespec import ValueSpec
 import cmk.gui.plugins.views
@@ -151,6 +156,32 @@ def test_registered_exporters():
     assert sorted(expected) == sorted(names)
 
 
+def test_json_exporter_streams_rows(register_builtin_html):
+    class Cell:
+        def __init__(self, column):
+            self.column = column
+
+        def export_title(self):
+            return self.column
+
+        def render_for_export(self, row):
+            return row[self.column]
+
+    class View:
+        row_cells = [Cell("a"), Cell("b")]
+
+    exporter = cmk.gui.plugins.views.exporter_registry["json"]
+    assert exporter.streams_rows
+
+    rows = [{"a": "x", "b": {"k": [1, 2]}}, {"a": "y<br>z", "b": 3}]
+    exporter.handler(View(), iter(rows))
+    assert b"".join(html.response.response) == json.dumps([
+        ["a", "b"],
+        ["x", {"k": [1, 2]}],
+        ["y\nz", "3"],
+    ], indent=True).encode("utf-8")
+
+
 def test_registered_command_groups():
     expected = [
         'acknowledge',
@@ -5824,6 +5855,136 @@ def test_view_want_checkboxes(view):
     assert view.want_checkboxes is True
 
 
+def test_view_page(view):
+    assert view.page is None
+    view.page = 2
+    assert view.page == 2
+
+
+@pytest.mark.parametrize("sorters,headers", [
+    ([("host_plugin_output", False)],
+     "OrderBy: host_plugin_output asc\nOrderBy: host_name asc\n"),
+    ([("host_next_check", False), ("host_plugin_output", True)],
+     "OrderBy: host_next_check desc\nOrderBy: host_plugin_output desc\nOrderBy: host_name asc\n"),
+    # Sorters unknown to livestatus
+    ([("host_address", False)], None),
+    ([("site", False)], None),
+])
+def test_livestatus_order_by_headers(view, sorters, headers):
+    view.user_sorters = sorters
+    assert cmk.gui.views._livestatus_order_by_headers(view, []) is None
+    view.row_limit = 100
+    assert cmk.gui.views._livestatus_order_by_headers(view, []) == headers
+
+
+# The livestatus columns of the sorted tables which livestatus can not sort by
+_LIST_COLUMN = re.compile(
+    r"(host|service|hostgroup|servicegroup|comment|downtime|log)_"
+    r"(custom_variable_names|custom_variable_values|custom_variables|groups|contact_groups|"
+    r"contacts|parents|childs|services|services_with_state|services_with_info|comments|"
+    r"downtimes|members|members_with_state|labels|label_names|label_values|tags|perf_data_list)")
+
+
+def test_registered_sorters_livestatus_order_by():
+    for ident, sorter_class in cmk.gui.plugins.views.utils.sorter_registry.items():
+        sorter = sorter_class()
+        if sorter.livestatus_order_by is None:
+            continue
+
+        for column, descending in sorter.livestatus_order_by:
+            assert column in sorter.columns, ident
+            assert column != "site", ident
+            assert not _LIST_COLUMN.fullmatch(column), ident
+            assert isinstance(descending, bool), ident
+
+
+@pytest.mark.parametrize("ident", [
+    "svc_servicelevel",
+    "host_servicelevel",
+    "host_address_family",
+    "alerts_problem",
+    "crash_time",
+])
+def test_sorter_not_sorted_by_livestatus(ident):
+    assert cmk.gui.plugins.views.utils.sorter_registry[ident]().livestatus_order_by is None
+
+
+class _FakeLive:
+    def __init__(self):
+        self.deadsites: Dict[str, Dict[str, Any]] = {}
+
+    def dead_sites(self):
+        return self.deadsites
+
+
+def test_page_headers_rejected_by_site(view, monkeypatch):
+    live = _FakeLive()
+    monkeypatch.setattr(cmk.gui.views.sites, "live", lambda: live)
+    monkeypatch.setattr(cmk.gui.views.sites, "disconnect", lambda: None)
+    monkeypatch.setattr(cmk.gui.views, "_sites_without_paging", set())
+
+    rows = [
+        {"site": "remote", "host_name": "b", "host_plugin_output": "CRIT"},
+        {"site": "remote", "host_name": "a", "host_plugin_output": "OK"},
+    ]
+
+    def fetch_view_rows(view, all_active_filters, only_count, limit, page_headers=""):
+        if "OrderBy:" in page_headers:
+            live.deadsites["remote"] = {
+                "exception": livestatus.MKLivestatusSocketError(
+                    "Unhandled exception: 400: OrderBy: undefined request header"),
+                "site": {},
+            }
+            return []
+        return copy.deepcopy(rows)
+
+    monkeypatch.setattr(cmk.gui.views, "_fetch_view_rows", fetch_view_rows)
+
+    view.only_sites = ["remote"]
+    view.row_limit = 100
+    view.user_sorters = [("host_plugin_output", True)]
+    assert cmk.gui.views._livestatus_order_by_headers(view, []) is not None
+
+    assert cmk.gui.views._get_view_rows(view, []) == (2, [rows[1], rows[0]])
+    assert view.page is None
+    # The site is not asked for sorted pages again
+    assert cmk.gui.views._livestatus_order_by_headers(view, []) is None
+
+
+def test_check_dead_sites_after_rows(monkeypatch):
+    live = _FakeLive()
+    live.deadsites["old"] = {"exception": Exception("old error"), "site": {}}
+    monkeypatch.setattr(cmk.gui.views.sites, "live", lambda: live)
+
+    def rows():
+        yield {"site": "local"}
+        live.deadsites["remote"] = {"exception": Exception("Connection reset"), "site": {}}
+        yield {"site": "remote"}
+
+    checked = cmk.gui.views._check_dead_sites(rows(), {"old"})
+    assert next(checked) == {"site": "local"}
+    assert next(checked) == {"site": "remote"}
+    with pytest.raises(MKGeneralException, match="remote: Connection reset"):
+        next(checked)
+
+
+def test_sort_page_rows(view):
+    view.user_sorters = [("host_plugin_output", False)]
+    rows = [
+        {"site": "b", "host_name": "a", "host_plugin_output": "OK"},
+        {"site": "a", "host_name": "B", "host_plugin_output": "ok"},
+        {"site": "a", "host_name": "a", "host_plugin_output": "OK"},
+        {"site": "a", "host_name": "c", "host_plugin_output": "CRIT"},
+    ]
+    cmk.gui.views._sort_page_rows(view, rows)
+    assert [(r["site"], r["host_name"]) for r in rows] == [
+        ("a", "c"),
+        ("a", "a"),
+        ("b", "a"),
+        ("a", "B"),
+    ]
+
+
 def test_registered_display_hints():
     expected = ['.',
     '.hardware.',
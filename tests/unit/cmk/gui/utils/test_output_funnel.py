@@ -116,3 +116,57 @@ def test_output_funnel_try_finally(html):
     finally:
         html.write("finally1\n")
     assert html.written == b"try1\ntry2\nexcept2\nfinally2\nexcept1\nError\nfinally1\n"
+
+
+def _written_lines(funnel, number):
+    for nr in range(number):
+        funnel.write("%d\n" % nr)
+        yield
+
+
+def test_output_funnel_stream(register_builtin_html):
+    response = Response()
+    funnel = OutputFunnel(response)
+    funnel.write("A\n")
+    funnel.stream(_written_lines(funnel, 3), chunk_size=4)
+    assert list(response.response) == [b"A\n", b"0\n1\n", b"2\n"]
+    assert funnel.plug_text == []
+
+
+def test_output_funnel_stream_is_lazy(register_builtin_html):
+    response = Response()
+    funnel = OutputFunnel(response)
+    produced = []
+
+    def producer():
+        for nr in range(2):
+            produced.append(nr)
+            funnel.write("%d" % nr)
+            yield
+
+    funnel.stream(producer(), chunk_size=1)
+    assert produced == []
+    body = iter(response.response)
+    assert next(body) == b"0"
+    assert produced == [0]
+    assert list(body) == [b"1"]
+
+
+def test_output_funnel_stream_plugged(register_builtin_html, html):
+    with html.plugged():
+        html.stream(_written_lines(html, 2))
+        assert html.drain() == "0\n1\n"
+
+
+def test_output_funnel_stream_error(register_builtin_html):
+    response = Response()
+    funnel = OutputFunnel(response)
+
+    def producer():
+        funnel.write("0\n")
+        yield
+        raise Exception("Site died")
+
+    funnel.stream(producer(), chunk_size=1)
+    assert list(response.response) == [b"0\n", b"\n\nERROR: The output is incomplete: Site died\n"]
+    assert funnel.plug_text == []
@@ -391,3 +391,78 @@ def test_subfolder_creation():
     # Upon instantiation, all the subfolders should be already known.
     folder = hosts_and_folders.Folder.root_folder()
     assert len(folder._subfolders) == 1
+
+
+@pytest.fixture(name="host_tree")
+def fixture_host_tree():
+    root = hosts_and_folders.Folder.root_folder()
+    sub = root.create_subfolder("sub", "Sub", {"tag_agent": "no-agent"})
+    root.create_hosts([("root-host", {"alias": "Root host"}, None)])
+    sub.create_hosts([
+        ("node1", {
+            "ipaddress": "127.0.0.1"
+        }, None),
+        ("node2", {}, None),
+        ("cluster", {}, ["node1", "node2"]),
+    ])
+    hosts_and_folders.Folder.invalidate_caches()
+
+
+def _host_data():
+    return {
+        host_name:
+        (host.folder().path(), host.attributes(), host.cluster_nodes(), host.effective_attributes())
+        for host_name, host in hosts_and_folders.Host.all().items()
+    }
+
+
+@pytest.mark.usefixtures("host_tree")
+def test_host_index_hosts_like_hosts_files(monkeypatch):
+    indexed = _host_data()
+    assert sorted(indexed) == ["cluster", "node1", "node2", "root-host"]
+    assert indexed["cluster"][2] == ["node1", "node2"]
+    assert indexed["node1"][3]["tag_agent"] == "no-agent"
+
+    hosts_and_folders.Folder.invalidate_caches()
+    monkeypatch.setattr(hosts_and_folders, "_host_index", hosts_and_folders._HostIndex())
+    assert _host_data() == indexed
+
+
+@pytest.mark.usefixtures("host_tree")
+def test_host_index_does_not_read_unchanged_hosts_files(monkeypatch):
+    hosts_and_folders.Host.all()
+    hosts_and_folders.Folder.invalidate_caches()
+
+    def _read_hosts_file(self):
+        raise AssertionError("%s read again" % self.hosts_file_path())
+
+    monkeypatch.setattr(hosts_and_folders.CREFolder, "_read_hosts_file", _read_hosts_file)
+    assert sorted(hosts_and_folders.Host.all()) == ["cluster", "node1", "node2", "root-host"]
+
+
+@pytest.mark.usefixtures("host_tree")
+def test_host_lookup_loads_folder_of_host_only():
+    host = hosts_and_folders.Host.host("node2")
+    assert host.folder().path() == "sub"
+    assert [
+        path for path, folder in hosts_and_folders.Folder.all_folders().items()
+        if folder._hosts is not None
+    ] == ["sub"]
+    assert hosts_and_folders.Host.host("unknown") is None
+
+
+@pytest.mark.usefixtures("host_tree")
+def test_host_lookup_follows_changes():
+    root = hosts_and_folders.Folder.root_folder()
+    sub = hosts_and_folders.Folder.folder("sub")
+    assert hosts_and_folders.Host.host("node2").folder() is sub
+
+    sub.move_hosts(["node2"], root)
+    assert hosts_and_folders.Host.host("node2").folder() is root
+
+    root.rename_host("root-host", "renamed-host")
+    assert hosts_and_folders.Host.host("root-host") is None
+    assert hosts_and_folders.Host.host("renamed-host").folder() is root
+
+    sub.create_hosts([("new-host", {}, None)])
+    assert hosts_and_folders.Host.host("new-host").folder() is sub
@@ -162,6 +162,7 @@ SNMPConfig = SNMPHostConfig(
     character_encoding="ascii",
     is_usewalk_host=False,
     is_inline_snmp_host=False,
+    is_native_snmp_host=False,
     record_stats=False,
 )
 
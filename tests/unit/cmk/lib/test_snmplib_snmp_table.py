@@ -4,14 +4,26 @@
 # This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
 # conditions defined in the file COPYING, which is part of this source code package.
 
+from typing import List, Optional, Tuple
+
 import pytest  # type: ignore[import]
 
 from testlib.base import Scenario
 
+import cmk.utils.paths
 from cmk.utils.log import logger
 from cmk.utils.type_defs import SectionName
 import cmk.snmplib.snmp_table as snmp_table
-from cmk.snmplib.type_defs import ABCSNMPBackend, OID_END, OIDBytes, OIDEnd, SNMPHostConfig, SNMPTree
+from cmk.snmplib.type_defs import (
+    ABCSNMPBackend,
+    OID_END,
+    OIDBytes,
+    OIDCached,
+    OIDEnd,
+    SNMPHostConfig,
+    SNMPTree,
+)
+from cmk.snmplib.walk_cache import WalkCache
 
 import cmk.base.config as config
 from cmk.base.api.agent_based.register.section_plugins_legacy import _create_snmp_trees
@@ -32,6 +44,7 @@ SNMPConfig = SNMPHostConfig(
     character_encoding="ascii",
     is_usewalk_host=False,
     is_inline_snmp_host=False,
+    is_native_snmp_host=False,
     record_stats=False,
 )
 
@@ -148,3 +161,130 @@ def test_is_bulkwalk_host(monkeypatch):
     config_cache = ts.apply(monkeypatch)
     assert config_cache.get_host_config("abc").snmp_config("").is_bulkwalk_host is False
     assert config_cache.get_host_config("localhost").snmp_config("").is_bulkwalk_host is True
+
+
+IF_TREES = [
+    SNMPTree(base=".1.3.6.1.2.1.2.2.1", oids=["1", "2", OIDCached("3")]),
+    SNMPTree(base=".1.3.6.1.2.1.31.1.1.1", oids=["1", OID_END]),
+]
+IF64_TREES = [
+    SNMPTree(base=".1.3.6.1.2.1.2.2.1", oids=["2", "3", "10"]),
+    SNMPTree(base=".1.3.6.1.2.1.31.1.1", oids=["1"]),
+]
+
+
+def test_plan_snmp_walks():
+    plan = snmp_table.plan_snmp_walks(
+        [(SectionName("if"), IF_TREES), (SectionName("if64"), IF64_TREES)],
+        True,
+        snmp_config=SNMPConfig,
+    )
+
+    assert plan.requested == 8
+    assert plan.saved == 3
+    if_, if64 = SectionName("if"), SectionName("if64")
+    assert [(w.fetchoid, w.covers, w.sections, w.persist, w.use_persisted) for w in plan.walks] == [
+        (".1.3.6.1.2.1.2.2.1.1", [".1.3.6.1.2.1.2.2.1.1"], [if_], False, False),
+        (".1.3.6.1.2.1.2.2.1.2", [".1.3.6.1.2.1.2.2.1.2"], [if_, if64], False, False),
+        (".1.3.6.1.2.1.2.2.1.3", [".1.3.6.1.2.1.2.2.1.3"], [if_, if64], True, False),
+        (
+            ".1.3.6.1.2.1.31.1.1.1",
+            [".1.3.6.1.2.1.31.1.1.1", ".1.3.6.1.2.1.31.1.1.1.1"],
+            [if64, if_],
+            False,
+            False,
+        ),
+        (".1.3.6.1.2.1.2.2.1.10", [".1.3.6.1.2.1.2.2.1.10"], [if64], False, False),
+    ]
+
+
+def test_plan_snmp_walks_keeps_contexts_apart():
+    snmp_config = SNMPConfig._replace(
+        credentials=("noAuthNoPriv", "user"),
+        snmpv3_contexts=[("if", ["ctx"])],
+    )
+    plan = snmp_table.plan_snmp_walks(
+        [(SectionName("if"), IF_TREES[:1]), (SectionName("if64"), IF64_TREES[:1])],
+        False,
+        snmp_config=snmp_config,
+    )
+    assert plan.saved == 0
+
+
+class CountingBackend(SNMPTestBackend):
+    walks: List[str] = []
+
+    def walk(self, oid, check_plugin_name=None, table_base_oid=None, context_name=None):
+        self.walks.append(oid)
+        return super().walk(oid, check_plugin_name, table_base_oid, context_name)
+
+
+class PipeliningBackend(CountingBackend):
+    batches: List[Tuple[List[str], Optional[str]]] = []
+
+    def walk_many(self, oids, *, context_name=None):
+        self.batches.append((list(oids), context_name))
+        return super().walk_many(oids, context_name=context_name)
+
+
+def test_walk_planned(monkeypatch, tmp_path):
+    monkeypatch.setattr(cmk.utils.paths, "var_dir", str(tmp_path))
+    monkeypatch.setattr(CountingBackend, "walks", [])
+    backend = CountingBackend(SNMPConfig, logger)
+    sections = [(SectionName("if"), IF_TREES), (SectionName("if64"), IF64_TREES)]
+    plan = snmp_table.plan_snmp_walks(sections, False, snmp_config=SNMPConfig)
+
+    walk_cache = WalkCache(SNMPConfig.hostname)
+    snmp_table.walk_planned(plan, backend=backend, walk_cache=walk_cache)
+    for section_name, trees in sections:
+        for tree in trees:
+            snmp_table.get_snmp_table(section_name, tree, backend=backend, walk_cache=walk_cache)
+
+    assert backend.walks == [w.fetchoid for w in plan.walks]
+    assert snmp_table.get_snmp_table(
+        SectionName("if64"),
+        IF64_TREES[1],
+        backend=backend,
+        walk_cache=walk_cache,
+    ) == [["C0FEFE"]] * 3
+
+
+@pytest.mark.parametrize("snmp_config, contexts", [
+    (SNMPConfig, [None]),
+    (
+        SNMPConfig._replace(credentials=("noAuthNoPriv", "user"),
+                            snmpv3_contexts=[("if", ["ctx1", "ctx2"])]),
+        ["ctx1", "ctx2", None],
+    ),
+])
+def test_walk_planned_walks_many(monkeypatch, tmp_path, snmp_config, contexts):
+    monkeypatch.setattr(cmk.utils.paths, "var_dir", str(tmp_path))
+    monkeypatch.setattr(CountingBackend, "walks", [])
+    monkeypatch.setattr(PipeliningBackend, "batches", [])
+    backend = PipeliningBackend(snmp_config, logger)
+    sections = [(SectionName("if"), IF_TREES), (SectionName("if64"), IF64_TREES)]
+    plan = snmp_table.plan_snmp_walks(sections, False, snmp_config=snmp_config)
+
+    snmp_table.walk_planned(plan, backend=backend, walk_cache=WalkCache(snmp_config.hostname))
+    # One batch of all subtrees per context
+    assert [context_name for _oids, context_name in backend.batches] == contexts
+    assert [(oid, context_name) for oids, context_name in backend.batches for oid in oids
+           ] == [(w.fetchoid, context_name)
+                 for context_name in contexts
+                 for w in plan.walks
+                 if context_name in snmp_config.snmpv3_contexts_of(w.section_name)]
+
+
+def test_walk_planned_with_oid_range_limits(monkeypatch, tmp_path):
+    monkeypatch.setattr(cmk.utils.paths, "var_dir", str(tmp_path))
+    monkeypatch.setattr(CountingBackend, "walks", [])
+    monkeypatch.setattr(PipeliningBackend, "batches", [])
+    snmp_config = SNMPConfig._replace(oid_range_limits=[("if", [("first", 2)])])
+    backend = PipeliningBackend(snmp_config, logger)
+    plan = snmp_table.plan_snmp_walks([(SectionName("if"), IF_TREES)],
+                                      False,
+                                      snmp_config=snmp_config)
+
+    snmp_table.walk_planned(plan, backend=backend, walk_cache=WalkCache(snmp_config.hostname))
+    assert backend.batches == []
+    assert backend.walks == [w.fetchoid for w in plan.walks]
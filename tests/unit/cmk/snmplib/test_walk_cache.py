@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright (C) 2019 tribe29 GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+
+import pytest  # type: ignore[import]
+
+import cmk.utils.paths
+import cmk.utils.store as store
+from cmk.utils.log import logger
+from cmk.utils.type_defs import SectionName
+
+import cmk.snmplib.snmp_table as snmp_table
+from cmk.snmplib.type_defs import ABCSNMPBackend, OIDCached, SNMPHostConfig, SNMPTree
+from cmk.snmplib.walk_cache import decode_oid, encode_oid, WalkCache
+
+IF_DESCR = [
+    (".1.3.6.1.2.1.2.2.1.2.1", b"lo"),
+    (".1.3.6.1.2.1.2.2.1.2.2", b"eth0"),
+    (".1.3.6.1.2.1.2.2.1.2.10", b"eth1"),
+]
+IF_TYPE = [
+    (".1.3.6.1.2.1.2.2.1.3.1", b"24"),
+    (".1.3.6.1.2.1.2.2.1.3.2", b"6"),
+]
+IF_TABLE = IF_DESCR + IF_TYPE
+NO_SCOPE = (None,)
+
+
+@pytest.fixture(autouse=True)
+def var_dir(monkeypatch, tmp_path):
+    monkeypatch.setattr(cmk.utils.paths, "var_dir", str(tmp_path))
+
+
+@pytest.mark.parametrize("oid", [".1.3.6.1.2.1.1.1.0", ".1.3.6.1.4.1.9.4294967295"])
+def test_oid_round_trip(oid):
+    assert decode_oid(encode_oid(oid)) == oid
+
+
+def test_encoded_oids_sort_numerically():
+    oids = [o for o, _v in IF_TABLE]
+    assert sorted(oids, key=encode_oid) == oids
+
+
+def test_subtree_lookup():
+    cache = WalkCache("heute")
+    cache.add(".1.3.6.1.2.1.2.2.1", list(reversed(IF_TABLE)), scope=NO_SCOPE, persist=False)
+
+    assert cache.get(".1.3.6.1.2.1.2.2.1.2", scope=NO_SCOPE, use_persisted=False) == IF_DESCR
+    assert cache.get(".1.3.6.1.2.1.2.2.1.3.2", scope=NO_SCOPE, use_persisted=False) == IF_TYPE[1:]
+    assert cache.get(".1.3.6.1.2.1.2.2.1.4", scope=NO_SCOPE, use_persisted=False) == []
+    # not walked yet
+    assert cache.get(".1.3.6.1.2.1.2.2", scope=NO_SCOPE, use_persisted=False) is None
+    # walked in another scope
+    assert cache.get(".1.3.6.1.2.1.2.2.1.2", scope=("ctx",), use_persisted=False) is None
+
+
+def test_rewalk_replaces_subtree():
+    cache = WalkCache("heute")
+    cache.add(".1.3.6.1.2.1.2.2.1", IF_TABLE, scope=NO_SCOPE, persist=False)
+    cache.add(".1.3.6.1.2.1.2.2.1.2", IF_DESCR[:1], scope=NO_SCOPE, persist=False)
+
+    assert cache.get(".1.3.6.1.2.1.2.2.1", scope=NO_SCOPE,
+                     use_persisted=False) == IF_DESCR[:1] + IF_TYPE
+    assert len(cache) == 3
+
+
+def test_persisted_walks():
+    cache = WalkCache("heute")
+    cache.add(".1.3.6.1.2.1.2.2.1.2", IF_DESCR, scope=NO_SCOPE, persist=True)
+    cache.add(".1.3.6.1.2.1.2.2.1.3", IF_TYPE, scope=NO_SCOPE, persist=False)
+    cache.save()
+
+    cache = WalkCache("heute")
+    assert cache.get(".1.3.6.1.2.1.2.2.1.2", scope=NO_SCOPE, use_persisted=False) is None
+    assert cache.get(".1.3.6.1.2.1.2.2.1.2", scope=("ctx",), use_persisted=True) == IF_DESCR
+    assert cache.get(".1.3.6.1.2.1.2.2.1.3", scope=NO_SCOPE, use_persisted=True) is None
+
+    # Saving keeps the persisted walks that were not touched by this fetch
+    cache = WalkCache("heute")
+    cache.add(".1.3.6.1.2.1.1.5", [(".1.3.6.1.2.1.1.5.0", b"heute")], scope=NO_SCOPE, persist=True)
+    cache.save()
+    cache = WalkCache("heute")
+    assert cache.get(".1.3.6.1.2.1.2.2.1.2", scope=NO_SCOPE, use_persisted=True) == IF_DESCR
+    assert cache.get(".1.3.6.1.2.1.1", scope=NO_SCOPE, use_persisted=True) is None
+    assert cache.get(".1.3.6.1.2.1.1.5", scope=NO_SCOPE,
+                     use_persisted=True) == [(".1.3.6.1.2.1.1.5.0", b"heute")]
+
+
+def test_convert_walks_of_former_version(tmp_path):
+    legacy_dir = tmp_path / "snmp_cache" / "heute"
+    legacy_dir.mkdir(parents=True)
+    store.save_object_to_file(legacy_dir / ".1.3.6.1.2.1.2.2.1.2", IF_DESCR)
+    store.save_object_to_file(legacy_dir / ".1.3.6.1.2.1.2.2.1.3", IF_TYPE)
+
+    cache = WalkCache("heute")
+    assert cache.get(".1.3.6.1.2.1.2.2.1.2", scope=NO_SCOPE, use_persisted=True) == IF_DESCR
+    # The walk of this fetch is more recent
+    cache.add(".1.3.6.1.2.1.2.2.1.3", IF_TYPE[:1], scope=NO_SCOPE, persist=True)
+    cache.save()
+    assert not legacy_dir.exists()
+
+    cache = WalkCache("heute")
+    assert cache.get(".1.3.6.1.2.1.2.2.1", scope=NO_SCOPE, use_persisted=True) is None
+    assert cache.get(".1.3.6.1.2.1.2.2.1.2", scope=NO_SCOPE, use_persisted=True) == IF_DESCR
+    assert cache.get(".1.3.6.1.2.1.2.2.1.3", scope=NO_SCOPE, use_persisted=True) == IF_TYPE[:1]
+
+
+def test_remove_walks_of_former_version_on_save(tmp_path):
+    legacy_dir = tmp_path / "snmp_cache" / "heute"
+    legacy_dir.mkdir(parents=True)
+    store.save_object_to_file(legacy_dir / ".1.3.6.1.2.1.2.2.1.2", IF_DESCR)
+
+    WalkCache("heute").save()
+    assert not legacy_dir.exists()
+    assert WalkCache("heute").get(".1.3.6.1.2.1.2.2.1.2", scope=NO_SCOPE,
+                                  use_persisted=True) == IF_DESCR
+
+
+def test_broken_cache_file(tmp_path):
+    (tmp_path / "snmp_cache").mkdir()
+    (tmp_path / "snmp_cache" / "heute.walk").write_bytes(b"CMKWALK1\x00")
+    assert WalkCache("heute").get(".1.3", scope=NO_SCOPE, use_persisted=True) is None
+
+
+class CountingBackend(ABCSNMPBackend):
+    def __init__(self, config, logger_):
+        super().__init__(config, logger_)
+        self.walks = []
+
+    def get(self, oid, context_name=None):
+        return None
+
+    def walk(self, oid, check_plugin_name=None, table_base_oid=None, context_name=None):
+        self.walks.append(oid)
+        return [(o, v) for o, v in IF_TABLE if o.startswith(oid + ".")]
+
+
+@pytest.fixture(name="backend")
+def fixture_backend():
+    return CountingBackend(
+        SNMPHostConfig(
+            is_ipv6_primary=False,
+            hostname="heute",
+            ipaddress="1.2.3.4",
+            credentials="public",
+            port=161,
+            is_bulkwalk_host=False,
+            is_snmpv2or3_without_bulkwalk_host=False,
+            bulk_walk_size_of=10,
+            timing={},
+            oid_range_limits=[],
+            snmpv3_contexts=[],
+            character_encoding="ascii",
+            is_usewalk_host=False,
+            is_inline_snmp_host=False,
+            is_native_snmp_host=False,
+            record_stats=False,
+        ), logger)
+
+
+def test_tables_share_walks(backend):
+    walk_cache = WalkCache("heute")
+    tree = SNMPTree(base=".1.3.6.1.2.1.2.2.1", oids=["2", "3"])
+    first = snmp_table.get_snmp_table(SectionName("if"),
+                                      tree,
+                                      backend=backend,
+                                      walk_cache=walk_cache)
+    second = snmp_table.get_snmp_table(SectionName("if64"),
+                                       tree,
+                                       backend=backend,
+                                       walk_cache=walk_cache)
+
+    assert first == second == [["lo", "24"], ["eth0", "6"], ["eth1", ""]]
+    assert backend.walks == [".1.3.6.1.2.1.2.2.1.2", ".1.3.6.1.2.1.2.2.1.3"]
+
+
+def test_cached_columns_are_persisted(backend):
+    tree = SNMPTree(base=".1.3.6.1.2.1.2.2.1", oids=[OIDCached("2")])
+    expected = [["lo"], ["eth0"], ["eth1"]]
+    assert snmp_table.get_snmp_table(SectionName("if"), tree, backend=backend) == expected
+    assert snmp_table.get_snmp_table_cached(SectionName("if"), tree, backend=backend) == expected
+    assert backend.walks == [".1.3.6.1.2.1.2.2.1.2"]
@@ -9,8 +9,10 @@ import pytest  # type: ignore[import]
 from testlib.base import Scenario
 
 from cmk.utils.type_defs import CheckPluginName
+from cmk.utils.labels import LabelManager
 from cmk.base.check_utils import Service
 from cmk.base.discovered_labels import DiscoveredServiceLabels, ServiceLabel
+import cmk.utils.rulesets.ruleset_matcher as ruleset_matcher
 from cmk.utils.rulesets.ruleset_matcher import RulesetMatchObject
 
 
@@ -514,3 +516,83 @@ def test_ruleset_matcher_get_service_ruleset_values_labels(monkeypatch, hostname
             hostname, service_description),
                                            ruleset=service_label_ruleset,
                                            is_binary=False)) == expected_result
+
+
+@pytest.mark.parametrize("pattern,expected_prefix", [
+    ("CPU load", "CPU load"),
+    ("^Interface (eth|lo)", "Interface "),
+    ("Interface.*", "Interface"),
+    (r"Mount\ /var", "Mount /var"),
+    ("ab*c", "a"),
+    ("abc+d", "abc"),
+    (r"\dfoo", ""),
+    ("CPU|Memory", ""),
+    ("x[|]y|z", ""),
+    ("(?i)cpu", ""),
+])
+def test_literal_prefix(pattern, expected_prefix):
+    assert ruleset_matcher._literal_prefix(pattern) == expected_prefix
+
+
+def test_service_ruleset_index_candidates():
+    matcher = ruleset_matcher.RulesetMatcher(
+        tag_to_group_map={},
+        host_tag_lists={
+            "host1": [],
+            "host2": []
+        },
+        host_paths={
+            "host1": "/wato/",
+            "host2": "/wato/"
+        },
+        labels=LabelManager({}, [], [], lambda host_name, service_description: {}),
+        all_configured_hosts={"host1", "host2"},
+        clusters_of={},
+        nodes_of={},
+    )
+    service_ruleset = [
+        {
+            "value": "cpu",
+            "condition": {
+                "service_description": ["CPU"]
+            },
+        },
+        {
+            "value": "not cpu",
+            "condition": {
+                "service_description": {
+                    "$nor": ["CPU"]
+                }
+            },
+        },
+        {
+            "value": "load",
+            "condition": {
+                "host_name": ["host2"],
+                "service_description": [{
+                    "$regex": ".*load"
+                }],
+            },
+        },
+        {
+            "value": "all",
+            "condition": {},
+        },
+    ]
+
+    def values(hostname, service_description):
+        return list(
+            matcher.get_service_ruleset_values(RulesetMatchObject(hostname, service_description),
+                                               ruleset=service_ruleset,
+                                               is_binary=False))
+
+    assert values("host1", "CPU load") == ["cpu", "all"]
+    assert values("host1", "Disk load") == ["not cpu", "all"]
+    assert values("host2", "CPU load") == ["cpu", "load", "all"]
+    assert values("host2", "Disk load") == ["not cpu", "load", "all"]
+    assert values("host3", "CPU load") == []
+
+    index = matcher.ruleset_optimizer.get_service_ruleset(service_ruleset,
+                                                          with_foreign_hosts=False,
+                                                          is_binary=False)
+    assert [rule[0] for rule in index.candidates("host1", "Memory")] == ["not cpu", "all"]
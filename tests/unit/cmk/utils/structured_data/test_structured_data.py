@@ -6,6 +6,7 @@
 
 from typing import Dict, List
 
+import ast
 import shutil
 import pytest  # type: ignore[import]
 from testlib import cmk_path  # type: ignore[import]
@@ -523,6 +524,64 @@ def test_structured_data_StructuredDataTree_is_equal_save_and_load(tree, tmp_pat
         shutil.rmtree(str(tmp_path))
 
 
+@pytest.mark.parametrize("tree", trees)
+def test_structured_data_StructuredDataTree_save_and_load_binary(tree, tmp_path):
+    tree.save_to(str(tmp_path), "foo")
+    assert (tmp_path / "foo.bin").exists()
+    # The tree file is still written, Livestatus hands it out
+    assert tree.is_equal(StructuredDataTree().create_tree_from_raw_tree(
+        ast.literal_eval((tmp_path / "foo").read_text())))
+
+    loaded_tree = StructuredDataTree().load_from(str(tmp_path / "foo"))
+    assert tree.is_equal(loaded_tree)
+    assert loaded_tree.get_raw_tree() == tree.get_raw_tree()
+
+
+@pytest.mark.parametrize("tree_paths,edges,missing_edges", [
+    ([["hardware", "memory"]], ["hardware"], ["networking"]),
+    ([["hardware", "memory", "arrays", 0, "devices"]], ["hardware"], ["networking"]),
+    ([["networking", "interfaces"], ["hardware", "memory"]], ["hardware", "networking"], []),
+    ([["nothing"]], [], ["hardware", "networking"]),
+    ([[]], ["hardware", "networking"], []),
+])
+@pytest.mark.parametrize("with_binary_tree_file", [True, False])
+def test_structured_data_StructuredDataTree_load_subtrees(tmp_path, tree_paths, edges,
+                                                          missing_edges, with_binary_tree_file):
+    tree = tree_old_arrays.copy()
+    tree.merge_with(tree_new_interfaces)
+    tree.save_to(str(tmp_path), "foo")
+    if not with_binary_tree_file:
+        (tmp_path / "foo.bin").unlink()
+
+    loaded_tree = StructuredDataTree().load_from(str(tmp_path / "foo"), tree_paths)
+    for edge in edges:
+        assert loaded_tree.has_edge(edge)
+    for edge in missing_edges:
+        assert not loaded_tree.has_edge(edge)
+    for path in tree_paths:
+        if path and path != ["nothing"]:
+            assert loaded_tree.get_sub_children(path) is not None
+            assert str(loaded_tree.get_sub_children(path)) == str(tree.get_sub_children(path))
+
+
+def test_structured_data_StructuredDataTree_load_ignores_outdated_binary_tree_file(tmp_path):
+    tree_old_memory.save_to(str(tmp_path), "foo")
+    binary_tree_file = (tmp_path / "foo.bin").read_bytes()
+    # E.g. a former version replaced the tree file but left the binary tree file
+    tree_new_heute.save_to(str(tmp_path), "foo")
+    (tmp_path / "foo.bin").write_bytes(binary_tree_file)
+
+    assert StructuredDataTree().load_from(str(tmp_path / "foo")).is_equal(tree_new_heute)
+
+
+def test_structured_data_StructuredDataTree_load_ignores_broken_binary_tree_file(tmp_path):
+    tree_new_heute.save_to(str(tmp_path), "foo")
+    binary_tree_file = (tmp_path / "foo.bin").read_bytes()
+    (tmp_path / "foo.bin").write_bytes(binary_tree_file[:len(binary_tree_file) // 2])
+
+    assert StructuredDataTree().load_from(str(tmp_path / "foo")).is_equal(tree_new_heute)
+
+
 @pytest.mark.parametrize("tree,result",
                          list(zip(trees, [
                              21,
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+# Copyright (C) 2019 tribe29 GmbH - License: GNU General Public License v2
+# This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
+# conditions defined in the file COPYING, which is part of this source code package.
+
+import os
+
+import pytest  # type: ignore[import]
+
+import cmk.utils.inventory_archive as inventory_archive
+import cmk.utils.paths
+from cmk.utils.structured_data import StructuredDataTree
+
+import cmk.base.inventory as inventory
+
+
+@pytest.fixture(name="inventory_dirs")
+def fixture_inventory_dirs(tmp_path, monkeypatch):
+    monkeypatch.setattr(cmk.utils.paths, "inventory_output_dir", str(tmp_path / "inventory"))
+    monkeypatch.setattr(cmk.utils.paths, "inventory_archive_dir",
+                        str(tmp_path / "inventory_archive"))
+    return tmp_path
+
+
+def _tree(packages):
+    tree = StructuredDataTree()
+    tree.get_dict("hardware.cpu.").update({"model": "Xeon", "cores": 8})
+    tree.get_list("software.packages:").extend({
+        "name": name,
+        "version": version
+    } for name, version in packages)
+    tree.normalize_nodes()
+    return tree
+
+
+def _save(hostname, tree, timestamp):
+    inventory._save_inventory_tree(hostname, tree)
+    # Pretend the tree has been saved at the timestamp
+    filepath = "%s/%s" % (cmk.utils.paths.inventory_output_dir, hostname)
+    inventory_archive.delta_filepath(hostname, int(os.stat(filepath).st_mtime)).rename(
+        inventory_archive.delta_filepath(hostname, timestamp))
+    os.utime(filepath, (timestamp, timestamp))
+
+
+def test_get_archived_timestamps_without_archive(inventory_dirs):
+    assert inventory_archive.get_archived_timestamps("heute") == ([], [])
+
+
+def test_get_archived_timestamps(inventory_dirs):
+    archive_dir = inventory_dirs / "inventory_archive" / "heute"
+    archive_dir.mkdir(parents=True)
+    for name in ["200", "100", "100.bin", "300.delta", "150.delta", "foo.delta", "400.delta.new"]:
+        (archive_dir / name).touch()
+    assert inventory_archive.get_archived_timestamps("heute") == ([100, 200], [150, 300])
+
+
+def test_save_and_load_delta(inventory_dirs):
+    tree, old_tree = _tree([("a", "1"), ("b", "2")]), _tree([("a", "1")])
+    delta = tree.compare_with(old_tree)
+    inventory_archive.save_delta("heute", 1000, tree, old_tree)
+
+    assert inventory_archive.has_delta("heute", 1000)
+    assert not inventory_archive.has_delta("heute", 1001)
+    assert inventory_archive.load_delta("heute", 1001) is None
+
+    loaded = inventory_archive.load_delta("heute", 1000)
+    assert loaded is not None
+    loaded_delta, compared_numerations = loaded
+    assert loaded_delta[:3] == delta[:3] == (1, 0, 0)
+    assert loaded_delta[3].is_equal(delta[3])
+    assert compared_numerations == [("software", "packages")]
+
+
+@pytest.mark.parametrize("permitted_paths", [
+    None,
+    [(["software", "packages"], None)],
+    [(["software", "packages"], ["name"])],
+    [(["hardware", "cpu"], ["model"])],
+    [(["hardware"], None), (["software", "packages"], ["version"])],
+])
+@pytest.mark.parametrize("packages,old_packages", [
+    ([("a", "1"), ("b", "2")], [("a", "1")]),
+    ([("a", "1")], [("a", "1"), ("b", "2"), ("c", "3")]),
+    ([("a", "2"), ("b", "2")], [("a", "1"), ("b", "1")]),
+    ([("a", "1"), ("b", "1")], []),
+])
+def test_count_delta_entries_of_filtered_delta(inventory_dirs, permitted_paths, packages,
+                                               old_packages):
+    tree, old_tree = _tree(packages), _tree(old_packages) if old_packages else StructuredDataTree()
+    inventory_archive.save_delta("heute", 1000, tree, old_tree)
+    loaded = inventory_archive.load_delta("heute", 1000)
+    assert loaded is not None
+    (_new, _changed, _removed, delta_tree), compared_numerations = loaded
+
+    # Counted like the delta of the filtered trees
+    expected = tree.get_filtered_tree(permitted_paths).compare_with(
+        old_tree.get_filtered_tree(permitted_paths))[:3]
+    assert inventory_archive.count_delta_entries(delta_tree.get_filtered_tree(permitted_paths),
+                                                 compared_numerations) == expected
+
+
+def test_save_inventory_tree_saves_delta_chain(inventory_dirs):
+    trees = [
+        _tree([("a", "1")]),
+        _tree([("a", "1"), ("b", "1")]),
+        _tree([("a", "2"), ("b", "1")]),
+    ]
+    for nr, tree in enumerate(trees):
+        _save("heute", tree, 1000 + nr)
+
+    # Only the deltas are archived, not the former trees
+    assert inventory_archive.get_archived_timestamps("heute") == ([], [1000, 1001, 1002])
+
+    first_delta = inventory_archive.load_delta("heute", 1000)
+    assert first_delta is not None
+    assert first_delta[0][3].is_equal(trees[0].compare_with(StructuredDataTree())[3])
+    for nr in [1, 2]:
+        loaded = inventory_archive.load_delta("heute", 1000 + nr)
+        expected = trees[nr].compare_with(trees[nr - 1])
+        assert loaded is not None
+        delta, _compared_numerations = loaded
+        assert delta[:3] == expected[:3]
+        assert delta[3].is_equal(expected[3])
+
+
+def test_save_inventory_tree_archives_tree_of_former_version(inventory_dirs):
+    old_tree = _tree([("a", "1")])
+    (inventory_dirs / "inventory").mkdir()
+    old_tree.save_to(str(inventory_dirs / "inventory"), "heute")
+    os.utime(str(inventory_dirs / "inventory" / "heute"), (1000, 1000))
+
+    _save("heute", _tree([("a", "2")]), 1001)
+
+    assert inventory_archive.get_archived_timestamps("heute") == ([1000], [1001])
+    assert StructuredDataTree().load_from(
+        str(inventory_dirs / "inventory_archive" / "heute" / "1000")).is_equal(old_tree)
@@ -15,7 +15,11 @@ piggyback_max_cachefile_age = 3600
 
 
 @pytest.fixture(autouse=True)
-def test_config():
+def test_config(monkeypatch, tmp_path):
+    monkeypatch.setattr(cmk.utils.paths, "piggyback_dir", tmp_path / "piggyback")
+    monkeypatch.setattr(cmk.utils.paths, "piggyback_source_dir", tmp_path / "piggyback_sources")
+    monkeypatch.setattr(cmk.utils.paths, "piggyback_packed_dir", tmp_path / "piggyback_packed")
+
     piggyback_dir = cmk.utils.paths.piggyback_dir
     host_dir = piggyback_dir / "test-host"
     host_dir.mkdir(parents=True, exist_ok=True)
@@ -23,6 +27,9 @@ def test_config():
     for f1 in piggyback_dir.glob("*/*"):
         f1.unlink()
 
+    for packed_file in cmk.utils.paths.piggyback_packed_dir.glob("*"):
+        packed_file.unlink()
+
     source_file = piggyback_dir / "test-host" / "source1"
     with source_file.open(mode="wb") as f2:
         f2.write(b"<<<check_mk>>>\nlala\n")
@@ -241,7 +248,7 @@ def test_store_piggyback_raw_data_new_host():
 
     for raw_data_info in piggyback.get_piggyback_raw_data("pig", time_settings):
         assert raw_data_info.source_hostname == "source2"
-        assert raw_data_info.file_path.endswith('/pig/source2')
+        assert raw_data_info.file_path == str(cmk.utils.paths.piggyback_packed_dir / "source2")
         assert raw_data_info.successfully_processed is True
         assert raw_data_info.reason.startswith("Successfully processed from source 'source2'")
         assert raw_data_info.reason_status == 0
@@ -267,13 +274,113 @@ def test_store_piggyback_raw_data_second_source():
             assert raw_data_info.raw_data == b'<<<check_mk>>>\nlala\n'
 
         else:  # source2
-            assert raw_data_info.file_path.endswith('/test-host/source2')
+            assert raw_data_info.file_path == str(cmk.utils.paths.piggyback_packed_dir / "source2")
             assert raw_data_info.successfully_processed is True
             assert raw_data_info.reason.startswith("Successfully processed from source 'source2'")
             assert raw_data_info.reason_status == 0
             assert raw_data_info.raw_data == b'<<<check_mk>>>\nlulu\n'
 
 
+def test_store_piggyback_raw_data_replaces_former_file():
+    time_settings: piggyback.PiggybackTimeSettings = [(None, "max_cache_age",
+                                                       piggyback_max_cachefile_age)]
+
+    piggyback.store_piggyback_raw_data("source1", {"test-host": [
+        b"<<<check_mk>>>",
+        b"lulu",
+    ]})
+
+    raw_data_infos = piggyback.get_piggyback_raw_data("test-host", time_settings)
+    assert len(raw_data_infos) == 1
+    assert raw_data_infos[0].source_hostname == "source1"
+    assert raw_data_infos[0].successfully_processed is True
+    assert raw_data_infos[0].raw_data == b'<<<check_mk>>>\nlulu\n'
+
+
+@pytest.mark.parametrize("time_settings, successfully_processed, reason", [
+    ([
+        (None, "max_cache_age", piggyback_max_cachefile_age),
+    ], False, "Piggyback file not updated by source 'source2'"),
+    ([
+        (None, "max_cache_age", piggyback_max_cachefile_age),
+        ("source2", "validity_period", 1000),
+    ], True, "Piggyback file not updated by source 'source2' (still valid"),
+])
+def test_store_piggyback_raw_data_keeps_data_not_sent_again(time_settings, successfully_processed,
+                                                            reason):
+    piggyback.store_piggyback_raw_data("source2", {
+        "pig1": [b"<<<check_mk>>>", b"pig1"],
+        "pig2": [b"<<<check_mk>>>", b"pig2"],
+    })
+    piggyback.store_piggyback_raw_data("source2", {"pig1": [b"<<<check_mk>>>", b"pig1 again"]})
+
+    [pig1] = piggyback.get_piggyback_raw_data("pig1", time_settings)
+    assert pig1.successfully_processed is True
+    assert pig1.raw_data == b'<<<check_mk>>>\npig1 again\n'
+
+    [pig2] = piggyback.get_piggyback_raw_data("pig2", time_settings)
+    assert pig2.successfully_processed is successfully_processed
+    assert pig2.reason.startswith(reason)
+    assert pig2.raw_data == b'<<<check_mk>>>\npig2\n'
+
+
+def test_packed_sources_index_notices_replaced_files():
+    piggyback.store_piggyback_raw_data("source2", {"pig1": [b"<<<check_mk>>>"]})
+
+    # Old enough to be trusted, the index of the file is cached from now on
+    past = time.time() - 60
+    for path in [
+            cmk.utils.paths.piggyback_packed_dir / "source2", cmk.utils.paths.piggyback_packed_dir
+    ]:
+        os.utime(str(path), (past, past))
+    assert piggyback.get_source_hostnames("pig1") == ["source2"]
+    assert piggyback.get_source_hostnames("pig2") == []
+
+    piggyback.store_piggyback_raw_data("source2", {"pig2": [b"<<<check_mk>>>"]})
+    assert piggyback.get_source_hostnames("pig1") == ["source2"]
+    assert piggyback.get_source_hostnames("pig2") == ["source2"]
+
+
+def test_lookup_lists_host_folders_of_former_versions_only(monkeypatch):
+    piggyback.store_piggyback_raw_data("source2", {"pig1": [b"<<<check_mk>>>"]})
+    listed = []
+    get_piggybacked_host_sources = piggyback._get_piggybacked_host_sources
+
+    def get_host_sources(piggybacked_host_folder):
+        listed.append(piggybacked_host_folder.name)
+        return get_piggybacked_host_sources(piggybacked_host_folder)
+
+    monkeypatch.setattr(piggyback, "_get_piggybacked_host_sources", get_host_sources)
+    assert piggyback.get_source_hostnames("pig1") == ["source2"]
+    assert piggyback.get_source_hostnames("test-host") == ["source1"]
+    assert listed == ["test-host"]
+
+    # Written by a former version just now
+    (cmk.utils.paths.piggyback_dir / "pig1").mkdir()
+    (cmk.utils.paths.piggyback_dir / "pig1" / "source1").write_bytes(b"<<<check_mk>>>\n")
+    try:
+        assert piggyback.get_source_hostnames("pig1") == ["source1", "source2"]
+    finally:
+        (cmk.utils.paths.piggyback_dir / "pig1" / "source1").unlink()
+        (cmk.utils.paths.piggyback_dir / "pig1").rmdir()
+
+
+def test_cleanup_packed_piggyback_files():
+    piggyback.store_piggyback_raw_data("source2", {
+        "pig1": [b"<<<check_mk>>>", b"pig1"],
+        "pig2": [b"<<<check_mk>>>", b"pig2"],
+    })
+    piggyback.store_piggyback_raw_data("source3", {"pig1": [b"<<<check_mk>>>", b"pig1"]})
+    piggyback.store_piggyback_raw_data("source2", {"pig1": [b"<<<check_mk>>>", b"pig1"]})
+
+    piggyback.cleanup_piggyback_files([(None, 'max_cache_age', piggyback_max_cachefile_age)])
+    assert sorted(piggyback.get_source_hostnames("pig1")) == ["source2", "source3"]
+    assert piggyback.get_source_hostnames("pig2") == []
+
+    piggyback.cleanup_piggyback_files([(None, 'max_cache_age', -1)])
+    assert list(cmk.utils.paths.piggyback_packed_dir.glob("*")) == []
+
+
 def test_get_source_and_piggyback_hosts():
     time_settings: piggyback.PiggybackTimeSettings = [(None, "max_cache_age",
                                                        piggyback_max_cachefile_age)]
@@ -4,6 +4,9 @@
 # This file is part of Checkmk (https://checkmk.com). It is subject to the terms and
 # conditions defined in the file COPYING, which is part of this source code package.
 
+import json
+import math
+
 import pytest  # type: ignore[import]
 
 import cmk.utils.prediction as prediction
@@ -60,6 +63,17 @@ def test_time_series_upsampling(rrddata, twindow, shift, upsampled):
     assert ts.bfill_upsample(twindow, shift) == upsampled
 
 
+@pytest.mark.parametrize("rrddata, twindow, shift", [
+    ([10, 20, 10, 20], (10, 20, 5), 0),
+    ([0, 120, 40, 25, None, 105], (300, 400, 10), 300),
+    ([0, 120, 40, 25, 65, 105], (0, 120, 40), 0),
+])
+def test_time_series_upsampling_array(rrddata, twindow, shift):
+    ts = prediction.TimeSeries(rrddata)
+    upsampled = ts.bfill_upsample_array(twindow, shift).tolist()
+    assert [None if math.isnan(v) else v for v in upsampled] == ts.bfill_upsample(twindow, shift)
+
+
 @pytest.mark.parametrize("rrddata, twindow, cf, downsampled", [
     ([10, 25, 5, 15, 20, 25], (10, 30, 10), "average", [17.5, 25]),
     ([10, 25, 5, 15, 20, 25], (10, 30, 10), "max", [20, 25]),
@@ -132,3 +146,62 @@ def test_estimate_level_bounds(ref_value, stdev, sig, params, levels_factor, res
 ])
 def test_estimate_levels(reference, params, levels_factor, result):
     assert prediction.estimate_levels(reference, params, levels_factor) == result
+
+
+_DATA_FOR_PRED = {
+    "columns": ["average", "min", "max", "stdev"],
+    "points": [[1.5, 1.0, 2.0, 0.5], [None, None, None, None], [3.0, 3.0, 3.0, 3.0]],
+    "num_points": 3,
+    "data_twindow": [1000, 1180],
+    "step": 60,
+}
+
+
+def test_save_and_retrieve_prediction_data(tmp_path):
+    pred_file = str(tmp_path / "monday")
+    prediction.save_prediction_data(pred_file, _DATA_FOR_PRED)
+    assert prediction.retrieve_data_for_prediction(pred_file, "monday") == _DATA_FOR_PRED
+
+
+@pytest.mark.parametrize("rel_time, reference", [
+    (0, {
+        "average": 1.5,
+        "min": 1.0,
+        "max": 2.0,
+        "stdev": 0.5
+    }),
+    (119, {
+        "average": None,
+        "min": None,
+        "max": None,
+        "stdev": None
+    }),
+    (150, {
+        "average": 3.0,
+        "min": 3.0,
+        "max": 3.0,
+        "stdev": 3.0
+    }),
+    (180, {
+        "average": None,
+        "min": None,
+        "max": None,
+        "stdev": None
+    }),
+])
+def test_retrieve_prediction_reference(tmp_path, rel_time, reference):
+    pred_file = str(tmp_path / "monday")
+    prediction.save_prediction_data(pred_file, _DATA_FOR_PRED)
+    assert prediction.retrieve_prediction_reference(pred_file, rel_time, "monday") == reference
+
+
+def test_retrieve_prediction_reference_of_former_json_format(tmp_path):
+    pred_file = tmp_path / "monday"
+    pred_file.write_text(json.dumps(_DATA_FOR_PRED))
+    assert prediction.retrieve_prediction_reference(str(pred_file), 0, "monday") is None
+    # ... which is still readable completely
+    assert prediction.retrieve_data_for_prediction(str(pred_file), "monday") == _DATA_FOR_PRED
+
+
+def test_retrieve_prediction_reference_without_file(tmp_path):
+    assert prediction.retrieve_prediction_reference(str(tmp_path / "monday"), 0, "monday") is None
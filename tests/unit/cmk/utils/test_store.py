@@ -10,6 +10,7 @@ import queue
 import os
 import stat
 import errno
+import time
 from pathlib import Path
 
 from six import ensure_binary
@@ -158,6 +159,41 @@ def test_save_data_to_file_not_pretty(tmp_path, path_type):
     assert store.load_object_from_file(path) == data
 
 
+@pytest.mark.parametrize("path_type", [str, Path])
+def test_reliable_file_signature(tmp_path, path_type):
+    path = tmp_path / "lala.mk"
+    assert store.reliable_file_signature(path_type(path)) == (True, None)
+
+    store.save_text_to_file(path, "x = 1\n")
+    reliable, signature = store.reliable_file_signature(path_type(path))
+    assert not reliable
+    assert signature == store.file_signature(path)
+
+    os.utime(str(path), (time.time() - 10, time.time() - 10))
+    reliable, aged_signature = store.reliable_file_signature(path_type(path))
+    assert reliable
+    assert aged_signature != signature
+
+
+@pytest.mark.parametrize("age_ns,whole_seconds,reliable", [
+    (500000000, False, True),
+    (50000000, False, False),
+    (500000000, True, False),
+    (3000000000, True, True),
+])
+def test_reliable_file_signature_timestamp_resolution(tmp_path, age_ns, whole_seconds, reliable):
+    path = tmp_path / "lala.mk"
+    store.save_text_to_file(path, "x = 1\n")
+    mtime_ns = time.time_ns() - age_ns
+    if whole_seconds:
+        # Like the timestamps of a file system with a resolution of seconds
+        mtime_ns -= mtime_ns % 1000000000
+    elif not mtime_ns % 1000000000:
+        mtime_ns -= 1
+    os.utime(str(path), ns=(mtime_ns, mtime_ns))
+    assert store.reliable_file_signature(path)[0] is reliable
+
+
 @pytest.mark.parametrize("path_type", [str, Path])
 @pytest.mark.parametrize("data", [
     None,
@@ -171,6 +207,164 @@ def test_save_data_to_file(tmp_path, path_type, data):
     assert store.load_object_from_file(path) == data
 
 
+@pytest.mark.parametrize("path_type", [str, Path])
+@pytest.mark.parametrize("data", [
+    None,
+    [2, 3],
+    [u"föö"],
+    [b'foob\xc3\xa4r'],
+    {
+        "a": (1, 2.5, True),
+        "b": {
+            "c": [None, {1, 2}]
+        }
+    },
+])
+def test_save_data_to_file_marshal(tmp_path, path_type, data):
+    path = path_type(tmp_path / "lala")
+    store.save_object_to_file(path, data, codec=store.MARSHAL_CODEC)
+    assert Path(path).read_bytes().startswith(store.MARSHAL_CODEC.header)
+    assert store.load_object_from_file(path) == data
+
+
+def test_save_data_to_file_marshal_not_plain_data(tmp_path):
+    class Data(dict):
+        pass
+
+    with pytest.raises(ValueError, match="unmarshallable"):
+        store.save_object_to_file(tmp_path / "lala", Data(), codec=store.MARSHAL_CODEC)
+
+
+def test_load_data_from_file_repr_after_marshal(tmp_path):
+    path = tmp_path / "lala"
+    store.save_object_to_file(path, {"a": 1}, codec=store.MARSHAL_CODEC)
+    store.save_object_to_file(path, {"a": 2})
+    assert store.load_object_from_file(path) == {"a": 2}
+
+
+def test_load_data_from_file_invalid_utf8(tmp_path):
+    path = tmp_path / "lala"
+    path.write_bytes(b"'\xff'")
+    with pytest.raises(MKGeneralException, match="Cannot read file"):
+        store.load_object_from_file(path)
+
+
+@pytest.mark.parametrize("header", [b"", b"\x02\x03", b"{"])
+def test_register_object_codec_invalid_header(header):
+    class Codec(store.MarshalCodec):
+        pass
+
+    Codec.header = header
+    with pytest.raises(ValueError):
+        store.register_object_codec(Codec())
+
+
+@pytest.fixture(name="file_cache")
+def fixture_file_cache():
+    store.enable_file_cache()
+    yield
+    store.disable_file_cache()
+
+
+def _make_reliable(path):
+    """Backdates the file as if it had not been changed recently, see reliable_file_signature()"""
+    mtime = time.time() - 10
+    os.utime(str(path), (mtime, mtime))
+
+
+def _file_cache_stats():
+    stats = store.file_cache_stats()
+    assert stats is not None
+    return stats["hits"], stats["misses"], stats["evictions"]
+
+
+def test_file_cache_disabled():
+    assert store.file_cache_stats() is None
+
+
+@pytest.mark.usefixtures("file_cache")
+@pytest.mark.parametrize("codec", [None, store.MARSHAL_CODEC])
+def test_file_cache_load_object_from_file(tmp_path, codec):
+    path = tmp_path / "lala"
+    store.save_object_to_file(path, {"a": [1]}, codec=codec)
+    _make_reliable(path)
+
+    first = store.load_object_from_file(path)
+    first["a"].append(2)
+    assert store.load_object_from_file(path) == {"a": [1]}
+    assert _file_cache_stats() == (1, 1, 0)
+
+    store.save_object_to_file(path, {"a": [3]}, codec=codec)
+    assert store.load_object_from_file(path) == {"a": [3]}
+    assert _file_cache_stats() == (1, 2, 0)
+
+
+@pytest.mark.usefixtures("file_cache")
+def test_file_cache_load_object_from_file_not_existing(tmp_path):
+    path = tmp_path / "lala"
+    assert store.load_object_from_file(path, default=42) == 42
+    store.save_object_to_file(path, 23)
+    assert store.load_object_from_file(path, default=42) == 23
+
+
+@pytest.mark.usefixtures("file_cache")
+def test_file_cache_load_object_from_file_locking(tmp_path):
+    path = tmp_path / "lala"
+    store.save_object_to_file(path, 1)
+    _make_reliable(path)
+    for _nr in range(2):
+        assert store.load_object_from_file(path, lock=True) == 1
+        assert store.have_lock(path)
+        store.release_lock(path)
+
+
+@pytest.mark.usefixtures("file_cache")
+def test_file_cache_load_mk_file(tmp_path):
+    path = tmp_path / "lala.mk"
+    store.save_to_mk_file(path, "x", {"a": 1})
+    _make_reliable(path)
+
+    assert store.load_mk_file(path, default={"x": {}}) == {"x": {"a": 1}}
+    assert store.load_mk_file(path, default={"x": {"b": 2}}) == {"x": {"a": 1, "b": 2}}
+    assert _file_cache_stats() == (1, 1, 0)
+
+
+@pytest.mark.usefixtures("file_cache")
+def test_file_cache_skips_recently_changed_files(tmp_path):
+    path = tmp_path / "lala"
+    store.save_object_to_file(path, 1)
+    assert store.load_object_from_file(path) == 1
+    assert store.load_object_from_file(path) == 1
+    assert _file_cache_stats() == (0, 2, 0)
+
+    # Same size and possibly the inode of the former file
+    store.save_object_to_file(path, 2)
+    assert store.load_object_from_file(path) == 2
+    assert _file_cache_stats() == (0, 3, 0)
+
+
+def test_file_cache_evicts_least_recently_used():
+    cache = store.FileCache(max_size=10)
+    cache.add(("object", "a"), (1, 4, 1), "a", 4)
+    cache.add(("object", "b"), (1, 4, 2), "b", 4)
+    assert cache.get(("object", "a"), (1, 4, 1)) == "a"
+    cache.add(("object", "c"), (1, 4, 3), "c", 4)
+    cache.add(("object", "d"), (1, 11, 4), "d", 11)
+
+    assert cache.get(("object", "b"), (1, 4, 2)) is None
+    assert cache.get(("object", "a"), (1, 4, 1)) == "a"
+    assert cache.get(("object", "c"), (1, 4, 3)) == "c"
+    assert cache.get(("object", "d"), (1, 11, 4)) is None
+    assert cache.get(("object", "a"), (2, 4, 1)) is None
+    assert cache.stats() == {
+        "hits": 3,
+        "misses": 3,
+        "evictions": 1,
+        "entries": 2,
+        "size": 8,
+    }
+
+
 @pytest.mark.parametrize("path_type", [str, Path])
 @pytest.mark.parametrize("data", [
     u"föö",
@@ -195,3 +195,168 @@ def test_create_socket_no_cert(tmp_path):
     with pytest.raises(livestatus.MKLivestatusConfigError,
                        match="(unknown error|no certificate or crl found)"):
         live._create_socket(socket.AF_INET)
+
+
+@pytest.mark.parametrize("query,result", [
+    ("GET hosts\nColumns: name mk_inventory state\n", [1]),
+    ("GET services\nColumns: host_name\nColumns: host_mk_inventory\n", [1]),
+    ("GET hosts\nColumns: name state\n", []),
+    ("GET hosts\nStats: state = 0\n", []),
+    ("GET hosts\n", None),
+    ("GET hosts\nColumns: name mk_logwatch_file:file:/var/log/messages\n", None),
+])
+def test_json_blob_positions(query, result):
+    tables = {"hosts": {"mk_inventory"}, "services": {"host_mk_inventory"}}
+    assert livestatus.json_blob_positions(query, tables) == result
+
+
+JSON_RESPONSE = (
+    b'[["heute","\\u00e4\\ud83d\\ude00",["a","b"],{"x":1.5},null,"{\\"a\\":\\u00ff}"],\n'
+    b'["morgen","",[],{},3,""]]\n')
+JSON_ROWS = [
+    ["heute", u"\xe4\U0001f600", ["a", "b"], {
+        "x": 1.5
+    }, None, b'{"a":\xff}'],
+    ["morgen", "", [], {}, 3, b""],
+]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 64, len(JSON_RESPONSE)])
+def test_json_row_decoder(chunk_size):
+    decoder = livestatus.JSONRowDecoder([5], column_headers=False)
+    rows = []
+    for offset in range(0, len(JSON_RESPONSE), chunk_size):
+        rows += decoder.feed(JSON_RESPONSE[offset:offset + chunk_size],
+                             final=offset + chunk_size >= len(JSON_RESPONSE))
+    assert rows == JSON_ROWS
+
+
+def test_json_row_decoder_column_headers():
+    decoder = livestatus.JSONRowDecoder([0], column_headers=True)
+    assert decoder.feed(b'[["mk_inventory"],\n["\\u00ff"]]\n', final=True) == [
+        ["mk_inventory"],
+        [b"\xff"],
+    ]
+    assert livestatus.JSONRowDecoder([], column_headers=False).feed(b"[]\n", final=True) == []
+
+
+def _connection_answering(monkeypatch, body):
+    client, server = socket.socketpair()
+    monkeypatch.setitem(livestatus.blob_columns, "unix:/tmp/xyz", {"hosts": {"mk_inventory"}})
+    live = livestatus.SingleSiteConnection("unix:/tmp/xyz")
+    live.socket = client
+    server.sendall(b"200 %11d\n" % len(body) + body)
+    return live, server
+
+
+def test_query_iter_json(monkeypatch):
+    live, server = _connection_answering(monkeypatch, JSON_RESPONSE)
+    rows = live.query_iter(
+        "GET hosts\nColumns: name alias parents custom_variables state mk_inventory\n")
+    assert list(rows) == JSON_ROWS
+    assert b"\nOutputFormat: json\n" in server.recv(4096)
+
+
+def test_query_python3_without_columns(monkeypatch):
+    live, server = _connection_answering(monkeypatch, b"[[u'heute', b'\\xff', None]]\n")
+    assert live.query("GET hosts\n") == [["heute", b"\xff", None]]
+    assert b"\nOutputFormat: python3\n" in server.recv(4096)
+
+
+def test_blob_columns_unknown(monkeypatch):
+    monkeypatch.setattr(livestatus, "_blob_columns_retry_at", {})
+    client, server = socket.socketpair()
+    live = livestatus.SingleSiteConnection("unix:/tmp/blobless")
+    live.socket = client
+    error = b"Invalid filter"
+    body = b"[[u'heute']]\n"
+    server.sendall(b"400 %11d\n" % len(error) + error + (b"200 %11d\n" % len(body) + body) * 2)
+
+    assert live.query("GET hosts\nColumns: name\n") == [["heute"]]
+    assert b"GET columns\n" in server.recv(4096)
+    # The site is not asked again with every query
+    assert live.query("GET hosts\nColumns: name\n") == [["heute"]]
+    assert b"GET columns\n" not in server.recv(4096)
+    assert "unix:/tmp/blobless" not in livestatus.blob_columns
+
+
+def _multisite_connection(monkeypatch, responses):
+    live = livestatus.MultiSiteConnection({})
+    servers = {}
+    for sitename, response in responses.items():
+        url = "unix:/tmp/%s" % sitename
+        monkeypatch.setitem(livestatus.blob_columns, url, {})
+        connection = livestatus.SingleSiteConnection(url)
+        connection.socket, servers[sitename] = socket.socketpair()
+        if response is not None:
+            servers[sitename].sendall(response)
+        live.connections.append((sitename, {"socket": url}, connection))
+    return live, servers
+
+
+def _response(body):
+    return b"200 %11d\n" % len(body) + body
+
+
+def test_query_parallel(monkeypatch):
+    live, _servers = _multisite_connection(monkeypatch, {
+        "first": _response(b'[["a"],\n["b"]]\n'),
+        "second": _response(b'[["c"]]\n'),
+    })
+    live.set_prepend_site(True)
+    assert live.query("GET hosts\nColumns: name\n") == [
+        ["first", "a"],
+        ["first", "b"],
+        ["second", "c"],
+    ]
+    assert live.alive_sites() == ["first", "second"]
+    stats = live.query_stats()
+    assert stats["first"].bytes_received == 16 + 15
+    assert stats["first"].rows == 2
+    assert stats["second"].duration is not None
+
+
+def test_query_parallel_broken_site(monkeypatch):
+    live, servers = _multisite_connection(monkeypatch, {
+        "broken": b"200          100\n[[\"a\"],\n",
+        "ok": _response(b'[["c"]]\n'),
+    })
+    servers["broken"].close()
+    assert live.query("GET hosts\nColumns: name\n") == [["c"]]
+    assert live.alive_sites() == ["ok"]
+    assert "broken" in live.dead_sites()
+
+
+def test_query_iter_query_timeout(monkeypatch):
+    live, _servers = _multisite_connection(monkeypatch, {
+        "hanging": None,
+        "ok": _response(b'[["c"]]\n'),
+    })
+    live.set_query_timeout(0.1)
+    assert list(live.query_iter("GET hosts\nColumns: name\n")) == [["c"]]
+    assert live.alive_sites() == ["ok"]
+    assert "did not answer" in str(live.dead_sites()["hanging"]["exception"])
+
+
+def test_query_iter_nested_query(monkeypatch):
+    live, servers = _multisite_connection(monkeypatch, {
+        "first": _response(b'[["a"]]\n'),
+        "second": None,
+    })
+    live.set_prepend_site(True)
+    rows = live.query_iter("GET hosts\nColumns: name\n")
+    assert next(rows) == ["first", "a"]
+
+    live.set_prepend_site(False)
+    with pytest.raises(RuntimeError):
+        live.query("GET hosts\nColumns: name\n")
+    with pytest.raises(RuntimeError):
+        live.command("[1] NOP", "first")
+
+    servers["second"].sendall(_response(b'[["b"]]\n'))
+    assert list(rows) == [["second", "b"]]
+
+    # The connections are free again
+    servers["first"].sendall(_response(b'[["c"]]\n'))
+    servers["second"].sendall(_response(b'[["d"]]\n'))
+    assert live.query("GET hosts\nColumns: name\n") == [["c"], ["d"]]